@@ -0,0 +1,197 @@
+"""
+Background dependency probes for ``/health`` and ``/ready``.
+
+Load-balancer and orchestrator probes hit the health endpoints every few
+seconds per instance; forwarding each one to Triton would put gRPC calls on
+the probe path and make the 100 ms health SLA depend on the model server.
+``HealthMonitor`` instead runs every dependency probe concurrently on an
+interval in a background task, each bounded by a timeout, and the endpoints
+return the last snapshot without doing any I/O.
+
+Readiness has three states:
+
+- ``ready``: every probe succeeded quickly and generation is responsive.
+- ``degraded``: dependencies answer but slowly (probe latency over
+  ``slow_probe_ms``), recent time to first token is over ``max_ttft_ms``, or
+  the snapshot is stale because probing stopped. Traffic can be shifted
+  away gradually.
+- ``unavailable``: a probe failed or timed out, or nothing has been checked
+  yet.
+
+Recent time to first token is the mean over the last probe interval, read
+from the ``absher_time_to_first_token_seconds`` histogram, so no test
+generation is sent to the model.
+
+Requirements: 1.3
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from observability.metrics import TIME_TO_FIRST_TOKEN
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_S = 5.0
+DEFAULT_TIMEOUT_S = 1.0
+DEFAULT_SLOW_PROBE_MS = 250.0
+DEFAULT_MAX_TTFT_MS = 2000.0
+
+# A snapshot older than this many intervals means probing has stopped
+STALE_INTERVALS = 3
+
+READY = "ready"
+DEGRADED = "degraded"
+UNAVAILABLE = "unavailable"
+
+Probe = Callable[[], Awaitable[bool]]
+
+
+@dataclass
+class ProbeResult:
+    """Outcome of one dependency probe."""
+    ok: bool
+    latency_ms: float
+    error: Optional[str] = None
+
+
+@dataclass
+class HealthSnapshot:
+    """Probe results and the readiness derived from them."""
+    status: str
+    reasons: List[str] = field(default_factory=list)
+    checks: Dict[str, ProbeResult] = field(default_factory=dict)
+    checked_at: Optional[datetime] = None
+    recent_ttft_ms: Optional[float] = None
+    checked_monotonic: float = 0.0
+
+    def ok(self, name: str) -> bool:
+        """True if probe ``name`` succeeded, or is not configured."""
+        result = self.checks.get(name)
+        return result is None or result.ok
+
+
+class HealthMonitor:
+    """Runs dependency probes periodically and caches the latest snapshot."""
+
+    def __init__(
+        self,
+        probes: Dict[str, Probe],
+        interval_s: float = DEFAULT_INTERVAL_S,
+        timeout_s: float = DEFAULT_TIMEOUT_S,
+        slow_probe_ms: float = DEFAULT_SLOW_PROBE_MS,
+        max_ttft_ms: float = DEFAULT_MAX_TTFT_MS,
+    ):
+        """
+        Initialize the monitor.
+
+        Args:
+            probes: Async checks by dependency name; each returns True if ready
+            interval_s: Time between probe rounds
+            timeout_s: A probe taking longer counts as failed
+            slow_probe_ms: A successful probe taking longer degrades readiness
+            max_ttft_ms: Recent mean time to first token that degrades readiness
+        """
+        if interval_s <= 0:
+            raise ValueError("interval_s must be positive")
+        self.probes = dict(probes)
+        self.interval_s = interval_s
+        self.timeout_s = timeout_s
+        self.slow_probe_ms = slow_probe_ms
+        self.max_ttft_ms = max_ttft_ms
+        self._snapshot = HealthSnapshot(status=UNAVAILABLE, reasons=["not checked yet"])
+        self._ttft_totals: Tuple[int, float] = TIME_TO_FIRST_TOKEN.totals()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _probe(self, name: str, probe: Probe) -> ProbeResult:
+        start = time.perf_counter()
+        try:
+            ok = bool(await asyncio.wait_for(probe(), self.timeout_s))
+            error = None if ok else "not ready"
+        except asyncio.TimeoutError:
+            ok, error = False, f"timed out after {self.timeout_s:g}s"
+        except Exception as e:
+            ok, error = False, str(e)
+        return ProbeResult(ok, (time.perf_counter() - start) * 1000, error)
+
+    def _recent_ttft_ms(self) -> Optional[float]:
+        """Mean time to first token since the previous round, if any generation finished."""
+        count, total = TIME_TO_FIRST_TOKEN.totals()
+        last_count, last_total = self._ttft_totals
+        self._ttft_totals = (count, total)
+        if count <= last_count:
+            return None
+        return (total - last_total) / (count - last_count) * 1000
+
+    async def check(self) -> HealthSnapshot:
+        """Run every probe once, concurrently, and store the new snapshot."""
+        names = list(self.probes)
+        results = await asyncio.gather(*(self._probe(n, self.probes[n]) for n in names))
+        checks = dict(zip(names, results))
+        recent_ttft_ms = self._recent_ttft_ms()
+
+        reasons = [f"{name}: {r.error}" for name, r in checks.items() if not r.ok]
+        if reasons:
+            status = UNAVAILABLE
+        else:
+            reasons = [
+                f"{name}: slow probe ({r.latency_ms:.0f} ms)"
+                for name, r in checks.items()
+                if r.latency_ms > self.slow_probe_ms
+            ]
+            if recent_ttft_ms is not None and recent_ttft_ms > self.max_ttft_ms:
+                reasons.append(f"time to first token {recent_ttft_ms:.0f} ms")
+            status = DEGRADED if reasons else READY
+
+        self._snapshot = HealthSnapshot(
+            status=status,
+            reasons=reasons,
+            checks=checks,
+            checked_at=datetime.utcnow(),
+            recent_ttft_ms=recent_ttft_ms,
+            checked_monotonic=time.monotonic(),
+        )
+        if status != READY:
+            logger.warning(f"Readiness {status}: {'; '.join(reasons)}")
+        return self._snapshot
+
+    def snapshot(self) -> HealthSnapshot:
+        """The latest snapshot; degraded if probing has fallen behind."""
+        snapshot = self._snapshot
+        age_s = time.monotonic() - snapshot.checked_monotonic
+        if snapshot.status == READY and age_s > STALE_INTERVALS * self.interval_s:
+            return HealthSnapshot(
+                status=DEGRADED,
+                reasons=[f"health snapshot is {age_s:.0f}s old"],
+                checks=snapshot.checks,
+                checked_at=snapshot.checked_at,
+                recent_ttft_ms=snapshot.recent_ttft_ms,
+                checked_monotonic=snapshot.checked_monotonic,
+            )
+        return snapshot
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Health probe round failed: {e}")
+
+    async def start(self) -> None:
+        """Run a first probe round, then keep probing in the background."""
+        await self.check()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -1,28 +1,423 @@
 """FastAPI application for Absher Chatbot Server."""
 
+import asyncio
+import json
+import math
 import os
-from datetime import datetime
+import time
+import uuid
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from datetime import datetime
+from typing import AsyncGenerator, List, Optional, Tuple
 
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from sse_starlette.sse import EventSourceResponse
 
-from api.models import HealthResponse, ErrorResponse
+from api.health import (
+    DEFAULT_INTERVAL_S,
+    DEFAULT_MAX_TTFT_MS,
+    DEFAULT_SLOW_PROBE_MS,
+    DEFAULT_TIMEOUT_S,
+    READY,
+    UNAVAILABLE,
+    HealthMonitor,
+)
+from api.models import (
+    ChatRequest,
+    ChatResponse,
+    ErrorResponse,
+    HealthResponse,
+    Message,
+    ProbeStatus,
+    RAGSource,
+    ReadyResponse,
+    Usage,
+)
+from api.prompt import CONTEXT_IN_TURN, STOP_SEQUENCES, build_prompt
+from api.rate_limit import (
+    DEFAULT_REDIS_TIMEOUT_S,
+    DEFAULT_REQUEST_BURST,
+    DEFAULT_TOKEN_BURST,
+    DEFAULT_TOKENS_PER_MINUTE,
+    RateLimiter,
+    RateLimits,
+)
+from api.semantic_cache import (
+    DEFAULT_MAX_INDEX_BYTES,
+    DEFAULT_SIMILARITY_THRESHOLD,
+    SemanticCache,
+    cacheable_question,
+)
+from api.sessions import (
+    DEFAULT_MAX_INPUT_TOKENS,
+    DEFAULT_MAX_SESSIONS,
+    DEFAULT_SESSION_TTL_S,
+    InMemorySessionStore,
+    PromptAssembler,
+    PromptTooLongError,
+    RedisSessionStore,
+    SessionPrompt,
+)
+from api.streaming import DEFAULT_MAX_BUFFERED_TOKENS, TokenStreamRelay
+from guardrails import Guardrails, StreamFilter, load_terms
+from models import ENSEMBLE_MODEL_NAME
+from models.admission import (
+    DEFAULT_BATCH_QUEUE_TIMEOUT_S,
+    DEFAULT_KV_TOKEN_BUDGET,
+    DEFAULT_MAX_IN_FLIGHT,
+    DEFAULT_MAX_QUEUE,
+    DEFAULT_QUEUE_TIMEOUT_S,
+    INTERACTIVE,
+    PRIORITIES,
+    AdmissionController,
+    AdmittedTritonClient,
+    OverloadedError,
+)
+from models.channel_pool import TritonChannelPool
+from models.mock_latency import parse_latency_model
+from models.prefix_cache import combined_hit_ratio
+from models.response_cache import (
+    DEFAULT_MAX_ENTRIES,
+    DEFAULT_MAX_TEMPERATURE,
+    DEFAULT_TTL_S,
+    CachedTritonClient,
+    InMemoryCacheBackend,
+    RedisCacheBackend,
+)
+from models.router import DEFAULT_AFFINITY_SLACK, TritonRouter
+from models.single_flight import SingleFlightTritonClient
+from models.triton_client import (
+    InferenceConfig,
+    MockTritonClient,
+    TritonClient,
+    TritonClientError,
+    create_triton_client,
+)
+from models.usage import GenerationStats
+from observability.metrics import (
+    ADMISSION_KV_TOKENS_IN_USE,
+    ADMISSION_QUEUED,
+    CACHE_HIT_RATIO,
+    CONTENT_TYPE,
+    GUARDRAILS,
+    REGISTRY,
+    RETRIEVAL,
+    ROUTER_BACKEND_HEALTHY,
+)
+from rag.embeddings import (
+    DEFAULT_EMBEDDING_MODEL,
+    BatchingEmbedder,
+    SentenceTransformerEmbedder,
+)
+from rag.hybrid import DEFAULT_DENSE_WEIGHT, DEFAULT_FUSION
+from rag.ivf import DEFAULT_N_PROBE
+from rag.pipeline import DEFAULT_MIN_SCORE, DEFAULT_TOP_K, RetrievalPipeline
 
 # Application version
 VERSION = "0.1.0"
 
+# Streaming configuration
+STREAM_MAX_BUFFERED_TOKENS = int(
+    os.getenv("STREAM_MAX_BUFFERED_TOKENS", str(DEFAULT_MAX_BUFFERED_TOKENS))
+)
+STREAM_SEND_TIMEOUT_S = float(os.getenv("STREAM_SEND_TIMEOUT_S", "10"))
+STREAM_PING_INTERVAL_S = int(os.getenv("STREAM_PING_INTERVAL_S", "15"))
+
+# Number of persistent gRPC channels to Triton per worker
+TRITON_CHANNEL_POOL_SIZE = int(os.getenv("TRITON_CHANNEL_POOL_SIZE", "4"))
+
+# Triton model serving text in and out: "ensemble", or "tensorrt_llm_bls"
+# for draft-target speculative decoding (see scripts/convert_allam.py)
+TRITON_MODEL_NAME = os.getenv("TRITON_MODEL_NAME", ENSEMBLE_MODEL_NAME)
+# Draft tokens verified per step by tensorrt_llm_bls (0 decodes without a draft)
+SPECULATIVE_DRAFT_TOKENS = int(os.getenv("SPECULATIVE_DRAFT_TOKENS", "0"))
+
+# Extra in-flight generations a session's replica may have over the least
+# loaded one before the session moves (several TRITON_URL replicas only)
+ROUTER_AFFINITY_SLACK = int(os.getenv("ROUTER_AFFINITY_SLACK", str(DEFAULT_AFFINITY_SLACK)))
+
+# Client-side micro-batching window for non-streaming requests (disabled if unset)
+TRITON_BATCH_WINDOW_MS = (
+    float(os.environ["TRITON_BATCH_WINDOW_MS"]) if os.getenv("TRITON_BATCH_WINDOW_MS") else None
+)
+
+# Simulated engine latency of the mock client, e.g. "a100" or "l4,token_ms=40"
+# (see models.mock_latency; unset keeps the fixed mock timing)
+MOCK_TRITON_LATENCY = os.getenv("MOCK_TRITON_LATENCY", "")
+
+# Tokenizer for counting tokens the model does not report (estimated if unset)
+TOKENIZER_DIR = os.getenv("TOKENIZER_DIR") or None
+
+# Sampling settings for chat generation
+CHAT_MAX_TOKENS = int(os.getenv("CHAT_MAX_TOKENS", "512"))
+CHAT_TEMPERATURE = float(os.getenv("CHAT_TEMPERATURE", "0.7"))
+
+# Response cache: "memory", "redis" or unset (disabled)
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "").lower()
+RESPONSE_CACHE_TTL_S = float(os.getenv("RESPONSE_CACHE_TTL_S", str(DEFAULT_TTL_S)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES)))
+RESPONSE_CACHE_MAX_TEMPERATURE = float(
+    os.getenv("RESPONSE_CACHE_MAX_TEMPERATURE", str(DEFAULT_MAX_TEMPERATURE))
+)
+
+# Share identical in-flight generations of deterministic configs (see models.single_flight)
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+SINGLE_FLIGHT_MAX_TEMPERATURE = float(
+    os.getenv("SINGLE_FLIGHT_MAX_TEMPERATURE", str(DEFAULT_MAX_TEMPERATURE))
+)
+
+# Conversation sessions: "memory", "redis" or "none" (re-render every turn)
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "memory").lower()
+SESSION_TTL_S = float(os.getenv("SESSION_TTL_S", str(DEFAULT_SESSION_TTL_S)))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", str(DEFAULT_MAX_SESSIONS)))
+# Prompt token budget; history beyond it is dropped oldest first
+PROMPT_MAX_INPUT_TOKENS = int(os.getenv("PROMPT_MAX_INPUT_TOKENS", str(DEFAULT_MAX_INPUT_TOKENS)))
+# Retrieved passages in the latest user turn ("turn", keeps a reusable KV-cache
+# prefix) or in the system block ("system")
+PROMPT_CONTEXT_PLACEMENT = os.getenv("PROMPT_CONTEXT_PLACEMENT", CONTEXT_IN_TURN).lower()
+
+# Semantic (embedding-similarity) answer cache
+SEMANTIC_CACHE_THRESHOLD = float(
+    os.getenv("SEMANTIC_CACHE_THRESHOLD", str(DEFAULT_SIMILARITY_THRESHOLD))
+)
+SEMANTIC_CACHE_MAX_MB = float(
+    os.getenv("SEMANTIC_CACHE_MAX_MB", str(DEFAULT_MAX_INDEX_BYTES / (1024 * 1024)))
+)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+
+# Retrieval: directory produced by scripts/build_rag_index.py (disabled if unset)
+RAG_INDEX_DIR = os.getenv("RAG_INDEX_DIR", "")
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", str(DEFAULT_TOP_K)))
+RAG_MIN_SCORE = float(os.getenv("RAG_MIN_SCORE", str(DEFAULT_MIN_SCORE)))
+# Clusters searched per query when the index is IVF (see scripts/benchmark_ann.py)
+RAG_N_PROBE = int(os.getenv("RAG_N_PROBE", str(DEFAULT_N_PROBE)))
+# Hybrid dense + BM25 fusion ("rrf" or "weighted"), used when the index has BM25
+RAG_FUSION = os.getenv("RAG_FUSION", DEFAULT_FUSION)
+RAG_DENSE_WEIGHT = float(os.getenv("RAG_DENSE_WEIGHT", str(DEFAULT_DENSE_WEIGHT)))
+
+# Content guardrails (on unless GUARDRAILS_ENABLED=false)
+GUARDRAILS_ENABLED = os.getenv("GUARDRAILS_ENABLED", "true").lower() in ("1", "true", "yes")
+GUARDRAILS_BLOCKLIST = os.getenv("GUARDRAILS_BLOCKLIST", "")
+
+# Background dependency probes behind /health and /ready
+HEALTH_PROBE_INTERVAL_S = float(os.getenv("HEALTH_PROBE_INTERVAL_S", str(DEFAULT_INTERVAL_S)))
+HEALTH_PROBE_TIMEOUT_S = float(os.getenv("HEALTH_PROBE_TIMEOUT_S", str(DEFAULT_TIMEOUT_S)))
+READY_SLOW_PROBE_MS = float(os.getenv("READY_SLOW_PROBE_MS", str(DEFAULT_SLOW_PROBE_MS)))
+READY_MAX_TTFT_MS = float(os.getenv("READY_MAX_TTFT_MS", str(DEFAULT_MAX_TTFT_MS)))
+
+# Admission control for generation slots (see models.admission)
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_KV_TOKENS = int(os.getenv("ADMISSION_KV_TOKENS", str(DEFAULT_KV_TOKEN_BUDGET)))
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", str(DEFAULT_MAX_IN_FLIGHT)))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", str(DEFAULT_MAX_QUEUE)))
+ADMISSION_QUEUE_TIMEOUT_S = float(
+    os.getenv("ADMISSION_QUEUE_TIMEOUT_S", str(DEFAULT_QUEUE_TIMEOUT_S))
+)
+ADMISSION_BATCH_QUEUE_TIMEOUT_S = float(
+    os.getenv("ADMISSION_BATCH_QUEUE_TIMEOUT_S", str(DEFAULT_BATCH_QUEUE_TIMEOUT_S))
+)
+
+# Per-user rate limits in Redis (see api.rate_limit); 0 requests per minute disables
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", str(DEFAULT_REQUEST_BURST)))
+RATE_LIMIT_TOKENS_PER_MINUTE = float(
+    os.getenv("RATE_LIMIT_TOKENS_PER_MINUTE", str(DEFAULT_TOKENS_PER_MINUTE))
+)
+RATE_LIMIT_TOKEN_BURST = float(os.getenv("RATE_LIMIT_TOKEN_BURST", str(DEFAULT_TOKEN_BURST)))
+RATE_LIMIT_REDIS_TIMEOUT_MS = float(
+    os.getenv("RATE_LIMIT_REDIS_TIMEOUT_MS", str(DEFAULT_REDIS_TIMEOUT_S * 1000))
+)
+
+
+def _env_flag(name: str) -> bool:
+    """Read a boolean flag from the environment."""
+    return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+
+def dependency_probes(triton_client, retriever: Optional[RetrievalPipeline]) -> dict:
+    """Readiness probes for Triton and, if it has one, the RAG vector store."""
+    async def triton() -> bool:
+        return await triton_client.is_server_ready() and await triton_client.is_model_ready()
+
+    probes = {"triton": triton}
+    index_ready = getattr(retriever.index, "is_ready", None) if retriever is not None else None
+    if index_ready is not None:
+        # Qdrant's client is synchronous; keep it off the event loop
+        probes["vector_store"] = lambda: asyncio.to_thread(index_ready)
+    return probes
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """Application lifespan handler for startup/shutdown."""
     # Startup
     print("Starting Absher Chatbot Server...")
+    # Comma-separated replicas are routed by TritonRouter
+    triton_urls = [url.strip() for url in os.getenv("TRITON_URL", "localhost:8001").split(",")]
+    triton_urls = [url for url in triton_urls if url]
+    use_mock = _env_flag("USE_MOCK_TRITON")
+
+    app.state.triton_pools = []
+    replicas = []
+    for url in triton_urls:
+        pool = None
+        if not use_mock:
+            pool = TritonChannelPool(url=url, size=TRITON_CHANNEL_POOL_SIZE)
+            await pool.start()
+            app.state.triton_pools.append(pool)
+        replicas.append(create_triton_client(
+            url=url,
+            model_name=TRITON_MODEL_NAME,
+            use_mock=use_mock,
+            pool=pool,
+            batch_window_ms=TRITON_BATCH_WINDOW_MS,
+            tokenizer_dir=TOKENIZER_DIR,
+            mock_latency=parse_latency_model(MOCK_TRITON_LATENCY) if use_mock else None,
+        ))
+
+    if len(replicas) > 1:
+        # Replica probes share the health monitor's timeout with the other probes
+        app.state.triton_client = TritonRouter(
+            replicas,
+            affinity_slack=ROUTER_AFFINITY_SLACK,
+            probe_timeout_s=HEALTH_PROBE_TIMEOUT_S / 2,
+        )
+        for backend in app.state.triton_client.backends:
+            ROUTER_BACKEND_HEALTHY.labels(backend.name).set_function(
+                lambda backend=backend: float(backend.healthy)
+            )
+    else:
+        app.state.triton_client = replicas[0]
+
+    prefix_trackers = [
+        replica.prefix_tracker
+        for replica in replicas
+        if getattr(replica, "prefix_tracker", None) is not None
+    ]
+    if prefix_trackers:
+        CACHE_HIT_RATIO.labels("kv_prefix").set_function(
+            lambda: combined_hit_ratio(prefix_trackers)
+        )
+
+    if ADMISSION_ENABLED:
+        # The budget is per replica, as every replica runs its own engine
+        admission = AdmissionController(
+            kv_token_budget=ADMISSION_KV_TOKENS * len(replicas),
+            max_in_flight=ADMISSION_MAX_IN_FLIGHT * len(replicas),
+            max_queue=ADMISSION_MAX_QUEUE,
+            queue_timeout_s=ADMISSION_QUEUE_TIMEOUT_S,
+            batch_queue_timeout_s=ADMISSION_BATCH_QUEUE_TIMEOUT_S,
+        )
+        # Inside the response cache, so cache hits never wait for a slot
+        app.state.triton_client = AdmittedTritonClient(app.state.triton_client, admission)
+        ADMISSION_KV_TOKENS_IN_USE.set_function(lambda: admission.tokens_in_use)
+        for priority in PRIORITIES:
+            ADMISSION_QUEUED.labels(priority).set_function(
+                lambda priority=priority: admission.queued(priority)
+            )
+
+    if SINGLE_FLIGHT_ENABLED:
+        # Outside admission, so requests that join a generation take no slot,
+        # and inside the response cache, which answers once it has finished
+        app.state.triton_client = SingleFlightTritonClient(
+            app.state.triton_client, max_temperature=SINGLE_FLIGHT_MAX_TEMPERATURE
+        )
+
+    if RESPONSE_CACHE_BACKEND in ("memory", "redis"):
+        if RESPONSE_CACHE_BACKEND == "redis":
+            backend = RedisCacheBackend(url=REDIS_URL)
+        else:
+            backend = InMemoryCacheBackend(max_entries=RESPONSE_CACHE_MAX_ENTRIES)
+        app.state.triton_client = CachedTritonClient(
+            app.state.triton_client,
+            backend,
+            ttl_s=RESPONSE_CACHE_TTL_S,
+            max_temperature=RESPONSE_CACHE_MAX_TEMPERATURE,
+        )
+        CACHE_HIT_RATIO.labels("response").set_function(
+            lambda cache=app.state.triton_client: cache.stats.hit_rate
+        )
+
+    app.state.prompt_assembler = None
+    if SESSION_STORE_BACKEND in ("memory", "redis"):
+        if SESSION_STORE_BACKEND == "redis":
+            store = RedisSessionStore(url=REDIS_URL)
+        else:
+            store = InMemorySessionStore(max_sessions=SESSION_MAX_ENTRIES)
+        app.state.prompt_assembler = PromptAssembler(
+            store,
+            counter=getattr(app.state.triton_client, "token_counter", None),
+            max_input_tokens=PROMPT_MAX_INPUT_TOKENS,
+            ttl_s=SESSION_TTL_S,
+            context_placement=PROMPT_CONTEXT_PLACEMENT,
+        )
+
+    app.state.rate_limiter = None
+    if RATE_LIMIT_PER_MINUTE > 0:
+        limits = RateLimits(
+            requests_per_minute=RATE_LIMIT_PER_MINUTE,
+            request_burst=RATE_LIMIT_BURST,
+            tokens_per_minute=RATE_LIMIT_TOKENS_PER_MINUTE,
+            token_burst=RATE_LIMIT_TOKEN_BURST,
+        )
+        app.state.rate_limiter = RateLimiter.from_url(
+            REDIS_URL, limits, timeout_s=RATE_LIMIT_REDIS_TIMEOUT_MS / 1000
+        )
+
+    app.state.embedder = None
+    app.state.semantic_cache = None
+    if _env_flag("SEMANTIC_CACHE_ENABLED"):
+        app.state.embedder = BatchingEmbedder(SentenceTransformerEmbedder(EMBEDDING_MODEL))
+        app.state.semantic_cache = SemanticCache(
+            app.state.embedder,
+            threshold=SEMANTIC_CACHE_THRESHOLD,
+            max_bytes=int(SEMANTIC_CACHE_MAX_MB * 1024 * 1024),
+        )
+        CACHE_HIT_RATIO.labels("semantic").set_function(
+            lambda cache=app.state.semantic_cache: cache.hit_rate
+        )
+
+    app.state.guardrails = None
+    if GUARDRAILS_ENABLED:
+        app.state.guardrails = Guardrails.create(load_terms(GUARDRAILS_BLOCKLIST))
+
+    app.state.retriever = None
+    if RAG_INDEX_DIR:
+        if app.state.embedder is None:
+            app.state.embedder = BatchingEmbedder(SentenceTransformerEmbedder(EMBEDDING_MODEL))
+        app.state.retriever = RetrievalPipeline.load(
+            RAG_INDEX_DIR,
+            app.state.embedder,
+            n_probe=RAG_N_PROBE,
+            top_k=RAG_TOP_K,
+            min_score=RAG_MIN_SCORE,
+            fusion=RAG_FUSION,
+            dense_weight=RAG_DENSE_WEIGHT,
+        )
+        print(f"Loaded RAG index with {len(app.state.retriever)} chunks from {RAG_INDEX_DIR}")
+
+    app.state.health_monitor = HealthMonitor(
+        dependency_probes(app.state.triton_client, app.state.retriever),
+        interval_s=HEALTH_PROBE_INTERVAL_S,
+        timeout_s=HEALTH_PROBE_TIMEOUT_S,
+        slow_probe_ms=READY_SLOW_PROBE_MS,
+        max_ttft_ms=READY_MAX_TTFT_MS,
+    )
+    await app.state.health_monitor.start()
     yield
     # Shutdown
     print("Shutting down Absher Chatbot Server...")
+    await app.state.health_monitor.close()
+    if app.state.rate_limiter is not None:
+        await app.state.rate_limiter.close()
+    if app.state.prompt_assembler is not None:
+        await app.state.prompt_assembler.store.close()
+    await app.state.triton_client.close()
+    for pool in app.state.triton_pools:
+        await pool.close()
 
 
 app = FastAPI(
@@ -61,23 +456,266 @@ async def global_exception_handler(request: Request, exc: Exception) -> JSONResp
     )
 
 
+def get_triton_client(request: Request) -> TritonClient | MockTritonClient:
+    """Dependency returning the application-wide Triton client."""
+    return request.app.state.triton_client
+
+
+def get_semantic_cache(request: Request) -> Optional[SemanticCache]:
+    """Dependency returning the semantic answer cache, if enabled."""
+    return getattr(request.app.state, "semantic_cache", None)
+
+
+def get_retriever(request: Request) -> Optional[RetrievalPipeline]:
+    """Dependency returning the RAG retrieval pipeline, if an index is loaded."""
+    return getattr(request.app.state, "retriever", None)
+
+
+def get_guardrails(request: Request) -> Optional[Guardrails]:
+    """Dependency returning the content guardrails, if enabled."""
+    return getattr(request.app.state, "guardrails", None)
+
+
+def get_health_monitor(request: Request) -> Optional[HealthMonitor]:
+    """Dependency returning the background health monitor, once started."""
+    return getattr(request.app.state, "health_monitor", None)
+
+
+def get_prompt_assembler(request: Request) -> Optional[PromptAssembler]:
+    """Dependency returning the session prompt assembler, if sessions are enabled."""
+    return getattr(request.app.state, "prompt_assembler", None)
+
+
+def get_rate_limiter(request: Request) -> Optional[RateLimiter]:
+    """Dependency returning the per-user rate limiter, if enabled."""
+    return getattr(request.app.state, "rate_limiter", None)
+
+
+_INPUT_GUARDRAILS = GUARDRAILS.labels("input")
+_OUTPUT_GUARDRAILS = GUARDRAILS.labels("output")
+
+
+def screen_messages(
+    guardrails: Optional[Guardrails],
+    messages: List[Message],
+) -> Tuple[List[Message], bool]:
+    """
+    Run the input filter over every message.
+
+    Returns:
+        Tuple of (messages with PII redacted, whether the request is blocked)
+    """
+    if guardrails is None:
+        return messages, False
+    start = time.perf_counter()
+    screened = []
+    try:
+        for message in messages:
+            result = guardrails.input.filter(message.content)
+            if result.blocked:
+                return messages, True
+            screened.append(
+                message.model_copy(update={"content": result.text}) if result.matches else message
+            )
+        return screened, False
+    finally:
+        _INPUT_GUARDRAILS.observe(time.perf_counter() - start)
+
+
+def overloaded_error() -> ErrorResponse:
+    """Arabic error for a request shed by admission control."""
+    return ErrorResponse(
+        error="overloaded",
+        message_ar="الخدمة مشغولة حالياً، يرجى المحاولة بعد قليل",
+    )
+
+
+def overloaded_response(retry_after_s: float) -> JSONResponse:
+    """503 response for a request shed by admission control."""
+    return JSONResponse(
+        status_code=503,
+        content=overloaded_error().model_dump(),
+        headers={"Retry-After": str(max(1, round(retry_after_s)))},
+    )
+
+
+def rate_limited_response(retry_after_s: float) -> JSONResponse:
+    """429 response for a user over their request or token limit."""
+    return JSONResponse(
+        status_code=429,
+        content=ErrorResponse(
+            error="rate_limited",
+            message_ar="لقد تجاوزت الحد المسموح من الطلبات، يرجى المحاولة بعد قليل",
+        ).model_dump(),
+        headers={"Retry-After": str(max(1, math.ceil(retry_after_s)))},
+    )
+
+
+def prompt_too_long_error() -> ErrorResponse:
+    """Arabic error for a question that does not fit the model's input."""
+    return ErrorResponse(
+        error="prompt_too_long",
+        message_ar="الرسالة طويلة جداً، يرجى اختصارها",
+    )
+
+
+def content_blocked_response() -> JSONResponse:
+    """400 response for a prompt rejected by the guardrails."""
+    return JSONResponse(
+        status_code=400,
+        content=ErrorResponse(
+            error="content_blocked",
+            message_ar="عذراً، لا يمكن معالجة هذا الطلب",
+        ).model_dump(),
+    )
+
+
+async def retrieve_context(
+    retriever: Optional[RetrievalPipeline],
+    messages: List[Message],
+    semantic_cache: Optional[SemanticCache] = None,
+    question: Optional[str] = None,
+    question_vector=None,
+) -> Tuple[List[str], List[RAGSource]]:
+    """
+    Retrieve passages for the latest user message.
+
+    The semantic cache embedding of ``question`` is reused when the cache and
+    the retriever share an embedder, so a first-turn question is embedded once.
+
+    Returns:
+        Tuple of (passage texts for the prompt, sources for the response)
+    """
+    user_messages = [m.content.strip() for m in messages if m.role == "user"]
+    if retriever is None or not user_messages:
+        return [], []
+    query = user_messages[-1]
+    if query != question or retriever.embedder is not getattr(semantic_cache, "embedder", None):
+        question_vector = None
+    start = time.perf_counter()
+    retrieved = await retriever.retrieve(query, query_vector=question_vector)
+    RETRIEVAL.observe(time.perf_counter() - start)
+    sources = [
+        RAGSource(
+            document_id=r.chunk.document_id,
+            service_category=r.chunk.service_category,
+            relevance_score=r.score,
+        )
+        for r in retrieved
+    ]
+    return [r.chunk.text for r in retrieved], sources
+
+
+async def assemble_prompt(
+    assembler: Optional[PromptAssembler],
+    chat_request: ChatRequest,
+    messages: List[Message],
+    context: List[str],
+    sources: List[RAGSource],
+) -> Tuple[str, Optional[SessionPrompt], List[RAGSource]]:
+    """
+    Build the model prompt, from the session's stored turns when enabled.
+
+    A request without a ``session_id`` cannot be continued, so its prompt is
+    assembled without reading or writing the session store.
+
+    Returns:
+        Tuple of (prompt, session to record the answer in or None, sources
+        of the passages that fit the prompt)
+
+    Raises:
+        PromptTooLongError: If the latest turn does not fit the token budget
+    """
+    if assembler is None:
+        prompt = build_prompt(messages, context=context, context_placement=PROMPT_CONTEXT_PLACEMENT)
+        return prompt, None, sources
+    session_key = None
+    if chat_request.session_id is not None:
+        # Scoped by user, so a guessed session id cannot evict another user's session
+        session_key = f"{chat_request.user_id}:{chat_request.session_id}"
+    session = await assembler.build(session_key, messages, context)
+    sources = sources[:len(sources) - session.dropped_passages]
+    return session.prompt, session if session_key is not None else None, sources
+
+
+def chat_inference_config(stream: bool) -> InferenceConfig:
+    """Sampling settings used for chat generation."""
+    return InferenceConfig(
+        max_tokens=CHAT_MAX_TOKENS,
+        temperature=CHAT_TEMPERATURE,
+        stream=stream,
+        stop=STOP_SEQUENCES,
+        num_draft_tokens=SPECULATIVE_DRAFT_TOKENS,
+    )
+
+
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
-async def health_check() -> HealthResponse:
+async def health_check(
+    monitor: Optional[HealthMonitor] = Depends(get_health_monitor),
+) -> HealthResponse:
     """
     Health check endpoint.
-    
+
     Returns the server status and readiness of dependent services.
-    Responds within 100ms as per Requirements 1.3.
+    Responds within 100ms as per Requirements 1.3: dependencies are probed
+    in the background and this returns the cached snapshot.
     """
+    if monitor is None:
+        return HealthResponse(
+            status="starting",
+            timestamp=datetime.utcnow(),
+            triton_ready=False,
+            qdrant_ready=False,
+            version=VERSION,
+        )
+    snapshot = monitor.snapshot()
     return HealthResponse(
-        status="healthy",
+        status={READY: "healthy", UNAVAILABLE: "unhealthy"}.get(snapshot.status, snapshot.status),
         timestamp=datetime.utcnow(),
-        triton_ready=True,  # Will be updated with actual check
-        qdrant_ready=True,  # Will be updated with actual check
+        triton_ready=snapshot.ok("triton"),
+        qdrant_ready=snapshot.ok("vector_store"),
         version=VERSION,
+        checked_at=snapshot.checked_at,
+    )
+
+
+@app.get("/ready", response_model=ReadyResponse, tags=["Health"])
+async def readiness(
+    monitor: Optional[HealthMonitor] = Depends(get_health_monitor),
+) -> JSONResponse:
+    """
+    Readiness endpoint for load balancers.
+
+    200 when ``ready`` or ``degraded`` (slow dependencies or generation; the
+    reasons say why, so traffic can be shifted gradually), 503 when
+    ``unavailable``. Served from the cached probe snapshot.
+    """
+    if monitor is None:
+        body = ReadyResponse(status=UNAVAILABLE, reasons=["health monitor not running"])
+    else:
+        snapshot = monitor.snapshot()
+        body = ReadyResponse(
+            status=snapshot.status,
+            reasons=snapshot.reasons,
+            checks={
+                name: ProbeStatus(ok=r.ok, latency_ms=r.latency_ms, error=r.error)
+                for name, r in snapshot.checks.items()
+            },
+            recent_ttft_ms=snapshot.recent_ttft_ms,
+            checked_at=snapshot.checked_at,
+        )
+    return JSONResponse(
+        status_code=503 if body.status == UNAVAILABLE else 200,
+        content=body.model_dump(mode="json"),
     )
 
 
+@app.get("/metrics", tags=["Monitoring"])
+async def metrics() -> Response:
+    """Prometheus metrics of this worker."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/", tags=["Root"])
 async def root() -> dict:
     """Root endpoint with API information."""
@@ -86,4 +724,244 @@ async def root() -> dict:
         "version": VERSION,
         "docs": "/docs",
         "health": "/health",
+        "ready": "/ready",
+        "metrics": "/metrics",
     }
+
+
+@app.post("/v1/chat", response_model=ChatResponse, tags=["Chat"])
+async def chat(
+    chat_request: ChatRequest,
+    triton_client: TritonClient | MockTritonClient = Depends(get_triton_client),
+    semantic_cache: Optional[SemanticCache] = Depends(get_semantic_cache),
+    retriever: Optional[RetrievalPipeline] = Depends(get_retriever),
+    guardrails: Optional[Guardrails] = Depends(get_guardrails),
+    rate_limiter: Optional[RateLimiter] = Depends(get_rate_limiter),
+    assembler: Optional[PromptAssembler] = Depends(get_prompt_assembler),
+) -> ChatResponse | JSONResponse:
+    """
+    Synchronous chat endpoint.
+
+    Returns the complete assistant response once generation finishes, or a
+    semantically matching cached answer without touching the GPU. Prompts
+    failing the guardrails, or too long for the model's input, are rejected
+    with 400; PII is redacted from the prompt and the answer. When admission
+    control sheds the request it gets a 503 with ``Retry-After``, and a user
+    over their rate limit a 429.
+    """
+    session_id = chat_request.session_id or str(uuid.uuid4())
+    start_time = time.perf_counter()
+
+    if rate_limiter is not None:
+        decision = await rate_limiter.check(chat_request.user_id)
+        if not decision.allowed:
+            return rate_limited_response(decision.retry_after_s)
+
+    messages, blocked = screen_messages(guardrails, chat_request.messages)
+    if blocked:
+        return content_blocked_response()
+
+    question = cacheable_question(messages) if semantic_cache is not None else None
+    question_vector = None
+    if question:
+        question_vector = await semantic_cache.embed(question)
+        hit = semantic_cache.match(question_vector)
+        if hit is not None:
+            return ChatResponse(
+                response=hit.answer,
+                session_id=session_id,
+                sources=hit.sources,
+                latency_ms=(time.perf_counter() - start_time) * 1000,
+            )
+
+    context, sources = await retrieve_context(
+        retriever, messages, semantic_cache, question, question_vector
+    )
+    try:
+        prompt, session, sources = await assemble_prompt(
+            assembler, chat_request, messages, context, sources
+        )
+    except PromptTooLongError:
+        return JSONResponse(status_code=400, content=prompt_too_long_error().model_dump())
+    try:
+        result = await triton_client.infer(prompt, chat_inference_config(stream=False))
+    except OverloadedError as e:
+        return overloaded_response(e.retry_after_s)
+    except TritonClientError as e:
+        return JSONResponse(
+            status_code=503,
+            content=ErrorResponse(
+                error="inference_failed",
+                message_ar="تعذر إكمال الرد، يرجى المحاولة لاحقاً",
+                detail=str(e) if os.getenv("DEBUG") else None,
+            ).model_dump(),
+        )
+
+    if rate_limiter is not None:
+        rate_limiter.debit_nowait(chat_request.user_id, result.tokens_generated)
+    answer = result.text
+    if guardrails is not None:
+        filter_start = time.perf_counter()
+        answer = guardrails.output.filter(result.text).text
+        _OUTPUT_GUARDRAILS.observe(time.perf_counter() - filter_start)
+    if question_vector is not None and result.finish_reason == "stop" and answer.strip():
+        await semantic_cache.store(question, answer, sources, question_vector)
+    if session is not None:
+        await assembler.record_answer(session, answer, result.tokens_generated)
+
+    return ChatResponse(
+        response=answer,
+        session_id=session_id,
+        sources=sources,
+        latency_ms=(time.perf_counter() - start_time) * 1000,
+        usage=Usage(
+            prompt_tokens=result.prompt_tokens,
+            completion_tokens=result.tokens_generated,
+            total_tokens=result.prompt_tokens + result.tokens_generated,
+            ttft_ms=result.ttft_ms,
+            inter_token_ms=result.inter_token_ms,
+            tokens_per_second=result.tokens_per_second,
+            exact=result.exact_usage,
+        ),
+    )
+
+
+@app.post("/v1/chat/stream", response_model=None, tags=["Chat"])
+async def chat_stream(
+    chat_request: ChatRequest,
+    triton_client: TritonClient | MockTritonClient = Depends(get_triton_client),
+    semantic_cache: Optional[SemanticCache] = Depends(get_semantic_cache),
+    retriever: Optional[RetrievalPipeline] = Depends(get_retriever),
+    guardrails: Optional[Guardrails] = Depends(get_guardrails),
+    rate_limiter: Optional[RateLimiter] = Depends(get_rate_limiter),
+    assembler: Optional[PromptAssembler] = Depends(get_prompt_assembler),
+) -> EventSourceResponse | JSONResponse:
+    """
+    Streaming chat endpoint (Server-Sent Events).
+
+    Emits one ``token`` event per generated token as soon as it arrives,
+    followed by a ``done`` event with the session id, total latency and token
+    usage (omitted for a semantic cache hit). On
+    failure an ``error`` event carrying an Arabic ``ErrorResponse`` is sent.
+    If the client disconnects, the Triton stream is cancelled immediately.
+    A semantic cache hit is sent as a single ``token`` event.
+
+    Prompts failing the guardrails are rejected with 400 before the stream
+    opens, a user over their rate limit gets a 429 and a full admission
+    queue a 503. A question too long for the model's input gets a
+    ``prompt_too_long`` error event. The answer passes through
+    an incremental output filter, which holds back only text that could
+    still be the start of a redacted span.
+    """
+    session_id = chat_request.session_id or str(uuid.uuid4())
+    start_time = time.perf_counter()
+    if rate_limiter is not None:
+        decision = await rate_limiter.check(chat_request.user_id)
+        if not decision.allowed:
+            return rate_limited_response(decision.retry_after_s)
+    messages, blocked = screen_messages(guardrails, chat_request.messages)
+    if blocked:
+        return content_blocked_response()
+    admission: Optional[AdmissionController] = getattr(triton_client, "admission", None)
+    if admission is not None and admission.should_shed(INTERACTIVE):
+        # Shed before the stream opens so the client gets a plain 503
+        return overloaded_response(admission.queue_timeout_s[INTERACTIVE])
+    question = cacheable_question(messages) if semantic_cache is not None else None
+
+    async def event_generator() -> AsyncGenerator[dict, None]:
+        question_vector = None
+        if question:
+            question_vector = await semantic_cache.embed(question)
+            hit = semantic_cache.match(question_vector)
+            if hit is not None:
+                data = json.dumps({"token": hit.answer}, ensure_ascii=False)
+                yield {"event": "token", "data": data}
+                yield {
+                    "event": "done",
+                    "data": json.dumps({
+                        "session_id": session_id,
+                        "latency_ms": (time.perf_counter() - start_time) * 1000,
+                    }),
+                }
+                return
+
+        context, sources = await retrieve_context(
+            retriever, messages, semantic_cache, question, question_vector
+        )
+        try:
+            prompt, session, sources = await assemble_prompt(
+                assembler, chat_request, messages, context, sources
+            )
+        except PromptTooLongError:
+            yield {"event": "error", "data": prompt_too_long_error().model_dump_json()}
+            return
+        output_filter = StreamFilter(guardrails.output) if guardrails is not None else None
+        stats = GenerationStats()
+        stream = triton_client.infer_stream(prompt, chat_inference_config(stream=True), stats=stats)
+        if rate_limiter is not None:
+            stream = rate_limiter.metered_stream(chat_request.user_id, stream, stats)
+        relay = TokenStreamRelay(stream, max_buffered=STREAM_MAX_BUFFERED_TOKENS)
+        answer_tokens = []
+        filter_s = 0.0  # Output filter time, recorded once per stream
+        try:
+            async for token in relay:
+                if output_filter is not None:
+                    filter_start = time.perf_counter()
+                    token = output_filter.feed(token)
+                    filter_s += time.perf_counter() - filter_start
+                if token:
+                    answer_tokens.append(token)
+                    data = json.dumps({"token": token}, ensure_ascii=False)
+                    yield {"event": "token", "data": data}
+                if output_filter is not None and output_filter.blocked:
+                    break
+        except OverloadedError:
+            yield {"event": "error", "data": overloaded_error().model_dump_json()}
+            return
+        except TritonClientError as e:
+            error = ErrorResponse(
+                error="inference_failed",
+                message_ar="تعذر إكمال الرد، يرجى المحاولة لاحقاً",
+                detail=str(e) if os.getenv("DEBUG") else None,
+            )
+            yield {"event": "error", "data": error.model_dump_json()}
+            return
+
+        if output_filter is not None:
+            if output_filter.blocked:
+                _OUTPUT_GUARDRAILS.observe(filter_s)
+                await relay.cancel()
+                error = ErrorResponse(
+                    error="content_blocked", message_ar="عذراً، لا يمكن إكمال هذا الرد"
+                )
+                yield {"event": "error", "data": error.model_dump_json()}
+                return
+            filter_start = time.perf_counter()
+            tail = output_filter.finish()
+            _OUTPUT_GUARDRAILS.observe(filter_s + time.perf_counter() - filter_start)
+            if tail:
+                answer_tokens.append(tail)
+                yield {"event": "token", "data": json.dumps({"token": tail}, ensure_ascii=False)}
+
+        answer = "".join(answer_tokens)
+        # Like /v1/chat: only complete answers, not ones cut at max_tokens
+        if question_vector is not None and stats.finish_reason == "stop" and answer.strip():
+            await semantic_cache.store(question, answer.strip(), sources, question_vector)
+        if session is not None:
+            await assembler.record_answer(session, answer, stats.completion_tokens)
+
+        latency_ms = (time.perf_counter() - start_time) * 1000
+        yield {
+            "event": "done",
+            "data": json.dumps({
+                "session_id": session_id,
+                "latency_ms": latency_ms,
+                "usage": stats.to_dict(),
+            }),
+        }
+
+    return EventSourceResponse(
+        event_generator(),
+        ping=STREAM_PING_INTERVAL_S,
+        send_timeout=STREAM_SEND_TIMEOUT_S,
+    )
@@ -1,7 +1,8 @@
 """Pydantic models for API request/response validation."""
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
+
 from pydantic import BaseModel, Field, field_validator
 
 
@@ -9,14 +10,14 @@ class Message(BaseModel):
     """Chat message model."""
     role: str = Field(..., description="Message role: 'user' or 'assistant'")
     content: str = Field(..., description="Message content")
-    
+
     @field_validator("role")
     @classmethod
     def validate_role(cls, v: str) -> str:
         if v not in ("user", "assistant", "system"):
             raise ValueError("role must be 'user', 'assistant', or 'system'")
         return v
-    
+
     @field_validator("content")
     @classmethod
     def validate_content(cls, v: str) -> str:
@@ -30,7 +31,7 @@ class ChatRequest(BaseModel):
     messages: List[Message] = Field(..., min_length=1, description="Conversation messages")
     user_id: str = Field(..., min_length=1, description="User identifier")
     session_id: Optional[str] = Field(None, description="Session identifier")
-    
+
     @field_validator("user_id")
     @classmethod
     def validate_user_id(cls, v: str) -> str:
@@ -46,12 +47,24 @@ class RAGSource(BaseModel):
     relevance_score: float
 
 
+class Usage(BaseModel):
+    """Token usage and generation timing of one answer."""
+    prompt_tokens: int = Field(..., description="Tokens in the model prompt")
+    completion_tokens: int = Field(..., description="Tokens generated")
+    total_tokens: int = Field(..., description="Prompt plus generated tokens")
+    ttft_ms: Optional[float] = Field(None, description="Time to first token in milliseconds")
+    inter_token_ms: Optional[float] = Field(None, description="Mean time between streamed tokens")
+    tokens_per_second: Optional[float] = Field(None, description="Generation throughput")
+    exact: bool = Field(..., description="False if token counts are estimated")
+
+
 class ChatResponse(BaseModel):
     """Chat response model."""
     response: str = Field(..., description="Assistant response")
     session_id: str = Field(..., description="Session identifier")
     sources: List[RAGSource] = Field(default_factory=list, description="RAG source references")
     latency_ms: float = Field(..., description="Response latency in milliseconds")
+    usage: Optional[Usage] = Field(None, description="Token usage; absent for cached answers")
 
 
 class HealthResponse(BaseModel):
@@ -59,8 +72,27 @@ class HealthResponse(BaseModel):
     status: str
     timestamp: datetime
     triton_ready: bool
-    qdrant_ready: bool
+    qdrant_ready: bool  # Vector store of the RAG index; true when none is configured
     version: str
+    checked_at: Optional[datetime] = Field(None, description="Time of the last dependency probe")
+
+
+class ProbeStatus(BaseModel):
+    """Result of one dependency probe."""
+    ok: bool
+    latency_ms: float
+    error: Optional[str] = None
+
+
+class ReadyResponse(BaseModel):
+    """Readiness response model."""
+    status: str = Field(..., description="'ready', 'degraded' or 'unavailable'")
+    reasons: List[str] = Field(default_factory=list, description="Why the instance is not ready")
+    checks: Dict[str, ProbeStatus] = Field(default_factory=dict)
+    recent_ttft_ms: Optional[float] = Field(
+        None, description="Mean time to first token since the last probe"
+    )
+    checked_at: Optional[datetime] = None
 
 
 class ErrorResponse(BaseModel):
@@ -0,0 +1,121 @@
+"""Prompt rendering for the Allam chat model."""
+
+from typing import List, Sequence, Tuple
+
+from api.models import Message
+
+# Default system prompt shared by every Absher conversation
+SYSTEM_PROMPT_AR = (
+    "أنت مساعد أبشر الذكي. أجب باللغة العربية بدقة وإيجاز عن خدمات وزارة الداخلية "
+    "في منصة أبشر، ولا تطلب من المستخدم أي معلومات سرية."
+)
+
+# Introduces instructions from ``system`` messages of the request, which
+# come after the server's system prompt and cannot replace it
+CLIENT_SYSTEM_HEADER_AR = "تعليمات إضافية من التطبيق (لا تلغي التعليمات السابقة):"
+
+# Introduces retrieved service documents
+CONTEXT_HEADER_AR = "استخدم المعلومات التالية من أدلة خدمات أبشر عند الإجابة:"
+
+# The model starting a new turn or template block ends the answer
+STOP_SEQUENCES = ("</s>", "[INST]", "<<SYS>>")
+
+# Where retrieved passages go: in the system block, or at the start of the
+# latest user turn. The latter keeps the system prompt and the earlier turns
+# an unchanged prefix from one turn to the next, which the engine can serve
+# from reused KV-cache blocks instead of prefilling it again.
+CONTEXT_IN_SYSTEM = "system"
+CONTEXT_IN_TURN = "turn"
+CONTEXT_PLACEMENTS = (CONTEXT_IN_SYSTEM, CONTEXT_IN_TURN)
+
+# Opens a user turn; the system block goes right after it in the first one
+INST_OPEN = "[INST] "
+
+
+def _passages(context: Sequence[str]) -> str:
+    passages = "\n".join(f"- {passage}" for passage in context)
+    return f"{CONTEXT_HEADER_AR}\n{passages}"
+
+
+def system_block(
+    messages: Sequence[Message],
+    system_prompt: str = SYSTEM_PROMPT_AR,
+    context: Sequence[str] = (),
+) -> str:
+    """
+    Render the ``<<SYS>>`` block that opens the first user turn.
+
+    ``system`` messages in the conversation come from API callers. They are
+    added beneath the server's system prompt and never replace it.
+    """
+    system_messages = [m.content.strip() for m in messages if m.role == "system"]
+    if system_messages:
+        client_instructions = "\n".join(system_messages)
+        system_prompt = f"{system_prompt}\n\n{CLIENT_SYSTEM_HEADER_AR}\n{client_instructions}"
+    if context:
+        system_prompt = f"{system_prompt}\n\n{_passages(context)}"
+    return f"<<SYS>>\n{system_prompt}\n<</SYS>>\n\n"
+
+
+def context_block(context: Sequence[str]) -> str:
+    """Render passages for the start of the latest user turn; empty without any."""
+    return f"{_passages(context)}\n\n" if context else ""
+
+
+def render_turn(message: Message) -> str:
+    """Render one user or assistant message on its own."""
+    if message.role == "user":
+        return f"{INST_OPEN}{message.content.strip()} [/INST]"
+    return f" {message.content.strip()} "
+
+
+def join_turns(header: str, turns: Sequence[Tuple[str, str]], context: str = "") -> str:
+    """
+    Join rendered ``(role, text)`` turns.
+
+    ``header`` goes into the first user turn and ``context`` (from
+    ``context_block``) into the last one. Turns are rendered independently
+    of their position, so a conversation that grows by a turn only renders
+    the new one.
+    """
+    last_user = max((i for i, (role, _) in enumerate(turns) if role == "user"), default=None)
+    parts: List[str] = []
+    for i, (role, text) in enumerate(turns):
+        if i == last_user and context:
+            text = f"{INST_OPEN}{context}{text[len(INST_OPEN):]}"
+        if header and role == "user":
+            text = f"{INST_OPEN}{header}{text[len(INST_OPEN):]}"
+            header = ""
+        parts.append(text)
+    if last_user is None and (header or context):
+        # No user turn to carry the system block
+        parts.append(f"{INST_OPEN}{(header + context).strip()} [/INST]")
+    return "".join(parts)
+
+
+def build_prompt(
+    messages: List[Message],
+    system_prompt: str = SYSTEM_PROMPT_AR,
+    context: Sequence[str] = (),
+    context_placement: str = CONTEXT_IN_SYSTEM,
+) -> str:
+    """
+    Render a conversation into the Allam (LLaMA-2 style) instruction format.
+
+    ``system`` messages in the conversation are added beneath the system prompt.
+
+    Args:
+        messages: Conversation messages in chronological order
+        system_prompt: Server system prompt, always kept
+        context: Retrieved document passages
+        context_placement: ``CONTEXT_IN_SYSTEM`` or ``CONTEXT_IN_TURN``
+
+    Returns:
+        Prompt string ending with an open assistant turn
+    """
+    if context_placement not in CONTEXT_PLACEMENTS:
+        raise ValueError(f"Unknown context placement: {context_placement}")
+    turns = [(m.role, render_turn(m)) for m in messages if m.role != "system"]
+    if context_placement == CONTEXT_IN_TURN:
+        return join_turns(system_block(messages, system_prompt), turns, context_block(context))
+    return join_turns(system_block(messages, system_prompt, context), turns)
@@ -0,0 +1,304 @@
+"""
+Per-user rate limiting shared by every worker and replica.
+
+One user looping on ``/v1/chat/stream`` can hold a large share of the eight
+generation slots, so each ``user_id`` gets two token buckets:
+
+- requests: ``requests_per_minute`` refill, up to ``request_burst`` at once;
+  every chat request takes one.
+- generated tokens: ``tokens_per_minute`` refill, up to ``token_burst``. The
+  size of an answer is only known afterwards, so a request is admitted while
+  the bucket is positive and its completion tokens are debited when the
+  generation ends. A long answer can leave the bucket in debt, which delays
+  the user's next request until it is paid back.
+
+Both buckets live in one Redis hash slot (``absher:rl:{user_id}:...``) and are
+refilled, checked and taken by a single Lua script, so a check is one
+``EVALSHA`` round-trip and is atomic across uvicorn workers and replicas. The
+script uses the Redis server clock, so replicas with drifting clocks share one
+timeline. Idle buckets expire once they would be full again.
+
+When Redis is slower than ``timeout_s`` or failing, the limiter falls back to
+an in-process bucket with the same rules and leaves Redis alone for
+``failure_backoff_s``, so an outage adds at most one timeout per back-off to
+the request path. During fallback the limits apply per worker.
+
+``slowapi`` is not used: its limits are fixed windows keyed from the request
+before the body is parsed, and it cannot debit generated tokens afterwards.
+
+Requirements: 3.2, 9.2
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional, Set, Tuple
+
+from models.usage import GenerationStats
+from observability.metrics import RATE_LIMIT_FALLBACKS, RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUESTS_PER_MINUTE = 60.0
+DEFAULT_REQUEST_BURST = 10.0
+DEFAULT_TOKENS_PER_MINUTE = 20_000.0
+DEFAULT_TOKEN_BURST = 4096.0
+DEFAULT_REDIS_TIMEOUT_S = 0.02
+DEFAULT_FAILURE_BACKOFF_S = 1.0
+DEFAULT_MAX_LOCAL_USERS = 100_000
+
+# KEYS: request bucket, token bucket
+# ARGV: request rate/s, request burst, token rate/s, token burst,
+#       requests to take, tokens to take, enforce (1/0), expiry in ms
+# Returns {allowed (1/0), retry after in ms}
+TOKEN_BUCKET_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local function refill(key, rate, burst)
+  local state = redis.call('HMGET', key, 'level', 'ts')
+  local level, ts = tonumber(state[1]), tonumber(state[2])
+  if level == nil then
+    return burst
+  end
+  return math.min(burst, level + math.max(0, now - ts) * rate)
+end
+
+local request_rate, request_burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local token_rate, token_burst = tonumber(ARGV[3]), tonumber(ARGV[4])
+local requests, tokens = tonumber(ARGV[5]), tonumber(ARGV[6])
+local request_level = refill(KEYS[1], request_rate, request_burst)
+local token_level = refill(KEYS[2], token_rate, token_burst)
+
+local wait = 0
+if ARGV[7] == '1' then
+  if request_level < requests then
+    wait = (requests - request_level) / request_rate
+  end
+  if token_level <= 0 then
+    wait = math.max(wait, (1 - token_level) / token_rate)
+  end
+end
+if wait > 0 then
+  return {0, math.ceil(wait * 1000)}
+end
+
+redis.call('HSET', KEYS[1], 'level', tostring(request_level - requests), 'ts', tostring(now))
+redis.call('HSET', KEYS[2], 'level', tostring(token_level - tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], ARGV[8])
+redis.call('PEXPIRE', KEYS[2], ARGV[8])
+return {1, 0}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimits:
+    """Per-user request and generated-token limits."""
+    requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE
+    request_burst: float = DEFAULT_REQUEST_BURST
+    tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE
+    token_burst: float = DEFAULT_TOKEN_BURST
+
+    def __post_init__(self) -> None:
+        if min(self.requests_per_minute, self.tokens_per_minute) <= 0:
+            raise ValueError("rates must be positive")
+        if self.request_burst < 1 or self.token_burst < 1:
+            raise ValueError("bursts must be at least 1")
+
+    @property
+    def request_rate(self) -> float:
+        return self.requests_per_minute / 60
+
+    @property
+    def token_rate(self) -> float:
+        return self.tokens_per_minute / 60
+
+    @property
+    def idle_expiry_ms(self) -> int:
+        """Time after which an untouched bucket is full again, with margin."""
+        refill_s = max(self.request_burst / self.request_rate, self.token_burst / self.token_rate)
+        return int(refill_s * 2000) + 60_000
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    """Outcome of a rate limit check."""
+    allowed: bool
+    retry_after_s: float = 0.0
+    source: str = "local"
+
+
+class LocalTokenBuckets:
+    """In-process token buckets with the same rules as the Lua script."""
+
+    def __init__(self, limits: RateLimits, max_users: int = DEFAULT_MAX_LOCAL_USERS):
+        if max_users < 1:
+            raise ValueError("max_users must be at least 1")
+        self.limits = limits
+        self.max_users = max_users
+        # user_id -> (request level, token level, updated at)
+        self._buckets: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def levels(self, user_id: str, now: Optional[float] = None) -> Tuple[float, float]:
+        """Current (request, token) levels of a user after refill."""
+        now = time.monotonic() if now is None else now
+        limits = self.limits
+        state = self._buckets.get(user_id)
+        if state is None:
+            return limits.request_burst, limits.token_burst
+        requests, tokens, ts = state
+        elapsed = max(0.0, now - ts)
+        return (
+            min(limits.request_burst, requests + elapsed * limits.request_rate),
+            min(limits.token_burst, tokens + elapsed * limits.token_rate),
+        )
+
+    def apply(
+        self,
+        user_id: str,
+        requests: float,
+        tokens: float,
+        enforce: bool = True,
+        now: Optional[float] = None,
+    ) -> RateLimitDecision:
+        """Take ``requests`` and ``tokens`` if allowed (always, unless ``enforce``)."""
+        now = time.monotonic() if now is None else now
+        request_level, token_level = self.levels(user_id, now)
+        if enforce:
+            wait = 0.0
+            if request_level < requests:
+                wait = (requests - request_level) / self.limits.request_rate
+            if token_level <= 0:
+                wait = max(wait, (1 - token_level) / self.limits.token_rate)
+            if wait > 0:
+                return RateLimitDecision(False, wait, "local")
+
+        self._buckets[user_id] = (request_level - requests, token_level - tokens, now)
+        self._buckets.move_to_end(user_id)
+        # Evicting the least recently seen user resets it to full buckets
+        while len(self._buckets) > self.max_users:
+            self._buckets.popitem(last=False)
+        return RateLimitDecision(True, 0.0, "local")
+
+
+class RateLimiter:
+    """Per-user request and token limits, in Redis with a local fallback."""
+
+    def __init__(
+        self,
+        limits: RateLimits,
+        redis_client=None,
+        prefix: str = "absher:rl:",
+        timeout_s: float = DEFAULT_REDIS_TIMEOUT_S,
+        failure_backoff_s: float = DEFAULT_FAILURE_BACKOFF_S,
+        max_local_users: int = DEFAULT_MAX_LOCAL_USERS,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            limits: Per-user limits
+            redis_client: ``redis.asyncio`` client; None limits per worker only
+            prefix: Key prefix of the Redis buckets
+            timeout_s: Slower Redis calls use the local bucket instead
+            failure_backoff_s: Time Redis is skipped after a timeout or error
+            max_local_users: LRU size of the local fallback buckets
+        """
+        self.limits = limits
+        self.prefix = prefix
+        self.timeout_s = timeout_s
+        self.failure_backoff_s = failure_backoff_s
+        self.local = LocalTokenBuckets(limits, max_users=max_local_users)
+        self._redis = redis_client
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT) if redis_client else None
+        self._redis_retry_at = 0.0
+        self._pending: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_url(cls, url: str, limits: RateLimits, **kwargs) -> "RateLimiter":
+        """Create a limiter backed by the Redis at ``url``, or a local one without redis."""
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            logger.warning(
+                "redis not installed, rate limits apply per worker. Install with: pip install redis"
+            )
+            return cls(limits, **kwargs)
+        return cls(limits, redis.from_url(url, decode_responses=True), **kwargs)
+
+    def _keys(self, user_id: str) -> list:
+        # The hash tag keeps both buckets in one cluster slot for the script
+        base = f"{self.prefix}{{{user_id}}}"
+        return [f"{base}:req", f"{base}:tok"]
+
+    async def _apply(
+        self, user_id: str, requests: float, tokens: float, enforce: bool
+    ) -> RateLimitDecision:
+        if self._script is not None and time.monotonic() >= self._redis_retry_at:
+            limits = self.limits
+            args = [
+                limits.request_rate,
+                limits.request_burst,
+                limits.token_rate,
+                limits.token_burst,
+                requests,
+                tokens,
+                1 if enforce else 0,
+                limits.idle_expiry_ms,
+            ]
+            try:
+                allowed, retry_after_ms = await asyncio.wait_for(
+                    self._script(keys=self._keys(user_id), args=args), self.timeout_s
+                )
+                return RateLimitDecision(bool(int(allowed)), int(retry_after_ms) / 1000, "redis")
+            except Exception as e:
+                self._redis_retry_at = time.monotonic() + self.failure_backoff_s
+                RATE_LIMIT_FALLBACKS.inc()
+                reason = "timed out" if isinstance(e, asyncio.TimeoutError) else str(e)
+                logger.warning(f"Rate limit check in Redis failed ({reason}), using local buckets")
+        return self.local.apply(user_id, requests, tokens, enforce)
+
+    async def check(self, user_id: str) -> RateLimitDecision:
+        """Take one request from ``user_id``'s buckets, or say how long to wait."""
+        decision = await self._apply(user_id, 1, 0, enforce=True)
+        if not decision.allowed:
+            RATE_LIMITED.labels(decision.source).inc()
+        return decision
+
+    async def debit(self, user_id: str, tokens: int) -> None:
+        """Charge generated tokens to ``user_id``; the bucket may go into debt."""
+        if tokens > 0:
+            await self._apply(user_id, 0, tokens, enforce=False)
+
+    def debit_nowait(self, user_id: str, tokens: int) -> None:
+        """Schedule ``debit`` without waiting for it, off the response path."""
+        if tokens <= 0:
+            return
+        task = asyncio.get_running_loop().create_task(self.debit(user_id, tokens))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def metered_stream(
+        self, user_id: str, stream: AsyncIterator[str], stats: GenerationStats
+    ) -> AsyncIterator[str]:
+        """Relay ``stream`` and debit its completion tokens however it ends."""
+        try:
+            async with aclosing(stream):
+                async for token in stream:
+                    yield token
+        finally:
+            # The inner stream is closed here, so ``stats`` is final
+            self.debit_nowait(user_id, stats.completion_tokens)
+
+    async def close(self) -> None:
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        if self._redis is not None:
+            # redis-py renamed close() to aclose() in 5.0.1
+            await getattr(self._redis, "aclose", self._redis.close)()
@@ -0,0 +1,174 @@
+"""
+Semantic response cache for chat answers.
+
+Embeds incoming user questions and compares them with the embeddings of
+previously answered questions. When cosine similarity passes a threshold the
+earlier answer (and its RAG sources) is returned and the GPU is skipped, so
+paraphrases such as "كيف أجدد رخصتي" and "تجديد رخصة القيادة" share one answer.
+
+The index is a preallocated float32 matrix searched with one matrix-vector
+product. Its size is capped in bytes; when full, the least-recently-used
+entry is replaced.
+
+Requirements: 3.2, 4.1
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from api.models import Message, RAGSource
+from rag.embeddings import BatchingEmbedder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.88
+DEFAULT_MAX_INDEX_BYTES = 64 * 1024 * 1024
+
+# Rough per-entry overhead for the question/answer strings and bookkeeping
+_ENTRY_OVERHEAD_BYTES = 2048
+
+
+@dataclass
+class SemanticCacheEntry:
+    """A cached answer and the question it was generated for."""
+    question: str
+    answer: str
+    sources: List[RAGSource] = field(default_factory=list)
+
+
+@dataclass
+class SemanticCacheHit:
+    """Result of a successful semantic lookup."""
+    answer: str
+    sources: List[RAGSource]
+    similarity: float
+    matched_question: str
+
+
+def cacheable_question(messages: List[Message]) -> Optional[str]:
+    """
+    Return the question to match, or None if the conversation is not cacheable.
+
+    Only first-turn questions are matched: a follow-up such as "وماذا عن
+    الجواز؟" depends on earlier turns and must not reuse a standalone answer.
+    Neither are questions sent with client ``system`` messages, which are
+    rendered into the prompt and change the answer.
+    """
+    user_messages = [m for m in messages if m.role == "user"]
+    if len(user_messages) != 1 or any(m.role != "user" for m in messages):
+        return None
+    return user_messages[0].content.strip()
+
+
+class SemanticCache:
+    """In-memory nearest-neighbour cache of answered questions."""
+
+    def __init__(
+        self,
+        embedder: BatchingEmbedder,
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        max_bytes: int = DEFAULT_MAX_INDEX_BYTES,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            embedder: Batched question embedder
+            threshold: Minimum cosine similarity for a hit
+            max_bytes: Memory budget for vectors and entries
+        """
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_bytes = max_bytes
+        self._vectors: Optional[np.ndarray] = None
+        self._last_used: Optional[np.ndarray] = None
+        self._entries: List[SemanticCacheEntry] = []
+        self.capacity = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _ensure_index(self, dimension: int) -> None:
+        if self._vectors is None:
+            self.capacity = max(1, self.max_bytes // (dimension * 4 + _ENTRY_OVERHEAD_BYTES))
+            self._vectors = np.zeros((self.capacity, dimension), dtype=np.float32)
+            self._last_used = np.zeros(self.capacity, dtype=np.float64)
+            logger.info(f"Semantic cache capacity: {self.capacity} entries")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def embed(self, question: str) -> np.ndarray:
+        """Embed a question (batched with concurrent callers)."""
+        return await self.embedder.embed(question)
+
+    async def lookup(self, question: str) -> Optional[SemanticCacheHit]:
+        """Return the cached answer for the most similar question, if close enough."""
+        return self.match(await self.embed(question))
+
+    def match(self, query: np.ndarray) -> Optional[SemanticCacheHit]:
+        """Return the cached answer closest to an embedded question, if close enough."""
+        if not self._entries:
+            self.misses += 1
+            return None
+
+        scores = self._vectors[: len(self._entries)] @ query
+        best = int(np.argmax(scores))
+        similarity = float(scores[best])
+
+        if similarity < self.threshold:
+            self.misses += 1
+            return None
+
+        entry = self._entries[best]
+        self._last_used[best] = time.monotonic()
+        self.hits += 1
+        return SemanticCacheHit(
+            answer=entry.answer,
+            sources=list(entry.sources),
+            similarity=similarity,
+            matched_question=entry.question,
+        )
+
+    async def store(
+        self,
+        question: str,
+        answer: str,
+        sources: List[RAGSource],
+        vector: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Cache an answer, replacing the least-recently-used entry when full.
+
+        Pass ``vector`` when the question was already embedded for ``match``.
+        """
+        if vector is None:
+            vector = await self.embed(question)
+        self._ensure_index(vector.shape[0])
+
+        entry = SemanticCacheEntry(question=question, answer=answer, sources=list(sources))
+        if len(self._entries) < self.capacity:
+            slot = len(self._entries)
+            self._entries.append(entry)
+        else:
+            slot = int(np.argmin(self._last_used))
+            self._entries[slot] = entry
+        self._vectors[slot] = vector
+        self._last_used[slot] = time.monotonic()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
@@ -0,0 +1,343 @@
+"""
+Conversation sessions and incremental prompt assembly.
+
+The iOS app resends the whole ``messages`` list on every turn. Rendering and
+tokenizing all of it again makes every turn cost more than the last, and a
+long conversation eventually overflows the engine's ``max_input_len`` (2048).
+``PromptAssembler`` keeps, per ``session_id``, the rendered turns of the
+conversation with their token counts:
+
+- Each user or assistant message is a turn keyed by a hash chained over all
+  earlier turns, so a stored turn is reused only if the conversation up to
+  and including it is unchanged. New turns are rendered and counted; an
+  edited history just misses from the point of the edit.
+- The system block and the retrieved passages are counted once per distinct
+  text. With ``CONTEXT_IN_TURN`` the passages go into the latest user turn,
+  so the system block and the earlier turns form a prefix that stays the
+  same between turns and can be served from reused KV-cache blocks.
+- History is trimmed from the oldest turn so the system block, passages and
+  kept turns fit ``max_input_tokens``. The window always keeps the latest
+  turn and a trimmed window starts at a user turn. If the latest turn does
+  not fit beside the passages, the least relevant passages are dropped; if
+  it does not fit beside the system block alone, ``PromptTooLongError`` is
+  raised rather than sending the engine a prompt it would reject. The first turn of the
+  window only moves when the budget is exceeded, and then the window is cut
+  to ``trim_fraction`` of the budget, so the prefix is not lost every turn.
+- After generation the answer is stored as the next assistant turn, with the
+  completion token count reported by the model, so the follow-up request only
+  renders the new question.
+
+Only the turns in the window are stored, and only for requests that carry a
+``session_id``: one without it cannot be continued. Two stores: in-process LRU (per
+worker) and Redis (shared across workers and replicas), both with a TTL.
+
+Requirements: 3.2
+"""
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Protocol, Sequence, Tuple
+
+from api.models import Message
+from api.prompt import (
+    CONTEXT_IN_SYSTEM,
+    CONTEXT_IN_TURN,
+    CONTEXT_PLACEMENTS,
+    SYSTEM_PROMPT_AR,
+    context_block,
+    join_turns,
+    render_turn,
+    system_block,
+)
+from models.usage import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+# Matches max_input_len of the allam_tensorrt engine (scripts/convert_allam.py)
+DEFAULT_MAX_INPUT_TOKENS = 2048
+DEFAULT_SESSION_TTL_S = 1800.0
+DEFAULT_MAX_SESSIONS = 10_000
+# A window over budget is cut to this share of it, not just below it
+DEFAULT_TRIM_FRACTION = 0.75
+
+
+@dataclass
+class Turn:
+    """One rendered user or assistant message."""
+    key: str
+    role: str
+    text: str
+    tokens: int
+
+
+class SessionStore(Protocol):
+    """Storage interface for conversation turns."""
+
+    async def get(self, session_id: str) -> Optional[List[Turn]]:
+        """Return the stored turns of a session, or None."""
+        ...
+
+    async def set(self, session_id: str, turns: List[Turn], ttl_s: float) -> None:
+        """Store the turns of a session for ``ttl_s`` seconds."""
+        ...
+
+    async def close(self) -> None:
+        """Release store resources."""
+        ...
+
+
+class InMemorySessionStore:
+    """Per-process LRU of sessions with per-session expiry."""
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS):
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Tuple[float, List[Turn]]]" = OrderedDict()
+
+    async def get(self, session_id: str) -> Optional[List[Turn]]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        expires_at, turns = entry
+        if expires_at <= time.monotonic():
+            del self._sessions[session_id]
+            return None
+        self._sessions.move_to_end(session_id)
+        return list(turns)
+
+    async def set(self, session_id: str, turns: List[Turn], ttl_s: float) -> None:
+        self._sessions[session_id] = (time.monotonic() + ttl_s, list(turns))
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def close(self) -> None:
+        self._sessions.clear()
+
+
+class RedisSessionStore:
+    """Redis-backed session store shared by all workers and replicas."""
+
+    def __init__(self, url: str = "redis://localhost:6379", prefix: str = "absher:session:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            logger.warning("redis not installed. Install with: pip install redis")
+            raise
+        self.prefix = prefix
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    async def get(self, session_id: str) -> Optional[List[Turn]]:
+        payload = await self._redis.get(self.prefix + session_id)
+        if payload is None:
+            return None
+        return [Turn(*fields) for fields in json.loads(payload)]
+
+    async def set(self, session_id: str, turns: List[Turn], ttl_s: float) -> None:
+        payload = json.dumps([[t.key, t.role, t.text, t.tokens] for t in turns], ensure_ascii=False)
+        await self._redis.set(self.prefix + session_id, payload, px=int(ttl_s * 1000))
+
+    async def close(self) -> None:
+        # redis-py renamed close() to aclose() in 5.0.1
+        await getattr(self._redis, "aclose", self._redis.close)()
+
+
+def turn_key(previous_key: str, message: Message) -> str:
+    """Key of a turn, chained over every turn before it."""
+    # Rendering strips the content, so whitespace around it does not matter
+    payload = json.dumps([previous_key, message.role, message.content.strip()], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PromptTooLongError(Exception):
+    """Raised when the system block and the latest turn alone exceed the token budget."""
+
+
+@dataclass
+class SessionPrompt:
+    """An assembled prompt and the window of turns it was built from."""
+    session_id: Optional[str]
+    prompt: str
+    prompt_tokens: int
+    turns: List[Turn]
+    dropped_turns: int = 0
+    dropped_passages: int = 0
+    rendered_turns: int = 0
+
+
+class PromptAssembler:
+    """Builds prompts from stored session turns, rendering only what is new."""
+
+    def __init__(
+        self,
+        store: SessionStore,
+        counter: Optional[TokenCounter] = None,
+        max_input_tokens: int = DEFAULT_MAX_INPUT_TOKENS,
+        ttl_s: float = DEFAULT_SESSION_TTL_S,
+        context_placement: str = CONTEXT_IN_SYSTEM,
+        trim_fraction: float = DEFAULT_TRIM_FRACTION,
+    ):
+        """
+        Initialize the assembler.
+
+        Args:
+            store: Session storage
+            counter: Token counter of the Triton client, which is told the
+                count of every assembled prompt
+            max_input_tokens: Token budget of a prompt
+            ttl_s: Lifetime of an idle session
+            context_placement: Where retrieved passages go (see ``api.prompt``)
+            trim_fraction: Share of the budget a trimmed window is cut to
+        """
+        if max_input_tokens < 1:
+            raise ValueError("max_input_tokens must be at least 1")
+        if context_placement not in CONTEXT_PLACEMENTS:
+            raise ValueError(f"Unknown context placement: {context_placement}")
+        if not 0 < trim_fraction <= 1:
+            raise ValueError("trim_fraction must be in (0, 1]")
+        self.store = store
+        self.counter = counter or TokenCounter()
+        self.max_input_tokens = max_input_tokens
+        self.ttl_s = ttl_s
+        self.context_placement = context_placement
+        self.trim_fraction = trim_fraction
+
+    async def _load(self, session_id: str) -> List[Turn]:
+        try:
+            return await self.store.get(session_id) or []
+        except Exception as e:
+            logger.warning(f"Session lookup failed: {e}")
+            return []
+
+    async def _save(self, session_id: str, turns: List[Turn]) -> None:
+        try:
+            await self.store.set(session_id, turns, self.ttl_s)
+        except Exception as e:
+            logger.warning(f"Session store failed: {e}")
+
+    def _turn(self, key: str, message: Message) -> Turn:
+        text = render_turn(message)
+        return Turn(key, message.role, text, self.counter.count(text))
+
+    def _count_block(self, text: str) -> int:
+        """Count a system or context block; repeated blocks are counted once."""
+        if not text:
+            return 0
+        tokens = self.counter.count(text)
+        self.counter.remember(text, tokens)
+        return tokens
+
+    async def build(
+        self,
+        session_id: Optional[str],
+        messages: Sequence[Message],
+        context: Sequence[str] = (),
+        system_prompt: str = SYSTEM_PROMPT_AR,
+    ) -> SessionPrompt:
+        """
+        Assemble the prompt for ``messages``, trimmed to the token budget.
+
+        With ``session_id`` None no stored turns are used; the prompt is
+        trimmed the same way but is not meant to be recorded.
+        """
+        history = [m for m in messages if m.role != "system"]
+        keys: List[str] = []
+        previous = ""
+        for message in history:
+            previous = turn_key(previous, message)
+            keys.append(previous)
+        stored_turns = await self._load(session_id) if session_id is not None else []
+        stored = {turn.key: turn for turn in stored_turns}
+
+        turns: Dict[int, Turn] = {}
+
+        def turn_at(i: int) -> Turn:
+            if i not in turns:
+                turns[i] = stored.get(keys[i]) or self._turn(keys[i], history[i])
+            return turns[i]
+
+        # The latest turn is always kept. When it does not fit beside the
+        # system block and the passages, the least relevant passages go first
+        latest_tokens = turn_at(len(history) - 1).tokens if history else 0
+        kept_context = list(context)
+        while True:
+            if self.context_placement == CONTEXT_IN_TURN:
+                header = system_block(messages, system_prompt)
+                passages = context_block(kept_context)
+            else:
+                header = system_block(messages, system_prompt, kept_context)
+                passages = ""
+            fixed_tokens = self._count_block(header) + self._count_block(passages)
+            if fixed_tokens + latest_tokens <= self.max_input_tokens or not kept_context:
+                break
+            kept_context.pop()
+        budget = self.max_input_tokens - fixed_tokens
+        if latest_tokens > budget:
+            raise PromptTooLongError(
+                f"Prompt needs {fixed_tokens + latest_tokens} tokens, "
+                f"over the budget of {self.max_input_tokens}"
+            )
+
+        def fill(first: int, limit: float) -> List[Turn]:
+            """Newest turns from ``first`` on, stopping at the first that no longer fits."""
+            window: List[Turn] = []
+            used = 0
+            for i in range(len(history) - 1, first - 1, -1):
+                turn = turn_at(i)
+                if window and used + turn.tokens > limit:
+                    break
+                window.append(turn)
+                used += turn.tokens
+            window.reverse()
+            return window
+
+        # Keep the stored window's first turn while everything after it fits,
+        # so the prompt prefix stays the same from turn to turn
+        positions = {key: i for i, key in enumerate(keys)}
+        start = positions.get(stored_turns[0].key) if stored_turns else None
+        window = fill(start or 0, budget)
+        if start is not None and len(window) < len(history) - start:
+            # Over budget: cut deeper, so the new first turn lasts a few turns
+            window = fill(0, budget * self.trim_fraction)
+        if len(window) < len(history):
+            # A trimmed window starts at a user turn, which carries the system block
+            while len(window) > 1 and window[0].role != "user":
+                window.pop(0)
+
+        prompt = join_turns(header, [(t.role, t.text) for t in window], passages)
+        prompt_tokens = fixed_tokens + sum(t.tokens for t in window)
+        # The window is stored with the answer (record_answer)
+        self.counter.remember(prompt, prompt_tokens)
+        return SessionPrompt(
+            session_id=session_id,
+            prompt=prompt,
+            prompt_tokens=prompt_tokens,
+            turns=window,
+            dropped_turns=len(history) - len(window),
+            dropped_passages=len(context) - len(kept_context),
+            rendered_turns=sum(1 for t in turns.values() if t.key not in stored),
+        )
+
+    async def record_answer(self, session: SessionPrompt, answer: str, tokens: int = 0) -> None:
+        """
+        Store the answer as the next assistant turn of the session.
+
+        ``tokens`` is the completion token count reported for the answer; it
+        is counted only when unknown.
+        """
+        if session.session_id is None or not answer.strip():
+            return
+        previous = session.turns[-1].key if session.turns else ""
+        message = Message(role="assistant", content=answer)
+        text = render_turn(message)
+        tokens = tokens or self.counter.count(text)
+        turn = Turn(turn_key(previous, message), "assistant", text, tokens)
+        await self._save(session.session_id, session.turns + [turn])
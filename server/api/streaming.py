@@ -0,0 +1,93 @@
+"""
+Bounded token relay between a Triton token stream and an SSE response.
+
+The relay decouples reading tokens from Triton from writing them to the HTTP
+client with a small bounded queue:
+
+- Each token is forwarded as soon as it arrives (no response-level buffering).
+- When the client reads slower than the model generates, at most
+  ``max_buffered`` tokens are held per connection; the producer then stops
+  pulling from the gRPC stream until the client catches up.
+- When the client disconnects, sse-starlette cancels the response task. The
+  relay then cancels its producer, which closes the token iterator and, for
+  ``TritonClient.infer_stream``, cancels the gRPC stream so the decode slot
+  is freed right away.
+
+Requirements: 3.2, 9.2
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default per-connection token buffer
+DEFAULT_MAX_BUFFERED_TOKENS = 32
+
+_END_OF_STREAM = object()
+
+
+class TokenStreamRelay:
+    """
+    Relay tokens from a producer iterator to a consumer with bounded buffering.
+
+    Iterate over the relay to receive tokens. Errors raised by the producer are
+    re-raised to the consumer after all tokens buffered before them.
+    """
+
+    def __init__(
+        self,
+        tokens: AsyncIterator[str],
+        max_buffered: int = DEFAULT_MAX_BUFFERED_TOKENS,
+    ):
+        """
+        Initialize the relay.
+
+        Args:
+            tokens: Source token iterator (e.g. ``TritonClient.infer_stream``)
+            max_buffered: Maximum tokens held between producer and consumer
+        """
+        if max_buffered < 1:
+            raise ValueError("max_buffered must be at least 1")
+        self._tokens = tokens
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered)
+        self._producer: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+
+    async def _produce(self) -> None:
+        """Pull tokens from the source into the bounded queue."""
+        try:
+            async for token in self._tokens:
+                await self._queue.put(token)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._error = e
+        finally:
+            aclose = getattr(self._tokens, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        await self._queue.put(_END_OF_STREAM)
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        self._producer = asyncio.create_task(self._produce())
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is _END_OF_STREAM:
+                    break
+                yield item
+            if self._error is not None:
+                raise self._error
+        finally:
+            await self.cancel()
+
+    async def cancel(self) -> None:
+        """Stop the producer and close the source iterator."""
+        if self._producer is not None and not self._producer.done():
+            self._producer.cancel()
+            try:
+                await self._producer
+            except asyncio.CancelledError:
+                logger.debug("Token stream cancelled before completion")
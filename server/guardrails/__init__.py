@@ -1 +1,24 @@
-# Guardrails module for content filtering
+"""
+Guardrails module for content filtering.
+
+This module contains:
+- filter: Single-pass combined-pattern filter and its incremental stream variant
+- rules: PII, jailbreak and blocked-term rule sets for prompts and answers
+"""
+
+from guardrails.filter import REDACTED, ContentFilter, FilterResult, Match, Rule, StreamFilter
+from guardrails.rules import Guardrails, input_filter, load_terms, output_filter, pii_rules
+
+__all__ = [
+    "REDACTED",
+    "ContentFilter",
+    "FilterResult",
+    "Guardrails",
+    "Match",
+    "Rule",
+    "StreamFilter",
+    "input_filter",
+    "load_terms",
+    "output_filter",
+    "pii_rules",
+]
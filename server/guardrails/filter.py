@@ -0,0 +1,216 @@
+"""
+Single-pass multi-pattern content filter.
+
+All rules are compiled into one regular expression of named alternatives, so
+a message is scanned once no matter how many rules are active; the name of
+the matching group identifies the rule. Each rule either ``block``s the text
+(the caller rejects it) or ``redact``s the matched span.
+
+Rules have a bounded match length (``Rule.max_length``) and look at most
+``LOOKAROUND_CHARS`` characters outside a match. That is what makes
+``StreamFilter`` exact: it releases streamed text as soon as no match can
+still start in it, holding back only the tail from the first character that
+could begin a match, and produces the same output as filtering the whole
+answer at once.
+
+Requirements: 8.1, 8.3
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Sequence
+
+ACTIONS = ("block", "redact")
+REDACTED = "[محجوب]"
+
+# Rules may inspect at most this many characters before and after a match
+LOOKAROUND_CHARS = 1
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    One filter pattern.
+
+    Attributes:
+        name: Rule identifier reported in matches
+        category: Rule family (e.g. ``pii``, ``jailbreak``, ``blocked_term``)
+        pattern: Regular expression; must not match the empty string
+        max_length: Upper bound on the length of a match
+        first: Character class body of the characters a match can start with
+        action: ``block`` or ``redact``
+        replacement: Text substituted for a redacted match
+    """
+    name: str
+    category: str
+    pattern: str
+    max_length: int
+    first: str = r"\s\S"
+    action: str = "redact"
+    replacement: str = REDACTED
+
+
+@dataclass(frozen=True)
+class Match:
+    """A rule match at ``[start, end)`` of the scanned text."""
+    rule: str
+    category: str
+    action: str
+    start: int
+    end: int
+
+
+@dataclass
+class FilterResult:
+    """Filtered text (redactions applied) and the matches found."""
+    text: str
+    matches: List[Match] = field(default_factory=list)
+
+    @property
+    def blocked(self) -> bool:
+        return any(m.action == "block" for m in self.matches)
+
+
+class ContentFilter:
+    """A set of rules compiled into one combined pattern."""
+
+    def __init__(self, rules: Sequence[Rule], flags: int = re.IGNORECASE):
+        """
+        Compile ``rules``.
+
+        Args:
+            rules: Rules in priority order; at a given position the first
+                matching rule wins
+            flags: ``re`` flags for the combined pattern
+        """
+        for rule in rules:
+            if rule.action not in ACTIONS:
+                raise ValueError(f"Unknown action for rule {rule.name}: {rule.action}")
+        self.rules = list(rules)
+        self._by_group = {f"r{i}": rule for i, rule in enumerate(self.rules)}
+        self._pattern: Optional[re.Pattern] = None
+        self._first: Optional[re.Pattern] = None
+        if self.rules:
+            first = "[" + "".join(rule.first for rule in self.rules) + "]"
+            alternatives = "|".join(
+                f"(?P<{group}>{rule.pattern})" for group, rule in self._by_group.items()
+            )
+            # The leading lookahead lets the scan skip non-starting characters
+            # without trying every alternative at every position.
+            self._pattern = re.compile(f"(?={first})(?:{alternatives})", flags)
+            self._first = re.compile(first, flags)
+        self.max_length = max((rule.max_length for rule in self.rules), default=0)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def scan(self, text: str, pos: int = 0, endpos: Optional[int] = None) -> Iterator[re.Match]:
+        """Yield raw matches of the combined pattern, leftmost first, without overlap."""
+        if self._pattern is None:
+            return iter(())
+        return self._pattern.finditer(text, pos, len(text) if endpos is None else endpos)
+
+    def rule_for(self, match: re.Match) -> Rule:
+        """The rule that produced a raw match."""
+        return self._by_group[match.lastgroup]
+
+    def first_candidate(self, text: str, pos: int) -> int:
+        """Index of the first character at or after ``pos`` that could start a match."""
+        if self._first is None:
+            return len(text)
+        m = self._first.search(text, pos)
+        return m.start() if m else len(text)
+
+    def filter(self, text: str) -> FilterResult:
+        """Scan ``text`` once, applying redactions and collecting matches."""
+        pieces: List[str] = []
+        matches: List[Match] = []
+        pos = 0
+        for m in self.scan(text):
+            rule = self.rule_for(m)
+            matches.append(Match(rule.name, rule.category, rule.action, m.start(), m.end()))
+            if rule.action == "redact":
+                pieces.append(text[pos:m.start()])
+                pieces.append(rule.replacement)
+                pos = m.end()
+        if not matches:
+            return FilterResult(text)
+        pieces.append(text[pos:])
+        return FilterResult("".join(pieces), matches)
+
+    def check(self, text: str) -> bool:
+        """Return True if ``text`` would be blocked."""
+        return any(self.rule_for(m).action == "block" for m in self.scan(text))
+
+
+class StreamFilter:
+    """
+    Incremental ``ContentFilter`` over a token stream.
+
+    ``feed`` each token and forward what it returns; call ``finish`` at the
+    end of the stream for the held-back tail. The concatenated output equals
+    ``ContentFilter.filter`` on the whole text. After a ``block`` match the
+    text before the match is released, ``blocked`` is set and everything
+    after it is dropped.
+    """
+
+    def __init__(self, content_filter: ContentFilter):
+        self.filter = content_filter
+        self.matches: List[Match] = []
+        self.blocked = False
+        self._context = ""
+        self._pending = ""
+        self._offset = 0  # Position of ``_pending`` in the full stream
+
+    def feed(self, token: str) -> str:
+        """Add a token; return the text that is now safe to release."""
+        if self.blocked:
+            return ""
+        self._pending += token
+        return self._release(final=False)
+
+    def finish(self) -> str:
+        """Release the held-back tail at the end of the stream."""
+        if self.blocked:
+            return ""
+        return self._release(final=True)
+
+    def _release(self, final: bool) -> str:
+        text = self._context + self._pending
+        start = len(self._context)
+        if final:
+            cutoff = len(text)
+        else:
+            # Matches starting before ``settled`` lie entirely inside ``text``
+            # (with their lookahead); after it, hold back from the first
+            # character that could begin a match.
+            settled = max(start, len(text) - self.filter.max_length - LOOKAROUND_CHARS)
+            cutoff = self.filter.first_candidate(text, settled)
+        if cutoff <= start:
+            return ""
+
+        pieces: List[str] = []
+        pos = start
+        for m in self.filter.scan(text, start):
+            if m.start() >= cutoff:
+                break
+            rule = self.filter.rule_for(m)
+            offset = self._offset - start
+            self.matches.append(
+                Match(rule.name, rule.category, rule.action, m.start() + offset, m.end() + offset)
+            )
+            if rule.action == "block":
+                self.blocked = True
+                pieces.append(text[pos:m.start()])
+                self._pending = ""
+                return "".join(pieces)
+            pieces.append(text[pos:m.start()])
+            pieces.append(rule.replacement)
+            pos = m.end()
+
+        end = max(pos, cutoff)
+        pieces.append(text[pos:end])
+        self._offset += end - start
+        self._context = text[max(0, end - LOOKAROUND_CHARS):end]
+        self._pending = text[end:]
+        return "".join(pieces)
@@ -8,7 +8,7 @@ This module contains:
 The triton_model_repository/ directory contains:
 - allam_tensorrt/: TensorRT-LLM engine configuration
 - preprocessing/: Tokenization model
-- postprocessing/: Detokenization model  
+- postprocessing/: Detokenization model
 - ensemble/: End-to-end pipeline configuration
 """
 
@@ -0,0 +1,289 @@
+"""
+Admission control for GPU generation slots.
+
+``allam_tensorrt`` runs at most ``max_batch_size`` (8) sequences and holds
+``max_tokens_in_paged_kv_cache`` (2560) tokens of KV cache. Requests beyond
+that only wait inside Triton, where they can no longer be prioritised or
+dropped. ``AdmissionController`` keeps the waiting in the API instead:
+
+- Each generation costs its estimated KV footprint, prompt tokens plus
+  ``max_tokens``, and is admitted while the in-flight total stays within
+  ``kv_token_budget`` and ``max_in_flight``. A request larger than the whole
+  budget is admitted alone rather than never.
+- Waiting requests are served by priority class (``interactive`` streams
+  before ``batch`` calls), first come first served within a class.
+- When the queue is full the request is rejected at once (``OverloadedError``,
+  sent to clients as a 503 with an Arabic message) instead of queueing
+  behind work that would already be too late. Batch requests are shed at
+  half the queue length, so interactive traffic keeps its headroom.
+- Every queued request has a deadline; one still waiting at its deadline is
+  dropped. A request whose caller is cancelled (the client disconnected)
+  leaves the queue immediately.
+
+``AdmittedTritonClient`` wraps a ``TritonClient`` or ``MockTritonClient``
+with the same interface and holds a slot for the whole generation,
+including the full length of a stream.
+
+Requirements: 3.2, 9.2
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import aclosing, asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from models.triton_client import InferenceConfig, InferenceResult, TritonClientError
+from models.usage import GenerationStats, TokenCounter
+from observability.metrics import ADMISSION_REJECTED, QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+# Match allam_tensorrt: max_tokens_in_paged_kv_cache and max_batch_size
+DEFAULT_KV_TOKEN_BUDGET = 2560
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_MAX_QUEUE = 64
+DEFAULT_QUEUE_TIMEOUT_S = 10.0
+DEFAULT_BATCH_QUEUE_TIMEOUT_S = 30.0
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+
+class OverloadedError(TritonClientError):
+    """Raised when a request is shed or its queue deadline passes."""
+
+    def __init__(self, message: str, retry_after_s: float):
+        super().__init__(message)
+        self.retry_after_s = retry_after_s
+
+
+@dataclass
+class _Waiter:
+    """A queued request."""
+    cost: int
+    priority: str
+    future: asyncio.Future
+    enqueued: float = field(default_factory=time.perf_counter)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class AdmissionController:
+    """KV-token budget with priority queues, load shedding and deadlines."""
+
+    def __init__(
+        self,
+        kv_token_budget: int = DEFAULT_KV_TOKEN_BUDGET,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        queue_timeout_s: float = DEFAULT_QUEUE_TIMEOUT_S,
+        batch_queue_timeout_s: float = DEFAULT_BATCH_QUEUE_TIMEOUT_S,
+    ):
+        """
+        Initialize the controller.
+
+        Args:
+            kv_token_budget: Estimated KV-cache tokens of all admitted generations
+            max_in_flight: Maximum admitted generations
+            max_queue: Maximum waiting requests (batch requests: half of it)
+            queue_timeout_s: Deadline of a queued interactive request
+            batch_queue_timeout_s: Deadline of a queued batch request
+        """
+        if kv_token_budget < 1 or max_in_flight < 1:
+            raise ValueError("kv_token_budget and max_in_flight must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue must be non-negative")
+        self.kv_token_budget = kv_token_budget
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout_s = {INTERACTIVE: queue_timeout_s, BATCH: batch_queue_timeout_s}
+        self.tokens_in_use = 0
+        self.in_flight = 0
+        self._queues: Dict[str, Deque[_Waiter]] = {p: deque() for p in PRIORITIES}
+        self._wait_metric = QUEUE_WAIT.labels("admission")
+
+    def queued(self, priority: Optional[str] = None) -> int:
+        """Number of waiting requests, of one class or in total."""
+        if priority is not None:
+            return len(self._queues[priority])
+        return sum(len(q) for q in self._queues.values())
+
+    def cost(self, prompt_tokens: int, max_tokens: int) -> int:
+        """Estimated KV-cache tokens of a generation, capped at the budget."""
+        return max(1, min(prompt_tokens + max_tokens, self.kv_token_budget))
+
+    def _fits(self, cost: int) -> bool:
+        return (
+            self.in_flight < self.max_in_flight
+            and self.tokens_in_use + cost <= self.kv_token_budget
+        )
+
+    def _queue_limit(self, priority: str) -> int:
+        return self.max_queue if priority == INTERACTIVE else self.max_queue // 2
+
+    def should_shed(self, priority: str) -> bool:
+        """True if a new request of ``priority`` would be rejected right now."""
+        return self.queued() >= self._queue_limit(priority) and not self._can_admit_now(priority, 1)
+
+    def _can_admit_now(self, priority: str, cost: int) -> bool:
+        # Never overtake a waiting request of the same or a higher class
+        ahead = self._queues[INTERACTIVE] if priority == INTERACTIVE else self.queued()
+        return not ahead and self._fits(cost)
+
+    def _grant(self, cost: int) -> None:
+        self.tokens_in_use += cost
+        self.in_flight += 1
+
+    def _reject(self, reason: str, message: str, priority: str) -> OverloadedError:
+        ADMISSION_REJECTED.labels(reason).inc()
+        return OverloadedError(message, retry_after_s=self.queue_timeout_s[priority])
+
+    async def acquire(self, cost: int, priority: str = INTERACTIVE) -> None:
+        """
+        Wait for room for a generation of ``cost`` KV tokens.
+
+        Raises:
+            OverloadedError: The queue is full or the deadline passed
+        """
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority: {priority}")
+        cost = min(cost, self.kv_token_budget)
+        if self._can_admit_now(priority, cost):
+            self._grant(cost)
+            self._wait_metric.observe(0.0)
+            return
+        if self.queued() >= self._queue_limit(priority):
+            raise self._reject("overloaded", "Admission queue is full", priority)
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(cost, priority, loop.create_future())
+        waiter.timer = loop.call_later(self.queue_timeout_s[priority], self._expire, waiter)
+        self._queues[priority].append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            # The caller gave up: leave the queue, or hand back a slot granted
+            # in the same loop iteration
+            future = waiter.future
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release(cost)
+            else:
+                self._remove(waiter)
+            raise
+        finally:
+            waiter.timer.cancel()
+        self._wait_metric.observe(time.perf_counter() - waiter.enqueued)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        try:
+            self._queues[waiter.priority].remove(waiter)
+        except ValueError:
+            return
+        # The head may have been blocking smaller requests behind it
+        self._dispatch()
+
+    def _expire(self, waiter: _Waiter) -> None:
+        if waiter.future.done():
+            return
+        self._queues[waiter.priority].remove(waiter)
+        waiter.future.set_exception(
+            self._reject("deadline", "Timed out waiting for a generation slot", waiter.priority)
+        )
+        self._dispatch()
+
+    def release(self, cost: int) -> None:
+        """Return the budget of a finished generation and admit waiters."""
+        self.tokens_in_use -= min(cost, self.kv_token_budget)
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Admit waiting requests in priority order while the head fits."""
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue:
+                waiter = queue[0]
+                if not self._fits(waiter.cost):
+                    return
+                queue.popleft()
+                self._grant(waiter.cost)
+                waiter.future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, cost: int, priority: str = INTERACTIVE) -> AsyncIterator[None]:
+        """Hold room for one generation for the duration of the block."""
+        await self.acquire(cost, priority)
+        try:
+            yield
+        finally:
+            self.release(cost)
+
+
+class AdmittedTritonClient:
+    """
+    Triton client wrapper that admits generations through an ``AdmissionController``.
+
+    Streams are ``interactive`` and non-streaming calls are ``batch``.
+    """
+
+    def __init__(self, client, admission: AdmissionController):
+        """
+        Initialize the wrapper.
+
+        Args:
+            client: Wrapped ``TritonClient`` or ``MockTritonClient``
+            admission: Controller shared by all requests of this worker
+        """
+        self.client = client
+        self.admission = admission
+        self._counter: TokenCounter = getattr(client, "token_counter", None) or TokenCounter()
+
+    def __getattr__(self, name: str):
+        # Delegate everything else (url, model_name, ...) to the wrapped client
+        return getattr(self.client, name)
+
+    def _cost(self, prompt: str, config: InferenceConfig) -> int:
+        return self.admission.cost(self._counter.count(prompt), config.max_tokens)
+
+    async def is_server_ready(self) -> bool:
+        return await self.client.is_server_ready()
+
+    async def is_model_ready(self) -> bool:
+        return await self.client.is_model_ready()
+
+    async def infer(
+        self,
+        prompt: str,
+        config: Optional[InferenceConfig] = None,
+    ) -> InferenceResult:
+        """Run inference once admitted as a batch request."""
+        if config is None:
+            config = InferenceConfig(stream=False)
+        async with self.admission.slot(self._cost(prompt, config), BATCH):
+            return await self.client.infer(prompt, config)
+
+    async def infer_stream(
+        self,
+        prompt: str,
+        config: Optional[InferenceConfig] = None,
+        stats: Optional[GenerationStats] = None,
+    ) -> AsyncIterator[str]:
+        """Stream inference once admitted as an interactive request."""
+        if config is None:
+            config = InferenceConfig(stream=True)
+        async with self.admission.slot(self._cost(prompt, config), INTERACTIVE):
+            stream = (
+                self.client.infer_stream(prompt, config)
+                if stats is None
+                else self.client.infer_stream(prompt, config, stats=stats)
+            )
+            # Close the inner stream (cancelling generation) before the slot is freed
+            async with aclosing(stream):
+                async for token in stream:
+                    yield token
+
+    async def close(self) -> None:
+        await self.client.close()
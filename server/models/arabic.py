@@ -0,0 +1,44 @@
+"""
+Arabic text normalization.
+
+Folds the orthographic variation that does not change meaning in user
+questions so that equivalent prompts compare equal:
+
+- Strips tashkeel (harakat, tanween, shadda, sukun, dagger alef) and tatweel
+- Unifies alef variants (أ إ آ ٱ) to bare alef (ا)
+- Unifies alef maqsura (ى) with yaa (ي) and taa marbuta (ة) with haa (ه)
+- Lowercases Latin text and collapses whitespace
+"""
+
+import re
+
+# Harakat, tanween, shadda, sukun, Quranic marks and the dagger alef
+_DIACRITICS = "".join(chr(c) for c in range(0x064B, 0x0660)) + "ٰ"
+_TATWEEL = "ـ"
+
+_TRANSLATION = str.maketrans(
+    {
+        **{ch: None for ch in _DIACRITICS + _TATWEEL},
+        "أ": "ا",
+        "إ": "ا",
+        "آ": "ا",
+        "ٱ": "ا",
+        "ى": "ي",
+        "ة": "ه",
+    }
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_arabic(text: str) -> str:
+    """
+    Normalize Arabic text for matching and cache keys.
+
+    Args:
+        text: Raw text (Arabic, Latin or mixed)
+
+    Returns:
+        Normalized text with single spaces and no leading/trailing whitespace
+    """
+    return _WHITESPACE.sub(" ", text.translate(_TRANSLATION).lower()).strip()
@@ -0,0 +1,136 @@
+"""
+Client-side micro-batching for non-streaming Triton inference.
+
+Concurrent ``infer`` calls that share an ``InferenceConfig`` are collected for
+up to a short window and sent to Triton as one ``[B, 1]`` request, and the
+batched outputs are scattered back to each waiting caller. Calls are grouped
+by config because all rows of a batch share one set of sampling parameter
+tensors.
+
+This is opt-in (``TritonClient(batch_window_ms=...)``) and is meant for bulk
+and offline workloads, or for measuring throughput against Triton dynamic
+batching alone.
+
+Requirements: 3.2
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Hashable, List
+
+from observability.metrics import QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+# Matches max_batch_size in the ensemble model config
+DEFAULT_MAX_BATCH_SIZE = 8
+DEFAULT_BATCH_WINDOW_MS = 5.0
+
+
+@dataclass
+class _PendingBatch:
+    """Calls collected for one config while its window is open."""
+    prompts: List[str] = field(default_factory=list)
+    futures: List[asyncio.Future] = field(default_factory=list)
+    enqueued: List[float] = field(default_factory=list)
+    timer: asyncio.TimerHandle | None = None
+
+
+class MicroBatcher:
+    """
+    Collect concurrent requests and dispatch them as batches.
+
+    ``dispatch(prompts, key)`` must return one result per prompt, in order.
+    A batch is sent when it reaches ``max_batch_size`` or when
+    ``window_ms`` has elapsed since its first request, whichever is first.
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[List[str], Hashable], Awaitable[List]],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        window_ms: float = DEFAULT_BATCH_WINDOW_MS,
+        name: str = "batch",
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            dispatch: Coroutine sending one batch and returning per-row results
+            max_batch_size: Maximum rows per dispatched batch
+            window_ms: Maximum time a request waits for the batch to fill
+            name: ``queue`` label of the queue wait metric
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if window_ms < 0:
+            raise ValueError("window_ms must be non-negative")
+        self._dispatch = dispatch
+        self.max_batch_size = max_batch_size
+        self.window_s = window_ms / 1000
+        self._pending: Dict[Hashable, _PendingBatch] = {}
+        self._in_flight: set = set()
+        self.batches_sent = 0
+        self.requests_sent = 0
+        self._wait_metric = QUEUE_WAIT.labels(name)
+
+    async def submit(self, prompt: str, key: Hashable):
+        """Queue one prompt and wait for its row of the batched result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch()
+            batch.timer = loop.call_later(self.window_s, self._flush, key)
+        batch.prompts.append(prompt)
+        batch.futures.append(future)
+        batch.enqueued.append(time.perf_counter())
+
+        if len(batch.prompts) >= self.max_batch_size:
+            self._flush(key)
+
+        return await future
+
+    def _flush(self, key: Hashable) -> None:
+        """Close the window for ``key`` and dispatch its batch."""
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.create_task(self._run(batch, key))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _run(self, batch: _PendingBatch, key: Hashable) -> None:
+        """Send one batch and scatter its results to the waiting callers."""
+        self.batches_sent += 1
+        self.requests_sent += len(batch.prompts)
+        now = time.perf_counter()
+        for enqueued in batch.enqueued:
+            self._wait_metric.observe(now - enqueued)
+        try:
+            results = await self._dispatch(batch.prompts, key)
+            if len(results) != len(batch.prompts):
+                raise ValueError(
+                    f"Batch returned {len(results)} results for {len(batch.prompts)} prompts"
+                )
+        except Exception as e:
+            logger.error(f"Batched inference failed for {len(batch.prompts)} requests: {e}")
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result in zip(batch.futures, results):
+            # Callers that gave up (cancelled) are skipped
+            if not future.done():
+                future.set_result(result)
+
+    @property
+    def mean_batch_size(self) -> float:
+        """Average rows per dispatched batch."""
+        return self.requests_sent / self.batches_sent if self.batches_sent else 0.0
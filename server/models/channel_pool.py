@@ -0,0 +1,219 @@
+"""
+Pool of persistent gRPC channels to Triton Inference Server.
+
+A single HTTP/2 connection caps the number of concurrent streams and makes the
+first request after a worker restart pay the connection setup cost. The pool
+keeps N independent channels open for the lifetime of the application:
+
+- Channels are created and warmed (one readiness RPC each) at startup.
+- Each request uses the channel with the fewest in-flight calls, with ties
+  broken round-robin so idle channels stay warm.
+- A channel whose call fails with a connection error is replaced.
+- All channels are closed on shutdown.
+
+Requirements: 3.2
+"""
+
+import asyncio
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# gRPC status codes that indicate the channel itself is unusable. Triton
+# returns INTERNAL and UNKNOWN for model and backend errors, which a new
+# channel would not fix.
+_CONNECTION_ERROR_CODES = ("UNAVAILABLE",)
+
+
+@dataclass
+class PooledChannel:
+    """A single pooled Triton gRPC client and its load accounting."""
+    index: int
+    client: Any
+    in_flight: int = 0
+    generation: int = 0
+    requests: int = 0
+    reconnects: int = 0
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """Return True if an error means the gRPC channel should be replaced."""
+    status = getattr(error, "status", None)
+    if callable(status):
+        status = status()
+    code = getattr(error, "code", None)
+    if callable(code):
+        code = code()
+    text = f"{status} {code}"
+    return any(name in text for name in _CONNECTION_ERROR_CODES)
+
+
+class TritonChannelPool:
+    """
+    Fixed-size pool of Triton gRPC clients with least-in-flight selection.
+
+    Owned by the application lifespan: call ``start()`` at startup and
+    ``close()`` at shutdown, and share one pool across all ``TritonClient``
+    instances of a worker.
+    """
+
+    def __init__(
+        self,
+        url: str = "localhost:8001",
+        size: int = 4,
+        verbose: bool = False,
+        client_factory: Optional[Callable[[str, int], Any]] = None,
+    ):
+        """
+        Initialize the pool (channels are opened by ``start()``).
+
+        Args:
+            url: Triton server gRPC URL (host:port)
+            size: Number of persistent channels
+            verbose: Enable verbose tritonclient logging
+            client_factory: Optional ``(url, index) -> client`` factory,
+                defaulting to ``tritonclient.grpc.aio.InferenceServerClient``
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.url = url
+        self.size = size
+        self.verbose = verbose
+        self._client_factory = client_factory or self._default_client_factory
+        self._channels: List[PooledChannel] = []
+        self._round_robin = itertools.count()
+        self._reconnect_lock = asyncio.Lock()
+        self._closed = False
+
+    def _default_client_factory(self, url: str, index: int) -> Any:
+        """Create a tritonclient aio client on its own HTTP/2 connection."""
+        try:
+            import tritonclient.grpc.aio as grpcclient
+            from tritonclient.grpc import MAX_GRPC_MESSAGE_SIZE, KeepAliveOptions
+        except ImportError:
+            logger.warning(
+                "tritonclient not installed. Install with: pip install tritonclient[all]"
+            )
+            raise
+
+        keepalive = KeepAliveOptions()
+        channel_args = [
+            ("grpc.max_send_message_length", MAX_GRPC_MESSAGE_SIZE),
+            ("grpc.max_receive_message_length", MAX_GRPC_MESSAGE_SIZE),
+            ("grpc.keepalive_time_ms", keepalive.keepalive_time_ms),
+            ("grpc.keepalive_timeout_ms", keepalive.keepalive_timeout_ms),
+            ("grpc.keepalive_permit_without_calls", keepalive.keepalive_permit_without_calls),
+            ("grpc.http2.max_pings_without_data", keepalive.http2_max_pings_without_data),
+            # gRPC shares subchannels between identical channels by default;
+            # a local pool gives every pooled channel its own connection.
+            ("grpc.use_local_subchannel_pool", 1),
+        ]
+        return grpcclient.InferenceServerClient(
+            url=url,
+            verbose=self.verbose,
+            channel_args=channel_args,
+        )
+
+    @property
+    def started(self) -> bool:
+        """Whether the pool has open channels."""
+        return bool(self._channels) and not self._closed
+
+    async def start(self, warm: bool = True) -> None:
+        """
+        Open all channels and optionally warm them.
+
+        Warming issues one ``is_server_ready`` call per channel so that TCP and
+        HTTP/2 setup happen before the first user request. Warm-up failures are
+        logged, not raised: Triton may still be starting.
+        """
+        if self.started:
+            return
+        self._closed = False
+        self._channels = [
+            PooledChannel(index=i, client=self._client_factory(self.url, i))
+            for i in range(self.size)
+        ]
+        logger.info(f"Opened {self.size} Triton gRPC channels to {self.url}")
+
+        if warm:
+            results = await asyncio.gather(
+                *(channel.client.is_server_ready() for channel in self._channels),
+                return_exceptions=True,
+            )
+            warmed = sum(1 for result in results if result is True)
+            if warmed < self.size:
+                logger.warning(f"Warmed {warmed}/{self.size} Triton channels")
+
+    def _select(self) -> PooledChannel:
+        """Pick the least-loaded channel, rotating the start for fairness."""
+        offset = next(self._round_robin) % len(self._channels)
+        rotated = self._channels[offset:] + self._channels[:offset]
+        return min(rotated, key=lambda channel: channel.in_flight)
+
+    @asynccontextmanager
+    async def channel(self) -> AsyncIterator[Any]:
+        """
+        Borrow a channel's client for the duration of one call or stream.
+
+        Connection errors raised inside the block cause the channel to be
+        replaced before the error propagates.
+        """
+        if not self.started:
+            raise RuntimeError("Triton channel pool is not started")
+
+        pooled = self._select()
+        generation = pooled.generation
+        pooled.in_flight += 1
+        pooled.requests += 1
+        try:
+            yield pooled.client
+        except Exception as e:
+            if is_connection_error(e):
+                await self._reconnect(pooled, generation)
+            raise
+        finally:
+            pooled.in_flight -= 1
+
+    async def _reconnect(self, pooled: PooledChannel, generation: int) -> None:
+        """Replace a failed channel unless another caller already did."""
+        async with self._reconnect_lock:
+            if self._closed or pooled.generation != generation:
+                return
+            old_client = pooled.client
+            pooled.client = self._client_factory(self.url, pooled.index)
+            pooled.generation += 1
+            pooled.reconnects += 1
+            logger.warning(f"Reconnected Triton channel {pooled.index}")
+        try:
+            await old_client.close()
+        except Exception as e:
+            logger.debug(f"Closing failed Triton channel raised: {e}")
+
+    def stats(self) -> List[Dict[str, int]]:
+        """Per-channel load and reconnect counters."""
+        return [
+            {
+                "index": channel.index,
+                "in_flight": channel.in_flight,
+                "requests": channel.requests,
+                "reconnects": channel.reconnects,
+            }
+            for channel in self._channels
+        ]
+
+    async def close(self) -> None:
+        """Close all channels."""
+        self._closed = True
+        channels, self._channels = self._channels, []
+        for channel in channels:
+            try:
+                await channel.client.close()
+            except Exception as e:
+                logger.debug(f"Closing Triton channel {channel.index} raised: {e}")
+        if channels:
+            logger.info(f"Closed {len(channels)} Triton gRPC channels")
@@ -0,0 +1,120 @@
+"""
+Latency models for ``MockTritonClient``.
+
+The mock client normally answers at once (streams at a fixed 50 ms per
+token), which is fine for functional tests but says nothing about how the
+server behaves under load. A ``LatencyModel`` makes the mock behave like
+in-flight batched TensorRT-LLM generation, so server-side changes can be
+benchmarked without a GPU (see ``scripts/benchmark_chat.py``):
+
+- Prefill takes ``prefill_ms`` plus ``prefill_ms_per_token`` per prompt token.
+- Every decoding step takes ``token_ms``.
+- Both are multiplied by lognormal noise of standard deviation ``jitter``
+  (in log space), and by ``1 + batch_slowdown * (batch - 1)`` where
+  ``batch`` is the number of generations running at that moment. The slowdown
+  is re-read at every step, so a stream slows down as others join it.
+- At most ``max_batch_size`` generations run at once; later ones wait, as
+  they would inside Triton, and the wait counts towards time to first token.
+
+The presets are rough shapes of the Allam 7B engine (``max_batch_size`` 8)
+on common GPUs, not measurements; pass ``key=value`` overrides to fit them
+to numbers measured on real hardware.
+
+Requirements: 3.2, 9.2
+"""
+
+import math
+import random
+from dataclasses import dataclass, fields, replace
+from typing import Dict, Optional
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """Prefill and decoding latency of a simulated engine."""
+    prefill_ms: float = 0.0
+    prefill_ms_per_token: float = 0.0
+    token_ms: float = 50.0
+    jitter: float = 0.0
+    batch_slowdown: float = 0.0
+    max_batch_size: int = 0  # 0: no limit
+
+    def __post_init__(self) -> None:
+        for f in fields(self):
+            if getattr(self, f.name) < 0:
+                raise ValueError(f"{f.name} must not be negative")
+
+    def slowdown(self, batch: int) -> float:
+        """Step time multiplier with ``batch`` generations running."""
+        return 1.0 + self.batch_slowdown * max(batch - 1, 0)
+
+    def _noise(self, rng: random.Random) -> float:
+        if not self.jitter:
+            return 1.0
+        # Mean-one lognormal: slow outliers, never negative
+        return rng.lognormvariate(-self.jitter ** 2 / 2, self.jitter)
+
+    def prefill_s(self, prompt_tokens: int, batch: int, rng: random.Random) -> float:
+        """Seconds to prefill a prompt of ``prompt_tokens`` tokens."""
+        ms = self.prefill_ms + self.prefill_ms_per_token * prompt_tokens
+        return ms * self.slowdown(batch) * self._noise(rng) / 1000
+
+    def token_s(self, batch: int, rng: random.Random) -> float:
+        """Seconds for one decoding step."""
+        return self.token_ms * self.slowdown(batch) * self._noise(rng) / 1000
+
+
+LATENCY_PRESETS: Dict[str, LatencyModel] = {
+    # Server overhead only
+    "instant": LatencyModel(token_ms=0.0),
+    "a100": LatencyModel(
+        prefill_ms=15.0,
+        prefill_ms_per_token=0.12,
+        token_ms=22.0,
+        jitter=0.15,
+        batch_slowdown=0.06,
+        max_batch_size=8,
+    ),
+    "l4": LatencyModel(
+        prefill_ms=30.0,
+        prefill_ms_per_token=0.45,
+        token_ms=45.0,
+        jitter=0.2,
+        batch_slowdown=0.1,
+        max_batch_size=8,
+    ),
+}
+
+
+def parse_latency_model(spec: Optional[str]) -> Optional[LatencyModel]:
+    """
+    Parse a latency model from a spec string.
+
+    A spec is a preset name, ``key=value`` fields, or both, comma separated:
+    ``"a100"``, ``"a100,token_ms=30"`` or ``"token_ms=40,jitter=0.2"``.
+    An empty spec (or ``"none"``) means no model.
+    """
+    if not spec or spec.strip().lower() == "none":
+        return None
+    model = LatencyModel()
+    types = {f.name: f.type for f in fields(LatencyModel)}
+    for part in (p.strip() for p in spec.split(",") if p.strip()):
+        if "=" not in part:
+            if part.lower() not in LATENCY_PRESETS:
+                raise ValueError(
+                    f"Unknown latency preset: {part} (one of {', '.join(LATENCY_PRESETS)})"
+                )
+            model = LATENCY_PRESETS[part.lower()]
+            continue
+        name, value = (s.strip() for s in part.split("=", 1))
+        if name not in types:
+            raise ValueError(f"Unknown latency model field: {name}")
+        parsed = float(value)
+        if types[name] in (int, "int"):
+            if not parsed.is_integer():
+                raise ValueError(f"{name} must be an integer")
+            parsed = int(parsed)
+        if math.isnan(parsed):
+            raise ValueError(f"{name} must be a number")
+        model = replace(model, **{name: parsed})
+    return model
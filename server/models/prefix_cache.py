@@ -0,0 +1,110 @@
+"""
+Client-side estimate of KV-cache prefix reuse.
+
+With ``enable_kv_cache_reuse`` the TensorRT-LLM engine keeps the KV blocks of
+finished requests and serves the prefill of a new prompt from them as far as
+its leading blocks (``tokens_per_block`` tokens each) match. Every Absher
+chat starts with the same system prompt and a follow-up turn starts with the
+previous turn, so most of a prompt can skip prefill when it is laid out with
+the stable part first (see ``api.prompt``).
+
+Triton does not report per-request reuse, so ``PrefixCacheTracker`` mirrors
+the engine's bookkeeping on the prompts this worker sends: prompts are split
+into fixed-size character blocks approximating token blocks, each block is
+identified by a hash chained over the blocks before it, and the most recently
+used ``max_blocks`` are kept, least-recently-used first out. A prompt's
+leading blocks that are already tracked are counted as reused. Other workers
+and evictions inside the engine are invisible here, so this is an estimate
+meant to confirm the trend, together with time to first token split by hit
+and miss.
+
+Requirements: 3.2, 9.2
+"""
+
+from collections import OrderedDict
+from typing import List, Sequence
+
+from models.usage import ESTIMATE_CHARS_PER_TOKEN
+
+# Match the engine build (scripts/convert_allam.py) and allam_tensorrt
+DEFAULT_TOKENS_PER_BLOCK = 64
+DEFAULT_KV_CACHE_TOKENS = 2560
+
+
+class PrefixCacheTracker:
+    """LRU of chained prompt-block hashes approximating the engine's reusable blocks."""
+
+    def __init__(
+        self,
+        tokens_per_block: int = DEFAULT_TOKENS_PER_BLOCK,
+        kv_cache_tokens: int = DEFAULT_KV_CACHE_TOKENS,
+    ):
+        """
+        Initialize the tracker.
+
+        Args:
+            tokens_per_block: KV-cache block size of the engine
+            kv_cache_tokens: KV-cache capacity of the engine in tokens
+        """
+        if tokens_per_block < 1 or kv_cache_tokens < tokens_per_block:
+            raise ValueError("kv_cache_tokens must hold at least one block")
+        self.block_chars = tokens_per_block * ESTIMATE_CHARS_PER_TOKEN
+        self.max_blocks = kv_cache_tokens // tokens_per_block
+        self._blocks: "OrderedDict[int, None]" = OrderedDict()
+        self.reused_chars = 0
+        self.total_chars = 0
+
+    def _block_hashes(self, prompt: str) -> List[int]:
+        """Chained hashes of the complete blocks of ``prompt``."""
+        hashes = []
+        previous = 0
+        for start in range(0, len(prompt) - self.block_chars + 1, self.block_chars):
+            previous = hash((previous, prompt[start:start + self.block_chars]))
+            hashes.append(previous)
+        return hashes
+
+    def _leading_tracked(self, hashes: List[int]) -> int:
+        reused = 0
+        while reused < len(hashes) and hashes[reused] in self._blocks:
+            reused += 1
+        return reused
+
+    def match(self, prompt: str) -> int:
+        """Leading blocks of ``prompt`` that are tracked, without recording it."""
+        return self._leading_tracked(self._block_hashes(prompt))
+
+    def observe(self, prompt: str) -> float:
+        """
+        Record a prompt sent to the engine.
+
+        Returns:
+            Estimated fraction of the prompt served from cached blocks
+        """
+        hashes = self._block_hashes(prompt)
+        reused = self._leading_tracked(hashes)
+        # Leading blocks are shared by more prompts: touch them last so they
+        # are evicted last, as the engine frees leaf blocks first
+        for block in reversed(hashes):
+            self._blocks[block] = None
+            self._blocks.move_to_end(block)
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+
+        reused_chars = reused * self.block_chars
+        self.reused_chars += reused_chars
+        self.total_chars += len(prompt)
+        return reused_chars / len(prompt) if prompt else 0.0
+
+    @property
+    def hit_ratio(self) -> float:
+        """Share of prompt text sent since startup that was served from cached blocks."""
+        return self.reused_chars / self.total_chars if self.total_chars else 0.0
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+
+def combined_hit_ratio(trackers: Sequence[PrefixCacheTracker]) -> float:
+    """Hit ratio over the prompts of several trackers (one per Triton replica)."""
+    total_chars = sum(t.total_chars for t in trackers)
+    return sum(t.reused_chars for t in trackers) / total_chars if total_chars else 0.0
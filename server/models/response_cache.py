@@ -0,0 +1,296 @@
+"""
+Response cache in front of Triton inference.
+
+Much of the Absher traffic is the same handful of questions (license renewal,
+passport renewal, ...). ``CachedTritonClient`` wraps a Triton client and serves
+repeated prompts from a cache instead of the GPU:
+
+- Keys combine the Arabic-normalized prompt with the sampling parameters of
+  the ``InferenceConfig``, so spelling variants of the same question share an
+  entry while different generation settings never do.
+- Only deterministic or low-temperature configs are cached; sampling at high
+  temperature is expected to vary between calls.
+- Entries expire after a TTL and are evicted least-recently-used.
+- Two backends: in-process (per worker) and Redis (shared across workers and
+  replicas; LRU eviction via Redis ``maxmemory-policy allkeys-lru``).
+
+Requirements: 3.2
+"""
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional, Protocol, Tuple
+
+from models.arabic import normalize_arabic
+from models.triton_client import InferenceConfig, InferenceResult
+from models.usage import GenerationStats, TokenCounter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_S = 3600.0
+DEFAULT_MAX_ENTRIES = 10_000
+# Configs sampling above this temperature are never cached (unless top_k == 1)
+DEFAULT_MAX_TEMPERATURE = 0.3
+
+
+class ResponseCacheBackend(Protocol):
+    """Storage interface for cached responses."""
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached text for ``key``, or None."""
+        ...
+
+    async def set(self, key: str, text: str, ttl_s: float) -> None:
+        """Store ``text`` under ``key`` for ``ttl_s`` seconds."""
+        ...
+
+    async def close(self) -> None:
+        """Release backend resources."""
+        ...
+
+
+class InMemoryCacheBackend:
+    """Per-process LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, text = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return text
+
+    async def set(self, key: str, text: str, ttl_s: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl_s, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def close(self) -> None:
+        self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Redis-backed cache shared by all workers and replicas."""
+
+    def __init__(self, url: str = "redis://localhost:6379", prefix: str = "absher:resp:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            logger.warning("redis not installed. Install with: pip install redis")
+            raise
+        self.prefix = prefix
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._redis.get(self.prefix + key)
+
+    async def set(self, key: str, text: str, ttl_s: float) -> None:
+        await self._redis.set(self.prefix + key, text, px=int(ttl_s * 1000))
+
+    async def close(self) -> None:
+        # redis-py renamed close() to aclose() in 5.0.1
+        await getattr(self._redis, "aclose", self._redis.close)()
+
+
+@dataclass
+class CacheStats:
+    """Cache lookup counters."""
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    errors: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Hits over cacheable lookups."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def is_cacheable(config: InferenceConfig, max_temperature: float = DEFAULT_MAX_TEMPERATURE) -> bool:
+    """Return True if a config is deterministic enough to serve from cache."""
+    return config.top_k == 1 or config.temperature <= max_temperature
+
+
+def cache_key(prompt: str, config: InferenceConfig) -> str:
+    """Build the cache key for a prompt and its sampling parameters."""
+    payload = json.dumps(
+        [
+            normalize_arabic(prompt),
+            config.max_tokens,
+            round(config.temperature, 4),
+            round(config.top_p, 4),
+            config.top_k,
+            round(config.repetition_penalty, 4),
+            list(config.stop),
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedTritonClient:
+    """
+    Triton client wrapper that serves repeated prompts from a response cache.
+
+    Exposes the same interface as ``TritonClient``. Backend errors are logged
+    and treated as misses so the cache can never fail a request.
+    """
+
+    def __init__(
+        self,
+        client,
+        backend: ResponseCacheBackend,
+        ttl_s: float = DEFAULT_TTL_S,
+        max_temperature: float = DEFAULT_MAX_TEMPERATURE,
+    ):
+        """
+        Initialize the cached client.
+
+        Args:
+            client: Wrapped ``TritonClient`` or ``MockTritonClient``
+            backend: Cache storage backend
+            ttl_s: Time-to-live for cached responses
+            max_temperature: Highest temperature whose responses are cached
+        """
+        self.client = client
+        self.backend = backend
+        self.ttl_s = ttl_s
+        self.max_temperature = max_temperature
+        self.stats = CacheStats()
+        self._counter: TokenCounter = getattr(client, "token_counter", None) or TokenCounter()
+
+    def __getattr__(self, name: str):
+        # Delegate everything else (url, model_name, ...) to the wrapped client
+        return getattr(self.client, name)
+
+    async def _lookup(
+        self, prompt: str, config: InferenceConfig
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Return ``(key, cached_text)``; key is None when the config is not cacheable."""
+        if not is_cacheable(config, self.max_temperature):
+            self.stats.bypassed += 1
+            return None, None
+        key = cache_key(prompt, config)
+        try:
+            text = await self.backend.get(key)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Response cache lookup failed: {e}")
+            text = None
+        if text is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return key, text
+
+    async def _store(self, key: str, text: str) -> None:
+        try:
+            await self.backend.set(key, text, self.ttl_s)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Response cache store failed: {e}")
+
+    def _hit_stats(self, prompt: str, text: str, stats: GenerationStats) -> None:
+        """Fill ``stats`` for a cached answer; nothing was generated, so no timing."""
+        stats.finish()
+        stats.prompt_tokens = self._counter.count(prompt)
+        stats.completion_tokens = self._counter.count(text)
+        stats.exact = self._counter.exact
+        stats.finish_reason = "stop"
+
+    async def is_server_ready(self) -> bool:
+        return await self.client.is_server_ready()
+
+    async def is_model_ready(self) -> bool:
+        return await self.client.is_model_ready()
+
+    async def infer(
+        self,
+        prompt: str,
+        config: Optional[InferenceConfig] = None,
+    ) -> InferenceResult:
+        """Run inference, serving cacheable prompts from the cache when possible."""
+        if config is None:
+            config = InferenceConfig(stream=False)
+
+        stats = GenerationStats()
+        stats.start()
+        key, text = await self._lookup(prompt, config)
+        if text is not None:
+            self._hit_stats(prompt, text, stats)
+            return InferenceResult.from_stats(text, stats, "stop")
+
+        result = await self.client.infer(prompt, config)
+        if key is not None and result.finish_reason == "stop":
+            await self._store(key, result.text)
+        return result
+
+    async def infer_stream(
+        self,
+        prompt: str,
+        config: Optional[InferenceConfig] = None,
+        stats: Optional[GenerationStats] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream inference; a cache hit is replayed as a single chunk.
+
+        Like ``infer``, a miss is cached only if the stream ended on a stop,
+        never when it hit ``max_tokens``, failed or the consumer disconnected.
+        """
+        if config is None:
+            config = InferenceConfig(stream=True)
+
+        if stats is None:
+            stats = GenerationStats()
+        stats.streamed = True
+        stats.start()
+        key, text = await self._lookup(prompt, config)
+        if text is not None:
+            self._hit_stats(prompt, text, stats)
+            yield text
+            return
+
+        chunks = []
+        stream = self.client.infer_stream(prompt, config, stats=stats)
+        async with aclosing(stream):
+            async for token in stream:
+                if key is not None:
+                    chunks.append(token)
+                yield token
+
+        if key is not None and stats.finish_reason == "stop":
+            await self._store(key, "".join(chunks))
+
+    def cache_stats(self) -> Dict[str, float]:
+        """Hit/miss counters and hit rate."""
+        return {
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "bypassed": self.stats.bypassed,
+            "errors": self.stats.errors,
+            "hit_rate": self.stats.hit_rate,
+        }
+
+    async def close(self) -> None:
+        logger.info(f"Response cache stats: {self.cache_stats()}")
+        await self.backend.close()
+        await self.client.close()
@@ -0,0 +1,316 @@
+"""
+Routing of generations across several Triton replicas.
+
+An external load balancer in front of several GPU nodes sees neither how
+busy each engine is nor which engine already holds a conversation's KV
+cache. ``TritonRouter`` holds one client per replica and picks a replica
+for every request itself:
+
+- Least load: the replica with the lowest expected wait, its in-flight
+  generations (plus this one) times the EWMA of its recent time to first
+  token (streams) or of its recent generation time (non-streaming calls,
+  kept apart so whole generations do not pass for slow first tokens). A
+  replica without measurements yet is assumed to be as fast as the average
+  of the others. Ties rotate, so idle replicas stay warm.
+- KV affinity: every ``TritonClient`` estimates which prompt blocks its
+  replica has cached (``PrefixCacheTracker``). A follow-up turn starts with
+  the previous turn, so the replica that served it holds the longest
+  prefix and is chosen, keeping prefill reuse, unless it has more than
+  ``affinity_slack`` generations in flight beyond the least loaded
+  replica. Blocks every replica holds (the system prompt) do not count.
+- Ejection: ``is_server_ready`` probes every replica (server and model
+  readiness, bounded by ``probe_timeout_s``). Failing replicas are ejected
+  and passing ones readmitted. The ``/ready`` health monitor calls it on its
+  interval, so no separate probe loop is needed. A replica is also ejected
+  as soon as one of its calls fails with a connection error. When every
+  replica is ejected, all of them are tried rather than none.
+- Failover: a generation that fails with a connection error (gRPC
+  ``UNAVAILABLE``) before any
+  text has been returned is sent to the next replica, so a request queued
+  on a replica that goes down still completes. A stream that fails after
+  its first chunk cannot be resumed elsewhere, and the error is raised.
+  Model errors are raised as they are, without failover or ejection: a
+  malformed request would fail on every replica.
+
+``TritonRouter`` has the same interface as ``TritonClient`` and sits under
+the admission, single-flight and cache wrappers.
+
+Requirements: 3.2, 9.2
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+
+from models.channel_pool import is_connection_error
+from models.triton_client import InferenceConfig, InferenceResult
+from models.usage import GenerationStats
+from observability.metrics import ROUTER_FAILOVERS, ROUTER_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EWMA_ALPHA = 0.3
+# Half of allam_tensorrt's max_batch_size
+DEFAULT_AFFINITY_SLACK = 4
+DEFAULT_PROBE_TIMEOUT_S = 0.5
+
+AFFINITY = "affinity"
+LEAST_LOAD = "least_load"
+
+
+def is_failover_error(error: BaseException) -> bool:
+    """True if an error, or one it was raised from, means the replica is unreachable."""
+    seen: Set[int] = set()
+    current: Optional[BaseException] = error
+    while current is not None and id(current) not in seen:
+        if is_connection_error(current):
+            return True
+        seen.add(id(current))
+        current = current.__cause__ or current.__context__
+    return False
+
+
+@dataclass
+class Backend:
+    """One replica's client and its routing state."""
+    name: str
+    client: Any
+    in_flight: int = 0
+    requests: int = 0
+    failovers: int = 0
+    healthy: bool = True
+    ewma_ttft_s: Optional[float] = None
+    # Whole non-streaming generations
+    ewma_latency_s: Optional[float] = None
+
+    def observe_ttft(self, ttft_s: float, alpha: float) -> None:
+        self.ewma_ttft_s = _ewma(self.ewma_ttft_s, ttft_s, alpha)
+
+    def observe_latency(self, latency_s: float, alpha: float) -> None:
+        self.ewma_latency_s = _ewma(self.ewma_latency_s, latency_s, alpha)
+
+    def average(self, streaming: bool) -> Optional[float]:
+        return self.ewma_ttft_s if streaming else self.ewma_latency_s
+
+
+def _ewma(average: Optional[float], value: float, alpha: float) -> float:
+    return value if average is None else average + alpha * (value - average)
+
+
+class TritonRouter:
+    """
+    Triton client over several replicas with least-load and KV-affinity routing.
+
+    Exposes the same interface as ``TritonClient``.
+    """
+
+    def __init__(
+        self,
+        clients: Sequence[Any],
+        affinity_slack: int = DEFAULT_AFFINITY_SLACK,
+        ewma_alpha: float = DEFAULT_EWMA_ALPHA,
+        probe_timeout_s: float = DEFAULT_PROBE_TIMEOUT_S,
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            clients: One ``TritonClient`` (or ``MockTritonClient``) per replica;
+                each is named by its ``url``
+            affinity_slack: Extra in-flight generations a replica holding a
+                prompt's prefix may have over the least loaded one
+            ewma_alpha: Weight of the newest time to first token in the average
+            probe_timeout_s: A replica probe taking longer counts as failed
+        """
+        if not clients:
+            raise ValueError("TritonRouter needs at least one client")
+        if not 0 < ewma_alpha <= 1:
+            raise ValueError("ewma_alpha must be in (0, 1]")
+        self.backends = [
+            Backend(name=getattr(client, "url", None) or f"replica-{i}", client=client)
+            for i, client in enumerate(clients)
+        ]
+        self.affinity_slack = affinity_slack
+        self.ewma_alpha = ewma_alpha
+        self.probe_timeout_s = probe_timeout_s
+        self.token_counter = getattr(clients[0], "token_counter", None)
+        self._round_robin = itertools.count()
+
+    def _expected_wait(self, backend: Backend, streaming: bool, default_s: float) -> float:
+        average = backend.average(streaming)
+        return (backend.in_flight + 1) * (average if average is not None else default_s)
+
+    def _select(
+        self, prompt: str, tried: List[Backend], streaming: bool = True
+    ) -> Tuple[Backend, str]:
+        """Pick a replica not tried yet for a stream (or non-streaming call), and why."""
+        untried = [b for b in self.backends if b not in tried]
+        candidates = [b for b in untried if b.healthy] or untried
+        offset = next(self._round_robin) % len(candidates)
+        candidates = candidates[offset:] + candidates[:offset]
+
+        measured = [b.average(streaming) for b in self.backends]
+        measured = [average for average in measured if average is not None]
+        default_s = sum(measured) / len(measured) if measured else 1.0
+        least = min(candidates, key=lambda b: self._expected_wait(b, streaming, default_s))
+
+        depths: Dict[int, int] = {}
+        for index, backend in enumerate(candidates):
+            tracker = getattr(backend.client, "prefix_tracker", None)
+            if tracker is not None:
+                depths[index] = tracker.match(prompt)
+        if len(depths) > 1:
+            index = max(depths, key=depths.get)
+            affine = candidates[index]
+            if (
+                depths[index] > min(depths.values())
+                and affine.in_flight <= least.in_flight + self.affinity_slack
+            ):
+                return affine, AFFINITY
+        return least, LEAST_LOAD
+
+    def _start(self, backend: Backend, decision: str) -> None:
+        backend.in_flight += 1
+        backend.requests += 1
+        ROUTER_REQUESTS.labels(backend.name, decision).inc()
+
+    def _fail_over(self, backend: Backend, error: BaseException, tried: List[Backend]) -> bool:
+        """Eject a replica after a connection error; True if another can take the request."""
+        if not is_failover_error(error):
+            return False
+        if backend.healthy:
+            logger.warning(f"Ejecting Triton replica {backend.name}: {error}")
+        backend.healthy = False
+        if len(tried) >= len(self.backends):
+            return False
+        backend.failovers += 1
+        ROUTER_FAILOVERS.labels(backend.name).inc()
+        return True
+
+    async def _probe(self, backend: Backend) -> bool:
+        async def ready() -> bool:
+            return await backend.client.is_server_ready() and await backend.client.is_model_ready()
+
+        try:
+            ok = bool(await asyncio.wait_for(ready(), self.probe_timeout_s))
+        except Exception as e:
+            logger.debug(f"Probe of Triton replica {backend.name} failed: {e}")
+            ok = False
+        if ok != backend.healthy:
+            if ok:
+                logger.info(f"Readmitting Triton replica {backend.name}")
+            else:
+                logger.warning(f"Ejecting Triton replica {backend.name}: probe failed")
+            backend.healthy = ok
+        return ok
+
+    async def is_server_ready(self) -> bool:
+        """Probe every replica, ejecting and readmitting them; True if any is ready."""
+        results = await asyncio.gather(*(self._probe(b) for b in self.backends))
+        return any(results)
+
+    async def is_model_ready(self) -> bool:
+        """True if a replica passed its last probe (which includes model readiness)."""
+        return any(b.healthy for b in self.backends)
+
+    async def infer(
+        self,
+        prompt: str,
+        config: Optional[InferenceConfig] = None,
+    ) -> InferenceResult:
+        """Run inference on the selected replica, failing over on connection errors."""
+        tried: List[Backend] = []
+        while True:
+            backend, decision = self._select(prompt, tried, streaming=False)
+            tried.append(backend)
+            self._start(backend, decision)
+            start = time.perf_counter()
+            try:
+                result = await backend.client.infer(prompt, config)
+            except Exception as e:
+                if self._fail_over(backend, e, tried):
+                    logger.warning(
+                        f"Retrying generation on another replica after {backend.name}: {e}"
+                    )
+                    continue
+                raise
+            finally:
+                backend.in_flight -= 1
+            backend.observe_latency(time.perf_counter() - start, self.ewma_alpha)
+            return result
+
+    async def infer_stream(
+        self,
+        prompt: str,
+        config: Optional[InferenceConfig] = None,
+        stats: Optional[GenerationStats] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream inference from the selected replica.
+
+        A replica failing with a connection error before its first chunk is
+        replaced by the next one. ``stats`` times the whole request, failover
+        included; token counts are those of the replica that answered.
+        """
+        if stats is None:
+            stats = GenerationStats()
+        stats.streamed = True
+        stats.start()
+        attempt = GenerationStats()
+        tried: List[Backend] = []
+        try:
+            while True:
+                backend, decision = self._select(prompt, tried)
+                tried.append(backend)
+                self._start(backend, decision)
+                attempt = GenerationStats()
+                start = time.perf_counter()
+                sent = False
+                try:
+                    stream = backend.client.infer_stream(prompt, config, stats=attempt)
+                    async with aclosing(stream):
+                        async for chunk in stream:
+                            if not sent:
+                                sent = True
+                                backend.observe_ttft(time.perf_counter() - start, self.ewma_alpha)
+                                stats.first_token()
+                            yield chunk
+                    return
+                except Exception as e:
+                    if not sent and self._fail_over(backend, e, tried):
+                        logger.warning(
+                            f"Retrying stream on another replica after {backend.name}: {e}"
+                        )
+                        continue
+                    raise
+                finally:
+                    backend.in_flight -= 1
+        finally:
+            stats.finish()
+            stats.prompt_tokens = attempt.prompt_tokens
+            stats.completion_tokens = attempt.completion_tokens
+            stats.exact = attempt.exact
+            stats.finish_reason = attempt.finish_reason
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-replica load, health and latency."""
+        return [
+            {
+                "backend": b.name,
+                "healthy": b.healthy,
+                "in_flight": b.in_flight,
+                "requests": b.requests,
+                "failovers": b.failovers,
+                "ewma_ttft_ms": None if b.ewma_ttft_s is None else b.ewma_ttft_s * 1000,
+                "ewma_latency_ms": None if b.ewma_latency_s is None else b.ewma_latency_s * 1000,
+            }
+            for b in self.backends
+        ]
+
+    async def close(self) -> None:
+        """Close every replica's client."""
+        await asyncio.gather(*(b.client.close() for b in self.backends))
@@ -0,0 +1,231 @@
+"""
+Single-flight deduplication of identical in-flight generations.
+
+When a service notice goes out, thousands of users ask the same question
+within seconds. The response cache only helps once the first answer has
+finished; until then every copy of the question would start its own GPU
+generation. ``SingleFlightTritonClient`` wraps a Triton client so that at any
+moment there is one generation per distinct question:
+
+- Requests are keyed like the response cache (``cache_key``): the
+  Arabic-normalized prompt with the sampling parameters. Only deterministic
+  or low-temperature configs (``is_cacheable``) are shared; sampled answers
+  are expected to differ between users.
+- A non-streaming call with the key of a call in flight awaits that call's
+  result instead of starting another.
+- A stream with the key of a stream in flight subscribes to it: it is sent
+  every chunk generated so far and then follows the live stream. Chunks come
+  from the wrapped client already decoded and cut at stop sequences, so every
+  subscriber receives the same text.
+- A caller that goes away only detaches. The generation is cancelled, freeing
+  the decode slot, when its last caller has gone.
+
+Each caller's ``GenerationStats`` times its own wait, from attaching to its
+first and last chunk; token counts are those of the shared generation.
+Generation metrics are recorded once, by the wrapped client.
+
+Requirements: 3.2, 9.2
+"""
+
+import asyncio
+import logging
+from contextlib import aclosing
+from dataclasses import replace
+from typing import AsyncIterator, Dict, List, Optional
+
+from models.response_cache import DEFAULT_MAX_TEMPERATURE, cache_key, is_cacheable
+from models.triton_client import InferenceConfig, InferenceResult, TritonClientError
+from models.usage import GenerationStats
+from observability.metrics import SINGLE_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """A non-streaming generation and the number of callers awaiting it."""
+
+    def __init__(self, task: "asyncio.Task[InferenceResult]"):
+        self.task = task
+        self.waiters = 0
+
+
+class _Stream:
+    """A streaming generation, the chunks sent so far and its subscribers."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.stats = GenerationStats()
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.changed = asyncio.Event()
+
+    def notify(self) -> None:
+        """Wake the subscribers waiting for a chunk or the end of the stream."""
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class SingleFlightTritonClient:
+    """
+    Triton client wrapper that shares identical in-flight generations.
+
+    Exposes the same interface as ``TritonClient``.
+    """
+
+    def __init__(self, client, max_temperature: float = DEFAULT_MAX_TEMPERATURE):
+        """
+        Initialize the wrapper.
+
+        Args:
+            client: Wrapped ``TritonClient``, ``MockTritonClient`` or
+                ``AdmittedTritonClient``
+            max_temperature: Highest temperature whose generations are shared
+        """
+        self.client = client
+        self.max_temperature = max_temperature
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _Stream] = {}
+
+    def __getattr__(self, name: str):
+        # Delegate everything else (url, model_name, ...) to the wrapped client
+        return getattr(self.client, name)
+
+    @property
+    def in_flight(self) -> int:
+        """Distinct generations currently shared."""
+        return len(self._calls) + len(self._streams)
+
+    async def is_server_ready(self) -> bool:
+        return await self.client.is_server_ready()
+
+    async def is_model_ready(self) -> bool:
+        return await self.client.is_model_ready()
+
+    async def infer(
+        self,
+        prompt: str,
+        config: Optional[InferenceConfig] = None,
+    ) -> InferenceResult:
+        """Run inference, awaiting an identical call in flight if there is one."""
+        if config is None:
+            config = InferenceConfig(stream=False)
+        if not is_cacheable(config, self.max_temperature):
+            return await self.client.infer(prompt, config)
+
+        key = cache_key(prompt, config)
+        call = self._calls.get(key)
+        if call is None:
+            SINGLE_FLIGHT.labels("leader").inc()
+            call = _Call(asyncio.ensure_future(self.client.infer(prompt, config)))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _, key=key, call=call: self._end_call(key, call))
+        else:
+            SINGLE_FLIGHT.labels("follower").inc()
+
+        call.waiters += 1
+        try:
+            # A cancelled caller must not cancel the call the others await
+            result = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+        return replace(result)
+
+    def _end_call(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled():
+            # Retrieved here so a failure nobody awaited is not reported as lost
+            call.task.exception()
+
+    async def infer_stream(
+        self,
+        prompt: str,
+        config: Optional[InferenceConfig] = None,
+        stats: Optional[GenerationStats] = None,
+    ) -> AsyncIterator[str]:
+        """Stream inference, subscribing to an identical stream in flight if there is one."""
+        if config is None:
+            config = InferenceConfig(stream=True)
+        if not is_cacheable(config, self.max_temperature):
+            stream = (
+                self.client.infer_stream(prompt, config)
+                if stats is None
+                else self.client.infer_stream(prompt, config, stats=stats)
+            )
+            async with aclosing(stream):
+                async for token in stream:
+                    yield token
+            return
+
+        key = cache_key(prompt, config)
+        flight = self._streams.get(key)
+        if flight is None:
+            SINGLE_FLIGHT.labels("leader").inc()
+            flight = _Stream()
+            self._streams[key] = flight
+            flight.task = asyncio.ensure_future(self._produce(key, flight, prompt, config))
+        else:
+            SINGLE_FLIGHT.labels("follower").inc()
+
+        if stats is None:
+            stats = GenerationStats()
+        stats.streamed = True
+        stats.start()
+        flight.subscribers += 1
+        sent = 0
+        try:
+            while True:
+                while sent < len(flight.chunks):
+                    stats.first_token()
+                    sent += 1
+                    yield flight.chunks[sent - 1]
+                if flight.done:
+                    break
+                await flight.changed.wait()
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            flight.subscribers -= 1
+            stats.finish()
+            stats.prompt_tokens = flight.stats.prompt_tokens
+            stats.completion_tokens = flight.stats.completion_tokens
+            stats.exact = flight.stats.exact
+            stats.finish_reason = flight.stats.finish_reason if flight.done else None
+            if flight.subscribers == 0 and not flight.done:
+                # Last subscriber went away: stop generating, and let the
+                # next request start afresh rather than join a cancelled stream
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+                flight.task.cancel()
+
+    async def _produce(
+        self, key: str, flight: _Stream, prompt: str, config: InferenceConfig
+    ) -> None:
+        """Run the shared stream, publishing its chunks to the subscribers."""
+        try:
+            stream = self.client.infer_stream(prompt, config, stats=flight.stats)
+            async with aclosing(stream):
+                async for token in stream:
+                    flight.chunks.append(token)
+                    flight.notify()
+        except asyncio.CancelledError:
+            flight.error = TritonClientError("Shared generation cancelled")
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            flight.notify()
+
+    async def close(self) -> None:
+        for call in list(self._calls.values()):
+            call.task.cancel()
+        for flight in list(self._streams.values()):
+            flight.task.cancel()
+        await self.client.close()
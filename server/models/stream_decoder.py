@@ -0,0 +1,126 @@
+"""
+Incremental detokenization of streamed model output.
+
+Sits between the Triton ``text_output`` chunks and the client and holds back
+only what cannot be released yet:
+
+- Incomplete UTF-8 sequences: a multibyte Arabic character whose bytes are
+  split across two chunks is decoded once its last byte arrives.
+- Grapheme clusters: a trailing letter may still receive a combining mark
+  (harakat, shadda, hamza above) or a zero-width joiner in the next chunk, so
+  the last cluster is released with the next chunk instead of being split.
+- Stop sequences: the longest suffix that is a prefix of a stop string is
+  held until it either completes (the stream ends there, the stop string is
+  not emitted) or diverges (it is released).
+
+Everything else is released on the chunk that produced it, so streaming
+latency stays at one token.
+
+Requirements: 3.2
+"""
+
+import codecs
+import unicodedata
+from typing import Iterable, Optional, Tuple
+
+ZWJ = "\u200d"
+
+
+def _is_extender(char: str) -> bool:
+    """True for characters that attach to the preceding character (marks, ZWJ)."""
+    return char == ZWJ or unicodedata.category(char) in ("Mn", "Mc", "Me")
+
+
+def _may_be_extended(char: str) -> bool:
+    """True if a combining mark could still follow ``char`` in the same cluster."""
+    return char == ZWJ or unicodedata.category(char)[0] in ("L", "M")
+
+
+def cluster_boundary(text: str, cut: int, at_end: bool) -> int:
+    """
+    Move ``cut`` back to the nearest grapheme cluster boundary.
+
+    Args:
+        text: Decoded text
+        cut: Proposed split position
+        at_end: True if ``text[cut:]`` may still grow (``cut == len(text)``
+            and more chunks are coming)
+
+    Returns:
+        Position ``<= cut`` at which the text can be split safely
+    """
+    if at_end and cut > 0 and _may_be_extended(text[cut - 1]):
+        cut -= 1
+    while 0 < cut < len(text) and (_is_extender(text[cut]) or text[cut - 1] == ZWJ):
+        cut -= 1
+    return cut
+
+
+def truncate_at_stop(text: str, stop: Iterable[str]) -> Tuple[str, Optional[str]]:
+    """Cut ``text`` at the earliest stop string; returns ``(text, matched stop or None)``."""
+    best, matched = len(text), None
+    for sequence in stop:
+        index = text.find(sequence) if sequence else -1
+        if 0 <= index < best:
+            best, matched = index, sequence
+    return text[:best], matched
+
+
+class StreamDecoder:
+    """
+    Incremental UTF-8 decoder with stop-sequence and grapheme handling.
+
+    ``feed`` each raw chunk (``bytes`` or ``str``) and forward what it
+    returns; call ``finish`` when the stream ends. Once a stop string is seen
+    ``stopped`` is set and further input is ignored; the caller should cancel
+    the generation.
+    """
+
+    def __init__(self, stop: Iterable[str] = ()):
+        self.stop = tuple(s for s in stop if s)
+        self.stop_sequence: Optional[str] = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = ""
+
+    @property
+    def stopped(self) -> bool:
+        return self.stop_sequence is not None
+
+    def feed(self, chunk) -> str:
+        """Add a chunk; return the text that can be released now."""
+        if self.stopped:
+            return ""
+        if isinstance(chunk, (bytes, bytearray)):
+            chunk = self._decoder.decode(chunk)
+        return self._release(self._pending + chunk, final=False)
+
+    def finish(self) -> str:
+        """Flush everything still held back at the end of the stream."""
+        if self.stopped:
+            return ""
+        return self._release(self._pending + self._decoder.decode(b"", final=True), final=True)
+
+    def _stop_prefix_length(self, text: str) -> int:
+        """Length of the longest suffix of ``text`` that starts a stop string."""
+        longest = 0
+        for sequence in self.stop:
+            for k in range(min(len(sequence) - 1, len(text)), longest, -1):
+                if text.endswith(sequence[:k]):
+                    longest = k
+                    break
+        return longest
+
+    def _release(self, text: str, final: bool) -> str:
+        if self.stop:
+            released, matched = truncate_at_stop(text, self.stop)
+            if matched is not None:
+                self.stop_sequence = matched
+                self._pending = ""
+                return released
+        if final:
+            self._pending = ""
+            return text
+        cut = len(text) - self._stop_prefix_length(text)
+        cut = cluster_boundary(text, cut, at_end=cut == len(text))
+        self._pending = text[cut:]
+        return text[:cut]
@@ -7,25 +7,49 @@ running the TensorRT-LLM optimized Allam model, with support for streaming respo
 Requirements: 3.2
 """
 
-import logging
-from dataclasses import dataclass
-from typing import AsyncIterator, Optional
 import asyncio
-import queue
-import threading
+import logging
+import random
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+import numpy as np
+
+from models.batching import DEFAULT_MAX_BATCH_SIZE, MicroBatcher
+from models.channel_pool import TritonChannelPool
+from models.mock_latency import LatencyModel
+from models.prefix_cache import PrefixCacheTracker
+from models.stream_decoder import StreamDecoder, truncate_at_stop
+from models.usage import GenerationStats, TokenCounter
+from observability.metrics import TRITON_STREAMS, record_generation
+
+try:
+    import tritonclient.grpc.aio as grpcclient
+except ImportError:
+    grpcclient = None
 
 logger = logging.getLogger(__name__)
 
+# Distinct inference configs whose encoded parameter tensors are kept
+PARAMETER_CACHE_SIZE = 32
 
-@dataclass
+
+@dataclass(frozen=True)
 class InferenceConfig:
-    """Configuration for inference requests."""
+    """Configuration for inference requests (immutable, usable as a cache key)."""
     max_tokens: int = 512
     temperature: float = 0.7
     top_p: float = 0.9
     top_k: int = 50
     repetition_penalty: float = 1.1
     stream: bool = True
+    # Generation ends at the first of these strings (not included in the text)
+    stop: Tuple[str, ...] = ()
+    # Draft tokens verified per step by a speculative-decoding model
+    # (tensorrt_llm_bls); 0 sends no draft request
+    num_draft_tokens: int = 0
 
 
 @dataclass
@@ -35,6 +59,25 @@ class InferenceResult:
     tokens_generated: int
     latency_ms: float
     finish_reason: str  # "stop", "length", "error"
+    prompt_tokens: int = 0
+    ttft_ms: Optional[float] = None
+    inter_token_ms: Optional[float] = None
+    tokens_per_second: Optional[float] = None
+    exact_usage: bool = False  # Token counts from the model or its tokenizer
+
+    @classmethod
+    def from_stats(cls, text: str, stats: GenerationStats, finish_reason: str) -> "InferenceResult":
+        return cls(
+            text=text,
+            tokens_generated=stats.completion_tokens,
+            latency_ms=stats.latency_ms,
+            finish_reason=finish_reason,
+            prompt_tokens=stats.prompt_tokens,
+            ttft_ms=stats.ttft_ms,
+            inter_token_ms=stats.inter_token_ms,
+            tokens_per_second=stats.tokens_per_second,
+            exact_usage=stats.exact,
+        )
 
 
 class TritonClientError(Exception):
@@ -42,70 +85,144 @@ class TritonClientError(Exception):
     pass
 
 
+@lru_cache(maxsize=PARAMETER_CACHE_SIZE)
+def _parameter_inputs(config: InferenceConfig, batch_size: int = 1) -> Tuple[Any, ...]:
+    """
+    Build the encoded sampling parameter tensors for a config.
+
+    The returned ``InferInput`` objects are only read when a request is
+    serialized, so they are safely shared by concurrent requests that use
+    the same config and batch size.
+    """
+    parameters = (
+        ("max_tokens", "INT32", np.int32, config.max_tokens),
+        ("temperature", "FP32", np.float32, config.temperature),
+        ("top_p", "FP32", np.float32, config.top_p),
+        ("top_k", "INT32", np.int32, config.top_k),
+        ("stream", "BOOL", bool, config.stream),
+    )
+    if config.num_draft_tokens:
+        parameters += (("num_draft_tokens", "INT32", np.int32, config.num_draft_tokens),)
+    inputs = []
+    for name, triton_dtype, np_dtype, value in parameters:
+        tensor = grpcclient.InferInput(name, [batch_size, 1], triton_dtype)
+        tensor.set_data_from_numpy(np.full((batch_size, 1), value, dtype=np_dtype))
+        inputs.append(tensor)
+    return tuple(inputs)
+
+
+def _row_value(output: Any, row: int) -> Any:
+    """First element of batch row ``row`` of an output tensor (``[B]`` or ``[B, ...]``)."""
+    array = np.asarray(output, dtype=object)
+    return array[row].reshape(-1)[0] if array.ndim >= 2 else array[row]
+
+
+def _output_int(result: Any, name: str, row: int = 0) -> Optional[int]:
+    """Integer output ``name`` of batch row ``row``, or None if the model did not return it."""
+    output = result.as_numpy(name)
+    return None if output is None else int(_row_value(output, row))
+
 
 class TritonClient:
     """
     Client for Triton Inference Server with TensorRT-LLM backend.
-    
+
     Supports both synchronous and streaming inference for the Allam model.
+    When constructed with a started ``TritonChannelPool``, every call borrows
+    a pooled channel; otherwise a single channel is created lazily.
+
+    Setting ``batch_window_ms`` enables client-side micro-batching of
+    non-streaming ``infer`` calls (see ``models.batching``).
     """
-    
+
     def __init__(
         self,
         url: str = "localhost:8001",
         model_name: str = "ensemble",
         verbose: bool = False,
+        pool: Optional[TritonChannelPool] = None,
+        batch_window_ms: Optional[float] = None,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        token_counter: Optional[TokenCounter] = None,
+        prefix_tracker: Optional[PrefixCacheTracker] = None,
     ):
         """
         Initialize Triton client.
-        
+
         Args:
             url: Triton server gRPC URL (host:port)
             model_name: Name of the model to use
             verbose: Enable verbose logging
+            pool: Shared channel pool; its lifecycle is owned by the caller
+            batch_window_ms: If set, batch concurrent ``infer`` calls that
+                arrive within this window into one request
+            max_batch_size: Maximum rows per client-side batch
+            token_counter: Counts tokens when the model does not report
+                ``input_lengths``/``sequence_length``
+            prefix_tracker: Estimates KV-cache prefix reuse of sent prompts
         """
         self.url = url
         self.model_name = model_name
         self.verbose = verbose
+        self.token_counter = token_counter or TokenCounter()
+        self.prefix_tracker = prefix_tracker
+        self._pool = pool
         self._client = None
         self._connected = False
-    
+        self._batcher: Optional[MicroBatcher] = None
+        if batch_window_ms is not None:
+            self._batcher = MicroBatcher(
+                self._infer_batch,
+                max_batch_size=max_batch_size,
+                window_ms=batch_window_ms,
+                name="triton",
+            )
+
     def _ensure_client(self) -> None:
         """Ensure Triton client is initialized."""
         if self._client is None:
+            if grpcclient is None:
+                logger.warning(
+                    "tritonclient not installed. Install with: pip install tritonclient[all]"
+                )
+                raise TritonClientError("tritonclient not available")
             try:
-                import tritonclient.grpc.aio as grpcclient
                 self._client = grpcclient.InferenceServerClient(
                     url=self.url,
                     verbose=self.verbose,
                 )
                 self._connected = True
-            except ImportError:
-                logger.warning(
-                    "tritonclient not installed. Install with: pip install tritonclient[all]"
-                )
-                raise TritonClientError("tritonclient not available")
             except Exception as e:
                 raise TritonClientError(f"Failed to connect to Triton: {e}")
-    
+
+    @asynccontextmanager
+    async def _channel(self) -> AsyncIterator[Any]:
+        """Borrow a gRPC client: a pooled channel, or the lazy single client."""
+        if self._pool is not None:
+            async with self._pool.channel() as client:
+                yield client
+        else:
+            self._ensure_client()
+            yield self._client
+
     async def is_server_ready(self) -> bool:
         """Check if Triton server is ready."""
         try:
-            self._ensure_client()
-            return await self._client.is_server_ready()
+            async with self._channel() as client:
+                return await client.is_server_ready()
         except Exception as e:
             logger.error(f"Server ready check failed: {e}")
             return False
-    
+
     async def is_model_ready(self) -> bool:
         """Check if the model is loaded and ready."""
         try:
-            self._ensure_client()
-            return await self._client.is_model_ready(self.model_name)
+            async with self._channel() as client:
+                return await client.is_model_ready(self.model_name)
         except Exception as e:
             logger.error(f"Model ready check failed: {e}")
             return False
-    
+
     async def infer(
         self,
         prompt: str,
@@ -113,226 +230,409 @@ class TritonClient:
     ) -> InferenceResult:
         """
         Run synchronous inference.
-        
+
         Args:
             prompt: Input text prompt
             config: Inference configuration
-            
+
         Returns:
             InferenceResult with generated text
         """
-        import time
-        import numpy as np
-        
         if config is None:
             config = InferenceConfig(stream=False)
-        
-        self._ensure_client()
-        
+
         try:
-            import tritonclient.grpc.aio as grpcclient
-            
-            start_time = time.perf_counter()
-            
-            # Prepare inputs
-            inputs = self._prepare_inputs(prompt, config, grpcclient)
-            
-            # Run inference
-            result = await self._client.infer(
-                model_name=self.model_name,
-                inputs=inputs,
+            stats = GenerationStats()
+            stats.start()
+            prefix_reused = self._observe_prefix(prompt)
+
+            if self._batcher is not None and not config.stream:
+                generated_text, input_length, sequence_length = await self._batcher.submit(
+                    prompt, config
+                )
+            else:
+                # Prepare inputs
+                inputs = self._prepare_inputs(prompt, config)
+
+                # Run inference
+                async with self._channel() as client:
+                    result = await client.infer(
+                        model_name=self.model_name,
+                        inputs=inputs,
+                    )
+
+                # Extract output
+                generated_text, input_length, sequence_length = self._read_row(result, 0)
+            stats.finish()
+
+            self._count_tokens(stats, prompt, generated_text, input_length, sequence_length)
+            record_generation(stats, prefix_reused)
+            generated_text, stop = truncate_at_stop(generated_text, config.stop)
+            length_limited = (
+                stop is None and stats.exact and stats.completion_tokens >= config.max_tokens
             )
-            
-            # Extract output
-            output = result.as_numpy("text_output")
-            generated_text = output[0].decode("utf-8") if output is not None else ""
-            
-            latency_ms = (time.perf_counter() - start_time) * 1000
-            
-            return InferenceResult(
-                text=generated_text,
-                tokens_generated=len(generated_text.split()),  # Approximate
-                latency_ms=latency_ms,
-                finish_reason="stop",
+            return InferenceResult.from_stats(
+                generated_text, stats, "length" if length_limited else "stop"
             )
-            
+
         except Exception as e:
             logger.error(f"Inference failed: {e}")
             raise TritonClientError(f"Inference failed: {e}")
-    
+
+    def _observe_prefix(self, prompt: str) -> Optional[float]:
+        """Estimated fraction of ``prompt`` the engine can serve from cached KV blocks."""
+        if self.prefix_tracker is None:
+            return None
+        return self.prefix_tracker.observe(prompt)
+
+    def _read_row(self, result: Any, row: int) -> Tuple[str, Optional[int], Optional[int]]:
+        """``(text, input_lengths, sequence_length)`` of one row of an ensemble response."""
+        output = result.as_numpy("text_output")
+        text = _row_value(output, row).decode("utf-8") if output is not None else ""
+        input_length = _output_int(result, "input_lengths", row)
+        return text, input_length, _output_int(result, "sequence_length", row)
+
+    def _count_tokens(
+        self,
+        stats: GenerationStats,
+        prompt: str,
+        text: str,
+        input_length: Optional[int],
+        sequence_length: Optional[int],
+    ) -> None:
+        """
+        Fill token counts of a non-streaming result.
+
+        ``sequence_length`` includes the prompt; without the model outputs the
+        local token counter is used.
+        """
+        stats.exact = input_length is not None and sequence_length is not None
+        if stats.exact:
+            stats.prompt_tokens = input_length
+            stats.completion_tokens = max(sequence_length - input_length, 0)
+        else:
+            stats.prompt_tokens = self.token_counter.count(prompt)
+            stats.completion_tokens = self.token_counter.count(text)
+            stats.exact = self.token_counter.exact
+
+    async def _infer_batch(
+        self, prompts: List[str], config: InferenceConfig
+    ) -> List[Tuple[str, Optional[int], Optional[int]]]:
+        """
+        Send ``prompts`` as one ``[B, 1]`` request.
+
+        Returns one ``(text, input_lengths, sequence_length)`` per row.
+        """
+        inputs = self._prepare_batch_inputs(prompts, config)
+        async with self._channel() as client:
+            result = await client.infer(
+                model_name=self.model_name,
+                inputs=inputs,
+            )
+
+        output = result.as_numpy("text_output")
+        if output is None:
+            return [("", None, None)] * len(prompts)
+        return [self._read_row(result, row) for row in range(len(prompts))]
+
     async def infer_stream(
         self,
         prompt: str,
         config: Optional[InferenceConfig] = None,
+        stats: Optional[GenerationStats] = None,
     ) -> AsyncIterator[str]:
         """
         Run streaming inference, yielding tokens as they are generated.
-        
+
+        The underlying gRPC stream is cancelled as soon as the consumer stops
+        iterating (``aclose()``, task cancellation or an exception) or a stop
+        sequence from ``config.stop`` is generated, so the Triton decode slot
+        is released immediately instead of generating until ``max_tokens``.
+
+        Chunks pass through a ``StreamDecoder``: multibyte characters split
+        across chunks, combining marks and partial stop strings are held
+        back until they are complete.
+
         Args:
             prompt: Input text prompt
             config: Inference configuration
-            
+            stats: Filled with token counts and timing when the stream ends
+
         Yields:
             Generated tokens as strings
         """
-        import numpy as np
-        
         if config is None:
             config = InferenceConfig(stream=True)
-        else:
-            config.stream = True
-        
-        self._ensure_client()
-        
+        elif not config.stream:
+            config = replace(config, stream=True)
+
+        response_iterator = None
+        completed = False
+        decoder = StreamDecoder(config.stop)
+        if stats is None:
+            stats = GenerationStats()
+        stats.streamed = True
+        stats.start()
+        input_length: Optional[int] = None
+        reported_tokens: Optional[int] = None
+        steps = 0
+        sent: List[str] = []
+        prefix_reused = self._observe_prefix(prompt)
         try:
-            import tritonclient.grpc.aio as grpcclient
-            
             # Prepare inputs
-            inputs = self._prepare_inputs(prompt, config, grpcclient)
-            
-            # Create streaming request
-            response_iterator = self._client.stream_infer(
-                model_name=self.model_name,
-                inputs=inputs,
-            )
-            
-            async for response in response_iterator:
-                result, error = response
-                
-                if error:
-                    logger.error(f"Streaming error: {error}")
-                    raise TritonClientError(f"Streaming error: {error}")
-                
-                if result:
-                    output = result.as_numpy("text_output")
-                    if output is not None:
-                        token = output[0].decode("utf-8")
-                        yield token
-                        
+            inputs = self._prepare_inputs(prompt, config)
+
+            async def request_iterator():
+                yield {"model_name": self.model_name, "inputs": inputs}
+
+            # The channel stays borrowed for the whole stream so that pool
+            # load accounting reflects open HTTP/2 streams
+            async with self._channel() as client:
+                # Create streaming request
+                response_iterator = client.stream_infer(
+                    inputs_iterator=request_iterator(),
+                )
+                TRITON_STREAMS.inc()
+
+                async for response in response_iterator:
+                    result, error = response
+
+                    if error:
+                        logger.error(f"Streaming error: {error}")
+                        raise TritonClientError(f"Streaming error: {error}")
+
+                    if result:
+                        if input_length is None:
+                            input_length = _output_int(result, "input_lengths")
+                        sequence_length = _output_int(result, "sequence_length")
+                        if sequence_length is not None:
+                            reported_tokens = (reported_tokens or 0) + sequence_length
+                        output = result.as_numpy("text_output")
+                        if output is not None:
+                            steps += 1
+                            token = decoder.feed(_row_value(output, 0))
+                            if token:
+                                stats.first_token()
+                                sent.append(token)
+                                yield token
+
+                    if decoder.stopped:
+                        break
+                else:
+                    completed = True
+
+            tail = decoder.finish()
+            if tail:
+                stats.first_token()
+                sent.append(tail)
+                yield tail
+
         except Exception as e:
             logger.error(f"Streaming inference failed: {e}")
             raise TritonClientError(f"Streaming inference failed: {e}")
-    
-    def _prepare_inputs(self, prompt: str, config: InferenceConfig, grpcclient) -> list:
-        """Prepare input tensors for inference."""
-        import numpy as np
-        
-        inputs = []
-        
+        finally:
+            # Each streamed response is one decoding step when the model does
+            # not report ``sequence_length``; a speculative step can carry
+            # several tokens, so its text is counted instead
+            stats.finish()
+            stats.prompt_tokens = (
+                input_length if input_length is not None else self.token_counter.count(prompt)
+            )
+            if reported_tokens is not None:
+                stats.completion_tokens = reported_tokens
+            elif config.num_draft_tokens:
+                stats.completion_tokens = self.token_counter.count("".join(sent))
+            else:
+                stats.completion_tokens = steps
+            stats.exact = input_length is not None and reported_tokens is not None
+            if completed or decoder.stopped:
+                length_limited = (
+                    not decoder.stopped
+                    and stats.exact
+                    and stats.completion_tokens >= config.max_tokens
+                )
+                stats.finish_reason = "length" if length_limited else "stop"
+            if response_iterator is not None:
+                TRITON_STREAMS.dec()
+                record_generation(stats, prefix_reused)
+                if not completed:
+                    # Consumer went away (or failed) mid-stream: free the GPU slot
+                    response_iterator.cancel()
+
+    def _prepare_inputs(self, prompt: str, config: InferenceConfig) -> list:
+        """Prepare input tensors for a single-prompt inference."""
+        return self._prepare_batch_inputs([prompt], config)
+
+    def _prepare_batch_inputs(self, prompts: List[str], config: InferenceConfig) -> list:
+        """
+        Prepare ``[B, 1]`` input tensors for ``B`` prompts sharing a config.
+
+        Only ``text_input`` is encoded per request; the sampling parameter
+        tensors are shared per distinct config (see ``_parameter_inputs``).
+        """
+        if grpcclient is None:
+            raise TritonClientError("tritonclient not available")
+
         # Text input
-        text_input = grpcclient.InferInput("text_input", [1, 1], "BYTES")
+        text_input = grpcclient.InferInput("text_input", [len(prompts), 1], "BYTES")
         text_input.set_data_from_numpy(
-            np.array([[prompt.encode("utf-8")]], dtype=object)
-        )
-        inputs.append(text_input)
-        
-        # Max tokens
-        max_tokens = grpcclient.InferInput("max_tokens", [1, 1], "INT32")
-        max_tokens.set_data_from_numpy(
-            np.array([[config.max_tokens]], dtype=np.int32)
-        )
-        inputs.append(max_tokens)
-        
-        # Temperature
-        temperature = grpcclient.InferInput("temperature", [1, 1], "FP32")
-        temperature.set_data_from_numpy(
-            np.array([[config.temperature]], dtype=np.float32)
-        )
-        inputs.append(temperature)
-        
-        # Top P
-        top_p = grpcclient.InferInput("top_p", [1, 1], "FP32")
-        top_p.set_data_from_numpy(
-            np.array([[config.top_p]], dtype=np.float32)
-        )
-        inputs.append(top_p)
-        
-        # Top K
-        top_k = grpcclient.InferInput("top_k", [1, 1], "INT32")
-        top_k.set_data_from_numpy(
-            np.array([[config.top_k]], dtype=np.int32)
+            np.array([[prompt.encode("utf-8")] for prompt in prompts], dtype=object)
         )
-        inputs.append(top_k)
-        
-        # Stream flag
-        stream = grpcclient.InferInput("stream", [1, 1], "BOOL")
-        stream.set_data_from_numpy(
-            np.array([[config.stream]], dtype=bool)
-        )
-        inputs.append(stream)
-        
-        return inputs
-    
+        return [text_input, *_parameter_inputs(config, len(prompts))]
+
     async def close(self) -> None:
-        """Close the client connection."""
+        """Close the client connection (a shared pool is closed by its owner)."""
         if self._client is not None:
             await self._client.close()
             self._client = None
             self._connected = False
 
 
+def mock_response(prompt: str) -> str:
+    """Canned Arabic answer for a prompt, shared by the mock client and fake server."""
+    # Simple mock responses for testing
+    if "رخصة" in prompt or "license" in prompt.lower():
+        return "لتجديد رخصة القيادة، يرجى زيارة أقرب مركز مرور أو استخدام تطبيق أبشر."
+    elif "جواز" in prompt or "passport" in prompt.lower():
+        return "يمكنك تجديد جواز السفر من خلال منصة أبشر الإلكترونية."
+    else:
+        return "مرحباً بك في خدمة أبشر. كيف يمكنني مساعدتك اليوم؟"
+
+
 class MockTritonClient:
     """
     Mock Triton client for testing without a running server.
-    
+
     Simulates streaming token generation for development and testing.
+    Without a ``latency`` model ``infer`` answers at once and streams take
+    50 ms per token; with one, generations take the model's prefill and
+    decoding time and slow down with the number running concurrently
+    (see ``models.mock_latency``).
     """
-    
+
     def __init__(
         self,
         url: str = "localhost:8001",
         model_name: str = "ensemble",
         verbose: bool = False,
+        token_counter: Optional[TokenCounter] = None,
+        latency: Optional[LatencyModel] = None,
+        seed: Optional[int] = None,
     ):
         self.url = url
         self.model_name = model_name
         self.verbose = verbose
-    
+        self.token_counter = token_counter or TokenCounter()
+        self.latency = latency
+        self.running = 0
+        self._rng = random.Random(seed)
+        self._slots = (
+            asyncio.Semaphore(latency.max_batch_size)
+            if latency is not None and latency.max_batch_size
+            else None
+        )
+
     async def is_server_ready(self) -> bool:
         """Always returns True for mock."""
         return True
-    
+
     async def is_model_ready(self) -> bool:
         """Always returns True for mock."""
         return True
-    
+
+    @asynccontextmanager
+    async def _generation(self) -> AsyncIterator[None]:
+        """Hold one of the simulated engine's batch slots."""
+        if self._slots is not None:
+            await self._slots.acquire()
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            if self._slots is not None:
+                self._slots.release()
+
+    def _step_s(self, step: int, prompt_tokens: int) -> float:
+        """Simulated seconds until the text of decoding step ``step``."""
+        if self.latency is None:
+            return 0.05
+        if step == 0:
+            return self.latency.prefill_s(prompt_tokens, self.running, self._rng)
+        return self.latency.token_s(self.running, self._rng)
+
     async def infer(
         self,
         prompt: str,
         config: Optional[InferenceConfig] = None,
     ) -> InferenceResult:
         """Return mock inference result."""
-        mock_response = self._generate_mock_response(prompt)
-        return InferenceResult(
-            text=mock_response,
-            tokens_generated=len(mock_response.split()),
+        answer = self._generate_mock_response(prompt)
+        if config is not None:
+            answer, _ = truncate_at_stop(answer, config.stop)
+        stats = GenerationStats(
+            prompt_tokens=self.token_counter.count(prompt),
+            completion_tokens=self.token_counter.count(answer),
             latency_ms=150.0,
-            finish_reason="stop",
+            ttft_ms=150.0,
+            exact=self.token_counter.exact,
         )
-    
+        if self.latency is not None:
+            stats.ttft_ms = None
+            stats.start()
+            async with self._generation():
+                for step in range(len(answer.split())):
+                    await asyncio.sleep(self._step_s(step, stats.prompt_tokens))
+            stats.finish()
+        record_generation(stats)
+        return InferenceResult.from_stats(answer, stats, "stop")
+
     async def infer_stream(
         self,
         prompt: str,
         config: Optional[InferenceConfig] = None,
+        stats: Optional[GenerationStats] = None,
     ) -> AsyncIterator[str]:
-        """Yield mock tokens with simulated delay."""
-        mock_response = self._generate_mock_response(prompt)
-        tokens = mock_response.split()
-        
-        for token in tokens:
-            await asyncio.sleep(0.05)  # Simulate token generation delay
-            yield token + " "
-    
+        """Yield mock tokens with simulated delay, decoded like real chunks."""
+        tokens = self._generate_mock_response(prompt).split()
+        decoder = StreamDecoder(config.stop if config is not None else ())
+        if stats is None:
+            stats = GenerationStats()
+        stats.streamed = True
+        stats.start()
+        prompt_tokens = self.token_counter.count(prompt)
+        sent: List[str] = []
+
+        try:
+            async with self._generation():
+                for step, token in enumerate(tokens):
+                    # Simulate generation delay
+                    await asyncio.sleep(self._step_s(step, prompt_tokens))
+                    text = decoder.feed((token + " ").encode("utf-8"))
+                    if text:
+                        stats.first_token()
+                        sent.append(text)
+                        yield text
+                    if decoder.stopped:
+                        stats.finish_reason = "stop"
+                        return
+            tail = decoder.finish()
+            stats.finish_reason = "stop"
+            if tail:
+                stats.first_token()
+                sent.append(tail)
+                yield tail
+        finally:
+            stats.finish()
+            stats.prompt_tokens = prompt_tokens
+            stats.completion_tokens = self.token_counter.count("".join(sent))
+            stats.exact = self.token_counter.exact
+            record_generation(stats)
+
     def _generate_mock_response(self, prompt: str) -> str:
         """Generate a mock Arabic response."""
-        # Simple mock responses for testing
-        if "رخصة" in prompt or "license" in prompt.lower():
-            return "لتجديد رخصة القيادة، يرجى زيارة أقرب مركز مرور أو استخدام تطبيق أبشر."
-        elif "جواز" in prompt or "passport" in prompt.lower():
-            return "يمكنك تجديد جواز السفر من خلال منصة أبشر الإلكترونية."
-        else:
-            return "مرحباً بك في خدمة أبشر. كيف يمكنني مساعدتك اليوم؟"
-    
+        return mock_response(prompt)
+
     async def close(self) -> None:
         """No-op for mock client."""
         pass
@@ -343,19 +643,42 @@ def create_triton_client(
     model_name: str = "ensemble",
     use_mock: bool = False,
     verbose: bool = False,
+    pool: Optional[TritonChannelPool] = None,
+    batch_window_ms: Optional[float] = None,
+    tokenizer_dir: Optional[str] = None,
+    mock_latency: Optional[LatencyModel] = None,
 ) -> TritonClient | MockTritonClient:
     """
     Factory function to create appropriate Triton client.
-    
+
     Args:
         url: Triton server URL
         model_name: Model name to use
         use_mock: If True, return mock client for testing
         verbose: Enable verbose logging
-        
+        pool: Shared channel pool for the real client
+        batch_window_ms: Enable client-side micro-batching with this window
+        tokenizer_dir: Tokenizer used to count tokens the model does not report
+        mock_latency: Simulated engine latency of the mock client
+
     Returns:
         TritonClient or MockTritonClient instance
     """
+    token_counter = TokenCounter(tokenizer_dir)
     if use_mock:
-        return MockTritonClient(url=url, model_name=model_name, verbose=verbose)
-    return TritonClient(url=url, model_name=model_name, verbose=verbose)
+        return MockTritonClient(
+            url=url,
+            model_name=model_name,
+            verbose=verbose,
+            token_counter=token_counter,
+            latency=mock_latency,
+        )
+    return TritonClient(
+        url=url,
+        model_name=model_name,
+        verbose=verbose,
+        pool=pool,
+        batch_window_ms=batch_window_ms,
+        token_counter=token_counter,
+        prefix_tracker=PrefixCacheTracker(),
+    )
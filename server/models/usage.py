@@ -0,0 +1,152 @@
+"""
+Token usage and generation timing.
+
+Token counts come from the model whenever possible: the ensemble returns
+``input_lengths`` (prompt tokens from the preprocessing tokenizer) and
+``sequence_length`` from ``allam_tensorrt``. TensorRT-LLM includes the prompt
+in a non-streaming ``sequence_length``; a streamed response carries only the
+tokens generated since the previous one, so streamed lengths are summed.
+
+When those outputs are missing (older model repositories, the mock client),
+a ``TokenCounter`` counts with the Allam tokenizer, loaded once per process
+from ``TOKENIZER_DIR`` if ``transformers`` is installed, and otherwise
+falls back to a subword estimate marked as inexact.
+
+Requirements: 3.2
+"""
+
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Average characters per subword token of the Allam vocabulary on service text
+ESTIMATE_CHARS_PER_TOKEN = 4
+
+# Prompts whose token count is known without tokenizing (see TokenCounter.remember)
+DEFAULT_MAX_KNOWN_COUNTS = 256
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=4)
+def load_tokenizer(tokenizer_dir: str) -> Optional[Any]:
+    """Load a Hugging Face tokenizer once per process; None if unavailable."""
+    try:
+        from transformers import AutoTokenizer
+    except ImportError:
+        logger.warning(
+            "transformers not installed; token counts are estimated. "
+            "Install with: pip install transformers"
+        )
+        return None
+    try:
+        return AutoTokenizer.from_pretrained(tokenizer_dir)
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer from {tokenizer_dir}: {e}")
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate subword token count: words and punctuation, long words split."""
+    return sum(math.ceil(len(piece) / ESTIMATE_CHARS_PER_TOKEN) for piece in _PIECES.findall(text))
+
+
+class TokenCounter:
+    """Counts tokens with the model tokenizer, or estimates them without one."""
+
+    def __init__(
+        self, tokenizer_dir: Optional[str] = None, max_known: int = DEFAULT_MAX_KNOWN_COUNTS
+    ):
+        self._tokenizer = load_tokenizer(tokenizer_dir) if tokenizer_dir else None
+        self.max_known = max_known
+        self._known: "OrderedDict[str, int]" = OrderedDict()
+
+    @property
+    def exact(self) -> bool:
+        return self._tokenizer is not None
+
+    def remember(self, text: str, tokens: int) -> None:
+        """Record a count already known for ``text`` (e.g. an assembled prompt)."""
+        self._known[text] = tokens
+        while len(self._known) > self.max_known:
+            self._known.popitem(last=False)
+
+    def count(self, text: str) -> int:
+        known = self._known.get(text)
+        if known is not None:
+            return known
+        if self._tokenizer is not None:
+            return len(self._tokenizer.encode(text, add_special_tokens=False))
+        return estimate_tokens(text)
+
+
+@dataclass
+class GenerationStats:
+    """
+    Token counts and timing of one generation.
+
+    ``ttft_ms`` is the time to the first generated text; for a non-streaming
+    call it equals the full latency. ``inter_token_ms`` is the mean gap
+    between later tokens and is only known for streams.
+    """
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_ms: float = 0.0
+    ttft_ms: Optional[float] = None
+    exact: bool = True
+    streamed: bool = False
+    # "stop" or "length" once the generation ended on its own; None while
+    # running or when it was cut short (disconnect, error, cancellation)
+    finish_reason: Optional[str] = None
+    _start: float = field(default=0.0, repr=False)
+
+    def start(self) -> None:
+        self._start = time.perf_counter()
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def first_token(self) -> None:
+        """Record the arrival of the first generated text (idempotent)."""
+        if self.ttft_ms is None:
+            self.ttft_ms = self.elapsed_ms()
+
+    def finish(self) -> None:
+        self.latency_ms = self.elapsed_ms()
+        if self.ttft_ms is None:
+            self.ttft_ms = self.latency_ms
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def inter_token_ms(self) -> Optional[float]:
+        if not self.streamed or self.completion_tokens < 2 or self.ttft_ms is None:
+            return None
+        return (self.latency_ms - self.ttft_ms) / (self.completion_tokens - 1)
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        if self.latency_ms <= 0:
+            return None
+        return self.completion_tokens / (self.latency_ms / 1000)
+
+    def to_dict(self) -> dict:
+        """Usage fields as reported to API clients."""
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "ttft_ms": self.ttft_ms,
+            "inter_token_ms": self.inter_token_ms,
+            "tokens_per_second": self.tokens_per_second,
+            "exact": self.exact,
+        }
@@ -0,0 +1,26 @@
+"""
+Observability module for the chat pipeline.
+
+This module contains:
+- metrics: Lock-free per-worker Prometheus counters, gauges and histograms
+"""
+
+from observability.metrics import (
+    CONTENT_TYPE,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    record_generation,
+)
+
+__all__ = [
+    "CONTENT_TYPE",
+    "REGISTRY",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "record_generation",
+]
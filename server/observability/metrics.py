@@ -0,0 +1,369 @@
+"""
+Hand-rolled Prometheus metrics for the chat pipeline.
+
+Each worker process keeps its own registry. Every metric is recorded on the
+worker's event loop thread, so updates are plain integer and float
+increments with no locks; a histogram ``observe`` is one ``bisect`` over the
+bucket bounds and two additions. Labelled children are looked up once and
+can be kept by the caller. Values that are already counted elsewhere (cache
+hit rates) are read by callbacks at scrape time instead of being duplicated
+on the request path.
+
+The exposition is the Prometheus text format (version 0.0.4). Series are
+per worker: run one uvicorn worker per container (as the Dockerfile does),
+or scrape every worker, and aggregate in Prometheus.
+
+Requirements: 9.2
+"""
+
+import math
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from models.usage import GenerationStats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket upper bounds in seconds
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+FAST_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """A metric family: name, help text and its children by label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _init_default(self) -> None:
+        # Unlabelled metrics are exposed (as zero) before their first update
+        if not self.label_names:
+            self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """The child for these label values, created on first use."""
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {values}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _default(self):
+        if self.label_names:
+            raise ValueError(f"{self.name} has labels {self.label_names}; use labels()")
+        return self.labels()
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._samples(values, child))
+        return lines
+
+    def _samples(self, values: Tuple[str, ...], child) -> List[str]:
+        return [f"{self.name}{_label_text(self.label_names, values)} {_format_value(child.get())}"]
+
+
+class _Value:
+    """Counter or gauge child; ``function`` overrides the stored value."""
+
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the value from ``function`` at scrape time."""
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._init_default()
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be read from a callback."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._init_default()
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default().dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default().set_function(function)
+
+
+class _HistogramChild:
+    """Bucket counts (not cumulative), sum and count of one label set."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        # bounds[i] is the inclusive upper bound ("le") of bucket i
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    """Distribution over fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != math.inf))
+        if not self.buckets:
+            raise ValueError("Histogram needs at least one finite bucket")
+        self._init_default()
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def totals(self) -> Tuple[int, float]:
+        """``(count, sum)`` over all label sets."""
+        children = list(self._children.values())
+        return sum(c.count for c in children), sum(c.sum for c in children)
+
+    def _samples(self, values: Tuple[str, ...], child: _HistogramChild) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), child.counts):
+            cumulative += count
+            labels = _label_text(self.label_names, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _label_text(self.label_names, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Registry:
+    """The metrics of one worker, rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+QUEUE_WAIT = REGISTRY.register(Histogram(
+    "absher_queue_wait_seconds",
+    "Time a request waited in a batching or admission queue",
+    labels=("queue",),
+    buckets=FAST_BUCKETS,
+))
+RETRIEVAL = REGISTRY.register(Histogram(
+    "absher_retrieval_seconds",
+    "RAG retrieval time per chat request",
+))
+GUARDRAILS = REGISTRY.register(Histogram(
+    "absher_guardrails_seconds",
+    "Content filter time per chat request",
+    labels=("direction",),
+    buckets=FAST_BUCKETS,
+))
+TIME_TO_FIRST_TOKEN = REGISTRY.register(Histogram(
+    "absher_time_to_first_token_seconds",
+    "Time from sending a generation request to its first text",
+    labels=("mode",),
+))
+TIME_TO_FIRST_TOKEN_BY_PREFIX = REGISTRY.register(Histogram(
+    "absher_time_to_first_token_by_prefix_seconds",
+    "Time to first text of Triton generations by estimated KV-cache prefix hit",
+    labels=("prefix",),
+))
+KV_PREFIX_TOKENS = REGISTRY.register(Counter(
+    "absher_kv_prefix_tokens_total",
+    "Prompt tokens estimated to be reused from the KV cache or computed by prefill",
+    labels=("result",),
+))
+GENERATION = REGISTRY.register(Histogram(
+    "absher_generation_seconds",
+    "Total generation time",
+    labels=("mode",),
+))
+TOKENS_PER_SECOND = REGISTRY.register(Histogram(
+    "absher_generation_tokens_per_second",
+    "Generated tokens per second of one generation",
+    labels=("mode",),
+    buckets=TOKENS_PER_SECOND_BUCKETS,
+))
+TRITON_STREAMS = REGISTRY.register(Gauge(
+    "absher_triton_streams_in_flight",
+    "Open Triton streaming generations",
+))
+ADMISSION_KV_TOKENS_IN_USE = REGISTRY.register(Gauge(
+    "absher_admission_kv_tokens_in_use",
+    "Estimated KV-cache tokens of admitted generations",
+))
+ADMISSION_QUEUED = REGISTRY.register(Gauge(
+    "absher_admission_queued",
+    "Requests waiting for a generation slot",
+    labels=("priority",),
+))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "absher_admission_rejected_total",
+    "Requests shed because the queue was full or their deadline passed",
+    labels=("reason",),
+))
+RATE_LIMITED = REGISTRY.register(Counter(
+    "absher_rate_limited_total",
+    "Requests rejected by the per-user rate limits",
+    labels=("source",),
+))
+RATE_LIMIT_FALLBACKS = REGISTRY.register(Counter(
+    "absher_rate_limit_fallbacks_total",
+    "Rate limit checks that fell back to local buckets because Redis was slow or failing",
+))
+SINGLE_FLIGHT = REGISTRY.register(Counter(
+    "absher_single_flight_requests_total",
+    "Shareable generation requests that started a generation (leader) "
+    "or joined one in flight (follower)",
+    labels=("role",),
+))
+ROUTER_REQUESTS = REGISTRY.register(Counter(
+    "absher_router_requests_total",
+    "Generation attempts sent to each Triton replica, by routing decision",
+    labels=("backend", "decision"),
+))
+ROUTER_FAILOVERS = REGISTRY.register(Counter(
+    "absher_router_failovers_total",
+    "Generations moved to another Triton replica after a connection error",
+    labels=("backend",),
+))
+ROUTER_BACKEND_HEALTHY = REGISTRY.register(Gauge(
+    "absher_router_backend_healthy",
+    "Whether a Triton replica passed its last probe (1) or is ejected (0)",
+    labels=("backend",),
+))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    "absher_cache_hit_ratio",
+    "Hit ratio of a cache since startup",
+    labels=("cache",),
+))
+
+
+def record_generation(stats: GenerationStats, prefix_reused: Optional[float] = None) -> None:
+    """
+    Record the timing of one finished generation.
+
+    ``prefix_reused`` is the estimated fraction of the prompt served from the
+    KV cache (see ``models.prefix_cache``), when tracked.
+    """
+    mode = "stream" if stats.streamed else "sync"
+    GENERATION.labels(mode).observe(stats.latency_ms / 1000)
+    if stats.ttft_ms is not None:
+        TIME_TO_FIRST_TOKEN.labels(mode).observe(stats.ttft_ms / 1000)
+    tokens_per_second = stats.tokens_per_second
+    if tokens_per_second is not None and stats.completion_tokens:
+        TOKENS_PER_SECOND.labels(mode).observe(tokens_per_second)
+    if prefix_reused is not None:
+        reused_tokens = round(stats.prompt_tokens * prefix_reused)
+        KV_PREFIX_TOKENS.labels("reused").inc(reused_tokens)
+        KV_PREFIX_TOKENS.labels("computed").inc(stats.prompt_tokens - reused_tokens)
+        if stats.ttft_ms is not None:
+            TIME_TO_FIRST_TOKEN_BY_PREFIX.labels("hit" if reused_tokens else "miss").observe(
+                stats.ttft_ms / 1000
+            )
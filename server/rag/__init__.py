@@ -1 +1,38 @@
-# RAG (Retrieval-Augmented Generation) module
+"""
+RAG (Retrieval-Augmented Generation) module.
+
+This module contains:
+- chunking: Splitting Absher service documents into retrievable chunks
+- embeddings: Batched sentence-transformers embeddings
+- index: In-process (memory-mapped NumPy) and Qdrant vector indexes
+- ivf: IVF-flat approximate nearest-neighbour index
+- store: Memory-mapped, quantized (float16/int8) embedding store
+- bm25: Arabic-aware BM25 inverted index
+- hybrid: Dense + sparse score fusion
+- pipeline: Indexing and top-k retrieval over the chunk corpus
+"""
+
+from rag.bm25 import BM25Index
+from rag.chunking import Chunk, Document, chunk_documents, chunk_text
+from rag.embeddings import BatchingEmbedder, SentenceTransformerEmbedder
+from rag.index import NumpyVectorIndex, QdrantVectorIndex, VectorIndex
+from rag.ivf import IVFFlatIndex
+from rag.pipeline import RetrievalPipeline, RetrievedChunk
+from rag.store import EmbeddingStore
+
+__all__ = [
+    "BM25Index",
+    "Chunk",
+    "Document",
+    "chunk_documents",
+    "chunk_text",
+    "BatchingEmbedder",
+    "SentenceTransformerEmbedder",
+    "NumpyVectorIndex",
+    "QdrantVectorIndex",
+    "VectorIndex",
+    "IVFFlatIndex",
+    "EmbeddingStore",
+    "RetrievalPipeline",
+    "RetrievedChunk",
+]
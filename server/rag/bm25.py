@@ -0,0 +1,231 @@
+"""
+BM25 inverted index with Arabic-aware analysis.
+
+Dense embeddings blur exact identifiers such as form numbers, plate formats
+and service codes; this sparse index matches them literally and runs inline
+in the worker with no network hop.
+
+Analysis: ``normalize_arabic``, Arabic-Indic digits folded to ASCII, Latin
+codes kept whole (``moi-123`` is indexed as ``moi-123``, ``moi`` and
+``123``), Arabic stop words dropped and a light (Light10-style) stemmer
+strips common prefixes and suffixes.
+
+Postings are CSR arrays: the rows of term ``t`` are
+``docs[offsets[t]:offsets[t + 1]]`` with precomputed BM25 weights, so a
+query is one ``scores[docs] += weights`` per query term. Saved indexes are
+loaded memory-mapped.
+
+Requirements: 4.2
+"""
+
+import json
+import logging
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from models.arabic import normalize_arabic
+from rag.index import top_k
+
+logger = logging.getLogger(__name__)
+
+VOCABULARY_FILE = "bm25_vocabulary.json"
+OFFSETS_FILE = "bm25_offsets.npy"
+DOCS_FILE = "bm25_docs.npy"
+TERM_FREQUENCIES_FILE = "bm25_tfs.npy"
+DOC_LENGTHS_FILE = "bm25_doc_lengths.npy"
+
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+
+_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹", "01234567890123456789")
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-/][a-z0-9]+)*|[ء-ي]+")
+_CODE_PARTS = re.compile(r"[-/]")
+
+# Prefixes and suffixes in normalized form (ة -> ه, ى -> ي, أ/إ/آ -> ا)
+_ARTICLES = ("وال", "بال", "كال", "فال", "لل", "ال")
+_SUFFIXES = ("ها", "ان", "ات", "ون", "ين", "يه", "ه", "ي")
+# Possessives on a taa marbuta noun (رخصتي -> رخص); need a 3-letter stem
+_TAA_POSSESSIVES = ("تها", "تهم", "تكم", "تنا", "تي", "تك")
+
+STOP_WORDS = frozenset(
+    normalize_arabic(word)
+    for word in (
+        "في من على إلى الى عن مع هل كيف ما ماذا متى أين لماذا كم هو هي هذا هذه ذلك "
+        "تلك التي الذي الذين أو ثم أن إن كان قد لا لم لن يا عند كل بعد قبل بين أي"
+    ).split()
+)
+
+
+def light_stem(token: str) -> str:
+    """Strip common Arabic prefixes and suffixes (Light10-style) from a normalized token."""
+    if len(token) > 3 and token.startswith("و"):
+        token = token[1:]
+    for article in _ARTICLES:
+        if token.startswith(article) and len(token) - len(article) >= 2:
+            token = token[len(article):]
+            break
+    for suffix in _TAA_POSSESSIVES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            token = token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Analyze text into index terms."""
+    terms: List[str] = []
+    for token in _TOKEN.findall(normalize_arabic(text).translate(_DIGITS)):
+        if token.isascii():
+            terms.append(token)
+            parts = _CODE_PARTS.split(token)
+            if len(parts) > 1:
+                terms.extend(parts)
+        elif token not in STOP_WORDS:
+            terms.append(light_stem(token))
+    return terms
+
+
+class BM25Index:
+    """Okapi BM25 over array-backed postings; document ids are row positions."""
+
+    def __init__(self, k1: float = DEFAULT_K1, b: float = DEFAULT_B):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._docs = np.zeros(0, dtype=np.int32)
+        self._tfs = np.zeros(0, dtype=np.int32)
+        self._weights = np.zeros(0, dtype=np.float32)
+        self._doc_lengths = np.zeros(0, dtype=np.int32)
+        self._pending: List[Counter] = []
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str], **kwargs) -> "BM25Index":
+        index = cls(**kwargs)
+        index.add(texts)
+        index.build()
+        return index
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths) + len(self._pending)
+
+    def add(self, texts: Iterable[str]) -> None:
+        """Queue documents; ids continue from the current size."""
+        self._pending.extend(Counter(tokenize(text)) for text in texts)
+
+    def build(self) -> None:
+        """Merge queued documents into the postings and recompute weights."""
+        if not self._pending:
+            return
+        first_doc = len(self._doc_lengths)
+        terms: List[int] = []
+        docs: List[int] = []
+        tfs: List[int] = []
+        for doc, counts in enumerate(self._pending, start=first_doc):
+            for term, tf in counts.items():
+                terms.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                docs.append(doc)
+                tfs.append(tf)
+        new_lengths = [sum(counts.values()) for counts in self._pending]
+        self._pending = []
+
+        old_terms = np.repeat(np.arange(len(self._offsets) - 1), np.diff(self._offsets))
+        all_terms = np.concatenate([old_terms, np.asarray(terms, dtype=np.int64)])
+        all_docs = np.concatenate([self._docs, np.asarray(docs, dtype=np.int32)])
+        all_tfs = np.concatenate([self._tfs, np.asarray(tfs, dtype=np.int32)])
+        order = np.argsort(all_terms, kind="stable")
+
+        self._docs = all_docs[order]
+        self._tfs = all_tfs[order]
+        counts = np.bincount(all_terms, minlength=len(self.vocabulary))
+        self._offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self._doc_lengths = np.concatenate(
+            [self._doc_lengths, np.asarray(new_lengths, dtype=np.int32)]
+        )
+        self._weights = self._compute_weights()
+
+    def _compute_weights(self) -> np.ndarray:
+        """Per-posting BM25 contribution ``idf * tf * (k1 + 1) / (tf + k1 * norm)``."""
+        n_docs = len(self._doc_lengths)
+        if n_docs == 0 or len(self._docs) == 0:
+            return np.zeros(len(self._docs), dtype=np.float32)
+        document_frequency = np.diff(self._offsets)
+        idf = np.log1p((n_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+        posting_idf = np.repeat(idf, document_frequency)
+        avg_length = max(float(self._doc_lengths.mean()), 1e-9)
+        norm = 1 - self.b + self.b * self._doc_lengths[self._docs] / avg_length
+        tf = self._tfs.astype(np.float64)
+        return (posting_idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)).astype(np.float32)
+
+    def score(self, query: str) -> np.ndarray:
+        """BM25 score of every document for ``query``."""
+        self.build()
+        scores = np.zeros(len(self._doc_lengths), dtype=np.float32)
+        for term, count in Counter(tokenize(query)).items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self._offsets[term_id], self._offsets[term_id + 1]
+            scores[self._docs[start:end]] += count * self._weights[start:end]
+        return scores
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return ``(scores, ids)`` of the ``k`` best matches, best first.
+
+        Documents sharing no term with the query are never returned; unused
+        slots hold score 0 and id ``-1``.
+        """
+        scores, ids = top_k(self.score(query)[None, :], k)
+        scores, ids = scores[0], ids[0]
+        missing = ~(scores > 0)
+        scores[missing] = 0.0
+        ids[missing] = -1
+        return scores, ids
+
+    def search_many(self, queries: Sequence[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """``search`` for several queries; returns ``[Q, k]`` arrays."""
+        results = [self.search(query, k) for query in queries]
+        if not results:
+            return np.zeros((0, k), dtype=np.float32), np.zeros((0, k), dtype=np.int64)
+        return np.stack([r[0] for r in results]), np.stack([r[1] for r in results])
+
+    def save(self, directory: Path) -> None:
+        """Write the vocabulary and postings to ``directory``."""
+        self.build()
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / VOCABULARY_FILE, "w", encoding="utf-8") as f:
+            data = {"k1": self.k1, "b": self.b, "terms": list(self.vocabulary)}
+            json.dump(data, f, ensure_ascii=False)
+        np.save(directory / OFFSETS_FILE, self._offsets)
+        np.save(directory / DOCS_FILE, self._docs)
+        np.save(directory / TERM_FREQUENCIES_FILE, self._tfs)
+        np.save(directory / DOC_LENGTHS_FILE, self._doc_lengths)
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> "BM25Index":
+        """Load a saved index; postings are memory-mapped by default."""
+        directory = Path(directory)
+        mode = "r" if mmap else None
+        with open(directory / VOCABULARY_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.vocabulary = {term: i for i, term in enumerate(data["terms"])}
+        index._offsets = np.load(directory / OFFSETS_FILE)
+        index._docs = np.load(directory / DOCS_FILE, mmap_mode=mode)
+        index._tfs = np.load(directory / TERM_FREQUENCIES_FILE, mmap_mode=mode)
+        index._doc_lengths = np.load(directory / DOC_LENGTHS_FILE)
+        index._weights = index._compute_weights()
+        return index
+
+
+def is_bm25_index(directory: Path) -> bool:
+    """Return True if ``directory`` holds a saved BM25 index."""
+    return (Path(directory) / VOCABULARY_FILE).exists()
@@ -0,0 +1,137 @@
+"""
+Chunking of Absher service documents for retrieval.
+
+Documents are split on paragraph and sentence boundaries (Arabic and Latin
+punctuation) into chunks of at most ``max_chars`` characters, with a small
+character overlap so that a fact straddling two chunks is retrievable from
+either.
+
+Requirements: 4.1
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List
+
+DEFAULT_MAX_CHARS = 800
+DEFAULT_OVERLAP_CHARS = 100
+
+# Sentence ends: Latin/Arabic full stop, question and exclamation marks
+_SENTENCE_END = re.compile(r"(?<=[.!?؟۔])\s+")
+_PARAGRAPH = re.compile(r"\n\s*\n")
+
+
+@dataclass
+class Document:
+    """An Absher service document to be indexed."""
+    document_id: str
+    service_category: str
+    text: str
+    title: str = ""
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Chunk:
+    """A retrievable slice of a document."""
+    chunk_id: str
+    document_id: str
+    service_category: str
+    text: str
+    position: int = 0
+    title: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "chunk_id": self.chunk_id,
+            "document_id": self.document_id,
+            "service_category": self.service_category,
+            "text": self.text,
+            "position": self.position,
+            "title": self.title,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Chunk":
+        return cls(**data)
+
+
+def _split_units(text: str) -> List[str]:
+    """Split text into sentences, keeping paragraph breaks as boundaries."""
+    units: List[str] = []
+    for paragraph in _PARAGRAPH.split(text):
+        paragraph = " ".join(paragraph.split())
+        if paragraph:
+            units.extend(s for s in _SENTENCE_END.split(paragraph) if s)
+    return units
+
+
+def chunk_text(
+    text: str,
+    max_chars: int = DEFAULT_MAX_CHARS,
+    overlap_chars: int = DEFAULT_OVERLAP_CHARS,
+) -> List[str]:
+    """
+    Split text into overlapping chunks along sentence boundaries.
+
+    Sentences longer than ``max_chars`` are hard-split.
+
+    Args:
+        text: Document text
+        max_chars: Maximum characters per chunk
+        overlap_chars: Characters carried over from the end of the previous chunk
+
+    Returns:
+        List of non-empty chunk strings
+    """
+    if max_chars < 1:
+        raise ValueError("max_chars must be at least 1")
+    if not 0 <= overlap_chars < max_chars:
+        raise ValueError("overlap_chars must be in [0, max_chars)")
+
+    units: List[str] = []
+    for unit in _split_units(text):
+        while len(unit) > max_chars:
+            units.append(unit[:max_chars])
+            unit = unit[max_chars:]
+        if unit:
+            units.append(unit)
+
+    chunks: List[str] = []
+    current = ""
+    for unit in units:
+        candidate = f"{current} {unit}" if current else unit
+        if len(candidate) <= max_chars:
+            current = candidate
+            continue
+        chunks.append(current)
+        tail = current[-overlap_chars:] if overlap_chars else ""
+        # Start the overlap at a word boundary
+        if " " in tail:
+            tail = tail[tail.index(" ") + 1:]
+        current = f"{tail} {unit}" if tail and len(tail) + 1 + len(unit) <= max_chars else unit
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_documents(
+    documents: Iterable[Document],
+    max_chars: int = DEFAULT_MAX_CHARS,
+    overlap_chars: int = DEFAULT_OVERLAP_CHARS,
+) -> List[Chunk]:
+    """Chunk documents, assigning stable ``<document_id>#<position>`` ids."""
+    chunks: List[Chunk] = []
+    for document in documents:
+        for position, text in enumerate(chunk_text(document.text, max_chars, overlap_chars)):
+            chunks.append(
+                Chunk(
+                    chunk_id=f"{document.document_id}#{position}",
+                    document_id=document.document_id,
+                    service_category=document.service_category,
+                    text=text,
+                    position=position,
+                    title=document.title,
+                )
+            )
+    return chunks
@@ -0,0 +1,142 @@
+"""
+Sentence embeddings for semantic matching and retrieval.
+
+``SentenceTransformerEmbedder`` wraps a multilingual sentence-transformers
+model. ``BatchingEmbedder`` lets many concurrent requests share one model
+call: single texts submitted within a short window are encoded together in a
+worker thread, so the event loop never blocks on the model.
+
+All embeddings are L2-normalized float32 vectors, so cosine similarity is a
+plain dot product.
+
+Requirements: 4.1
+"""
+
+import asyncio
+import logging
+from typing import List, Optional, Protocol, Sequence
+
+import numpy as np
+
+from models.batching import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+# Multilingual paraphrase model with good Arabic coverage
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+DEFAULT_EMBEDDING_BATCH_SIZE = 32
+DEFAULT_EMBEDDING_WINDOW_MS = 2.0
+
+
+class Embedder(Protocol):
+    """Synchronous text embedder returning L2-normalized float32 rows."""
+
+    @property
+    def dimension(self) -> int:
+        """Embedding dimension."""
+        ...
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed ``texts`` into an ``[N, dimension]`` float32 matrix."""
+        ...
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """Row-normalize a matrix to unit length (zero rows stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    """Embedder backed by a sentence-transformers model (loaded lazily)."""
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_EMBEDDING_MODEL,
+        batch_size: int = DEFAULT_EMBEDDING_BATCH_SIZE,
+        device: Optional[str] = None,
+    ):
+        """
+        Initialize the embedder.
+
+        Args:
+            model_name: sentence-transformers model name or path
+            batch_size: Texts per forward pass
+            device: Torch device (default: sentence-transformers' choice)
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.device = device
+        self._model = None
+
+    def _ensure_model(self):
+        if self._model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError:
+                logger.warning(
+                    "sentence-transformers not installed. "
+                    "Install with: pip install sentence-transformers"
+                )
+                raise
+            self._model = SentenceTransformer(self.model_name, device=self.device)
+            logger.info(f"Loaded embedding model {self.model_name}")
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        return self._ensure_model().get_sentence_embedding_dimension()
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        model = self._ensure_model()
+        vectors = model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class BatchingEmbedder:
+    """
+    Async front-end for an ``Embedder`` that batches concurrent calls.
+
+    Texts submitted within ``window_ms`` of each other are embedded in one
+    ``encode`` call on a worker thread.
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        max_batch_size: int = DEFAULT_EMBEDDING_BATCH_SIZE,
+        window_ms: float = DEFAULT_EMBEDDING_WINDOW_MS,
+    ):
+        self.embedder = embedder
+        self._batcher = MicroBatcher(
+            self._encode_batch,
+            max_batch_size=max_batch_size,
+            window_ms=window_ms,
+            name="embedding",
+        )
+
+    @property
+    def dimension(self) -> int:
+        return self.embedder.dimension
+
+    async def _encode_batch(self, texts: List[str], key: object) -> List[np.ndarray]:
+        vectors = await asyncio.to_thread(self.embedder.encode, texts)
+        return list(l2_normalize(vectors))
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed one text, sharing a model call with concurrent requests."""
+        return await self._batcher.submit(text, None)
+
+    async def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed many texts directly in one worker-thread call."""
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        vectors = await asyncio.to_thread(self.embedder.encode, list(texts))
+        return l2_normalize(vectors)
@@ -0,0 +1,83 @@
+"""
+Fusion of dense (embedding) and sparse (BM25) retrieval results.
+
+Both strategies return scores in ``[0, 1]`` so they can be reported directly
+as ``RAGSource.relevance_score``:
+
+- ``rrf``: reciprocal rank fusion, ``sum(1 / (rrf_k + rank))`` over the two
+  rankings, divided by its maximum (first in both lists scores 1.0). Robust
+  to the very different score scales of cosine similarity and BM25. Equal
+  scores share a rank, so a tie in one ranking is decided by the other.
+- ``weighted``: ``w * cosine + (1 - w) * bm25 / max_bm25`` with cosine
+  clipped to ``[0, 1]`` and BM25 normalized per query.
+
+Requirements: 4.2
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+FUSION_METHODS = ("rrf", "weighted")
+DEFAULT_FUSION = "rrf"
+DEFAULT_RRF_K = 60
+DEFAULT_DENSE_WEIGHT = 0.5
+
+
+def _valid(ids: np.ndarray, scores: np.ndarray) -> List[Tuple[int, float]]:
+    return [(int(i), float(s)) for i, s in zip(ids, scores) if i >= 0]
+
+
+def reciprocal_rank_fusion(
+    dense_ids: np.ndarray,
+    dense_scores: np.ndarray,
+    sparse_ids: np.ndarray,
+    sparse_scores: np.ndarray,
+    rrf_k: int = DEFAULT_RRF_K,
+) -> List[Tuple[int, float]]:
+    """Fuse two best-first rankings by reciprocal rank; returns ``(id, score)`` best first."""
+    fused: Dict[int, float] = {}
+    for ranking in (_valid(dense_ids, dense_scores), _valid(sparse_ids, sparse_scores)):
+        rank, previous = 0, None
+        for position, (doc, score) in enumerate(ranking, start=1):
+            if score != previous:
+                rank, previous = position, score
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (rrf_k + rank)
+    best = 2.0 / (rrf_k + 1)
+    return sorted(((doc, score / best) for doc, score in fused.items()), key=lambda x: -x[1])
+
+
+def weighted_fusion(
+    dense_ids: np.ndarray,
+    dense_scores: np.ndarray,
+    sparse_ids: np.ndarray,
+    sparse_scores: np.ndarray,
+    dense_weight: float = DEFAULT_DENSE_WEIGHT,
+) -> List[Tuple[int, float]]:
+    """Fuse by a weighted sum of normalized scores; returns ``(id, score)`` best first."""
+    fused: Dict[int, float] = {}
+    for doc, score in _valid(dense_ids, dense_scores):
+        fused[doc] = dense_weight * min(max(score, 0.0), 1.0)
+    sparse = _valid(sparse_ids, sparse_scores)
+    top_sparse = max((score for _, score in sparse), default=0.0)
+    if top_sparse > 0:
+        for doc, score in sparse:
+            fused[doc] = fused.get(doc, 0.0) + (1 - dense_weight) * score / top_sparse
+    return sorted(fused.items(), key=lambda x: -x[1])
+
+
+def fuse(
+    method: str,
+    dense_ids: np.ndarray,
+    dense_scores: np.ndarray,
+    sparse_ids: np.ndarray,
+    sparse_scores: np.ndarray,
+    dense_weight: float = DEFAULT_DENSE_WEIGHT,
+    rrf_k: int = DEFAULT_RRF_K,
+) -> List[Tuple[int, float]]:
+    """Fuse one query's dense and sparse results with ``method`` (see module docs)."""
+    if method == "rrf":
+        return reciprocal_rank_fusion(dense_ids, dense_scores, sparse_ids, sparse_scores, rrf_k)
+    if method == "weighted":
+        return weighted_fusion(dense_ids, dense_scores, sparse_ids, sparse_scores, dense_weight)
+    raise ValueError(f"Unknown fusion method: {method} (expected one of {FUSION_METHODS})")
@@ -0,0 +1,191 @@
+"""
+Vector indexes for dense retrieval.
+
+``NumpyVectorIndex`` keeps unit-length float32 embeddings in one matrix and
+answers top-k queries with a matrix product and ``argpartition``. Saved
+indexes are loaded memory-mapped, so every uvicorn worker shares the same
+page-cache copy and retrieval needs no network hop.
+
+``QdrantVectorIndex`` exposes the same interface on top of a Qdrant
+collection for deployments that prefer an external vector database.
+
+Row positions are the ids: row ``i`` is the ``i``-th chunk of the corpus.
+
+Requirements: 4.1, 4.2
+"""
+
+import logging
+from pathlib import Path
+from typing import Optional, Protocol, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+
+
+class VectorIndex(Protocol):
+    """Top-k inner-product search over unit-length vectors."""
+
+    @property
+    def dimension(self) -> int:
+        ...
+
+    def __len__(self) -> int:
+        ...
+
+    def add(self, vectors: np.ndarray) -> None:
+        """Append vectors; their ids are the next row positions."""
+        ...
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return ``(scores, ids)``, each ``[Q, k]``, best first.
+
+        Slots beyond the index size hold score ``-inf`` and id ``-1``.
+        """
+        ...
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Select the ``k`` best columns of each row of a ``[Q, N]`` score matrix."""
+    n_queries, n = scores.shape
+    out_scores = np.full((n_queries, k), -np.inf, dtype=np.float32)
+    out_ids = np.full((n_queries, k), -1, dtype=np.int64)
+    kk = min(k, n)
+    if kk == 0:
+        return out_scores, out_ids
+
+    if kk < n:
+        candidates = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+    else:
+        candidates = np.broadcast_to(np.arange(n), (n_queries, n))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    out_ids[:, :kk] = np.take_along_axis(candidates, order, axis=1)
+    out_scores[:, :kk] = np.take_along_axis(candidate_scores, order, axis=1)
+    return out_scores, out_ids
+
+
+class NumpyVectorIndex:
+    """Exact in-process inner-product index, memory-mappable from disk."""
+
+    def __init__(self, dimension: int, vectors: Optional[np.ndarray] = None):
+        self._dimension = dimension
+        if vectors is None:
+            vectors = np.zeros((0, dimension), dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != dimension:
+            raise ValueError(f"Expected [N, {dimension}] vectors, got {vectors.shape}")
+        self._vectors = vectors
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def __len__(self) -> int:
+        return self._vectors.shape[0]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors
+
+    def add(self, vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self._dimension)
+        # Appending copies a memory-mapped matrix into private memory
+        self._vectors = np.concatenate([self._vectors, vectors])
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self._dimension)
+        return top_k(queries @ self._vectors.T, k)
+
+    def save(self, directory: Path) -> None:
+        """Write the matrix as ``vectors.npy`` in ``directory``."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / VECTORS_FILE, np.ascontiguousarray(self._vectors, dtype=np.float32))
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> "NumpyVectorIndex":
+        """Load a saved index, memory-mapped read-only by default."""
+        vectors = np.load(Path(directory) / VECTORS_FILE, mmap_mode="r" if mmap else None)
+        return cls(vectors.shape[1], vectors)
+
+
+class QdrantVectorIndex:
+    """``VectorIndex`` backed by a Qdrant collection (optional dependency)."""
+
+    def __init__(
+        self,
+        dimension: int,
+        url: str = "localhost:6333",
+        collection: str = "absher_services",
+        client=None,
+    ):
+        """
+        Connect to Qdrant, creating the collection if needed.
+
+        Args:
+            dimension: Embedding dimension
+            url: Qdrant URL (host:port or http URL)
+            collection: Collection name
+            client: Pre-built ``QdrantClient`` (mainly for tests)
+        """
+        try:
+            from qdrant_client import QdrantClient, models
+        except ImportError:
+            logger.warning("qdrant-client not installed. Install with: pip install qdrant-client")
+            raise
+        self._models = models
+        self._dimension = dimension
+        self.collection = collection
+        if client is None:
+            client = QdrantClient(url=url if "://" in url else f"http://{url}")
+        self._client = client
+        if not self._client.collection_exists(collection):
+            self._client.create_collection(
+                collection,
+                vectors_config=models.VectorParams(size=dimension, distance=models.Distance.DOT),
+            )
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def __len__(self) -> int:
+        return self._client.count(self.collection, exact=True).count
+
+    def add(self, vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self._dimension)
+        start = len(self)
+        self._client.upsert(
+            self.collection,
+            points=[
+                self._models.PointStruct(id=start + i, vector=vector.tolist())
+                for i, vector in enumerate(vectors)
+            ],
+        )
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self._dimension)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        responses = self._client.query_batch_points(
+            self.collection,
+            requests=[
+                self._models.QueryRequest(query=query.tolist(), limit=k) for query in queries
+            ],
+        )
+        for row, response in enumerate(responses):
+            for col, point in enumerate(response.points):
+                scores[row, col] = point.score
+                ids[row, col] = int(point.id)
+        return scores, ids
+
+    def is_ready(self) -> bool:
+        """Return True if the collection is reachable."""
+        try:
+            return self._client.collection_exists(self.collection)
+        except Exception as e:
+            logger.error(f"Qdrant ready check failed: {e}")
+            return False
@@ -0,0 +1,244 @@
+"""
+IVF-flat approximate nearest-neighbour index.
+
+Vectors are partitioned into ``n_lists`` clusters by spherical k-means
+(NumPy only). A query scores the centroids, then searches exactly only the
+rows of the ``n_probe`` closest clusters, so query cost scales with
+``n_probe / n_lists`` of the corpus instead of all of it. ``n_probe`` trades
+recall for latency and can be changed at any time; ``n_probe == n_lists`` is
+exact search.
+
+Rows are stored grouped by cluster in one contiguous matrix, so probing a
+cluster is a single matrix-vector product over a slice. Saved indexes are
+loaded memory-mapped like ``NumpyVectorIndex``.
+
+Requirements: 4.2
+"""
+
+import logging
+import math
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from rag.index import top_k
+
+logger = logging.getLogger(__name__)
+
+CENTROIDS_FILE = "ivf_centroids.npy"
+LIST_VECTORS_FILE = "ivf_vectors.npy"
+LIST_IDS_FILE = "ivf_ids.npy"
+LIST_OFFSETS_FILE = "ivf_offsets.npy"
+
+DEFAULT_N_PROBE = 8
+DEFAULT_KMEANS_ITERATIONS = 20
+# k-means is trained on at most this many points per cluster
+TRAINING_POINTS_PER_LIST = 64
+# Rows assigned to centroids per block (bounds the [block, n_lists] score matrix)
+ASSIGN_BLOCK_ROWS = 16384
+
+
+def is_ivf_index(directory: Path) -> bool:
+    """Return True if ``directory`` holds a saved IVF index."""
+    return (Path(directory) / CENTROIDS_FILE).exists()
+
+
+def default_n_lists(n: int) -> int:
+    """Rule-of-thumb cluster count: about ``4 * sqrt(n)``."""
+    return max(1, min(n, int(4 * math.sqrt(n))))
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the highest inner-product centroid for each row."""
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def spherical_kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    n_iter: int = DEFAULT_KMEANS_ITERATIONS,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Cluster unit vectors by cosine similarity.
+
+    Args:
+        vectors: ``[N, d]`` unit-length training vectors
+        n_clusters: Number of centroids (at most ``N``)
+        n_iter: Lloyd iterations
+        seed: Random seed for initialisation and sampling
+
+    Returns:
+        ``[n_clusters, d]`` unit-length centroids
+    """
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        labels = assign(vectors, centroids)
+        counts = np.bincount(labels, minlength=n_clusters)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        empty = counts == 0
+        sums = np.zeros_like(centroids)
+        sums[~empty] = np.add.reduceat(
+            vectors[np.argsort(labels, kind="stable")], starts[~empty], axis=0
+        )
+        if empty.any():
+            # Re-seed empty clusters with random training points
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.where(norms > 0, norms, 1.0)
+    return centroids.astype(np.float32)
+
+
+class IVFFlatIndex:
+    """Inverted-file index with exact (flat) scoring inside probed clusters."""
+
+    def __init__(
+        self,
+        dimension: int,
+        n_lists: Optional[int] = None,
+        n_probe: int = DEFAULT_N_PROBE,
+        seed: int = 0,
+    ):
+        """
+        Initialize an empty index.
+
+        Args:
+            dimension: Embedding dimension
+            n_lists: Number of clusters (default: ``default_n_lists`` at build)
+            n_probe: Clusters searched per query
+            seed: Random seed for k-means
+        """
+        self._dimension = dimension
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        # Rows grouped by cluster: list i is rows offsets[i]:offsets[i + 1]
+        self._list_vectors = np.zeros((0, dimension), dtype=np.float32)
+        self._list_ids = np.zeros(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._pending: List[np.ndarray] = []
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def __len__(self) -> int:
+        return len(self._list_ids) + sum(len(v) for v in self._pending)
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors: np.ndarray) -> None:
+        """Fit the cluster centroids on a sample of ``vectors``."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self._dimension)
+        if len(vectors) == 0:
+            raise ValueError("Cannot train an IVF index without vectors")
+        n_lists = min(self.n_lists or default_n_lists(len(vectors)), len(vectors))
+        max_points = n_lists * TRAINING_POINTS_PER_LIST
+        if len(vectors) > max_points:
+            rng = np.random.default_rng(self.seed)
+            vectors = vectors[np.sort(rng.choice(len(vectors), max_points, replace=False))]
+        self.centroids = spherical_kmeans(vectors, n_lists, seed=self.seed)
+        self.n_lists = len(self.centroids)
+        logger.info(f"Trained IVF index with {self.n_lists} lists on {len(vectors)} vectors")
+
+    def add(self, vectors: np.ndarray) -> None:
+        """Queue vectors; they are assigned to clusters on the next ``build``/search."""
+        self._pending.append(np.asarray(vectors, dtype=np.float32).reshape(-1, self._dimension))
+
+    def build(self) -> None:
+        """Train if needed and merge queued vectors into the cluster lists."""
+        if not self._pending:
+            return
+        new = np.concatenate(self._pending)
+        if not self.trained:
+            self.train(np.concatenate([self._list_vectors, new]))
+        first_id = len(self._list_ids)
+        self._pending = []
+
+        vectors = np.concatenate([self._list_vectors, new])
+        ids = np.concatenate([self._list_ids, np.arange(first_id, first_id + len(new))])
+        labels = np.concatenate([
+            np.repeat(np.arange(self.n_lists), np.diff(self._offsets))
+            if len(self._offsets) == self.n_lists + 1 else np.zeros(0, dtype=np.int64),
+            assign(new, self.centroids),
+        ])
+        order = np.argsort(labels, kind="stable")
+        self._list_vectors = vectors[order]
+        self._list_ids = ids[order]
+        self._offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(labels, minlength=self.n_lists))]
+        ).astype(np.int64)
+
+    def list_sizes(self) -> np.ndarray:
+        """Number of rows in each cluster."""
+        self.build()
+        return np.diff(self._offsets)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k inner-product search over the ``n_probe`` closest clusters."""
+        self.build()
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self._dimension)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        if not self.trained or len(self._list_ids) == 0:
+            return scores, ids
+
+        n_probe = max(1, min(self.n_probe, self.n_lists))
+        _, probes = top_k(queries @ self.centroids.T, n_probe)
+        for row, query in enumerate(queries):
+            candidate_scores = []
+            candidate_ids = []
+            for cluster in probes[row]:
+                start, end = self._offsets[cluster], self._offsets[cluster + 1]
+                if start < end:
+                    candidate_scores.append(self._list_vectors[start:end] @ query)
+                    candidate_ids.append(self._list_ids[start:end])
+            if not candidate_scores:
+                continue
+            row_scores, order = top_k(np.concatenate(candidate_scores)[None, :], k)
+            found = order[0] >= 0
+            scores[row, found] = row_scores[0, found]
+            ids[row, found] = np.concatenate(candidate_ids)[order[0, found]]
+        return scores, ids
+
+    def save(self, directory: Path) -> None:
+        """Write centroids and cluster lists to ``directory``."""
+        self.build()
+        if not self.trained:
+            raise ValueError("Cannot save an empty IVF index")
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / CENTROIDS_FILE, self.centroids)
+        np.save(directory / LIST_VECTORS_FILE, np.ascontiguousarray(self._list_vectors))
+        np.save(directory / LIST_IDS_FILE, self._list_ids)
+        np.save(directory / LIST_OFFSETS_FILE, self._offsets)
+
+    @classmethod
+    def load(
+        cls,
+        directory: Path,
+        n_probe: int = DEFAULT_N_PROBE,
+        mmap: bool = True,
+    ) -> "IVFFlatIndex":
+        """Load a saved index; cluster rows are memory-mapped by default."""
+        directory = Path(directory)
+        mode = "r" if mmap else None
+        centroids = np.load(directory / CENTROIDS_FILE)
+        index = cls(centroids.shape[1], n_lists=len(centroids), n_probe=n_probe)
+        index.centroids = centroids
+        index._list_vectors = np.load(directory / LIST_VECTORS_FILE, mmap_mode=mode)
+        index._list_ids = np.load(directory / LIST_IDS_FILE, mmap_mode=mode)
+        index._offsets = np.load(directory / LIST_OFFSETS_FILE)
+        return index
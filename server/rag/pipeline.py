@@ -0,0 +1,281 @@
+"""
+Retrieval pipeline for Absher service documents.
+
+Indexing: documents are chunked, embedded in batches and appended to a
+vector index. Querying: a question (or its precomputed embedding) is searched
+against the index and the top-k chunks are returned with their scores.
+
+With a ``BM25Index`` attached, retrieval is hybrid: the dense and sparse
+top candidates are fused (``rag.hybrid``) in the same pass, so exact form
+numbers and service codes are found even when their embeddings are not
+close, and every result carries one relevance score in ``[0, 1]``.
+
+A saved pipeline is a directory holding the index files (exact
+``vectors.npy`` or IVF cluster lists, see ``rag.ivf``) and a ``chunks.jsonl``
+sidecar with one chunk per index row, or a quantized ``EmbeddingStore``
+(see ``rag.store``), which carries its own sidecar.
+
+Requirements: 4.1, 4.2
+"""
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from rag.bm25 import BM25Index, is_bm25_index
+from rag.chunking import (
+    DEFAULT_MAX_CHARS,
+    DEFAULT_OVERLAP_CHARS,
+    Chunk,
+    Document,
+    chunk_documents,
+)
+from rag.embeddings import BatchingEmbedder
+from rag.hybrid import DEFAULT_DENSE_WEIGHT, DEFAULT_FUSION, FUSION_METHODS, fuse
+from rag.index import NumpyVectorIndex, VectorIndex
+from rag.ivf import DEFAULT_N_PROBE, IVFFlatIndex, is_ivf_index
+from rag.store import EmbeddingStore, is_store
+
+logger = logging.getLogger(__name__)
+
+CHUNKS_FILE = "chunks.jsonl"
+DEFAULT_TOP_K = 4
+DEFAULT_MIN_SCORE = 0.3
+DEFAULT_INDEX_BATCH_SIZE = 256
+# Candidates taken from each of the dense and sparse rankings per result
+HYBRID_CANDIDATE_FACTOR = 4
+
+
+@dataclass
+class RetrievedChunk:
+    """A chunk returned by retrieval with its relevance score."""
+    chunk: Chunk
+    score: float
+
+
+class RetrievalPipeline:
+    """Chunk, embed, index and search Absher service documents."""
+
+    def __init__(
+        self,
+        embedder: BatchingEmbedder,
+        index: VectorIndex,
+        chunks: Optional[Sequence[Chunk]] = None,
+        top_k: int = DEFAULT_TOP_K,
+        min_score: float = DEFAULT_MIN_SCORE,
+        sparse: Optional[BM25Index] = None,
+        fusion: str = DEFAULT_FUSION,
+        dense_weight: float = DEFAULT_DENSE_WEIGHT,
+    ):
+        """
+        Initialize the pipeline.
+
+        Args:
+            embedder: Batched embedder (same model used to build the index)
+            index: Vector index whose row ``i`` embeds ``chunks[i]``
+            chunks: Chunk metadata aligned with the index rows (an
+                ``EmbeddingStore`` provides its own)
+            top_k: Default number of chunks to retrieve
+            min_score: Chunks scoring below this are dropped (dense score;
+                in hybrid mode a BM25 match also keeps a chunk)
+            sparse: BM25 index over the same rows, enabling hybrid retrieval
+            fusion: Hybrid fusion method, ``"rrf"`` or ``"weighted"``
+            dense_weight: Dense share of the score for ``"weighted"`` fusion
+        """
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method: {fusion} (expected one of {FUSION_METHODS})")
+        self.embedder = embedder
+        self.index = index
+        self.chunks: Sequence[Chunk] = (
+            index.chunks if isinstance(index, EmbeddingStore) else list(chunks or [])
+        )
+        self.top_k = top_k
+        self.min_score = min_score
+        self.sparse = sparse
+        self.fusion = fusion
+        self.dense_weight = dense_weight
+        if len(self.chunks) != len(index):
+            raise ValueError(
+                f"Index has {len(index)} rows but {len(self.chunks)} chunks were given"
+            )
+        if sparse is not None and len(sparse) != len(index):
+            raise ValueError(f"BM25 index has {len(sparse)} rows but the index has {len(index)}")
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    async def add_documents(
+        self,
+        documents: Iterable[Document],
+        max_chars: int = DEFAULT_MAX_CHARS,
+        overlap_chars: int = DEFAULT_OVERLAP_CHARS,
+        batch_size: int = DEFAULT_INDEX_BATCH_SIZE,
+    ) -> int:
+        """
+        Chunk, embed and index documents.
+
+        An ``EmbeddingStore`` index is appended to on disk and reopened.
+
+        Returns:
+            Number of chunks added
+        """
+        new_chunks = chunk_documents(documents, max_chars, overlap_chars)
+        if self.sparse is not None:
+            self.sparse.add(c.text for c in new_chunks)
+        for start in range(0, len(new_chunks), batch_size):
+            batch = new_chunks[start:start + batch_size]
+            vectors = await self.embedder.embed_many([c.text for c in batch])
+            if isinstance(self.index, EmbeddingStore):
+                EmbeddingStore.append(self.index.directory, vectors, batch)
+                self.index = EmbeddingStore.open(self.index.directory)
+                self.chunks = self.index.chunks
+            else:
+                self.index.add(vectors)
+                self.chunks.extend(batch)
+        logger.info(f"Indexed {len(new_chunks)} chunks ({len(self.chunks)} total)")
+        return len(new_chunks)
+
+    def rebuild_sparse(self) -> None:
+        """Rebuild the BM25 index from the chunks, skipping deleted store rows."""
+        deleted = getattr(self.index, "deleted", None)
+        self.sparse = BM25Index.from_texts(
+            "" if deleted is not None and deleted[i] else chunk.text
+            for i, chunk in enumerate(self.chunks)
+        )
+
+    def search_vectors(
+        self,
+        queries: np.ndarray,
+        k: Optional[int] = None,
+        texts: Optional[Sequence[str]] = None,
+    ) -> List[List[RetrievedChunk]]:
+        """
+        Search precomputed query embeddings (``[Q, d]``) synchronously.
+
+        When ``texts`` (the query strings) are given and a BM25 index is
+        attached, dense and sparse candidates are fused.
+        """
+        k = k or self.top_k
+        if self.sparse is None or texts is None:
+            scores, ids = self.index.search(queries, k)
+            return [
+                [
+                    RetrievedChunk(self.chunks[i], float(score))
+                    for score, i in zip(row_scores, row_ids)
+                    if i >= 0 and score >= self.min_score
+                ]
+                for row_scores, row_ids in zip(scores, ids)
+            ]
+
+        depth = k * HYBRID_CANDIDATE_FACTOR
+        dense_scores, dense_ids = self.index.search(queries, depth)
+        deleted = getattr(self.index, "deleted", None)
+        results: List[List[RetrievedChunk]] = []
+        for text, row_scores, row_ids in zip(texts, dense_scores, dense_ids):
+            keep = row_scores >= self.min_score
+            sparse_scores, sparse_ids = self.sparse.search(text, depth)
+            if deleted is not None:
+                # Store deletes only flip tombstones; the BM25 index keeps
+                # the rows until it is rebuilt
+                live = sparse_ids >= 0
+                live[live] = ~deleted[sparse_ids[live]]
+                sparse_ids, sparse_scores = sparse_ids[live], sparse_scores[live]
+            fused = fuse(
+                self.fusion,
+                row_ids[keep],
+                row_scores[keep],
+                sparse_ids,
+                sparse_scores,
+                dense_weight=self.dense_weight,
+            )
+            results.append([RetrievedChunk(self.chunks[i], score) for i, score in fused[:k]])
+        return results
+
+    async def retrieve(
+        self,
+        query: str,
+        k: Optional[int] = None,
+        query_vector: Optional[np.ndarray] = None,
+    ) -> List[RetrievedChunk]:
+        """
+        Retrieve the top-k chunks for a question.
+
+        Args:
+            query: Question text
+            k: Number of chunks (default: pipeline ``top_k``)
+            query_vector: Precomputed embedding of ``query``, if available
+        """
+        if not self.chunks:
+            return []
+        if query_vector is None:
+            query_vector = await self.embedder.embed(query)
+        results = await asyncio.to_thread(self.search_vectors, query_vector[None, :], k, [query])
+        return results[0]
+
+    async def retrieve_many(
+        self,
+        queries: Sequence[str],
+        k: Optional[int] = None,
+    ) -> List[List[RetrievedChunk]]:
+        """Retrieve for several questions with one embedding call and one search."""
+        if not self.chunks or not queries:
+            return [[] for _ in queries]
+        vectors = await self.embedder.embed_many(queries)
+        return await asyncio.to_thread(self.search_vectors, vectors, k, queries)
+
+    def save(self, directory: Path) -> None:
+        """
+        Persist the index, its chunk sidecar and the BM25 index, if any.
+
+        An ``EmbeddingStore`` is already on disk; only the BM25 index is
+        written next to it.
+        """
+        directory = Path(directory)
+        if isinstance(self.index, EmbeddingStore):
+            if directory.resolve() != self.index.directory.resolve():
+                raise ValueError("An EmbeddingStore pipeline can only be saved in its store")
+        elif isinstance(self.index, (NumpyVectorIndex, IVFFlatIndex)):
+            self.index.save(directory)
+            with open(directory / CHUNKS_FILE, "w", encoding="utf-8") as f:
+                for chunk in self.chunks:
+                    f.write(json.dumps(chunk.to_dict(), ensure_ascii=False) + "\n")
+        else:
+            raise TypeError(f"{type(self.index).__name__} pipelines cannot be saved to disk")
+        if self.sparse is not None:
+            self.sparse.save(directory)
+
+    @classmethod
+    def load(
+        cls,
+        directory: Path,
+        embedder: BatchingEmbedder,
+        mmap: bool = True,
+        n_probe: int = DEFAULT_N_PROBE,
+        **kwargs,
+    ) -> "RetrievalPipeline":
+        """
+        Load a saved pipeline (NumPy, IVF or embedding store), memory-mapped.
+
+        A saved BM25 index enables hybrid retrieval. ``n_probe`` applies to
+        IVF indexes only.
+        """
+        if is_bm25_index(directory):
+            kwargs.setdefault("sparse", BM25Index.load(directory, mmap=mmap))
+        if is_store(directory):
+            return cls(embedder, EmbeddingStore.open(directory), **kwargs)
+        if is_ivf_index(directory):
+            index = IVFFlatIndex.load(directory, n_probe=n_probe, mmap=mmap)
+        else:
+            index = NumpyVectorIndex.load(directory, mmap=mmap)
+        return cls(embedder, index, load_chunks(directory), **kwargs)
+
+
+def load_chunks(directory: Path) -> List[Chunk]:
+    """Read the ``chunks.jsonl`` sidecar of a saved index."""
+    with open(Path(directory) / CHUNKS_FILE, encoding="utf-8") as f:
+        return [Chunk.from_dict(json.loads(line)) for line in f if line.strip()]
@@ -0,0 +1,405 @@
+"""
+Memory-mapped, quantized embedding store for the RAG corpus.
+
+A store is a directory that every uvicorn worker maps read-only, so the
+corpus lives once in the page cache instead of once per worker, and opening
+it costs a few ``mmap`` calls rather than a load of the whole matrix:
+
+- ``manifest.json``: dtype, dimension, row count, sidecar size and generation
+- ``vectors-<gen>.bin``: ``[N, d]`` float16 or int8 rows, C order
+- ``scales-<gen>.bin``: ``[N]`` float32 per-row scales (int8 only)
+- ``deleted-<gen>.bin``: ``[N]`` uint8 tombstones
+- ``chunks-<gen>.jsonl`` + ``offsets-<gen>.bin``: chunk metadata, one JSON
+  line per row, with int64 byte offsets so a row is read without parsing the file
+
+Appends write the row data first and the manifest last; readers only map the
+rows the manifest counts, so a partially written append is never visible.
+Deletes flip tombstones in place and are seen by every worker at once.
+``compact`` writes the next generation without deleted rows and commits it
+by replacing the manifest; workers keep their old mapping until they reopen.
+There must be a single writer at a time.
+
+Search is brute force: rows are dequantized in cache-sized blocks and scored
+with a float32 matrix product (BLAS/SIMD), keeping a running top-k.
+
+Requirements: 4.1, 4.2
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rag.chunking import Chunk
+from rag.index import top_k
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors"
+SCALES_FILE = "scales"
+DELETED_FILE = "deleted"
+METADATA_FILE = "chunks"
+OFFSETS_FILE = "offsets"
+DATA_FILES = (VECTORS_FILE, SCALES_FILE, DELETED_FILE, METADATA_FILE, OFFSETS_FILE)
+
+FORMAT_VERSION = 1
+SUPPORTED_DTYPES = ("float16", "int8")
+DEFAULT_STORE_DTYPE = "int8"
+
+# Rows dequantized per block during search (~24 MB of float32 at d=384)
+DEFAULT_BLOCK_ROWS = 16384
+
+
+def is_store(directory: Path) -> bool:
+    """Return True if ``directory`` holds an embedding store."""
+    return (Path(directory) / MANIFEST_FILE).exists()
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Quantize float vectors for storage.
+
+    int8 uses symmetric per-row scales: ``row ≈ scale * q`` with ``q`` in
+    ``[-127, 127]``.
+
+    Returns:
+        Tuple of (quantized rows, per-row float32 scales or None)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0 if len(vectors) else np.zeros(0)
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return quantized, scales
+    raise ValueError(f"Unsupported store dtype: {dtype} (expected one of {SUPPORTED_DTYPES})")
+
+
+def dequantize(rows: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    """Convert stored rows back to float32."""
+    rows = rows.astype(np.float32)
+    if scales is not None:
+        rows *= scales[:, None]
+    return rows
+
+
+def _data_path(directory: Path, manifest: Dict[str, Any], name: str) -> Path:
+    """Path of a data file for the manifest's generation."""
+    suffix = ".jsonl" if name == METADATA_FILE else ".bin"
+    return Path(directory) / f"{name}-{manifest['generation']}{suffix}"
+
+
+def _map(path: Path, dtype, shape: Tuple[int, ...], mode: str = "r") -> np.ndarray:
+    """Memory-map ``path``; empty arrays are not mappable and are allocated instead."""
+    if int(np.prod(shape)) == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+
+
+def _write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class ChunkSidecar(Sequence[Chunk]):
+    """Read-only, memory-mapped view of the chunk metadata of a store."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+        return Chunk.from_dict(json.loads(bytes(self._data[start:end])))
+
+    def __iter__(self) -> Iterator[Chunk]:
+        return (self[i] for i in range(len(self)))
+
+
+class EmbeddingStore:
+    """
+    Quantized on-disk embedding matrix with a chunk metadata sidecar.
+
+    Implements the ``VectorIndex`` interface; ``chunks`` is aligned with the
+    rows. Open one instance per worker with ``EmbeddingStore.open``.
+    """
+
+    def __init__(self, directory: Path, block_rows: int = DEFAULT_BLOCK_ROWS):
+        """
+        Map an existing store read-only.
+
+        Args:
+            directory: Store directory
+            block_rows: Rows dequantized per search block
+        """
+        self.directory = Path(directory)
+        self.block_rows = block_rows
+        self.manifest: Dict[str, Any] = _read_manifest(self.directory)
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported store format: {self.manifest.get('format_version')}")
+        self.dtype: str = self.manifest["dtype"]
+        self._dimension: int = self.manifest["dimension"]
+        count: int = self.manifest["count"]
+
+        def path(name: str) -> Path:
+            return _data_path(self.directory, self.manifest, name)
+
+        self._vectors = _map(path(VECTORS_FILE), self.dtype, (count, self._dimension))
+        self._scales = (
+            _map(path(SCALES_FILE), np.float32, (count,)) if self.dtype == "int8" else None
+        )
+        self._deleted = _map(path(DELETED_FILE), np.uint8, (count,))
+        offsets = _map(path(OFFSETS_FILE), np.int64, (count,))
+        offsets = np.append(offsets, self.manifest["metadata_bytes"])
+        data = _map(path(METADATA_FILE), np.uint8, (self.manifest["metadata_bytes"],))
+        self.chunks = ChunkSidecar(data, offsets)
+
+    @classmethod
+    def open(cls, directory: Path, **kwargs) -> "EmbeddingStore":
+        """Map an existing store read-only."""
+        return cls(directory, **kwargs)
+
+    @classmethod
+    def build(
+        cls,
+        directory: Path,
+        dimension: int,
+        vectors: Optional[np.ndarray] = None,
+        chunks: Sequence[Chunk] = (),
+        dtype: str = DEFAULT_STORE_DTYPE,
+    ) -> "EmbeddingStore":
+        """
+        Create a store (replacing any existing one) and return it opened.
+
+        Args:
+            directory: Store directory
+            dimension: Embedding dimension
+            vectors: Optional ``[N, d]`` float vectors for ``chunks``
+            chunks: Chunk metadata aligned with ``vectors``
+            dtype: ``"float16"`` or ``"int8"``
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(
+                f"Unsupported store dtype: {dtype} (expected one of {SUPPORTED_DTYPES})"
+            )
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        previous = _read_manifest(directory) if is_store(directory) else None
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "dtype": dtype,
+            "dimension": dimension,
+            "count": 0,
+            "metadata_bytes": 0,
+            "generation": previous["generation"] + 1 if previous else 0,
+        }
+        _start_generation(directory, manifest)
+        quantized, scales = quantize(
+            np.asarray(vectors if vectors is not None else [], np.float32).reshape(-1, dimension),
+            dtype,
+        )
+        _append_rows(directory, manifest, quantized, scales, chunks)
+        if previous:
+            _remove_generation(directory, previous)
+        return cls.open(directory)
+
+    @staticmethod
+    def append(directory: Path, vectors: np.ndarray, chunks: Sequence[Chunk]) -> int:
+        """
+        Quantize and append rows to a store on disk.
+
+        Open stores keep their current row count; reopen to see the new rows.
+
+        Returns:
+            Row count after the append
+        """
+        manifest = _read_manifest(directory)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, manifest["dimension"])
+        quantized, scales = quantize(vectors, manifest["dtype"])
+        return _append_rows(Path(directory), manifest, quantized, scales, chunks)
+
+    @staticmethod
+    def delete_documents(directory: Path, document_ids: Iterable[str]) -> int:
+        """
+        Tombstone every row of the given documents, visible to open stores.
+
+        Returns:
+            Number of rows newly deleted
+        """
+        store = EmbeddingStore.open(directory)
+        targets = set(document_ids)
+        rows = [i for i, chunk in enumerate(store.chunks) if chunk.document_id in targets]
+        rows = [i for i in rows if not store._deleted[i]]
+        if rows:
+            path = _data_path(directory, store.manifest, DELETED_FILE)
+            deleted = _map(path, np.uint8, (len(store),), mode="r+")
+            deleted[rows] = 1
+            deleted.flush()
+        return len(rows)
+
+    @staticmethod
+    def compact(directory: Path) -> int:
+        """
+        Rewrite a store without its deleted rows.
+
+        The new files replace the old ones atomically; open stores keep
+        reading the old files until reopened.
+
+        Returns:
+            Row count after compaction
+        """
+        directory = Path(directory)
+        store = EmbeddingStore.open(directory)
+        keep = np.flatnonzero(store._deleted == 0)
+        if len(keep) == len(store):
+            return len(store)
+
+        manifest = dict(
+            store.manifest, count=0, metadata_bytes=0, generation=store.manifest["generation"] + 1
+        )
+        _start_generation(directory, manifest)
+        scales = store._scales[keep] if store._scales is not None else None
+        chunks = [store.chunks[i] for i in keep]
+        _append_rows(directory, manifest, store._vectors[keep], scales, chunks)
+        _remove_generation(directory, store.manifest)
+        logger.info(f"Compacted store {directory}: {len(store)} -> {len(keep)} rows")
+        return len(keep)
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def __len__(self) -> int:
+        return self._vectors.shape[0]
+
+    @property
+    def live_count(self) -> int:
+        """Rows not deleted."""
+        return int(len(self) - np.count_nonzero(self._deleted))
+
+    @property
+    def deleted(self) -> np.ndarray:
+        """Boolean tombstone mask over the rows."""
+        return self._deleted.astype(bool)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of embedding data mapped (shared between workers)."""
+        scales = self._scales.nbytes if self._scales is not None else 0
+        return self._vectors.nbytes + scales
+
+    def reconstruct(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Dequantize rows (all rows by default) to float32."""
+        if rows is None:
+            rows = np.arange(len(self))
+        scales = self._scales[rows] if self._scales is not None else None
+        return dequantize(self._vectors[rows], scales)
+
+    def add(self, vectors: np.ndarray) -> None:
+        raise TypeError("EmbeddingStore is read-only; use EmbeddingStore.append")
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top-k inner-product search over the live rows."""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self._dimension)
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+
+        for start in range(0, len(self), self.block_rows):
+            end = min(start + self.block_rows, len(self))
+            scales = self._scales[start:end] if self._scales is not None else None
+            scores = queries @ dequantize(self._vectors[start:end], scales).T
+            deleted = self._deleted[start:end].astype(bool)
+            if deleted.any():
+                scores[:, deleted] = -np.inf
+            block_scores, block_ids = top_k(scores, k)
+            block_ids = np.where(block_ids >= 0, block_ids + start, -1)
+
+            merged_scores = np.concatenate([best_scores, block_scores], axis=1)
+            merged_ids = np.concatenate([best_ids, block_ids], axis=1)
+            best_scores, order = top_k(merged_scores, k)
+            best_ids = np.take_along_axis(merged_ids, order, axis=1)
+
+        best_ids[~np.isfinite(best_scores)] = -1
+        return best_scores, best_ids
+
+
+def _read_manifest(directory: Path) -> Dict[str, Any]:
+    with open(Path(directory) / MANIFEST_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _start_generation(directory: Path, manifest: Dict[str, Any]) -> None:
+    """Create empty data files for a new (not yet committed) generation."""
+    for name in DATA_FILES:
+        _data_path(directory, manifest, name).write_bytes(b"")
+
+
+def _remove_generation(directory: Path, manifest: Dict[str, Any]) -> None:
+    """Unlink a superseded generation; existing mappings stay valid."""
+    for name in DATA_FILES:
+        _data_path(directory, manifest, name).unlink(missing_ok=True)
+
+
+def _append_bytes(path: Path, expected_size: int, data: bytes) -> None:
+    """Append ``data`` at ``expected_size``, dropping any uncommitted tail."""
+    with open(path, "r+b") as f:
+        f.truncate(expected_size)
+        f.seek(expected_size)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _append_rows(
+    directory: Path,
+    manifest: Dict[str, Any],
+    quantized: np.ndarray,
+    scales: Optional[np.ndarray],
+    chunks: Sequence[Chunk],
+) -> int:
+    """Append already-quantized rows, committing them with the manifest."""
+    if len(quantized) != len(chunks):
+        raise ValueError(f"Got {len(quantized)} vectors for {len(chunks)} chunks")
+    count, metadata_bytes = manifest["count"], manifest["metadata_bytes"]
+    lines = [
+        (json.dumps(chunk.to_dict(), ensure_ascii=False) + "\n").encode("utf-8")
+        for chunk in chunks
+    ]
+    sizes = np.array([len(line) for line in lines], dtype=np.int64)
+    offsets = metadata_bytes + np.cumsum(sizes) - sizes
+
+    # Rows past the committed count belong to an interrupted append; overwrite them
+    row_bytes = manifest["dimension"] * np.dtype(manifest["dtype"]).itemsize
+    vectors_bytes = np.ascontiguousarray(quantized).tobytes()
+    def path(name: str) -> Path:
+        return _data_path(directory, manifest, name)
+
+    _append_bytes(path(VECTORS_FILE), count * row_bytes, vectors_bytes)
+    if scales is not None:
+        _append_bytes(path(SCALES_FILE), count * 4, np.asarray(scales, np.float32).tobytes())
+    _append_bytes(path(DELETED_FILE), count, bytes(len(chunks)))
+    _append_bytes(path(OFFSETS_FILE), count * 8, offsets.tobytes())
+    _append_bytes(path(METADATA_FILE), metadata_bytes, b"".join(lines))
+
+    manifest["count"] = count + len(chunks)
+    manifest["metadata_bytes"] = metadata_bytes + int(sizes.sum())
+    _write_json_atomic(directory / MANIFEST_FILE, manifest)
+    return manifest["count"]
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Benchmark RAG vector search: exact vs. IVF-flat.
+
+For each corpus size, builds an exact ``NumpyVectorIndex`` and an
+``IVFFlatIndex`` over the same vectors, then reports for every ``n_probe``
+setting the recall@k against exact search and the p50/p99 latency of
+single-query searches (one query per request, as in the chat endpoints).
+
+Corpora are synthetic clustered unit vectors by default, which behave like
+sentence embeddings of topical documents far better than uniform noise. Pass
+``--vectors`` with an ``.npy`` file (e.g. a saved ``vectors.npy``) to
+benchmark real embeddings instead; queries are then perturbed corpus rows.
+
+Usage (from the ``server`` directory):
+    python -m scripts.benchmark_ann --sizes 10000 100000 1000000 --n-probe 1 4 8 16 32
+
+Requirements: 4.2
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from rag.index import NumpyVectorIndex
+from rag.ivf import IVFFlatIndex, default_n_lists
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BenchmarkResult:
+    """Recall and latency for one index configuration."""
+    size: int
+    index: str
+    n_lists: int
+    n_probe: int
+    recall_at_k: float
+    p50_ms: float
+    p99_ms: float
+    build_s: float
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+
+
+def clustered_vectors(
+    n: int,
+    dimension: int,
+    n_topics: int,
+    spread: float,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Unit vectors drawn around ``n_topics`` random topic directions."""
+    topics = normalize(rng.standard_normal((n_topics, dimension)))
+    vectors = np.empty((n, dimension), dtype=np.float32)
+    block = 65536
+    for start in range(0, n, block):
+        end = min(start + block, n)
+        labels = rng.integers(0, n_topics, end - start)
+        noise = rng.standard_normal((end - start, dimension)).astype(np.float32)
+        vectors[start:end] = normalize(topics[labels] + spread * noise / np.sqrt(dimension))
+    return vectors
+
+
+def perturbed_queries(
+    corpus: np.ndarray,
+    n_queries: int,
+    spread: float,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Queries near random corpus rows (paraphrases of indexed passages)."""
+    rows = corpus[rng.integers(0, len(corpus), n_queries)]
+    noise = rng.standard_normal(rows.shape).astype(np.float32)
+    return normalize(rows + spread * noise / np.sqrt(corpus.shape[1]))
+
+
+def recall_at_k(found: np.ndarray, exact: np.ndarray) -> float:
+    """Fraction of the exact top-k ids that were returned."""
+    hits = sum(len(set(f[f >= 0]) & set(e[e >= 0])) for f, e in zip(found, exact))
+    total = sum(int((e >= 0).sum()) for e in exact)
+    return hits / total if total else 1.0
+
+
+def time_queries(index, queries: np.ndarray, k: int) -> tuple:
+    """Search one query at a time; returns (ids, p50 ms, p99 ms)."""
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    latencies = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids[i] = index.search(query[None, :], k)
+        latencies[i] = (time.perf_counter() - start) * 1000
+    return ids, float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))
+
+
+def benchmark_size(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    n_probes: List[int],
+    n_lists: Optional[int],
+) -> List[BenchmarkResult]:
+    """Benchmark exact search and IVF at every ``n_probe`` on one corpus."""
+    size, dimension = corpus.shape
+    results: List[BenchmarkResult] = []
+
+    exact_index = NumpyVectorIndex(dimension, corpus)
+    exact_ids, p50, p99 = time_queries(exact_index, queries, k)
+    results.append(BenchmarkResult(size, "exact", 0, 0, 1.0, p50, p99, 0.0))
+
+    start = time.perf_counter()
+    ivf = IVFFlatIndex(dimension, n_lists=n_lists or default_n_lists(size))
+    ivf.add(corpus)
+    ivf.build()
+    build_s = time.perf_counter() - start
+
+    for n_probe in n_probes:
+        if n_probe > ivf.n_lists:
+            continue
+        ivf.n_probe = n_probe
+        ids, p50, p99 = time_queries(ivf, queries, k)
+        results.append(
+            BenchmarkResult(
+                size, "ivf", ivf.n_lists, n_probe, recall_at_k(ids, exact_ids), p50, p99, build_s
+            )
+        )
+    return results
+
+
+def print_table(results: List[BenchmarkResult], k: int) -> None:
+    print(f"\n{'size':>9} {'index':>6} {'lists':>6} {'probe':>6} "
+          f"{f'recall@{k}':>10} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8}")
+    for r in results:
+        print(f"{r.size:>9} {r.index:>6} {r.n_lists:>6} {r.n_probe:>6} "
+              f"{r.recall_at_k:>10.3f} {r.p50_ms:>8.3f} {r.p99_ms:>8.3f} {r.build_s:>8.1f}")
+
+
+def main() -> int:
+    """Main entry point for the ANN benchmark."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark exact and IVF-flat vector search for RAG"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+        help="Corpus sizes (default: 10000 100000 1000000)",
+    )
+    parser.add_argument(
+        "--dimension",
+        type=int,
+        default=384,
+        help="Embedding dimension for synthetic corpora (default: 384)",
+    )
+    parser.add_argument(
+        "--vectors",
+        type=str,
+        help="Benchmark real embeddings from an .npy file (sizes are capped by its rows)",
+    )
+    parser.add_argument(
+        "--queries",
+        type=int,
+        default=500,
+        help="Number of queries per corpus (default: 500)",
+    )
+    parser.add_argument(
+        "--k",
+        type=int,
+        default=10,
+        help="Neighbours per query (default: 10)",
+    )
+    parser.add_argument(
+        "--n-probe",
+        type=int,
+        nargs="+",
+        default=[1, 4, 8, 16, 32, 64],
+        help="IVF n_probe values to evaluate (default: 1 4 8 16 32 64)",
+    )
+    parser.add_argument(
+        "--n-lists",
+        type=int,
+        help="IVF cluster count (default: about 4 * sqrt(size))",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed (default: 0)",
+    )
+    parser.add_argument(
+        "--json",
+        type=str,
+        help="Also write the results to this JSON file",
+    )
+
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    source = np.load(args.vectors, mmap_mode="r") if args.vectors else None
+
+    results: List[BenchmarkResult] = []
+    for size in args.sizes:
+        if source is not None:
+            size = min(size, len(source))
+            corpus = normalize(np.asarray(source[:size], dtype=np.float32))
+        else:
+            corpus = clustered_vectors(
+                size, args.dimension, n_topics=max(16, size // 500), spread=1.0, rng=rng
+            )
+        queries = perturbed_queries(corpus, args.queries, spread=0.5, rng=rng)
+        logger.info(f"Benchmarking {size} vectors of dimension {corpus.shape[1]}")
+        results.extend(benchmark_size(corpus, queries, args.k, args.n_probe, args.n_lists))
+
+    print_table(results, args.k)
+    if args.json:
+        Path(args.json).write_text(json.dumps([asdict(r) for r in results], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Load-generation benchmark for the chat API.
+
+Replays Arabic conversation traces against the FastAPI app and reports
+p50/p95/p99 request latency and time to first token, the per-request decode
+rate and the overall output token throughput.
+
+Without ``--url`` a server is started for the run (``uvicorn api.main:app``
+with ``USE_MOCK_TRITON=true`` and ``MOCK_TRITON_LATENCY`` set from
+``--mock-latency``), so every server-side change can be benchmarked on a
+laptop with no GPU: the mock client simulates prefill, decoding and the
+slowdown of a batched engine (see ``models.mock_latency``). Other settings
+are taken from the environment, e.g. ``SINGLE_FLIGHT_ENABLED=false``. The
+server runs in its own process so the load generator does not share its
+event loop; the in-process ASGI transport would also buffer SSE responses.
+
+A trace is a JSONL file with one conversation per line, either
+``{"id": ..., "user_id": ..., "turns": ["question", ...]}`` or a recorded
+request body ``{"user_id": ..., "messages": [...]}`` whose user messages
+become the turns. Turns of a conversation are sent in order, each with the
+previous answers and the session id, like the iOS app. Every replay of a
+conversation uses its own user id, so per-user rate limits apply per replay.
+
+Load is either closed-loop (``--concurrency`` conversations at a time) or
+open-loop (conversations started as a Poisson process so that requests
+arrive at about ``--qps`` per second).
+
+Usage (from the ``server`` directory):
+    python -m scripts.benchmark_chat --mock-latency a100 --concurrency 16 --conversations 300
+    python -m scripts.benchmark_chat --url http://localhost:8000 --qps 20
+
+Requirements: 3.2, 9.2
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+# One line per request would drown the report
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_TRACE = Path(__file__).resolve().parent / "traces" / "absher_sample.jsonl"
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class Conversation:
+    """A recorded conversation: the user's questions in order."""
+    id: str
+    user_id: str
+    turns: List[str]
+
+
+@dataclass
+class RequestRecord:
+    """Outcome and timing of one chat request."""
+    conversation: str
+    turn: int
+    status: int
+    latency_s: float
+    ttft_s: Optional[float] = None
+    completion_tokens: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200 and self.error is None
+
+
+@dataclass
+class BenchmarkReport:
+    """Summary of a benchmark run; times in milliseconds."""
+    requests: int
+    errors: int
+    duration_s: float
+    requests_per_s: float
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    ttft_ms: Dict[str, float] = field(default_factory=dict)
+    decode_tokens_per_s: Dict[str, float] = field(default_factory=dict)
+    output_tokens_per_s: float = 0.0
+    errors_by_status: Dict[str, int] = field(default_factory=dict)
+
+
+def load_trace(path: Path) -> List[Conversation]:
+    """Read conversations from a JSONL trace."""
+    conversations = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "turns" in entry:
+                turns = [str(turn) for turn in entry["turns"]]
+            else:
+                turns = [m["content"] for m in entry.get("messages", []) if m.get("role") == "user"]
+            if not turns:
+                raise ValueError(f"{path}:{line_no}: conversation without user turns")
+            conversations.append(
+                Conversation(
+                    id=str(entry.get("id", line_no)),
+                    user_id=str(entry.get("user_id", f"user-{line_no}")),
+                    turns=turns,
+                )
+            )
+    if not conversations:
+        raise ValueError(f"{path}: empty trace")
+    return conversations
+
+
+async def sse_events(response: httpx.Response) -> AsyncIterator[Tuple[str, str]]:
+    """``(event, data)`` pairs of a Server-Sent Events response."""
+    event, data = "message", []
+    async for line in response.aiter_lines():
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip())
+    if data:
+        yield event, "\n".join(data)
+
+
+async def send_stream(
+    client: httpx.AsyncClient, body: dict, record: RequestRecord
+) -> Tuple[str, Optional[str]]:
+    """POST to ``/v1/chat/stream``; returns ``(answer, session_id)``."""
+    start = time.perf_counter()
+    tokens: List[str] = []
+    session_id = None
+    async with client.stream("POST", "/v1/chat/stream", json=body) as response:
+        record.status = response.status_code
+        if response.status_code != 200:
+            await response.aread()
+            record.error = response.text[:200]
+        else:
+            async for event, data in sse_events(response):
+                if event == "token":
+                    if record.ttft_s is None:
+                        record.ttft_s = time.perf_counter() - start
+                    tokens.append(json.loads(data)["token"])
+                elif event == "done":
+                    done = json.loads(data)
+                    session_id = done.get("session_id")
+                    usage = done.get("usage") or {}
+                    record.completion_tokens = usage.get("completion_tokens", len(tokens))
+                elif event == "error":
+                    record.error = json.loads(data).get("error", "error")
+    record.latency_s = time.perf_counter() - start
+    return "".join(tokens), session_id
+
+
+async def send_chat(
+    client: httpx.AsyncClient, body: dict, record: RequestRecord
+) -> Tuple[str, Optional[str]]:
+    """POST to ``/v1/chat``; returns ``(answer, session_id)``."""
+    start = time.perf_counter()
+    response = await client.post("/v1/chat", json=body)
+    record.latency_s = time.perf_counter() - start
+    record.status = response.status_code
+    if response.status_code != 200:
+        record.error = response.text[:200]
+        return "", None
+    result = response.json()
+    record.ttft_s = record.latency_s
+    record.completion_tokens = (result.get("usage") or {}).get("completion_tokens", 0)
+    return result["response"], result.get("session_id")
+
+
+async def replay_conversation(
+    client: httpx.AsyncClient,
+    conversation: Conversation,
+    replay: int,
+    records: List[RequestRecord],
+    stream: bool = True,
+    think_s: float = 0.0,
+) -> None:
+    """Send the turns of a conversation in order; stops at the first failed turn."""
+    send = send_stream if stream else send_chat
+    messages: List[Dict[str, str]] = []
+    session_id = None
+    for turn, question in enumerate(conversation.turns):
+        if turn and think_s:
+            await asyncio.sleep(think_s)
+        messages.append({"role": "user", "content": question})
+        body: Dict[str, Any] = {"messages": messages, "user_id": f"{conversation.user_id}-{replay}"}
+        if session_id:
+            body["session_id"] = session_id
+        record = RequestRecord(conversation.id, turn, status=0, latency_s=0.0)
+        records.append(record)
+        try:
+            answer, session_id = await send(client, body, record)
+        except httpx.HTTPError as e:
+            record.error = f"{type(e).__name__}: {e}"
+        if not record.ok:
+            return
+        messages.append({"role": "assistant", "content": answer})
+
+
+def schedule(conversations: List[Conversation], count: int) -> Iterable[Tuple[int, Conversation]]:
+    """``count`` conversations cycling through the trace, numbered for distinct user ids."""
+    return enumerate(itertools.islice(itertools.cycle(conversations), count))
+
+
+async def run_closed_loop(
+    client: httpx.AsyncClient,
+    conversations: List[Conversation],
+    count: int,
+    concurrency: int,
+    **replay_args: Any,
+) -> List[RequestRecord]:
+    """Keep ``concurrency`` conversations in flight until ``count`` have run."""
+    records: List[RequestRecord] = []
+    work = iter(schedule(conversations, count))
+
+    async def worker() -> None:
+        for replay, conversation in work:
+            await replay_conversation(client, conversation, replay, records, **replay_args)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return records
+
+
+async def run_open_loop(
+    client: httpx.AsyncClient,
+    conversations: List[Conversation],
+    count: int,
+    qps: float,
+    rng: random.Random,
+    **replay_args: Any,
+) -> List[RequestRecord]:
+    """Start conversations as a Poisson process so requests arrive at about ``qps``."""
+    records: List[RequestRecord] = []
+    mean_turns = sum(len(c.turns) for c in conversations) / len(conversations)
+    rate = qps / mean_turns
+    tasks = []
+    for replay, conversation in schedule(conversations, count):
+        tasks.append(asyncio.ensure_future(
+            replay_conversation(client, conversation, replay, records, **replay_args)
+        ))
+        if replay < count - 1:
+            await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+    return records
+
+
+def percentiles(values: List[float], scale: float = 1.0) -> Dict[str, float]:
+    if not values:
+        return {}
+    points = np.percentile(np.asarray(values) * scale, PERCENTILES)
+    return {f"p{p}": float(v) for p, v in zip(PERCENTILES, points)}
+
+
+def summarize(records: List[RequestRecord], duration_s: float) -> BenchmarkReport:
+    """Aggregate request records into a report."""
+    ok = [r for r in records if r.ok]
+    errors_by_status: Dict[str, int] = {}
+    for r in records:
+        if not r.ok:
+            key = str(r.status) if r.status != 200 else (r.error or "error")
+            errors_by_status[key] = errors_by_status.get(key, 0) + 1
+    decode_rates = [
+        (r.completion_tokens - 1) / (r.latency_s - r.ttft_s)
+        for r in ok
+        if r.ttft_s is not None and r.completion_tokens > 1 and r.latency_s > r.ttft_s
+    ]
+    return BenchmarkReport(
+        requests=len(records),
+        errors=len(records) - len(ok),
+        duration_s=duration_s,
+        requests_per_s=len(records) / duration_s if duration_s > 0 else 0.0,
+        latency_ms=percentiles([r.latency_s for r in ok], 1000),
+        ttft_ms=percentiles([r.ttft_s for r in ok if r.ttft_s is not None], 1000),
+        decode_tokens_per_s=percentiles(decode_rates),
+        output_tokens_per_s=(
+            sum(r.completion_tokens for r in ok) / duration_s if duration_s > 0 else 0.0
+        ),
+        errors_by_status=errors_by_status,
+    )
+
+
+async def run_benchmark(
+    client: httpx.AsyncClient,
+    conversations: List[Conversation],
+    count: int,
+    concurrency: int = 8,
+    qps: Optional[float] = None,
+    seed: int = 0,
+    stream: bool = True,
+    think_s: float = 0.0,
+) -> BenchmarkReport:
+    """Replay ``count`` conversations against ``client`` and summarize the run."""
+    start = time.perf_counter()
+    if qps:
+        records = await run_open_loop(
+            client, conversations, count, qps, random.Random(seed), stream=stream, think_s=think_s
+        )
+    else:
+        records = await run_closed_loop(
+            client, conversations, count, concurrency, stream=stream, think_s=think_s
+        )
+    return summarize(records, time.perf_counter() - start)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, mock_latency: str) -> subprocess.Popen:
+    """Start the API with the mock Triton client in a child process."""
+    env = dict(os.environ, USE_MOCK_TRITON="true", MOCK_TRITON_LATENCY=mock_latency)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVER_DIR,
+        env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout_s: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server not ready after {timeout_s:.0f}s")
+
+
+def print_report(report: BenchmarkReport) -> None:
+    print(f"\nrequests {report.requests}  errors {report.errors}  "
+          f"duration {report.duration_s:.1f}s  throughput {report.requests_per_s:.2f} req/s  "
+          f"output {report.output_tokens_per_s:.1f} tok/s")
+    print(f"\n{'':>18} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, values in (
+        ("latency ms", report.latency_ms),
+        ("ttft ms", report.ttft_ms),
+        ("decode tok/s", report.decode_tokens_per_s),
+    ):
+        if values:
+            print(f"{name:>18} {values['p50']:>9.1f} {values['p95']:>9.1f} {values['p99']:>9.1f}")
+    if report.errors_by_status:
+        print(f"\nerrors: {report.errors_by_status}")
+
+
+async def main_async(args: argparse.Namespace) -> BenchmarkReport:
+    conversations = load_trace(Path(args.trace))
+    server = None
+    url = args.url
+    if url is None:
+        port = args.port or free_port()
+        url = f"http://127.0.0.1:{port}"
+        logger.info(f"Starting mock server on {url} (latency {args.mock_latency or 'none'})")
+        server = start_server(port, args.mock_latency)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    try:
+        async with httpx.AsyncClient(base_url=url, timeout=args.timeout_s, limits=limits) as client:
+            await wait_ready(client)
+            load = f"{args.qps} req/s" if args.qps else f"concurrency {args.concurrency}"
+            logger.info(f"Replaying {args.conversations} conversations from {args.trace} at {load}")
+            return await run_benchmark(
+                client,
+                conversations,
+                args.conversations,
+                concurrency=args.concurrency,
+                qps=args.qps,
+                seed=args.seed,
+                stream=args.endpoint == "stream",
+                think_s=args.think_s,
+            )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+
+def main() -> int:
+    """Main entry point for the chat benchmark."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the chat API by replaying conversation traces"
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=str(DEFAULT_TRACE),
+        help="JSONL conversation trace (default: scripts/traces/absher_sample.jsonl)",
+    )
+    parser.add_argument(
+        "--url",
+        type=str,
+        help="Benchmark a running server instead of starting one with the mock client",
+    )
+    parser.add_argument(
+        "--mock-latency",
+        type=str,
+        default="a100",
+        help="MOCK_TRITON_LATENCY of the started server (default: a100)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        help="Port of the started server (default: a free port)",
+    )
+    parser.add_argument(
+        "--endpoint",
+        choices=["stream", "chat"],
+        default="stream",
+        help="/v1/chat/stream or /v1/chat (default: stream)",
+    )
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Conversations in flight at a time (default: 8)",
+    )
+    load.add_argument(
+        "--qps",
+        type=float,
+        help="Target request rate with Poisson arrivals (open loop)",
+    )
+    parser.add_argument(
+        "--conversations",
+        type=int,
+        default=200,
+        help="Conversations to replay, cycling through the trace (default: 200)",
+    )
+    parser.add_argument(
+        "--think-s",
+        type=float,
+        default=0.0,
+        help="Pause between the turns of a conversation (default: 0)",
+    )
+    parser.add_argument(
+        "--timeout-s",
+        type=float,
+        default=120.0,
+        help="Per-request timeout (default: 120)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed for arrivals (default: 0)",
+    )
+    parser.add_argument(
+        "--json",
+        type=str,
+        help="Also write the report to this JSON file",
+    )
+
+    args = parser.parse_args()
+    report = asyncio.run(main_async(args))
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(asdict(report), indent=2))
+    return 1 if report.errors == report.requests else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark guardrails filter cost per KB of text.
+
+Measures the input filter on whole prompts and the output filter both on
+whole answers and incrementally (``StreamFilter``, fed word-sized tokens as
+``infer_stream`` produces them), for blocklists of several sizes. Text is
+synthetic Arabic service prose with occasional national IDs and phone
+numbers, so the redaction path is exercised too.
+
+Usage (from the ``server`` directory):
+    python -m scripts.benchmark_guardrails --sizes-kb 1 16 --blocklist-sizes 0 100 1000
+
+Requirements: 8.1, 8.3
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, List
+
+from guardrails import Guardrails, StreamFilter
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "يمكنك تجديد رخصة القيادة جواز السفر الهوية الوطنية عبر منصة أبشر "
+    "الإلكترونية بعد سداد الرسوم وإرفاق صورة حديثة ويرجى مراجعة أقرب مركز "
+    "مرور أو إدارة الجوازات خلال أوقات الدوام الرسمي"
+).split()
+LETTERS = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+
+
+@dataclass
+class BenchmarkResult:
+    """Filter cost for one mode, text size and blocklist size."""
+    mode: str
+    size_kb: int
+    blocklist: int
+    us_per_kb: float
+    mb_per_s: float
+
+
+def synthetic_text(size_kb: int, rng: random.Random) -> str:
+    """Arabic prose of about ``size_kb`` KB (UTF-8) with sprinkled PII."""
+    words: List[str] = []
+    size = 0
+    while size < size_kb * 1024:
+        roll = rng.random()
+        if roll < 0.005:
+            word = "1" + "".join(rng.choice("0123456789") for _ in range(9))
+        elif roll < 0.01:
+            word = "05" + "".join(rng.choice("0123456789") for _ in range(8))
+        else:
+            word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word.encode("utf-8")) + 1
+    return " ".join(words)
+
+
+def synthetic_terms(n: int, rng: random.Random) -> List[str]:
+    """Random Arabic pseudo-words to fill a blocklist."""
+    return ["".join(rng.choice(LETTERS) for _ in range(rng.randint(4, 9))) for _ in range(n)]
+
+
+def time_per_kb(run: Callable[[], None], size_kb: int, min_time_s: float) -> float:
+    """Repeat ``run`` for at least ``min_time_s``; returns microseconds per KB."""
+    run()
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        run()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time_s:
+            return elapsed / runs / size_kb * 1e6
+
+
+def benchmark(
+    size_kb: int, n_terms: int, min_time_s: float, rng: random.Random
+) -> List[BenchmarkResult]:
+    """Benchmark every filter mode on one text size and blocklist size."""
+    text = synthetic_text(size_kb, rng)
+    tokens = [word + " " for word in text.split(" ")]
+    guardrails = Guardrails.create(synthetic_terms(n_terms, rng))
+
+    def stream() -> None:
+        stream_filter = StreamFilter(guardrails.output)
+        for token in tokens:
+            stream_filter.feed(token)
+        stream_filter.finish()
+
+    modes = {
+        "input": lambda: guardrails.input.filter(text),
+        "output": lambda: guardrails.output.filter(text),
+        "stream": stream,
+    }
+    results = []
+    for mode, run in modes.items():
+        us = time_per_kb(run, size_kb, min_time_s)
+        results.append(BenchmarkResult(mode, size_kb, n_terms, us, 1e6 / us / 1024))
+    return results
+
+
+def print_table(results: List[BenchmarkResult]) -> None:
+    print(f"\n{'mode':>7} {'KB':>6} {'terms':>7} {'us/KB':>9} {'MB/s':>8}")
+    for r in results:
+        print(f"{r.mode:>7} {r.size_kb:>6} {r.blocklist:>7} {r.us_per_kb:>9.1f} {r.mb_per_s:>8.1f}")
+
+
+def main() -> int:
+    """Main entry point for the guardrails benchmark."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark guardrails filter cost per KB"
+    )
+    parser.add_argument(
+        "--sizes-kb",
+        type=int,
+        nargs="+",
+        default=[1, 16],
+        help="Text sizes in KB (default: 1 16)",
+    )
+    parser.add_argument(
+        "--blocklist-sizes",
+        type=int,
+        nargs="+",
+        default=[0, 100, 1000],
+        help="Blocked-term list sizes (default: 0 100 1000)",
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.5,
+        help="Minimum measuring time per configuration in seconds (default: 0.5)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed (default: 0)",
+    )
+    parser.add_argument(
+        "--json",
+        type=str,
+        help="Also write the results to this JSON file",
+    )
+
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    results: List[BenchmarkResult] = []
+    for n_terms in args.blocklist_sizes:
+        for size_kb in args.sizes_kb:
+            logger.info(f"Benchmarking {size_kb} KB with {n_terms} blocked terms")
+            results.extend(benchmark(size_kb, n_terms, args.min_time, rng))
+
+    print_table(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps([asdict(r) for r in results], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Build the RAG index for Absher service documents.
+
+Reads a JSONL file with one document per line (``document_id``,
+``service_category``, ``text`` and optional ``title``), chunks and embeds the
+documents in batches, and writes a memory-mappable index directory that the
+API server loads via ``RAG_INDEX_DIR``.
+
+By default the index is a quantized ``EmbeddingStore`` (int8 or float16);
+``--dtype float32`` writes a plain ``vectors.npy`` index instead and
+``--ivf`` a float32 IVF-flat ANN index (tune ``RAG_N_PROBE`` with
+``scripts/benchmark_ann.py``). Stores can
+be updated in place: ``--append`` re-indexes the given documents (replacing
+earlier versions with the same ``document_id``) and ``--compact`` drops
+replaced rows.
+
+A BM25 index over the same chunks is written alongside for hybrid retrieval
+unless ``--no-bm25`` is given. It is rebuilt whenever rows change, so
+``--append --no-bm25`` is refused for a store that already has one.
+
+Usage (from the ``server`` directory):
+    python -m scripts.build_rag_index --documents docs.jsonl --output-dir data/rag_index
+    python -m scripts.build_rag_index --documents new.jsonl --output-dir data/rag_index --append
+    python -m scripts.build_rag_index --output-dir data/rag_index --compact
+
+Requirements: 4.1, 4.2
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from rag.bm25 import BM25Index, is_bm25_index
+from rag.chunking import DEFAULT_MAX_CHARS, DEFAULT_OVERLAP_CHARS, Document
+from rag.embeddings import DEFAULT_EMBEDDING_MODEL, BatchingEmbedder, SentenceTransformerEmbedder
+from rag.index import NumpyVectorIndex
+from rag.ivf import IVFFlatIndex
+from rag.pipeline import RetrievalPipeline
+from rag.store import DEFAULT_STORE_DTYPE, SUPPORTED_DTYPES, EmbeddingStore, is_store
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def load_documents(path: Path) -> List[Document]:
+    """Read documents from a JSONL file."""
+    documents: List[Document] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            documents.append(
+                Document(
+                    document_id=str(data["document_id"]),
+                    service_category=data["service_category"],
+                    text=data["text"],
+                    title=data.get("title", ""),
+                )
+            )
+    return documents
+
+
+async def build_index(
+    documents: List[Document],
+    output_dir: Path,
+    model_name: str,
+    max_chars: int,
+    overlap_chars: int,
+    dtype: str = DEFAULT_STORE_DTYPE,
+    append: bool = False,
+    ivf: bool = False,
+    n_lists: Optional[int] = None,
+    bm25: bool = True,
+) -> int:
+    """Chunk, embed and save documents; returns the number of chunks."""
+    if append and not bm25 and is_bm25_index(output_dir):
+        # The BM25 index would keep the old rows and no longer match the store
+        raise ValueError(
+            f"{output_dir} has a BM25 index that must be rebuilt when appending; "
+            "omit --no-bm25"
+        )
+    embedder = BatchingEmbedder(SentenceTransformerEmbedder(model_name))
+    if append:
+        if not is_store(output_dir):
+            raise ValueError(f"{output_dir} is not an embedding store")
+        removed = EmbeddingStore.delete_documents(output_dir, [d.document_id for d in documents])
+        if removed:
+            logger.info(f"Replacing {removed} chunks of re-indexed documents")
+        index = EmbeddingStore.open(output_dir)
+    elif ivf:
+        index = IVFFlatIndex(embedder.dimension, n_lists=n_lists)
+    elif dtype == "float32":
+        index = NumpyVectorIndex(embedder.dimension)
+    else:
+        index = EmbeddingStore.build(output_dir, embedder.dimension, dtype=dtype)
+
+    pipeline = RetrievalPipeline(embedder, index)
+    count = await pipeline.add_documents(documents, max_chars, overlap_chars)
+    if bm25:
+        pipeline.rebuild_sparse()
+    pipeline.save(output_dir)
+    return count
+
+
+def main() -> int:
+    """Main entry point for index building."""
+    parser = argparse.ArgumentParser(
+        description="Build the RAG vector index for Absher service documents"
+    )
+    parser.add_argument(
+        "--documents",
+        type=str,
+        help="JSONL file with one document per line",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        required=True,
+        help="Output directory for the index (RAG_INDEX_DIR)",
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default=DEFAULT_EMBEDDING_MODEL,
+        help=f"sentence-transformers model (default: {DEFAULT_EMBEDDING_MODEL})",
+    )
+    parser.add_argument(
+        "--max-chars",
+        type=int,
+        default=DEFAULT_MAX_CHARS,
+        help=f"Maximum characters per chunk (default: {DEFAULT_MAX_CHARS})",
+    )
+    parser.add_argument(
+        "--overlap-chars",
+        type=int,
+        default=DEFAULT_OVERLAP_CHARS,
+        help=f"Characters shared by consecutive chunks (default: {DEFAULT_OVERLAP_CHARS})",
+    )
+    parser.add_argument(
+        "--dtype",
+        type=str,
+        choices=["float32", *SUPPORTED_DTYPES],
+        default=DEFAULT_STORE_DTYPE,
+        help=f"Stored embedding precision (default: {DEFAULT_STORE_DTYPE})",
+    )
+    parser.add_argument(
+        "--ivf",
+        action="store_true",
+        help="Build a float32 IVF-flat ANN index instead of an exact one",
+    )
+    parser.add_argument(
+        "--n-lists",
+        type=int,
+        help="IVF cluster count (default: about 4 * sqrt(chunks))",
+    )
+    parser.add_argument(
+        "--no-bm25",
+        action="store_true",
+        help="Skip the BM25 index (dense-only retrieval)",
+    )
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="Add documents to an existing store, replacing same-id documents",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Rewrite the store without deleted or replaced rows",
+    )
+
+    args = parser.parse_args()
+    if not args.documents and not args.compact:
+        parser.error("--documents is required unless only compacting")
+    output_dir = Path(args.output_dir)
+
+    try:
+        if args.documents:
+            documents = load_documents(Path(args.documents))
+            count = asyncio.run(
+                build_index(
+                    documents,
+                    output_dir,
+                    args.model,
+                    args.max_chars,
+                    args.overlap_chars,
+                    dtype=args.dtype,
+                    append=args.append,
+                    ivf=args.ivf,
+                    n_lists=args.n_lists,
+                    bm25=not args.no_bm25,
+                )
+            )
+            logger.info(f"Wrote {count} chunks from {len(documents)} documents to {output_dir}")
+        if args.compact:
+            logger.info(f"Store now holds {EmbeddingStore.compact(output_dir)} chunks")
+            if is_bm25_index(output_dir):
+                store = EmbeddingStore.open(output_dir)
+                BM25Index.from_texts(chunk.text for chunk in store.chunks).save(output_dir)
+    except Exception as e:
+        logger.error(f"Index build failed: {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,17 +5,50 @@ Convert Allam model to TensorRT-LLM format.
 This script converts the Allam Arabic LLM to TensorRT-LLM engine format
 for optimized inference on NVIDIA GPUs via Triton Inference Server.
 
+With ``--draft-model-dir`` it also builds a small draft engine for
+draft-target speculative decoding. The draft proposes up to
+``--max-draft-len`` tokens per step and Allam verifies them in one forward
+pass. Accepted tokens cost one target step instead of one each, which cuts
+the decode latency of a single stream. The target engine is built to
+accept external draft tokens. Triton serves the pair through the
+``tensorrt_llm_bls`` model, with the draft as ``allam_draft``. Draft
+tokens are verified as Allam token ids, so the draft must share Allam's
+vocabulary. The Phi-3 model from ``ABSHER/training`` (32064 tokens) does
+not, and is rejected.
+
+Each step runs as a subprocess whose output is streamed to the log. It is
+killed with its child processes after ``--timeout`` seconds, and a
+non-zero exit fails the conversion. A step is skipped when its output
+directory holds a fingerprint of the same inputs: a SHA-256 over the
+content of the HuggingFace checkpoint (for the checkpoint conversion) or
+of the converted checkpoint (for the engine build), plus the step's
+command. Redeploying unchanged weights with unchanged build options then
+costs one hash of the weights instead of a rebuild. Changing a build
+option only rebuilds the engine. ``--workers`` hashes files in parallel,
+converts and builds the shards of ``--tensor-parallel`` ranks in parallel,
+and runs the draft pipeline alongside Allam's.
+
 Requirements: 2.1, 2.2, 2.3
 """
 
 import argparse
+import hashlib
+import json
 import logging
 import os
+import shlex
+import shutil
+import signal
+import subprocess
 import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Deque, List, Optional, Set
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,6 +56,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_DRAFT_LEN = 4
+MAX_DRAFT_LEN = 16
+DEFAULT_COMMAND_TIMEOUT_S = 4 * 3600.0
+# Written into a step's output directory once the step succeeds
+FINGERPRINT_FILE = ".fingerprint"
+_HASH_CHUNK_BYTES = 1 << 20
+# Output lines kept for the error of a failed command
+_ERROR_TAIL_LINES = 20
+
+# Commands started by run_command that have not exited yet
+_running: Set[subprocess.Popen] = set()
+_running_lock = threading.Lock()
+
+
+class CommandError(RuntimeError):
+    """A conversion command could not start, failed or timed out."""
+
 
 class QuantizationType(Enum):
     """Supported quantization types for model optimization."""
@@ -52,39 +102,209 @@ class ConversionConfig:
     max_beam_width: int
     tensor_parallel_size: int
     use_inflight_batching: bool
-    
+    # Reuse KV-cache blocks across requests sharing a prompt prefix
+    enable_kv_cache_reuse: bool = True
+    tokens_per_block: int = 64
+    # Draft model for speculative decoding (None builds Allam alone)
+    draft_model_dir: Optional[Path] = None
+    max_draft_len: int = DEFAULT_MAX_DRAFT_LEN
+    # Parallel file hashes, rank shards and draft/target pipelines
+    workers: int = 1
+    # Per command; None waits indefinitely
+    command_timeout_s: Optional[float] = DEFAULT_COMMAND_TIMEOUT_S
+    # Rerun every step even if its inputs are unchanged
+    force: bool = False
+
+    @property
+    def speculative(self) -> bool:
+        """Whether a draft engine is built alongside Allam."""
+        return self.draft_model_dir is not None
+
     def validate(self) -> None:
         """Validate configuration parameters."""
         if not self.model_dir.exists():
             raise ValueError(f"Model directory does not exist: {self.model_dir}")
-        
+
         if self.max_batch_size < 1 or self.max_batch_size > 256:
             raise ValueError("max_batch_size must be between 1 and 256")
-        
+
         if self.max_input_len < 1 or self.max_input_len > 32768:
             raise ValueError("max_input_len must be between 1 and 32768")
-        
+
         if self.max_output_len < 1 or self.max_output_len > 8192:
             raise ValueError("max_output_len must be between 1 and 8192")
-        
+
         if self.tensor_parallel_size < 1:
             raise ValueError("tensor_parallel_size must be at least 1")
 
+        if self.workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        if self.command_timeout_s is not None and self.command_timeout_s <= 0:
+            raise ValueError("command_timeout_s must be positive")
+
+        if self.tokens_per_block < 1 or self.tokens_per_block & (self.tokens_per_block - 1):
+            raise ValueError("tokens_per_block must be a power of two")
+
+        if self.enable_kv_cache_reuse and not self.use_inflight_batching:
+            raise ValueError(
+                "enable_kv_cache_reuse requires the paged KV cache of inflight batching"
+            )
+
+        if self.speculative:
+            if not self.draft_model_dir.exists():
+                raise ValueError(f"Draft model directory does not exist: {self.draft_model_dir}")
+            if self.max_draft_len < 1 or self.max_draft_len > MAX_DRAFT_LEN:
+                raise ValueError(f"max_draft_len must be between 1 and {MAX_DRAFT_LEN}")
+            if self.max_beam_width != 1:
+                raise ValueError("Speculative decoding requires max_beam_width 1")
+            if not self.use_inflight_batching:
+                raise ValueError("Speculative decoding requires inflight batching")
+            target_vocab = vocab_size(self.model_dir)
+            draft_vocab = vocab_size(self.draft_model_dir)
+            if target_vocab is not None and draft_vocab is not None and target_vocab != draft_vocab:
+                raise ValueError(
+                    f"Draft model vocabulary ({draft_vocab} tokens) differs from the target's "
+                    f"({target_vocab} tokens); draft tokens must be target token ids"
+                )
+
+
+def vocab_size(model_dir: Path) -> Optional[int]:
+    """``vocab_size`` from a HuggingFace model's config.json, if it has one."""
+    config_path = model_dir / "config.json"
+    if not config_path.exists():
+        return None
+    return json.loads(config_path.read_text()).get("vocab_size")
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def directory_fingerprint(directory: Path, workers: int = 1) -> str:
+    """
+    SHA-256 over the relative path and content of every file in a directory.
+
+    Hidden files and directories (fingerprints, ``.cache``, ``.git``) are
+    skipped. Files are hashed by ``workers`` threads.
+    """
+    files = sorted(
+        path for path in directory.rglob("*")
+        if path.is_file()
+        and not any(part.startswith(".") for part in path.relative_to(directory).parts)
+    )
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = list(pool.map(_file_digest, files))
+    digest = hashlib.sha256()
+    for path, file_digest in zip(files, digests):
+        digest.update(f"{path.relative_to(directory).as_posix()}\0{file_digest}\n".encode())
+    return digest.hexdigest()
+
+
+def _kill(process: subprocess.Popen) -> None:
+    """Kill a command's process group."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def kill_running_commands() -> None:
+    """Kill every command ``run_command`` is still waiting for."""
+    with _running_lock:
+        processes = list(_running)
+    for process in processes:
+        _kill(process)
+
+
+def run_command(command: str, timeout_s: Optional[float] = None, name: str = "") -> None:
+    """
+    Run a command, streaming its output to the log line by line.
+
+    The command runs in its own process group, so a timeout or an interrupt
+    also kills the processes it started (e.g. one per tensor-parallel rank).
+
+    Args:
+        command: Command line, split with shell quoting rules (no shell runs it).
+        timeout_s: Seconds before the command is killed (None waits indefinitely).
+        name: Prefix of the logged output lines.
+
+    Raises:
+        CommandError: If the command cannot start, exits non-zero or times out.
+    """
+    label = name or shlex.split(command)[0]
+    tail: Deque[str] = deque(maxlen=_ERROR_TAIL_LINES)
+    try:
+        process = subprocess.Popen(
+            shlex.split(command),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+            start_new_session=True,
+        )
+    except OSError as e:
+        raise CommandError(f"{label} could not start: {e}") from e
+    with _running_lock:
+        _running.add(process)
+
+    def forward() -> None:
+        for line in process.stdout:
+            line = line.rstrip()
+            tail.append(line)
+            logger.info(f"[{label}] {line}")
+
+    reader = threading.Thread(target=forward, daemon=True)
+    reader.start()
+    try:
+        returncode = process.wait(timeout=timeout_s)
+    except BaseException as e:
+        _kill(process)
+        process.wait()
+        reader.join(timeout=5)
+        if isinstance(e, subprocess.TimeoutExpired):
+            raise CommandError(f"{label} timed out after {timeout_s:g}s") from e
+        raise
+    finally:
+        with _running_lock:
+            _running.discard(process)
+    reader.join()
+    if returncode != 0:
+        output = "\n".join(tail)
+        raise CommandError(f"{label} exited with code {returncode}:\n{output}")
+
 
 
 class AllamModelConverter:
     """
     Converter for Allam Arabic LLM to TensorRT-LLM format.
-    
+
     This class handles the conversion of the Allam model (based on LLaMA architecture)
     to an optimized TensorRT-LLM engine for deployment on NVIDIA GPUs.
     """
-    
-    def __init__(self, config: ConversionConfig):
-        """Initialize the converter with configuration."""
+
+    def __init__(
+        self,
+        config: ConversionConfig,
+        runner: Callable[[str, Optional[float], str], None] = run_command,
+    ):
+        """
+        Initialize the converter with configuration.
+
+        Args:
+            config: Conversion configuration.
+            runner: Runs one command with a timeout and a log name, raising
+                on failure (``run_command`` unless replaced in tests).
+        """
         self.config = config
+        self.runner = runner
+        self._cancelled = threading.Event()
         self._validate_environment()
-    
+
     def _validate_environment(self) -> None:
         """Validate that required dependencies are available."""
         try:
@@ -94,7 +314,7 @@ class AllamModelConverter:
             logger.warning(
                 "TensorRT-LLM not installed. Install with: pip install tensorrt-llm"
             )
-    
+
     def _get_quantization_config(self) -> dict:
         """Get quantization configuration based on selected type."""
         configs = {
@@ -120,11 +340,11 @@ class AllamModelConverter:
             },
         }
         return configs[self.config.quantization]
-    
+
     def _get_builder_config(self) -> dict:
         """Get TensorRT builder configuration."""
         quant_config = self._get_quantization_config()
-        
+
         return {
             "precision": quant_config["dtype"],
             "max_batch_size": self.config.max_batch_size,
@@ -133,75 +353,132 @@ class AllamModelConverter:
             "max_beam_width": self.config.max_beam_width,
             "tensor_parallel": self.config.tensor_parallel_size,
             "use_inflight_batching": self.config.use_inflight_batching,
+            "enable_kv_cache_reuse": self.config.enable_kv_cache_reuse,
+            "tokens_per_block": self.config.tokens_per_block,
+            "max_draft_len": self.config.max_draft_len if self.config.speculative else 0,
             "use_weight_only": quant_config["use_weight_only"],
             "weight_only_precision": quant_config["weight_only_precision"],
         }
-    
-    def convert_checkpoint(self) -> Path:
+
+    def _rank_workers(self) -> int:
+        """Processes converting or building the shards of the tensor-parallel ranks."""
+        return min(self.config.workers, self.config.tensor_parallel_size)
+
+    def _run_step(self, name: str, command: str, output_dir: Path, source_fingerprint: str) -> None:
+        """
+        Run a conversion step unless ``output_dir`` was built from the same inputs.
+
+        The step's fingerprint covers its source and its command. It is
+        written only after the command succeeds, so an interrupted or failed
+        step reruns. A rerun starts from an empty directory, so no shards of
+        an older build (e.g. of more ranks) are left behind.
+        """
+        fingerprint = hashlib.sha256(f"{source_fingerprint}\n{command}".encode()).hexdigest()
+        stamp = output_dir / FINGERPRINT_FILE
+        if not self.config.force and stamp.exists() and stamp.read_text().strip() == fingerprint:
+            logger.info(f"{name}: inputs unchanged, reusing {output_dir}")
+            return
+
+        if self._cancelled.is_set():
+            raise CommandError(f"{name} cancelled")
+        if output_dir.exists():
+            shutil.rmtree(output_dir)
+        output_dir.mkdir(parents=True)
+        logger.info(f"{name} command: {command}")
+        start = time.perf_counter()
+        self.runner(command, self.config.command_timeout_s, name)
+        stamp.write_text(fingerprint)
+        logger.info(f"{name} finished in {time.perf_counter() - start:.1f}s")
+
+    def _output_root(self, draft: bool) -> Path:
+        """Output directory of the target engine, or of the draft engine."""
+        return self.config.output_dir / "draft" if draft else self.config.output_dir
+
+    def convert_checkpoint(self, draft: bool = False) -> Path:
         """
         Convert HuggingFace checkpoint to TensorRT-LLM format.
-        
+
+        Args:
+            draft: Convert the draft model instead of Allam.
+
         Returns:
             Path to the converted checkpoint directory.
         """
-        logger.info(f"Converting checkpoint from {self.config.model_dir}")
-        
-        checkpoint_dir = self.config.output_dir / "checkpoint"
-        checkpoint_dir.mkdir(parents=True, exist_ok=True)
-        
+        model_dir = self.config.draft_model_dir if draft else self.config.model_dir
+        logger.info(f"Converting checkpoint from {model_dir}")
+
+        checkpoint_dir = self._output_root(draft) / "checkpoint"
+
         # Build conversion command for TensorRT-LLM
         # Allam is based on LLaMA architecture
-        convert_cmd = self._build_checkpoint_convert_command(checkpoint_dir)
-        
-        logger.info(f"Checkpoint conversion command: {convert_cmd}")
+        convert_cmd = self._build_checkpoint_convert_command(checkpoint_dir, model_dir)
+
+        name = "Draft checkpoint conversion" if draft else "Checkpoint conversion"
+        source = directory_fingerprint(model_dir, self.config.workers)
+        self._run_step(name, convert_cmd, checkpoint_dir, source)
         logger.info(f"Checkpoint saved to: {checkpoint_dir}")
-        
+
         return checkpoint_dir
-    
-    def _build_checkpoint_convert_command(self, output_dir: Path) -> str:
-        """Build the checkpoint conversion command."""
+
+    def _build_checkpoint_convert_command(
+        self, output_dir: Path, model_dir: Optional[Path] = None
+    ) -> str:
+        """Build the checkpoint conversion command (of Allam unless ``model_dir`` is given)."""
         quant_config = self._get_quantization_config()
-        
+
         cmd_parts = [
             "python -m tensorrt_llm.commands.convert_checkpoint",
-            f"--model_dir {self.config.model_dir}",
+            f"--model_dir {model_dir or self.config.model_dir}",
             f"--output_dir {output_dir}",
             f"--dtype {quant_config['dtype']}",
             f"--tp_size {self.config.tensor_parallel_size}",
         ]
-        
+
+        if self._rank_workers() > 1:
+            # Convert the shards of the ranks in parallel
+            cmd_parts.append(f"--workers {self._rank_workers()}")
+
         if quant_config["use_weight_only"]:
             cmd_parts.append("--use_weight_only")
             cmd_parts.append(f"--weight_only_precision {quant_config['weight_only_precision']}")
-        
+
         return " ".join(cmd_parts)
-    
-    def build_engine(self, checkpoint_dir: Path) -> Path:
+
+    def build_engine(self, checkpoint_dir: Path, draft: bool = False) -> Path:
         """
         Build TensorRT engine from converted checkpoint.
-        
+
         Args:
             checkpoint_dir: Path to the converted checkpoint.
-            
+            draft: Build the draft engine instead of Allam's.
+
         Returns:
             Path to the built engine directory.
         """
-        logger.info("Building TensorRT-LLM engine...")
-        
-        engine_dir = self.config.output_dir / "engine"
-        engine_dir.mkdir(parents=True, exist_ok=True)
-        
-        build_cmd = self._build_engine_command(checkpoint_dir, engine_dir)
-        
-        logger.info(f"Engine build command: {build_cmd}")
+        logger.info(f"Building TensorRT-LLM {'draft ' if draft else ''}engine...")
+
+        engine_dir = self._output_root(draft) / "engine"
+
+        build_cmd = self._build_engine_command(checkpoint_dir, engine_dir, draft)
+
+        # A checkpoint converted here carries the fingerprint of its content
+        stamp = checkpoint_dir / FINGERPRINT_FILE
+        if stamp.exists():
+            source = stamp.read_text().strip()
+        else:
+            source = directory_fingerprint(checkpoint_dir, self.config.workers)
+        name = "Draft engine build" if draft else "Engine build"
+        self._run_step(name, build_cmd, engine_dir, source)
         logger.info(f"Engine saved to: {engine_dir}")
-        
+
         return engine_dir
-    
-    def _build_engine_command(self, checkpoint_dir: Path, engine_dir: Path) -> str:
-        """Build the engine build command."""
+
+    def _build_engine_command(
+        self, checkpoint_dir: Path, engine_dir: Path, draft: bool = False
+    ) -> str:
+        """Build the engine build command (of the draft engine if ``draft``)."""
         builder_config = self._get_builder_config()
-        
+
         cmd_parts = [
             "trtllm-build",
             f"--checkpoint_dir {checkpoint_dir}",
@@ -213,35 +490,72 @@ class AllamModelConverter:
             f"--gemm_plugin {builder_config['precision']}",
             f"--gpt_attention_plugin {builder_config['precision']}",
         ]
-        
+
         if builder_config["use_inflight_batching"]:
+            # Paged context FMHA lets a prefill attend to reused KV blocks
+            # (enable_kv_cache_reuse in allam_tensorrt/config.pbtxt)
             cmd_parts.extend([
                 "--paged_kv_cache enable",
                 "--remove_input_padding enable",
                 "--use_paged_context_fmha enable",
             ])
-        
+
+        if builder_config["enable_kv_cache_reuse"]:
+            # Reuse granularity: only whole blocks of a shared prefix are reused
+            cmd_parts.append(f"--tokens_per_block {builder_config['tokens_per_block']}")
+
+        if self._rank_workers() > 1:
+            # Build the engines of the ranks in parallel
+            cmd_parts.append(f"--workers {self._rank_workers()}")
+
+        if builder_config["max_draft_len"] and not draft:
+            # The target takes up to max_draft_len draft tokens per request
+            # (draft_input_ids) and verifies them in one generation step
+            cmd_parts.extend([
+                "--speculative_decoding_mode draft_tokens_external",
+                f"--max_draft_len {builder_config['max_draft_len']}",
+            ])
+
         return " ".join(cmd_parts)
-    
+
     def convert(self) -> Path:
         """
         Run the full conversion pipeline.
-        
+
         Returns:
             Path to the final engine directory.
         """
         logger.info("Starting Allam model conversion to TensorRT-LLM")
         logger.info(f"Configuration: {self.config}")
-        
+
         self.config.validate()
         self.config.output_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Step 1: Convert checkpoint
-        checkpoint_dir = self.convert_checkpoint()
-        
-        # Step 2: Build engine
-        engine_dir = self.build_engine(checkpoint_dir)
-        
+
+        def pipelines(drafts: List[bool]) -> List[Path]:
+            engine_dirs = []
+            for draft in drafts:
+                # Step 1: Convert checkpoint
+                checkpoint_dir = self.convert_checkpoint(draft=draft)
+                # Step 2: Build engine
+                engine_dirs.append(self.build_engine(checkpoint_dir, draft=draft))
+            return engine_dirs
+
+        # Step 3: Convert and build the draft engine, alongside Allam's with workers
+        drafts = [False, True] if self.config.speculative else [False]
+        groups = [[draft] for draft in drafts] if self.config.workers > 1 else [drafts]
+        self._cancelled.clear()
+        with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+            try:
+                engine_dirs = [path for group in pool.map(pipelines, groups) for path in group]
+            except BaseException:
+                # A failure or an interrupt stops the other pipeline too
+                self._cancelled.set()
+                kill_running_commands()
+                raise
+        engine_dir = engine_dirs[0]
+        if self.config.speculative:
+            logger.info(f"Draft engine at: {engine_dirs[1]}")
+
         logger.info(f"Conversion complete! Engine at: {engine_dir}")
         return engine_dir
 
@@ -322,14 +636,59 @@ def main() -> int:
         default=1,
         help="Tensor parallel size (default: 1)",
     )
+    parser.add_argument(
+        "--no-kv-cache-reuse",
+        action="store_true",
+        help="Build without KV-cache block reuse across requests",
+    )
+    parser.add_argument(
+        "--tokens-per-block",
+        type=int,
+        default=64,
+        help="KV-cache block size in tokens, the granularity of prefix reuse (default: 64)",
+    )
+    parser.add_argument(
+        "--draft-model-dir",
+        type=str,
+        help="Draft model (HuggingFace format, Allam's vocabulary) for speculative decoding",
+    )
+    parser.add_argument(
+        "--max-draft-len",
+        type=int,
+        default=DEFAULT_MAX_DRAFT_LEN,
+        help=f"Draft tokens verified per target step (default: {DEFAULT_MAX_DRAFT_LEN})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "Parallel file hashes, tensor-parallel rank shards and draft/target builds "
+            "(default: 1)"
+        ),
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_COMMAND_TIMEOUT_S,
+        help=(
+            "Seconds before a conversion command is killed, 0 for none "
+            f"(default: {DEFAULT_COMMAND_TIMEOUT_S:g})"
+        ),
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rerun every step even if its inputs are unchanged",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
         help="Print commands without executing",
     )
-    
+
     args = parser.parse_args()
-    
+
     config = ConversionConfig(
         model_dir=Path(args.model_dir),
         output_dir=Path(args.output_dir),
@@ -341,24 +700,42 @@ def main() -> int:
         max_beam_width=1,
         tensor_parallel_size=args.tensor_parallel,
         use_inflight_batching=True,
+        enable_kv_cache_reuse=not args.no_kv_cache_reuse,
+        tokens_per_block=args.tokens_per_block,
+        draft_model_dir=Path(args.draft_model_dir) if args.draft_model_dir else None,
+        max_draft_len=args.max_draft_len,
+        workers=args.workers,
+        command_timeout_s=args.timeout or None,
+        force=args.force,
     )
-    
+
     converter = AllamModelConverter(config)
-    
+
     if args.dry_run:
         logger.info("Dry run mode - printing commands only")
         config.output_dir.mkdir(parents=True, exist_ok=True)
         checkpoint_dir = config.output_dir / "checkpoint"
         engine_dir = config.output_dir / "engine"
-        
+
         print("\n=== Checkpoint Conversion Command ===")
         print(converter._build_checkpoint_convert_command(checkpoint_dir))
-        
+
         print("\n=== Engine Build Command ===")
         print(converter._build_engine_command(checkpoint_dir, engine_dir))
-        
+
+        if config.speculative:
+            draft_root = config.output_dir / "draft"
+            print("\n=== Draft Checkpoint Conversion Command ===")
+            print(converter._build_checkpoint_convert_command(
+                draft_root / "checkpoint", config.draft_model_dir
+            ))
+            print("\n=== Draft Engine Build Command ===")
+            print(converter._build_engine_command(
+                draft_root / "checkpoint", draft_root / "engine", draft=True
+            ))
+
         return 0
-    
+
     try:
         converter.convert()
         return 0
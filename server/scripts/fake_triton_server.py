@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+Fake Triton Inference Server speaking the real gRPC protocol.
+
+``MockTritonClient`` replaces ``TritonClient`` entirely, so the channel pool,
+micro-batching, tensor encoding and stream handling are never exercised
+without a GPU. This server implements the parts of Triton's
+``GRPCInferenceService`` that ``TritonClient`` uses, for the ``ensemble``
+model's tensors:
+
+- ``ServerLive``, ``ServerReady`` and ``ModelReady``.
+- ``ModelInfer``: a ``[B, 1]`` ``text_input`` batch with the sampling
+  parameter tensors; returns ``text_output``, ``input_lengths`` and
+  ``sequence_length`` (prompt included) per row.
+- ``ModelStreamInfer``: one response per generated token, each with its
+  ``text_output`` piece and ``sequence_length`` 1, as the decoupled
+  TensorRT-LLM model streams.
+
+Answers are the mock client's canned answers (``mock_response``). Text is
+split into tokens the way ``estimate_tokens`` counts them, so the reported
+lengths agree with the client's fallback counter.
+
+Generation runs on ``FakeEngine``, a simulation of the in-flight batching
+scheduler of ``allam_tensorrt``. Its ``max_batch_size`` and
+``max_tokens_in_paged_kv_cache`` are read from the model's config.pbtxt.
+Every iteration advances all running sequences by one token and admits
+waiting ones while the batch and the KV cache have room. A running sequence
+holds the KV cache of its prompt and its tokens so far. When the cache
+runs out, the newest sequence is paused and later resumed with its context
+recomputed, like the ``max_utilization`` scheduler policy. A cancelled
+stream frees its slot at the next iteration. Iteration time comes from a
+``LatencyModel`` (see ``models.mock_latency``).
+
+Usage (from the ``server`` directory):
+    python -m scripts.fake_triton_server --port 8001 --latency a100
+    TRITON_URL=localhost:8001 uvicorn api.main:app
+
+Requirements: 3.2, 9.2
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import re
+import sys
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+import grpc
+import numpy as np
+from tritonclient.grpc import service_pb2, service_pb2_grpc
+from tritonclient.utils import deserialize_bytes_tensor, serialize_byte_tensor, triton_to_np_dtype
+
+from models import ALLAM_MODEL_NAME, ENSEMBLE_MODEL_NAME, TRITON_MODEL_REPOSITORY
+from models.mock_latency import LATENCY_PRESETS, LatencyModel, parse_latency_model
+from models.triton_client import mock_response
+from models.usage import ESTIMATE_CHARS_PER_TOKEN, estimate_tokens
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+ENGINE_CONFIG = TRITON_MODEL_REPOSITORY / ALLAM_MODEL_NAME / "config.pbtxt"
+
+# Whitespace is kept with the piece after it, so the pieces join to the text
+_TOKEN_PIECES = re.compile(r"\s*(?:\w+|[^\w\s])")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into token pieces, as many as ``estimate_tokens`` counts."""
+    pieces = []
+    for match in _TOKEN_PIECES.finditer(text):
+        piece = match.group()
+        body = piece.lstrip()
+        lead = piece[:len(piece) - len(body)]
+        step = ESTIMATE_CHARS_PER_TOKEN
+        chunks = [body[i:i + step] for i in range(0, len(body), step)]
+        chunks[0] = lead + chunks[0]
+        pieces.extend(chunks)
+    return pieces
+
+
+def engine_limits(config_path: Path = ENGINE_CONFIG) -> Tuple[int, int]:
+    """``(max_batch_size, max_tokens_in_paged_kv_cache)`` of a TensorRT-LLM model config."""
+    text = config_path.read_text()
+    batch = re.search(r"^max_batch_size:\s*(\d+)", text, re.MULTILINE)
+    kv_cache = re.search(
+        r'key:\s*"max_tokens_in_paged_kv_cache"\s*value:\s*\{\s*string_value:\s*"(\d+)"', text
+    )
+    if batch is None or kv_cache is None:
+        raise ValueError(f"{config_path}: max_batch_size or max_tokens_in_paged_kv_cache missing")
+    return int(batch.group(1)), int(kv_cache.group(1))
+
+
+@dataclass
+class Sequence:
+    """One generation in the fake engine."""
+    prompt_tokens: int
+    pieces: List[str]
+    output: "asyncio.Queue[Optional[str]]" = field(default_factory=asyncio.Queue)
+    emitted: int = 0
+    prefilled: bool = False
+    cancelled: bool = False
+
+    @property
+    def kv_tokens(self) -> int:
+        """KV-cache tokens held while running: prompt and tokens so far."""
+        return self.prompt_tokens + self.emitted
+
+
+class FakeEngine:
+    """Iteration-level (in-flight) batching scheduler with a paged KV-cache budget."""
+
+    def __init__(
+        self,
+        max_batch_size: int = 8,
+        kv_cache_tokens: int = 2560,
+        latency: Optional[LatencyModel] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Initialize the engine (its loop starts with the first request).
+
+        Args:
+            max_batch_size: Sequences decoded per iteration
+            kv_cache_tokens: KV-cache capacity in tokens
+            latency: Prefill and step timing (instant when None)
+            seed: Seed of the latency jitter
+        """
+        if max_batch_size < 1 or kv_cache_tokens < 1:
+            raise ValueError("max_batch_size and kv_cache_tokens must be at least 1")
+        self.max_batch_size = max_batch_size
+        self.kv_cache_tokens = kv_cache_tokens
+        self.latency = latency or LATENCY_PRESETS["instant"]
+        self.waiting: Deque[Sequence] = deque()
+        self.running: List[Sequence] = []
+        self.iterations = 0
+        self.peak_batch = 0
+        self.peak_kv_tokens = 0
+        self.preempted = 0
+        self._rng = random.Random(seed)
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, config_path: Path = ENGINE_CONFIG, **kwargs) -> "FakeEngine":
+        max_batch_size, kv_cache_tokens = engine_limits(config_path)
+        return cls(max_batch_size=max_batch_size, kv_cache_tokens=kv_cache_tokens, **kwargs)
+
+    @property
+    def kv_tokens_in_use(self) -> int:
+        return sum(s.kv_tokens for s in self.running)
+
+    def submit(self, prompt_tokens: int, pieces: List[str]) -> Sequence:
+        """Queue a generation; its pieces, then None, arrive on ``output``."""
+        sequence = Sequence(prompt_tokens, pieces)
+        self.waiting.append(sequence)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return sequence
+
+    def _finish(self, sequence: Sequence) -> None:
+        self.running.remove(sequence)
+        sequence.output.put_nowait(None)
+
+    def _schedule(self) -> List[Sequence]:
+        """Drop cancelled sequences, pause over the KV budget and admit waiting ones."""
+        for sequence in [s for s in self.running if s.cancelled]:
+            self._finish(sequence)
+        # Each running sequence needs room for its next token
+        while (
+            len(self.running) > 1
+            and self.kv_tokens_in_use + len(self.running) > self.kv_cache_tokens
+        ):
+            paused = self.running.pop()
+            paused.prefilled = False
+            self.waiting.appendleft(paused)
+            self.preempted += 1
+        admitted = []
+        while self.waiting and len(self.running) < self.max_batch_size:
+            sequence = self.waiting[0]
+            if sequence.cancelled:
+                self.waiting.popleft()
+                sequence.output.put_nowait(None)
+                continue
+            # A sequence larger than the whole cache still runs, alone
+            needed = self.kv_tokens_in_use + sequence.kv_tokens + 1
+            if self.running and needed > self.kv_cache_tokens:
+                break
+            self.waiting.popleft()
+            self.running.append(sequence)
+            admitted.append(sequence)
+        return admitted
+
+    async def _run(self) -> None:
+        while self.running or self.waiting:
+            admitted = self._schedule()
+            if not self.running:
+                if self.waiting:
+                    continue
+                break
+            batch = len(self.running)
+            self.peak_batch = max(self.peak_batch, batch)
+            self.peak_kv_tokens = max(self.peak_kv_tokens, self.kv_tokens_in_use)
+            # Context phase of new (or resumed) sequences runs in the same iteration
+            step_s = self.latency.token_s(batch, self._rng) + sum(
+                self.latency.prefill_s(s.kv_tokens, batch, self._rng)
+                for s in admitted
+                if not s.prefilled
+            )
+            await asyncio.sleep(step_s)
+            self.iterations += 1
+            for sequence in list(self.running):
+                sequence.prefilled = True
+                if sequence.cancelled:
+                    continue
+                if sequence.emitted < len(sequence.pieces):
+                    sequence.output.put_nowait(sequence.pieces[sequence.emitted])
+                    sequence.emitted += 1
+                if sequence.emitted >= len(sequence.pieces):
+                    self._finish(sequence)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+def _input_arrays(request: service_pb2.ModelInferRequest) -> Dict[str, np.ndarray]:
+    """Decode the raw input tensors of a request by name."""
+    if len(request.raw_input_contents) != len(request.inputs):
+        raise ValueError("inputs must be sent as raw_input_contents")
+    arrays = {}
+    for tensor, raw in zip(request.inputs, request.raw_input_contents):
+        shape = list(tensor.shape)
+        if tensor.datatype == "BYTES":
+            array = deserialize_bytes_tensor(raw)
+        else:
+            array = np.frombuffer(raw, dtype=triton_to_np_dtype(tensor.datatype))
+        arrays[tensor.name] = array.reshape(shape)
+    return arrays
+
+
+def _output_tensor(response: service_pb2.ModelInferResponse, name: str, array: np.ndarray) -> None:
+    datatype = "BYTES" if array.dtype == np.object_ else "INT32"
+    output = response.outputs.add()
+    output.name = name
+    output.datatype = datatype
+    output.shape.extend(array.shape)
+    if datatype == "BYTES":
+        response.raw_output_contents.append(serialize_byte_tensor(array).item())
+    else:
+        response.raw_output_contents.append(array.astype(np.int32).tobytes())
+
+
+def _response(
+    request: service_pb2.ModelInferRequest,
+    texts: List[bytes],
+    input_lengths: List[int],
+    sequence_lengths: List[int],
+) -> service_pb2.ModelInferResponse:
+    response = service_pb2.ModelInferResponse(
+        model_name=request.model_name, model_version="1", id=request.id
+    )
+    rows = len(texts)
+    _output_tensor(response, "text_output", np.array(texts, dtype=np.object_).reshape(rows, 1))
+    _output_tensor(response, "input_lengths", np.array(input_lengths).reshape(rows, 1))
+    _output_tensor(response, "sequence_length", np.array(sequence_lengths).reshape(rows, 1))
+    return response
+
+
+class FakeTritonServicer(service_pb2_grpc.GRPCInferenceServiceServicer):
+    """``GRPCInferenceService`` for the ensemble model, backed by a ``FakeEngine``."""
+
+    def __init__(self, engine: FakeEngine, model_name: str = ENSEMBLE_MODEL_NAME):
+        self.engine = engine
+        self.model_name = model_name
+        self.batch_sizes: List[int] = []  # Rows of each ModelInfer request
+        self.streams = 0
+
+    def _generations(self, request: service_pb2.ModelInferRequest) -> List[Tuple[int, List[str]]]:
+        """``(prompt_tokens, pieces)`` of each row of a request."""
+        if request.model_name != self.model_name:
+            raise KeyError(f"Request for unknown model: '{request.model_name}' is not found")
+        arrays = _input_arrays(request)
+        if "text_input" not in arrays or "max_tokens" not in arrays:
+            raise ValueError("text_input and max_tokens are required")
+        prompts = [row.decode("utf-8") for row in arrays["text_input"].reshape(-1)]
+        max_tokens = arrays["max_tokens"].reshape(-1)
+        return [
+            (estimate_tokens(prompt), tokenize(mock_response(prompt))[:max(int(limit), 0)])
+            for prompt, limit in zip(prompts, max_tokens)
+        ]
+
+    async def ServerLive(self, request, context):
+        return service_pb2.ServerLiveResponse(live=True)
+
+    async def ServerReady(self, request, context):
+        return service_pb2.ServerReadyResponse(ready=True)
+
+    async def ModelReady(self, request, context):
+        return service_pb2.ModelReadyResponse(ready=request.name == self.model_name)
+
+    async def ModelInfer(self, request, context):
+        try:
+            generations = self._generations(request)
+        except KeyError as e:
+            await context.abort(grpc.StatusCode.NOT_FOUND, str(e))
+        except ValueError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        self.batch_sizes.append(len(generations))
+        sequences = [self.engine.submit(tokens, pieces) for tokens, pieces in generations]
+        try:
+            texts = []
+            for sequence in sequences:
+                pieces = []
+                while (piece := await sequence.output.get()) is not None:
+                    pieces.append(piece)
+                texts.append("".join(pieces).encode("utf-8"))
+        finally:
+            for sequence in sequences:
+                sequence.cancelled = True
+        return _response(
+            request,
+            texts,
+            [s.prompt_tokens for s in sequences],
+            [s.prompt_tokens + s.emitted for s in sequences],
+        )
+
+    async def ModelStreamInfer(self, request_iterator, context) -> AsyncIterator:
+        async for request in request_iterator:
+            try:
+                generations = self._generations(request)
+            except (KeyError, ValueError) as e:
+                yield service_pb2.ModelStreamInferResponse(error_message=str(e))
+                continue
+            self.streams += 1
+            sequences = [self.engine.submit(tokens, pieces) for tokens, pieces in generations]
+            try:
+                for sequence in sequences:
+                    while (piece := await sequence.output.get()) is not None:
+                        yield service_pb2.ModelStreamInferResponse(
+                            infer_response=_response(
+                                request, [piece.encode("utf-8")], [sequence.prompt_tokens], [1]
+                            )
+                        )
+                    # Like TensorRT-LLM, a last response without new tokens
+                    # ends the sequence, so even an empty one reports usage
+                    yield service_pb2.ModelStreamInferResponse(
+                        infer_response=_response(request, [b""], [sequence.prompt_tokens], [0])
+                    )
+            finally:
+                # The client cancelled the stream: free the slots
+                for sequence in sequences:
+                    sequence.cancelled = True
+
+
+class FakeTritonServer:
+    """A started gRPC server around a ``FakeTritonServicer``."""
+
+    def __init__(
+        self,
+        engine: Optional[FakeEngine] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        model_name: str = ENSEMBLE_MODEL_NAME,
+    ):
+        """
+        Initialize the server (call ``start()``, or use ``async with``).
+
+        Args:
+            engine: Simulated engine; by default sized from allam_tensorrt's config
+            host: Interface to listen on
+            port: Port to listen on; 0 picks a free one
+            model_name: Name the model is served under
+        """
+        self.engine = engine or FakeEngine.from_config()
+        self.servicer = FakeTritonServicer(self.engine, model_name)
+        self.host = host
+        self.port = port
+        self._server: Optional[grpc.aio.Server] = None
+
+    @property
+    def url(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    async def start(self) -> "FakeTritonServer":
+        self._server = grpc.aio.server()
+        service_pb2_grpc.add_GRPCInferenceServiceServicer_to_server(self.servicer, self._server)
+        self.port = self._server.add_insecure_port(f"{self.host}:{self.port}")
+        await self._server.start()
+        return self
+
+    async def close(self) -> None:
+        if self._server is not None:
+            await self._server.stop(grace=None)
+            self._server = None
+        await self.engine.close()
+
+    async def __aenter__(self) -> "FakeTritonServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    engine = FakeEngine.from_config(
+        Path(args.config), latency=parse_latency_model(args.latency), seed=args.seed
+    )
+    server = await FakeTritonServer(
+        engine, host=args.host, port=args.port, model_name=args.model_name
+    ).start()
+    logger.info(
+        f"Fake Triton serving '{args.model_name}' on {server.url} "
+        f"(batch {engine.max_batch_size}, KV cache {engine.kv_cache_tokens} tokens, "
+        f"latency {args.latency or 'instant'})"
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main() -> int:
+    """Main entry point for the fake Triton server."""
+    parser = argparse.ArgumentParser(
+        description="Serve the ensemble model over Triton's gRPC protocol without a GPU"
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="Interface to listen on (default: 127.0.0.1)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8001,
+        help="gRPC port (default: 8001)",
+    )
+    parser.add_argument(
+        "--model-name",
+        type=str,
+        default=ENSEMBLE_MODEL_NAME,
+        help=f"Model name to serve, e.g. tensorrt_llm_bls (default: {ENSEMBLE_MODEL_NAME})",
+    )
+    parser.add_argument(
+        "--latency",
+        type=str,
+        default="",
+        help="Engine latency model, e.g. a100 or l4,token_ms=40 (default: instant)",
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default=str(ENGINE_CONFIG),
+        help="TensorRT-LLM model config for batch size and KV cache (default: allam_tensorrt)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Seed of the latency jitter",
+    )
+
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+Property-based tests for admission control.
+
+**Feature: tensorrt-llm-server, Property 22: Admission Budget**
+**Validates: Requirements 3.2, 9.2**
+
+Tests that admitted generations never exceed the KV-token budget or the
+in-flight limit, that queued interactive requests go before batch ones,
+that a full queue sheds new requests at once, that deadlines and cancelled
+callers leave the queue, that a stream holds its slot until it is closed,
+and that the chat endpoints answer a shed request with an Arabic 503.
+"""
+
+import asyncio
+from typing import List, Tuple
+
+import pytest
+from fastapi.testclient import TestClient
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from api.main import app, get_guardrails, get_triton_client
+from models.admission import (
+    BATCH,
+    INTERACTIVE,
+    AdmissionController,
+    AdmittedTritonClient,
+    OverloadedError,
+)
+from models.triton_client import InferenceConfig, MockTritonClient
+
+requests = st.lists(
+    st.tuples(
+        st.integers(1, 1500),
+        st.sampled_from([INTERACTIVE, BATCH]),
+        st.integers(0, 3),
+    ),
+    min_size=1,
+    max_size=30,
+)
+
+
+class TestAdmissionController:
+    """
+    Property tests for ``AdmissionController``.
+
+    **Feature: tensorrt-llm-server, Property 22: Admission Budget**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    @given(workload=requests, budget=st.integers(500, 3000), max_in_flight=st.integers(1, 8))
+    @settings(max_examples=100, deadline=None)
+    def test_budget_never_exceeded(
+        self, workload: List[Tuple[int, str, int]], budget: int, max_in_flight: int
+    ) -> None:
+        """Every request is admitted or shed, and admitted work stays within both limits."""
+        async def run_test():
+            controller = AdmissionController(
+                budget, max_in_flight, max_queue=10, queue_timeout_s=60
+            )
+            outcomes = []
+
+            async def request(cost: int, priority: str, steps: int) -> None:
+                try:
+                    async with controller.slot(cost, priority):
+                        assert controller.tokens_in_use <= budget
+                        assert controller.in_flight <= max_in_flight
+                        for _ in range(steps):
+                            await asyncio.sleep(0)
+                    outcomes.append("done")
+                except OverloadedError:
+                    outcomes.append("shed")
+
+            await asyncio.gather(*(request(*r) for r in workload))
+            assert len(outcomes) == len(workload)
+            assert controller.tokens_in_use == 0 and controller.in_flight == 0
+            assert controller.queued() == 0
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(arrivals=st.lists(st.sampled_from([INTERACTIVE, BATCH]), min_size=1, max_size=12))
+    @settings(max_examples=100, deadline=None)
+    def test_interactive_served_before_batch(self, arrivals: List[str]) -> None:
+        """Queued requests are admitted interactive first, FIFO within a class."""
+        async def run_test():
+            controller = AdmissionController(kv_token_budget=100, max_in_flight=1, max_queue=100)
+            await controller.acquire(100, BATCH)
+            order: List[Tuple[str, int]] = []
+
+            async def request(i: int, priority: str) -> None:
+                await controller.acquire(10, priority)
+                order.append((priority, i))
+                controller.release(10)
+
+            tasks = [asyncio.create_task(request(i, p)) for i, p in enumerate(arrivals)]
+            await asyncio.sleep(0)
+            controller.release(100)
+            await asyncio.gather(*tasks)
+
+            expected = [(p, i) for i, p in enumerate(arrivals) if p == INTERACTIVE]
+            expected += [(p, i) for i, p in enumerate(arrivals) if p == BATCH]
+            assert order == expected
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(max_queue=st.integers(0, 10))
+    @settings(max_examples=30, deadline=None)
+    def test_full_queue_sheds_immediately(self, max_queue: int) -> None:
+        """Interactive requests are shed at ``max_queue`` waiting, batch at half of it."""
+        async def run_test():
+            controller = AdmissionController(
+                kv_token_budget=10, max_queue=max_queue, queue_timeout_s=60
+            )
+            await controller.acquire(10, INTERACTIVE)
+            waiting = [
+                asyncio.create_task(controller.acquire(1, INTERACTIVE)) for _ in range(max_queue)
+            ]
+            await asyncio.sleep(0)
+            assert controller.queued() == max_queue
+            assert controller.should_shed(INTERACTIVE) and controller.should_shed(BATCH)
+
+            with pytest.raises(OverloadedError):
+                await controller.acquire(1, INTERACTIVE)
+            with pytest.raises(OverloadedError):
+                await controller.acquire(1, BATCH)
+
+            for task in waiting:
+                task.cancel()
+            await asyncio.gather(*waiting, return_exceptions=True)
+            assert controller.queued() == 0
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_deadline_and_cancellation_leave_queue(self) -> None:
+        """Expired and cancelled waiters are removed; a cancelled head unblocks the rest."""
+        async def run_test():
+            controller = AdmissionController(kv_token_budget=100, queue_timeout_s=0.05)
+            await controller.acquire(60, INTERACTIVE)
+
+            with pytest.raises(OverloadedError):
+                await controller.acquire(50, INTERACTIVE)
+            assert controller.queued() == 0
+
+            big = asyncio.create_task(controller.acquire(100, INTERACTIVE))
+            small = asyncio.create_task(controller.acquire(30, INTERACTIVE))
+            await asyncio.sleep(0)
+            assert controller.queued() == 2 and not small.done()
+
+            big.cancel()
+            await asyncio.gather(big, return_exceptions=True)
+            await small
+            assert controller.tokens_in_use == 90 and controller.queued() == 0
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+
+class TestAdmittedClient:
+    """
+    Tests for ``AdmittedTritonClient`` and the chat endpoints.
+
+    **Feature: tensorrt-llm-server, Property 22: Admission Budget**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    def teardown_method(self) -> None:
+        app.dependency_overrides.clear()
+
+    def test_stream_holds_slot_until_closed(self) -> None:
+        """The slot is held while tokens are read and freed when the consumer stops."""
+        async def run_test():
+            controller = AdmissionController(kv_token_budget=2560)
+            client = AdmittedTritonClient(MockTritonClient(), controller)
+            config = InferenceConfig(max_tokens=100)
+
+            stream = client.infer_stream("كيف أجدد رخصة القيادة؟", config)
+            await stream.__anext__()
+            assert controller.in_flight == 1
+            assert controller.tokens_in_use == client._cost("كيف أجدد رخصة القيادة؟", config)
+            await stream.aclose()
+            assert controller.in_flight == 0 and controller.tokens_in_use == 0
+
+            await client.infer("مرحبا", InferenceConfig(stream=False))
+            assert controller.in_flight == 0
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_endpoints_shed_with_arabic_503(self) -> None:
+        """With the budget taken and no queue room, both endpoints answer 503."""
+        controller = AdmissionController(kv_token_budget=10, max_queue=0)
+        client = AdmittedTritonClient(MockTritonClient(), controller)
+        app.dependency_overrides[get_triton_client] = lambda: client
+        app.dependency_overrides[get_guardrails] = lambda: None
+        asyncio.get_event_loop().run_until_complete(controller.acquire(10, BATCH))
+
+        http = TestClient(app)
+        body = {"messages": [{"role": "user", "content": "كيف أجدد جواز السفر؟"}], "user_id": "u1"}
+        for path in ("/v1/chat", "/v1/chat/stream"):
+            response = http.post(path, json=body)
+            assert response.status_code == 503
+            assert response.json()["error"] == "overloaded"
+            assert response.json()["message_ar"]
+            assert int(response.headers["Retry-After"]) >= 1
+
+        controller.release(10)
+        assert http.post("/v1/chat", json=body).status_code == 200
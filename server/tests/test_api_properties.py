@@ -9,11 +9,13 @@ the API returns a valid response structure.
 """
 
 import string
-from hypothesis import given, strategies as st, settings
-from pydantic import ValidationError
 
-from api.models import Message, ChatRequest, ChatResponse, RAGSource
+from hypothesis import given, settings
+from hypothesis import strategies as st
+from pydantic import ValidationError
 
+from api.models import ChatRequest, ChatResponse, Message
+from api.prompt import CLIENT_SYSTEM_HEADER_AR, SYSTEM_PROMPT_AR, build_prompt
 
 # Strategies for generating valid data
 valid_roles = st.sampled_from(["user", "assistant", "system"])
@@ -56,7 +58,7 @@ class TestMessageValidation:
         """
         **Feature: tensorrt-llm-server, Property 1: API Request-Response Consistency**
         **Validates: Requirements 3.1, 3.3**
-        
+
         For any valid role and non-empty content, Message creation succeeds.
         """
         message = Message(role=role, content=content)
@@ -69,7 +71,7 @@ class TestMessageValidation:
         """
         **Feature: tensorrt-llm-server, Property 1: API Request-Response Consistency**
         **Validates: Requirements 3.1, 3.3**
-        
+
         For any invalid role, Message creation fails with ValidationError.
         """
         invalid_roles = ["admin", "bot", "unknown", "", "USER", "ASSISTANT"]
@@ -86,7 +88,7 @@ class TestMessageValidation:
         """
         **Feature: tensorrt-llm-server, Property 1: API Request-Response Consistency**
         **Validates: Requirements 3.1, 3.3**
-        
+
         For any empty or whitespace-only content, Message creation fails.
         """
         empty_contents = ["", "   ", "\t", "\n", "  \t\n  "]
@@ -107,7 +109,7 @@ class TestChatRequestValidation:
         """
         **Feature: tensorrt-llm-server, Property 1: API Request-Response Consistency**
         **Validates: Requirements 3.1, 3.3**
-        
+
         For any valid ChatRequest, all fields are properly set.
         """
         assert len(request.messages) >= 1
@@ -122,7 +124,7 @@ class TestChatRequestValidation:
         """
         **Feature: tensorrt-llm-server, Property 1: API Request-Response Consistency**
         **Validates: Requirements 3.1, 3.3**
-        
+
         For any empty user_id, ChatRequest creation fails.
         """
         empty_user_ids = ["", "   ", "\t"]
@@ -139,7 +141,7 @@ class TestChatRequestValidation:
         """
         **Feature: tensorrt-llm-server, Property 1: API Request-Response Consistency**
         **Validates: Requirements 3.1, 3.3**
-        
+
         For any empty messages list, ChatRequest creation fails.
         """
         try:
@@ -164,7 +166,7 @@ class TestChatResponseValidation:
         """
         **Feature: tensorrt-llm-server, Property 1: API Request-Response Consistency**
         **Validates: Requirements 3.1, 3.3**
-        
+
         For any valid response data, ChatResponse creation succeeds
         and contains non-empty response.
         """
@@ -183,7 +185,7 @@ class TestChatResponseValidation:
 class TestRequestResponseConsistency:
     """
     Property tests for request-response consistency.
-    
+
     **Feature: tensorrt-llm-server, Property 1: API Request-Response Consistency**
     **Validates: Requirements 3.1, 3.3**
     """
@@ -198,11 +200,35 @@ class TestRequestResponseConsistency:
         """
         json_data = request.model_dump()
         restored = ChatRequest.model_validate(json_data)
-        
+
         assert restored.user_id == request.user_id
         assert restored.session_id == request.session_id
         assert len(restored.messages) == len(request.messages)
-        
+
         for orig, rest in zip(request.messages, restored.messages):
             assert orig.role == rest.role
             assert orig.content == rest.content
+
+
+class TestSystemPrompt:
+    """
+    Property tests for the system block of rendered prompts.
+
+    **Feature: tensorrt-llm-server, Property 1: API Request-Response Consistency**
+    **Validates: Requirements 3.1, 3.3**
+    """
+
+    @given(request=valid_chat_requests())
+    @settings(max_examples=100)
+    def test_client_system_messages_cannot_replace_server_prompt(
+        self, request: ChatRequest
+    ) -> None:
+        """The server prompt always opens the system block; client instructions follow it."""
+        prompt = build_prompt(request.messages)
+        assert prompt.count("<<SYS>>\n") == 1
+        system = prompt.split("<<SYS>>\n")[1].split("\n<</SYS>>")[0]
+        assert system.startswith(SYSTEM_PROMPT_AR)
+        client_messages = [m.content.strip() for m in request.messages if m.role == "system"]
+        assert (CLIENT_SYSTEM_HEADER_AR in system) == bool(client_messages)
+        for content in client_messages:
+            assert content in system[len(SYSTEM_PROMPT_AR):]
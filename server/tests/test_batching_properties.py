@@ -0,0 +1,150 @@
+"""
+Property-based tests for client-side micro-batching.
+
+**Feature: tensorrt-llm-server, Property 10: Micro-Batch Scatter Consistency**
+**Validates: Requirements 3.2**
+
+Tests that concurrent non-streaming requests are packed into ``[B, 1]``
+batches no larger than the configured maximum, and that every caller receives
+exactly the output row that belongs to its own prompt.
+"""
+
+import asyncio
+import math
+import string
+from typing import List, Optional
+
+import numpy as np
+from hypothesis import given, settings
+from hypothesis import strategies as st
+from tritonclient.utils import deserialize_bytes_tensor
+
+from models.batching import MicroBatcher
+from models.triton_client import InferenceConfig, TritonClient, TritonClientError
+
+arabic_chars = "أبتثجحخدذرزسشصضطظعغفقكلمنهوي"
+valid_prompts = st.text(
+    alphabet=string.ascii_letters + string.digits + " " + arabic_chars,
+    min_size=1,
+    max_size=50,
+)
+
+
+class FakeBatchResult:
+    def __init__(self, texts: List[str]):
+        self._texts = texts
+
+    def as_numpy(self, name: str) -> Optional[np.ndarray]:
+        if name != "text_output":
+            return None
+        return np.array([[t.encode("utf-8")] for t in self._texts], dtype=object)
+
+
+class EchoGrpcClient:
+    """Fake Triton client that echoes each row of a batched request."""
+
+    def __init__(self, fail: bool = False):
+        self.batch_shapes: List[List[int]] = []
+        self.fail = fail
+
+    async def infer(self, model_name: str, inputs: list) -> FakeBatchResult:
+        await asyncio.sleep(0)
+        text_input = inputs[0]
+        self.batch_shapes.append(text_input.shape())
+        for tensor in inputs[1:]:
+            assert tensor.shape() == text_input.shape()
+        if self.fail:
+            raise RuntimeError("model failed")
+        prompts = deserialize_bytes_tensor(text_input._get_content())
+        return FakeBatchResult([f"echo:{p.decode('utf-8')}" for p in prompts])
+
+
+def make_client(window_ms: float, max_batch_size: int, grpc_client) -> TritonClient:
+    client = TritonClient(batch_window_ms=window_ms, max_batch_size=max_batch_size)
+    client._client = grpc_client
+    return client
+
+
+class TestMicroBatching:
+    """
+    Property tests for ``TritonClient`` micro-batching mode.
+
+    **Feature: tensorrt-llm-server, Property 10: Micro-Batch Scatter Consistency**
+    **Validates: Requirements 3.2**
+    """
+
+    @given(
+        prompts=st.lists(valid_prompts, min_size=1, max_size=40),
+        max_batch_size=st.integers(min_value=1, max_value=8),
+    )
+    @settings(max_examples=100)
+    def test_results_scattered_to_their_callers(
+        self, prompts: List[str], max_batch_size: int
+    ) -> None:
+        """
+        For any set of concurrent prompts, each caller receives its own
+        output, and the prompts are packed into the minimum number of batches.
+        """
+        async def run_test():
+            grpc_client = EchoGrpcClient()
+            client = make_client(20.0, max_batch_size, grpc_client)
+            config = InferenceConfig(stream=False)
+
+            results = await asyncio.gather(*(client.infer(p, config) for p in prompts))
+
+            assert [r.text for r in results] == [f"echo:{p}" for p in prompts]
+            assert len(grpc_client.batch_shapes) == math.ceil(len(prompts) / max_batch_size)
+            assert all(shape[0] <= max_batch_size for shape in grpc_client.batch_shapes)
+            assert all(shape[1] == 1 for shape in grpc_client.batch_shapes)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(
+        prompts=st.lists(valid_prompts, min_size=2, max_size=16),
+        max_tokens=st.lists(st.integers(min_value=1, max_value=4), min_size=2, max_size=16),
+    )
+    @settings(max_examples=100)
+    def test_batches_never_mix_configs(self, prompts: List[str], max_tokens: List[int]) -> None:
+        """Requests with different configs are never packed into one batch."""
+        async def run_test():
+            grpc_client = EchoGrpcClient()
+            client = make_client(20.0, 8, grpc_client)
+            configs = [InferenceConfig(max_tokens=m, stream=False) for m in max_tokens]
+            pairs = list(zip(prompts, configs))
+
+            results = await asyncio.gather(*(client.infer(p, c) for p, c in pairs))
+
+            assert [r.text for r in results] == [f"echo:{p}" for p, _ in pairs]
+            assert len(grpc_client.batch_shapes) >= len({c for _, c in pairs})
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_batch_failure_reaches_every_caller(self) -> None:
+        """If the batched RPC fails, every caller in that batch gets an error."""
+        async def run_test():
+            client = make_client(10.0, 8, EchoGrpcClient(fail=True))
+            config = InferenceConfig(stream=False)
+            results = await asyncio.gather(
+                *(client.infer(f"q{i}", config) for i in range(5)),
+                return_exceptions=True,
+            )
+            assert all(isinstance(r, TritonClientError) for r in results)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_window_flushes_partial_batch(self) -> None:
+        """A batch smaller than the maximum is sent once the window closes."""
+        async def run_test():
+            batches = []
+
+            async def dispatch(prompts: List[str], key) -> List[str]:
+                batches.append(list(prompts))
+                return prompts
+
+            batcher = MicroBatcher(dispatch, max_batch_size=8, window_ms=5.0)
+            results = await asyncio.gather(batcher.submit("a", "k"), batcher.submit("b", "k"))
+            assert results == ["a", "b"]
+            assert batches == [["a", "b"]]
+            assert batcher.mean_batch_size == 2.0
+
+        asyncio.get_event_loop().run_until_complete(run_test())
@@ -0,0 +1,194 @@
+"""
+Property-based tests for the mock latency model and the chat benchmark.
+
+**Feature: tensorrt-llm-server, Property 27: Simulated Engine Latency**
+**Validates: Requirements 3.2, 9.2**
+
+Tests that latency specs parse into the documented presets and overrides,
+that the mock client keeps its fixed timing without a model and follows the
+model with one (including the batch slowdown and batch size limit), and
+that the benchmark replays conversations through the chat API and
+summarizes them into ordered percentiles.
+"""
+
+import asyncio
+import random
+import time
+from typing import List
+
+import httpx
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from api.main import app, get_guardrails, get_triton_client
+from models.mock_latency import LATENCY_PRESETS, LatencyModel, parse_latency_model
+from models.triton_client import InferenceConfig, MockTritonClient
+from scripts.benchmark_chat import (
+    DEFAULT_TRACE,
+    Conversation,
+    RequestRecord,
+    load_trace,
+    run_benchmark,
+    summarize,
+)
+
+non_negative = st.floats(min_value=0, max_value=1000, allow_nan=False)
+
+
+class TestLatencyModel:
+    """
+    Property tests for ``LatencyModel`` and its specs.
+
+    **Feature: tensorrt-llm-server, Property 27: Simulated Engine Latency**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    @given(
+        preset=st.sampled_from(sorted(LATENCY_PRESETS)),
+        token_ms=non_negative,
+        max_batch_size=st.integers(0, 64),
+    )
+    @settings(max_examples=100)
+    def test_spec_applies_overrides_to_preset(
+        self, preset: str, token_ms: float, max_batch_size: int
+    ) -> None:
+        """Fields after a preset override it; the rest keep the preset's values."""
+        model = parse_latency_model(
+            f"{preset}, token_ms={token_ms!r},max_batch_size={max_batch_size}"
+        )
+        expected = LATENCY_PRESETS[preset]
+        assert model.token_ms == token_ms and model.max_batch_size == max_batch_size
+        assert model.prefill_ms == expected.prefill_ms and model.jitter == expected.jitter
+
+    def test_invalid_specs(self) -> None:
+        """Empty specs mean no model; unknown names and bad values are rejected."""
+        assert parse_latency_model("") is None and parse_latency_model("none") is None
+        for spec in ("h200", "token_ms", "speed=3", "token_ms=-1", "max_batch_size=2.5"):
+            with pytest.raises(ValueError):
+                parse_latency_model(spec)
+
+    @given(
+        slowdown=st.floats(min_value=0, max_value=1),
+        batch=st.integers(1, 64),
+        jitter=st.floats(min_value=0, max_value=1),
+        seed=st.integers(0, 1000),
+    )
+    @settings(max_examples=100)
+    def test_step_time_grows_with_batch(
+        self, slowdown: float, batch: int, jitter: float, seed: int
+    ) -> None:
+        """A step never gets faster with more generations running, and is seeded."""
+        model = LatencyModel(token_ms=20, batch_slowdown=slowdown, jitter=jitter)
+        assert model.slowdown(batch + 1) >= model.slowdown(batch) >= 1.0
+        first = model.token_s(batch, random.Random(seed))
+        assert first == model.token_s(batch, random.Random(seed)) and first > 0
+        if not jitter:
+            assert first == pytest.approx(0.02 * model.slowdown(batch))
+
+
+class TestMockClientLatency:
+    """
+    Tests for ``MockTritonClient`` with and without a latency model.
+
+    **Feature: tensorrt-llm-server, Property 27: Simulated Engine Latency**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    def test_default_timing_unchanged(self) -> None:
+        """Without a model ``infer`` answers at once and reports 150 ms."""
+        async def run_test():
+            start = time.perf_counter()
+            result = await MockTritonClient().infer("كيف أجدد الجواز؟")
+            assert time.perf_counter() - start < 0.05
+            assert result.latency_ms == 150.0 and result.ttft_ms == 150.0
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_infer_follows_model(self) -> None:
+        """A generation takes the prefill plus one step per generated word."""
+        async def run_test():
+            model = LatencyModel(prefill_ms=30, token_ms=5)
+            client = MockTritonClient(latency=model)
+            prompt = "كيف أجدد الجواز؟"
+            steps = len(client._generate_mock_response(prompt).split())
+            result = await client.infer(prompt, InferenceConfig(stream=False))
+            assert result.latency_ms >= 30 + 5 * (steps - 1)
+            assert result.latency_ms < 30 + 5 * (steps - 1) + 200
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_batch_limit_and_slowdown(self) -> None:
+        """Streams beyond ``max_batch_size`` wait; concurrent streams step slower."""
+        async def timed_stream(client: MockTritonClient) -> float:
+            start = time.perf_counter()
+            async for _ in client.infer_stream("سؤال"):
+                pass
+            return time.perf_counter() - start
+
+        async def run_test():
+            alone = MockTritonClient(latency=LatencyModel(token_ms=10))
+            solo = await timed_stream(alone)
+
+            limited = MockTritonClient(latency=LatencyModel(token_ms=10, max_batch_size=1))
+            durations = await asyncio.gather(*(timed_stream(limited) for _ in range(3)))
+            assert max(durations) >= 2.5 * solo
+
+            slowed = MockTritonClient(latency=LatencyModel(token_ms=10, batch_slowdown=1.0))
+            durations = await asyncio.gather(*(timed_stream(slowed) for _ in range(3)))
+            assert min(durations) >= 2 * solo
+            assert slowed.running == 0
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+
+class TestChatBenchmark:
+    """
+    Tests for ``scripts.benchmark_chat``.
+
+    **Feature: tensorrt-llm-server, Property 27: Simulated Engine Latency**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    def teardown_method(self) -> None:
+        app.dependency_overrides.clear()
+
+    @given(
+        latencies=st.lists(st.floats(min_value=0.001, max_value=10), min_size=1, max_size=50),
+        failed=st.integers(0, 5),
+    )
+    @settings(max_examples=100)
+    def test_summary_percentiles_are_ordered(self, latencies: List[float], failed: int) -> None:
+        """Percentiles are ordered and failed requests are counted apart."""
+        records = [
+            RequestRecord("c", 0, 200, latency, ttft_s=latency / 2, completion_tokens=10)
+            for latency in latencies
+        ] + [RequestRecord("c", 0, 503, 0.01, error="overloaded") for _ in range(failed)]
+        report = summarize(records, duration_s=2.0)
+        assert report.requests == len(records) and report.errors == failed
+        for values in (report.latency_ms, report.ttft_ms, report.decode_tokens_per_s):
+            assert values["p50"] <= values["p95"] <= values["p99"]
+        assert report.latency_ms["p99"] <= max(latencies) * 1000 + 1e-6
+        assert report.errors_by_status == ({"503": failed} if failed else {})
+
+    def test_replays_sample_trace_through_the_api(self) -> None:
+        """Every turn of every replayed conversation is answered over SSE."""
+        async def run_test():
+            client = MockTritonClient(latency=LATENCY_PRESETS["instant"])
+            app.dependency_overrides[get_triton_client] = lambda: client
+            app.dependency_overrides[get_guardrails] = lambda: None
+            conversations = load_trace(DEFAULT_TRACE)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+                report = await run_benchmark(http, conversations, count=30, concurrency=4)
+                sync_report = await run_benchmark(
+                    http, [Conversation("c", "u", ["كيف أجدد الجواز؟"])], count=3, stream=False
+                )
+
+            assert report.errors == 0 and sync_report.errors == 0
+            replayed = conversations[:24] + conversations[:6]
+            assert report.requests == sum(len(c.turns) for c in replayed)
+            assert report.ttft_ms["p50"] <= report.latency_ms["p50"]
+            assert sync_report.requests == 3 and report.output_tokens_per_s > 0
+
+        asyncio.get_event_loop().run_until_complete(run_test())
@@ -0,0 +1,184 @@
+"""
+Property-based tests for the Triton gRPC channel pool.
+
+**Feature: tensorrt-llm-server, Property 8: Channel Pool Load Distribution**
+**Validates: Requirements 3.2**
+
+Tests that the pool warms every channel at startup, spreads concurrent calls
+evenly across channels, replaces channels that fail with connection errors,
+and closes every channel on shutdown.
+"""
+
+import asyncio
+from contextlib import AsyncExitStack
+from typing import List
+
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from models.channel_pool import TritonChannelPool, is_connection_error
+from models.triton_client import TritonClient
+
+
+class FakeInferenceServerException(Exception):
+    """Mimics ``tritonclient.utils.InferenceServerException``."""
+
+    def __init__(self, status: str):
+        super().__init__(status)
+        self._status = status
+
+    def status(self) -> str:
+        return self._status
+
+
+class FakeChannelClient:
+    """Stand-in for ``tritonclient.grpc.aio.InferenceServerClient``."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.ready_checks = 0
+        self.closed = False
+        self.fail_with = None
+
+    async def is_server_ready(self) -> bool:
+        self.ready_checks += 1
+        if self.fail_with is not None:
+            raise self.fail_with
+        return True
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def make_pool(size: int, created: List[FakeChannelClient]) -> TritonChannelPool:
+    def factory(url: str, index: int) -> FakeChannelClient:
+        client = FakeChannelClient(index)
+        created.append(client)
+        return client
+
+    return TritonChannelPool(url="triton:8001", size=size, client_factory=factory)
+
+
+pool_sizes = st.integers(min_value=1, max_value=8)
+
+
+class TestChannelPool:
+    """
+    Property tests for ``TritonChannelPool``.
+
+    **Feature: tensorrt-llm-server, Property 8: Channel Pool Load Distribution**
+    **Validates: Requirements 3.2**
+    """
+
+    @given(size=pool_sizes)
+    @settings(max_examples=50)
+    def test_start_warms_every_channel(self, size: int) -> None:
+        """For any pool size, startup opens and warms exactly ``size`` channels."""
+        async def run_test():
+            created: List[FakeChannelClient] = []
+            pool = make_pool(size, created)
+            await pool.start()
+            assert len(created) == size
+            assert all(client.ready_checks == 1 for client in created)
+            await pool.close()
+            assert all(client.closed for client in created)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(size=pool_sizes, concurrent=st.integers(min_value=1, max_value=64))
+    @settings(max_examples=100)
+    def test_concurrent_calls_spread_evenly(self, size: int, concurrent: int) -> None:
+        """
+        For any number of concurrently held channels, in-flight counts across
+        channels differ by at most one (least-in-flight selection).
+        """
+        async def run_test():
+            pool = make_pool(size, [])
+            await pool.start(warm=False)
+            async with AsyncExitStack() as stack:
+                for _ in range(concurrent):
+                    await stack.enter_async_context(pool.channel())
+                loads = [channel["in_flight"] for channel in pool.stats()]
+                assert sum(loads) == concurrent
+                assert max(loads) - min(loads) <= 1
+            assert all(channel["in_flight"] == 0 for channel in pool.stats())
+            await pool.close()
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(size=pool_sizes)
+    @settings(max_examples=50)
+    def test_connection_error_replaces_channel(self, size: int) -> None:
+        """A connection error on a channel replaces it and closes the old client."""
+        async def run_test():
+            created: List[FakeChannelClient] = []
+            pool = make_pool(size, created)
+            await pool.start(warm=False)
+
+            failed = None
+            try:
+                async with pool.channel() as client:
+                    failed = client
+                    raise FakeInferenceServerException("StatusCode.UNAVAILABLE")
+            except FakeInferenceServerException:
+                pass
+
+            assert failed.closed
+            assert len(created) == size + 1
+            assert sum(channel["reconnects"] for channel in pool.stats()) == 1
+            await pool.close()
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_application_error_keeps_channel(self) -> None:
+        """Non-connection errors (e.g. invalid input) do not recycle the channel."""
+        async def run_test():
+            created: List[FakeChannelClient] = []
+            pool = make_pool(2, created)
+            await pool.start(warm=False)
+            try:
+                async with pool.channel():
+                    raise FakeInferenceServerException("StatusCode.INVALID_ARGUMENT")
+            except FakeInferenceServerException:
+                pass
+            assert len(created) == 2
+            assert not any(client.closed for client in created)
+            await pool.close()
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_unstarted_pool_rejects_calls(self) -> None:
+        """Borrowing from a pool that was never started is an error."""
+        async def run_test():
+            pool = make_pool(2, [])
+            try:
+                async with pool.channel():
+                    pass
+                assert False, "Should have rejected an unstarted pool"
+            except RuntimeError:
+                pass
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_triton_client_uses_pool(self) -> None:
+        """``TritonClient`` readiness checks run over pooled channels."""
+        async def run_test():
+            created: List[FakeChannelClient] = []
+            pool = make_pool(3, created)
+            await pool.start(warm=False)
+            client = TritonClient(pool=pool)
+            for _ in range(6):
+                assert await client.is_server_ready()
+            assert [c.ready_checks for c in created] == [2, 2, 2]
+            await client.close()
+            assert not any(c.closed for c in created)
+            await pool.close()
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_connection_error_classification(self) -> None:
+        """Only channel-level gRPC status codes count as connection errors."""
+        assert is_connection_error(FakeInferenceServerException("StatusCode.UNAVAILABLE"))
+        for status in ("NOT_FOUND", "INTERNAL", "UNKNOWN", "INVALID_ARGUMENT"):
+            assert not is_connection_error(FakeInferenceServerException(f"StatusCode.{status}"))
+        assert not is_connection_error(ValueError("bad input"))
@@ -0,0 +1,236 @@
+"""
+Property-based tests for the SSE chat streaming endpoint.
+
+**Feature: tensorrt-llm-server, Property 7: Streaming Token Delivery**
+**Validates: Requirements 3.2, 9.2**
+
+Tests that the token relay forwards every token in order, bounds the number
+of tokens buffered per connection, and closes the upstream stream as soon as
+the client goes away.
+"""
+
+import asyncio
+import json
+import string
+from typing import AsyncIterator, List
+
+from fastapi.testclient import TestClient
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from api.main import app, get_triton_client
+from api.streaming import TokenStreamRelay
+from models.triton_client import MockTritonClient, TritonClient
+
+token_lists = st.lists(
+    st.text(alphabet=string.ascii_letters + "أبتثجحخدذرزسشصضطظعغفقكلمنهوي ", min_size=1),
+    min_size=1,
+    max_size=50,
+)
+buffer_sizes = st.integers(min_value=1, max_value=16)
+
+
+class TrackingSource:
+    """Token source that records how far it was consumed and whether it closed."""
+
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+        self.produced = 0
+        self.closed = False
+
+    async def stream(self) -> AsyncIterator[str]:
+        try:
+            for token in self.tokens:
+                self.produced += 1
+                yield token
+        finally:
+            self.closed = True
+
+
+class TestTokenStreamRelay:
+    """
+    Property tests for the bounded token relay.
+
+    **Feature: tensorrt-llm-server, Property 7: Streaming Token Delivery**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    @given(tokens=token_lists, max_buffered=buffer_sizes)
+    @settings(max_examples=100)
+    def test_relay_preserves_tokens_in_order(self, tokens: List[str], max_buffered: int) -> None:
+        """For any token sequence, the relay delivers every token in order."""
+        async def run_test():
+            source = TrackingSource(tokens)
+            received = [t async for t in TokenStreamRelay(source.stream(), max_buffered)]
+            assert received == tokens
+            assert source.closed
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(tokens=token_lists, max_buffered=buffer_sizes)
+    @settings(max_examples=100)
+    def test_relay_bounds_buffered_tokens(self, tokens: List[str], max_buffered: int) -> None:
+        """
+        For any stalled consumer, the producer runs at most ``max_buffered``
+        tokens (plus the one it is blocked on) ahead of what was consumed.
+        """
+        async def run_test():
+            source = TrackingSource(tokens)
+            relay = TokenStreamRelay(source.stream(), max_buffered)
+            iterator = relay.__aiter__()
+            await iterator.__anext__()
+            await asyncio.sleep(0.01)  # Let the producer run ahead
+            assert source.produced <= 1 + max_buffered + 1
+            await iterator.aclose()
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(tokens=token_lists.filter(lambda t: len(t) > 1), max_buffered=buffer_sizes)
+    @settings(max_examples=100)
+    def test_consumer_disconnect_closes_source(
+        self, tokens: List[str], max_buffered: int
+    ) -> None:
+        """When the consumer stops early, the upstream token stream is closed."""
+        async def run_test():
+            source = TrackingSource(tokens)
+            iterator = TokenStreamRelay(source.stream(), max_buffered).__aiter__()
+            await iterator.__anext__()
+            await iterator.aclose()
+            assert source.closed
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_producer_cancelled_with_consumer_task(self) -> None:
+        """Cancelling the consumer task (client disconnect) closes the source."""
+        async def run_test():
+            async def endless() -> AsyncIterator[str]:
+                while True:
+                    await asyncio.sleep(0.001)
+                    yield "token"
+
+            source_closed = asyncio.Event()
+
+            async def tracked() -> AsyncIterator[str]:
+                try:
+                    async for token in endless():
+                        yield token
+                finally:
+                    source_closed.set()
+
+            async def consume():
+                async for _ in TokenStreamRelay(tracked(), 4):
+                    pass
+
+            task = asyncio.create_task(consume())
+            await asyncio.sleep(0.02)
+            task.cancel()
+            await asyncio.wait_for(source_closed.wait(), timeout=1.0)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+
+class FakeStreamCall:
+    """Stand-in for the tritonclient aio stream response iterator."""
+
+    def __init__(self, n_tokens: int):
+        self.remaining = n_tokens
+        self.cancelled = False
+
+    def __aiter__(self) -> "FakeStreamCall":
+        return self
+
+    async def __anext__(self):
+        if self.remaining == 0 or self.cancelled:
+            raise StopAsyncIteration
+        self.remaining -= 1
+        return FakeResult(), None
+
+    def cancel(self) -> bool:
+        self.cancelled = True
+        return True
+
+
+class FakeResult:
+    def as_numpy(self, name: str):
+        return [b"token "] if name == "text_output" else None
+
+
+class FakeGrpcClient:
+    def __init__(self, n_tokens: int):
+        self.call = FakeStreamCall(n_tokens)
+
+    def stream_infer(self, inputs_iterator):
+        return self.call
+
+
+class TestTritonStreamCancellation:
+    """
+    Tests that ``TritonClient.infer_stream`` frees the gRPC stream early.
+
+    **Feature: tensorrt-llm-server, Property 7: Streaming Token Delivery**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    @given(n_tokens=st.integers(min_value=2, max_value=50), consumed=st.integers(1, 49))
+    @settings(max_examples=50)
+    def test_early_close_cancels_grpc_stream(self, n_tokens: int, consumed: int) -> None:
+        """For any early exit, the gRPC call is cancelled; full reads are not."""
+        async def run_test():
+            client = TritonClient()
+            client._client = FakeGrpcClient(n_tokens)
+            client._prepare_inputs = lambda prompt, config: []
+
+            stream = client.infer_stream("مرحبا")
+            received = 0
+            async for _ in stream:
+                received += 1
+                if received == consumed:
+                    break
+            await stream.aclose()
+
+            # Breaking on the last token still exits before end-of-stream
+            assert client._client.call.cancelled == (consumed <= n_tokens)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+
+class TestChatStreamEndpoint:
+    """
+    Tests for ``POST /v1/chat/stream``.
+
+    **Feature: tensorrt-llm-server, Property 7: Streaming Token Delivery**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    def setup_method(self) -> None:
+        app.dependency_overrides[get_triton_client] = lambda: MockTritonClient()
+
+    def teardown_method(self) -> None:
+        app.dependency_overrides.clear()
+
+    @given(question=st.sampled_from(["كيف أجدد رخصة القيادة؟", "تجديد جواز السفر", "مرحبا"]))
+    @settings(max_examples=5, deadline=None)
+    def test_stream_emits_tokens_then_done(self, question: str) -> None:
+        """Streamed tokens reassemble into the full answer, followed by ``done``."""
+        client = TestClient(app)
+        body = {"messages": [{"role": "user", "content": question}], "user_id": "u1"}
+
+        events = []
+        with client.stream("POST", "/v1/chat/stream", json=body) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            event = None
+            for line in response.iter_lines():
+                if line.startswith("event:"):
+                    event = line.split(":", 1)[1].strip()
+                elif line.startswith("data:"):
+                    events.append((event, json.loads(line.split(":", 1)[1])))
+
+        names = [name for name, _ in events]
+        assert names[-1] == "done"
+        assert set(names[:-1]) == {"token"}
+
+        streamed = "".join(data["token"] for name, data in events if name == "token")
+        expected = MockTritonClient()._generate_mock_response(question)
+        assert streamed.strip() == expected
+        assert events[-1][1]["latency_ms"] >= 0
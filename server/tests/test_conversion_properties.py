@@ -0,0 +1,241 @@
+"""
+Property-based tests for running the Allam conversion pipeline.
+
+**Feature: tensorrt-llm-server, Property 31: Conversion Pipeline Execution**
+**Validates: Requirements 2.1, 2.2, 2.3**
+
+Tests that conversion commands run as subprocesses with streamed output,
+exit-code handling and a timeout that kills them, that steps whose inputs
+are unchanged are skipped by content hash while changed weights or build
+options rerun only the affected steps, and that rank shards and the draft
+pipeline run in parallel with ``workers``.
+"""
+
+import json
+import logging
+import shlex
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from scripts.convert_allam import (
+    FINGERPRINT_FILE,
+    AllamModelConverter,
+    CommandError,
+    ConversionConfig,
+    create_default_config,
+    directory_fingerprint,
+    run_command,
+)
+
+
+def python_command(code: str) -> str:
+    return f"{shlex.quote(sys.executable)} -c {shlex.quote(code)}"
+
+
+def write_model(path: Path, weights: bytes = b"weights") -> Path:
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "config.json").write_text(json.dumps({"vocab_size": 64000}))
+    (path / "model.safetensors").write_bytes(weights)
+    return path
+
+
+class FakeRunner:
+    """Runs no tools; writes one shard per rank into the command's output directory."""
+
+    def __init__(self, fail: Optional[str] = None, barrier: Optional[threading.Barrier] = None):
+        self.fail = fail
+        self.barrier = barrier
+        self.names: List[str] = []
+        self.commands: List[str] = []
+
+    def __call__(self, command: str, timeout_s: Optional[float], name: str) -> None:
+        self.names.append(name)
+        self.commands.append(command)
+        if self.barrier is not None and "checkpoint conversion" in name.lower():
+            self.barrier.wait()
+        if name == self.fail:
+            raise CommandError(f"{name} exited with code 1")
+        parts = shlex.split(command)
+        output_dir = Path(parts[parts.index("--output_dir") + 1])
+        tp_size = int(parts[parts.index("--tp_size") + 1]) if "--tp_size" in parts else 1
+        for rank in range(tp_size):
+            (output_dir / f"rank{rank}.safetensors").write_text(command)
+
+
+def converter_for(tmp_path: Path, runner: FakeRunner, **changes) -> AllamModelConverter:
+    config = create_default_config(str(tmp_path / "allam"), str(tmp_path / "out"))
+    for field, value in changes.items():
+        setattr(config, field, value)
+    return AllamModelConverter(config, runner=runner)
+
+
+class TestRunCommand:
+    """
+    Tests for running one conversion command.
+
+    **Feature: tensorrt-llm-server, Property 31: Conversion Pipeline Execution**
+    **Validates: Requirements 2.1, 2.3**
+    """
+
+    def test_output_is_streamed_to_the_log(self, caplog) -> None:
+        """Every output line, stderr included, is logged under the step's name."""
+        with caplog.at_level(logging.INFO, logger="scripts.convert_allam"):
+            run_command(
+                python_command(
+                    "import sys; print('rank 0 done'); print('warning', file=sys.stderr)"
+                ),
+                timeout_s=30,
+                name="Engine build",
+            )
+        assert "[Engine build] rank 0 done" in caplog.messages
+        assert "[Engine build] warning" in caplog.messages
+
+    def test_failures_raise(self) -> None:
+        """A non-zero exit carries its last output lines; a missing tool cannot start."""
+        with pytest.raises(CommandError, match=r"exited with code 3:\nout of memory"):
+            run_command(python_command("print('out of memory'); raise SystemExit(3)"), timeout_s=30)
+        with pytest.raises(CommandError, match="could not start"):
+            run_command("trtllm-build-missing --checkpoint_dir x", timeout_s=30)
+
+    def test_timeout_kills_the_process_group(self, tmp_path: Path) -> None:
+        """A command over its timeout is killed with the processes it started."""
+        marker = tmp_path / "child-survived"
+        child = f"import time; time.sleep(1.5); open({str(marker)!r}, 'w').close()"
+        parent = (
+            f"import subprocess, sys, time; subprocess.Popen([sys.executable, '-c', {child!r}]); "
+            "time.sleep(30)"
+        )
+        start = time.perf_counter()
+        with pytest.raises(CommandError, match="timed out after 0.5s"):
+            run_command(python_command(parent), timeout_s=0.5)
+        assert time.perf_counter() - start < 5
+        time.sleep(2)
+        assert not marker.exists()
+
+
+class TestConversionCache:
+    """
+    Property tests for content-hash caching of the conversion steps.
+
+    **Feature: tensorrt-llm-server, Property 31: Conversion Pipeline Execution**
+    **Validates: Requirements 2.1, 2.2**
+    """
+
+    def test_fingerprint_follows_content(self, tmp_path: Path) -> None:
+        """Content and names change the fingerprint; hidden files and timestamps do not."""
+        model = write_model(tmp_path / "allam")
+        fingerprint = directory_fingerprint(model)
+        (model / FINGERPRINT_FILE).write_text("stale")
+        (model / ".cache").mkdir()
+        (model / ".cache" / "download.lock").write_text("lock")
+        (model / "model.safetensors").touch()
+        assert directory_fingerprint(model, workers=4) == fingerprint
+
+        (model / "model.safetensors").write_bytes(b"weightz")
+        changed = directory_fingerprint(model)
+        assert changed != fingerprint
+        (model / "model.safetensors").rename(model / "model-00001.safetensors")
+        assert directory_fingerprint(model) != changed
+
+    def test_unchanged_inputs_skip_steps(self, tmp_path: Path) -> None:
+        """A rerun skips everything; new weights rerun both steps, new options only the build."""
+        write_model(tmp_path / "allam")
+        runner = FakeRunner()
+        engine_dir = converter_for(tmp_path, runner).convert()
+        assert runner.names == ["Checkpoint conversion", "Engine build"]
+        assert (engine_dir / "rank0.safetensors").exists()
+
+        runner.names.clear()
+        converter_for(tmp_path, runner).convert()
+        assert runner.names == []
+
+        converter_for(tmp_path, runner, max_batch_size=16).convert()
+        assert runner.names == ["Engine build"]
+
+        runner.names.clear()
+        write_model(tmp_path / "allam", b"fine-tuned weights")
+        converter_for(tmp_path, runner, max_batch_size=16).convert()
+        assert runner.names == ["Checkpoint conversion", "Engine build"]
+
+        runner.names.clear()
+        converter_for(tmp_path, runner, max_batch_size=16, force=True).convert()
+        assert runner.names == ["Checkpoint conversion", "Engine build"]
+
+    def test_failed_step_reruns(self, tmp_path: Path) -> None:
+        """A failed build leaves no fingerprint, so the next run retries it."""
+        write_model(tmp_path / "allam")
+        with pytest.raises(CommandError):
+            converter_for(tmp_path, FakeRunner(fail="Engine build")).convert()
+        assert not (tmp_path / "out" / "engine" / FINGERPRINT_FILE).exists()
+
+        runner = FakeRunner()
+        converter_for(tmp_path, runner).convert()
+        assert runner.names == ["Engine build"]
+
+    def test_rebuild_removes_stale_shards(self, tmp_path: Path) -> None:
+        """Shards of ranks an older build had and the new one has not are removed."""
+        write_model(tmp_path / "allam")
+        converter_for(tmp_path, FakeRunner(), tensor_parallel_size=4).convert()
+        converter_for(tmp_path, FakeRunner(), tensor_parallel_size=2).convert()
+        shards = sorted(p.name for p in (tmp_path / "out" / "checkpoint").glob("rank*"))
+        assert shards == ["rank0.safetensors", "rank1.safetensors"]
+
+
+class TestParallelConversion:
+    """
+    Property tests for parallel rank shards and draft/target pipelines.
+
+    **Feature: tensorrt-llm-server, Property 31: Conversion Pipeline Execution**
+    **Validates: Requirements 2.1, 2.2**
+    """
+
+    @given(tensor_parallel_size=st.integers(1, 8), workers=st.integers(1, 8))
+    @settings(max_examples=50)
+    def test_ranks_convert_in_parallel(self, tensor_parallel_size: int, workers: int) -> None:
+        """Both tools get one worker per rank, up to ``workers``, and none without parallelism."""
+        config = create_default_config("allam", "out")
+        config.tensor_parallel_size, config.workers = tensor_parallel_size, workers
+        converter = AllamModelConverter(config)
+        expected = min(tensor_parallel_size, workers)
+        for command in (
+            converter._build_checkpoint_convert_command(Path("ckpt")),
+            converter._build_engine_command(Path("ckpt"), Path("engine")),
+        ):
+            assert ("--workers" in command) == (expected > 1)
+            if expected > 1:
+                assert f"--workers {expected}" in command
+
+    def test_draft_pipeline_runs_alongside_target(self, tmp_path: Path) -> None:
+        """With two workers both checkpoint conversions run at once; a failure stops both."""
+        write_model(tmp_path / "allam")
+        write_model(tmp_path / "draft", b"draft weights")
+        runner = FakeRunner(barrier=threading.Barrier(2, timeout=10))
+        converter_for(tmp_path, runner, draft_model_dir=tmp_path / "draft", workers=2).convert()
+        assert sorted(runner.names) == sorted([
+            "Checkpoint conversion", "Engine build",
+            "Draft checkpoint conversion", "Draft engine build",
+        ])
+
+        write_model(tmp_path / "allam", b"new weights")
+        write_model(tmp_path / "draft", b"new draft weights")
+        runner = FakeRunner(fail="Checkpoint conversion")
+        with pytest.raises(CommandError):
+            converter_for(tmp_path, runner, draft_model_dir=tmp_path / "draft").convert()
+        assert "Engine build" not in runner.names and "Draft engine build" not in runner.names
+
+    def test_rejects_bad_settings(self, tmp_path: Path) -> None:
+        """Workers and timeouts must be positive."""
+        config: ConversionConfig = create_default_config(str(tmp_path), str(tmp_path / "out"))
+        for field, value in (("workers", 0), ("command_timeout_s", 0.0)):
+            original = getattr(config, field)
+            setattr(config, field, value)
+            with pytest.raises(ValueError):
+                config.validate()
+            setattr(config, field, original)
@@ -0,0 +1,183 @@
+"""
+Property-based tests for the quantized embedding store.
+
+**Feature: tensorrt-llm-server, Property 14: Quantized Store Fidelity**
+**Validates: Requirements 4.1, 4.2**
+
+Tests that float16/int8 rows reconstruct within quantization error, that
+brute-force block search matches a float32 search over the reconstructed
+rows, that appends are invisible until committed and readable after
+reopening, and that compaction drops exactly the deleted rows.
+"""
+
+import asyncio
+import tempfile
+from typing import List
+
+import numpy as np
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from rag.chunking import Chunk, Document
+from rag.embeddings import BatchingEmbedder
+from rag.index import NumpyVectorIndex
+from rag.pipeline import RetrievalPipeline
+from rag.store import EmbeddingStore, dequantize, quantize
+from tests.test_semantic_cache_properties import KeywordEmbedder
+
+dtypes = st.sampled_from(["float16", "int8"])
+
+
+def unit_vectors(n: int, d: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, d)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_chunks(n: int, start: int = 0, document: str = "doc") -> List[Chunk]:
+    return [
+        Chunk(f"{document}-{i}#0", f"{document}-{i}", "traffic", f"نص {i}", 0, "عنوان")
+        for i in range(start, start + n)
+    ]
+
+
+class TestQuantization:
+    """
+    Property tests for store quantization.
+
+    **Feature: tensorrt-llm-server, Property 14: Quantized Store Fidelity**
+    **Validates: Requirements 4.2**
+    """
+
+    @given(n=st.integers(1, 50), seed=st.integers(0, 2**16), dtype=dtypes)
+    @settings(max_examples=100)
+    def test_reconstruction_error_bounded(self, n: int, seed: int, dtype: str) -> None:
+        """Dequantized rows stay within half a quantization step of the originals."""
+        vectors = unit_vectors(n, 32, seed)
+        quantized, scales = quantize(vectors, dtype)
+        error = np.abs(dequantize(quantized, scales) - vectors)
+        if dtype == "int8":
+            assert (error <= scales[:, None] / 2 + 1e-6).all()
+        else:
+            assert error.max() <= 1e-3
+
+
+class TestEmbeddingStore:
+    """
+    Property tests for ``EmbeddingStore``.
+
+    **Feature: tensorrt-llm-server, Property 14: Quantized Store Fidelity**
+    **Validates: Requirements 4.1, 4.2**
+    """
+
+    @given(
+        n=st.integers(0, 120),
+        k=st.integers(1, 8),
+        block_rows=st.integers(1, 64),
+        seed=st.integers(0, 2**16),
+        dtype=dtypes,
+    )
+    @settings(max_examples=50, deadline=None)
+    def test_block_search_matches_float_search(
+        self, n: int, k: int, block_rows: int, seed: int, dtype: str
+    ) -> None:
+        """Blockwise search equals exact search over the dequantized matrix."""
+        d = 16
+        vectors = unit_vectors(n, d, seed)
+        queries = unit_vectors(3, d, seed + 1)
+        with tempfile.TemporaryDirectory() as tmp:
+            EmbeddingStore.build(tmp, d, vectors, make_chunks(n), dtype)
+            store = EmbeddingStore.open(tmp, block_rows=block_rows)
+            scores, ids = store.search(queries, k)
+            expected_scores, _ = NumpyVectorIndex(d, store.reconstruct()).search(queries, k)
+
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-5, atol=1e-5)
+        found = min(k, n)
+        assert (ids[:, :found] >= 0).all() and (ids[:, found:] == -1).all()
+
+    @given(first=st.integers(1, 30), second=st.integers(1, 30), dtype=dtypes)
+    @settings(max_examples=30, deadline=None)
+    def test_append_visible_after_reopen(self, first: int, second: int, dtype: str) -> None:
+        """Open stores keep their row count; reopening sees appended rows and metadata."""
+        d = 8
+        with tempfile.TemporaryDirectory() as tmp:
+            reader = EmbeddingStore.build(
+                tmp, d, unit_vectors(first, d, 1), make_chunks(first), dtype
+            )
+            new_chunks = make_chunks(second, start=first)
+            EmbeddingStore.append(tmp, unit_vectors(second, d, 2), new_chunks)
+
+            assert len(reader) == first
+            reopened = EmbeddingStore.open(tmp)
+            assert len(reopened) == len(reopened.chunks) == first + second
+            assert list(reopened.chunks[first:]) == new_chunks
+
+    def test_interrupted_append_ignored(self) -> None:
+        """Bytes written past the committed row count are overwritten by the next append."""
+        d = 4
+        with tempfile.TemporaryDirectory() as tmp:
+            store = EmbeddingStore.build(tmp, d, unit_vectors(2, d, 1), make_chunks(2))
+            with open(store._vectors.filename, "ab") as f:
+                f.write(b"\x7f" * d * 3)  # torn append: rows but no manifest
+            assert len(EmbeddingStore.open(tmp)) == 2
+
+            EmbeddingStore.append(tmp, unit_vectors(1, d, 2), make_chunks(1, start=2))
+            reopened = EmbeddingStore.open(tmp)
+            assert len(reopened) == 3
+            assert reopened.chunks[2].document_id == "doc-2"
+            np.testing.assert_allclose(
+                reopened.reconstruct()[2], unit_vectors(1, d, 2)[0], atol=0.02
+            )
+
+    @given(n=st.integers(2, 40), data=st.data())
+    @settings(max_examples=30, deadline=None)
+    def test_delete_and_compact(self, n: int, data) -> None:
+        """Deleted rows are never returned and compaction removes exactly them."""
+        d = 8
+        deleted = data.draw(st.sets(st.integers(0, n - 1), max_size=n - 1))
+        vectors = unit_vectors(n, d, n)
+        chunks = make_chunks(n)
+        with tempfile.TemporaryDirectory() as tmp:
+            reader = EmbeddingStore.build(tmp, d, vectors, chunks)
+            removed = EmbeddingStore.delete_documents(tmp, [chunks[i].document_id for i in deleted])
+            assert removed == len(deleted)
+
+            # Tombstones are shared with already-open readers
+            _, ids = reader.search(vectors, n)
+            assert not set(ids[ids >= 0].tolist()) & deleted
+            assert reader.live_count == n - len(deleted)
+
+            assert EmbeddingStore.compact(tmp) == n - len(deleted)
+            compacted = EmbeddingStore.open(tmp)
+            kept = [chunks[i] for i in range(n) if i not in deleted]
+            assert list(compacted.chunks) == kept
+            # The old generation is unlinked but still readable through its mapping
+            assert len(reader.chunks) == n
+
+
+class TestStorePipeline:
+    """
+    Tests for ``RetrievalPipeline`` on an ``EmbeddingStore``.
+
+    **Feature: tensorrt-llm-server, Property 14: Quantized Store Fidelity**
+    **Validates: Requirements 4.1, 4.2**
+    """
+
+    def test_indexes_into_store_and_reloads(self) -> None:
+        """Documents added through the pipeline are retrievable after loading the store."""
+        async def run_test():
+            embedder = BatchingEmbedder(KeywordEmbedder())
+            documents = [
+                Document("traffic-001", "traffic", "تجديد رخصة القيادة عبر أبشر."),
+                Document("passports-001", "passports", "إصدار جواز السفر إلكترونياً."),
+            ]
+            with tempfile.TemporaryDirectory() as tmp:
+                store = EmbeddingStore.build(tmp, embedder.dimension, dtype="int8")
+                pipeline = RetrievalPipeline(embedder, store, min_score=0.5)
+                assert await pipeline.add_documents(documents) == 2
+
+                loaded = RetrievalPipeline.load(tmp, embedder, min_score=0.5)
+                results = await loaded.retrieve("جواز السفر")
+                assert results[0].chunk.document_id == "passports-001"
+
+        asyncio.get_event_loop().run_until_complete(run_test())
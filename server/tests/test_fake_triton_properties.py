@@ -0,0 +1,197 @@
+"""
+Property-based tests for the fake Triton gRPC server.
+
+**Feature: tensorrt-llm-server, Property 28: Triton Protocol Round Trip**
+**Validates: Requirements 3.2, 9.2**
+
+Tests that the real ``TritonClient`` (channel pool, micro-batching, stream
+cancellation and stop sequences included) talks to the fake server over
+gRPC, that reported token counts match the generated text, and that the
+simulated engine keeps to the batch size and KV-cache capacity of
+``allam_tensorrt`` and frees the slot of a cancelled stream.
+"""
+
+import asyncio
+from typing import List
+
+from hypothesis import example, given, settings
+from hypothesis import strategies as st
+
+from models.channel_pool import TritonChannelPool
+from models.mock_latency import LatencyModel
+from models.triton_client import InferenceConfig, TritonClient, mock_response
+from models.usage import GenerationStats, estimate_tokens
+from scripts.fake_triton_server import FakeEngine, FakeTritonServer, engine_limits, tokenize
+
+PASSPORT = "كيف أجدد الجواز؟"
+LICENSE = "أريد تجديد رخصة القيادة"
+
+
+async def read_stream(client: TritonClient, prompt: str, config: InferenceConfig) -> str:
+    return "".join([token async for token in client.infer_stream(prompt, config)])
+
+
+class TestFakeEngine:
+    """
+    Tests for the simulated engine on its own.
+
+    **Feature: tensorrt-llm-server, Property 28: Triton Protocol Round Trip**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    @given(text=st.text(max_size=200))
+    @settings(max_examples=100)
+    def test_tokenize_matches_estimate(self, text: str) -> None:
+        """Pieces join back to the text and are as many as ``estimate_tokens`` counts."""
+        pieces = tokenize(text)
+        assert len(pieces) == estimate_tokens(text)
+        assert "".join(pieces) == text.rstrip() or not pieces
+
+    def test_limits_come_from_model_config(self) -> None:
+        """The default engine uses allam_tensorrt's batch size and KV-cache capacity."""
+        assert engine_limits() == (8, 2560)
+        engine = FakeEngine.from_config()
+        assert (engine.max_batch_size, engine.kv_cache_tokens) == (8, 2560)
+
+
+class TestFakeTritonServer:
+    """
+    Tests for ``TritonClient`` against the fake server.
+
+    **Feature: tensorrt-llm-server, Property 28: Triton Protocol Round Trip**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    def test_readiness(self) -> None:
+        """The server and the ensemble model are ready; unknown models are not."""
+        async def run_test():
+            async with FakeTritonServer(FakeEngine()) as server:
+                client = TritonClient(server.url)
+                missing = TritonClient(server.url, model_name="missing")
+                assert await client.is_server_ready() and await client.is_model_ready()
+                assert not await missing.is_model_ready()
+                await client.close()
+                await missing.close()
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(max_tokens=st.integers(0, 24), stream=st.booleans())
+    @example(max_tokens=0, stream=True)
+    @settings(max_examples=10, deadline=None)
+    def test_usage_is_exact(self, max_tokens: int, stream: bool) -> None:
+        """Text and reported usage follow ``max_tokens`` in both modes."""
+        async def run_test():
+            pieces = tokenize(mock_response(PASSPORT))[:max_tokens]
+            config = InferenceConfig(max_tokens=max_tokens, stream=stream)
+            async with FakeTritonServer(FakeEngine()) as server:
+                client = TritonClient(server.url)
+                if stream:
+                    stats = GenerationStats()
+                    text = "".join([t async for t in client.infer_stream(PASSPORT, config, stats)])
+                    completion_tokens, prompt_tokens, exact = (
+                        stats.completion_tokens, stats.prompt_tokens, stats.exact
+                    )
+                else:
+                    result = await client.infer(PASSPORT, config)
+                    text = result.text
+                    completion_tokens, prompt_tokens, exact = (
+                        result.tokens_generated, result.prompt_tokens, result.exact_usage
+                    )
+                await client.close()
+
+            assert text == "".join(pieces)
+            assert exact and completion_tokens == len(pieces)
+            assert prompt_tokens == estimate_tokens(PASSPORT)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_stop_sequence_cancels_stream(self) -> None:
+        """A stop sequence ends the stream and the server frees the sequence."""
+        async def run_test():
+            engine = FakeEngine(latency=LatencyModel(token_ms=5))
+            async with FakeTritonServer(engine) as server:
+                client = TritonClient(server.url)
+                text = await read_stream(client, LICENSE, InferenceConfig(stop=("مركز",)))
+                await asyncio.sleep(0.05)
+                assert text == mock_response(LICENSE).split("مركز")[0]
+                assert not engine.running and not engine.waiting
+                await client.close()
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_closed_stream_frees_its_slot(self) -> None:
+        """Closing a stream early ends its sequence at the next iteration."""
+        async def run_test():
+            engine = FakeEngine(latency=LatencyModel(token_ms=20))
+            async with FakeTritonServer(engine) as server:
+                client = TritonClient(server.url)
+                stream = client.infer_stream(PASSPORT)
+                await stream.__anext__()
+                assert len(engine.running) == 1
+                await stream.aclose()
+                await asyncio.sleep(0.1)
+                assert not engine.running
+                assert engine.iterations < len(tokenize(mock_response(PASSPORT)))
+                await client.close()
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_pool_spreads_streams(self) -> None:
+        """Concurrent streams through a pool use every channel."""
+        async def run_test():
+            engine = FakeEngine(latency=LatencyModel(token_ms=5))
+            async with FakeTritonServer(engine) as server:
+                pool = TritonChannelPool(server.url, size=2)
+                await pool.start()
+                client = TritonClient(server.url, pool=pool)
+                texts = await asyncio.gather(
+                    *(read_stream(client, PASSPORT, InferenceConfig()) for _ in range(6))
+                )
+                assert set(texts) == {mock_response(PASSPORT)}
+                assert [channel["requests"] for channel in pool.stats()] == [3, 3]
+                assert server.servicer.streams == 6
+                await pool.close()
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_micro_batches_reach_server(self) -> None:
+        """Client-side batching sends several rows per ``ModelInfer``."""
+        async def run_test():
+            async with FakeTritonServer(FakeEngine()) as server:
+                client = TritonClient(server.url, batch_window_ms=20)
+                prompts = [PASSPORT, LICENSE, "مرحبا"] * 2
+                results = await asyncio.gather(
+                    *(client.infer(p, InferenceConfig(stream=False)) for p in prompts)
+                )
+                assert [r.text for r in results] == [mock_response(p) for p in prompts]
+                assert sum(server.servicer.batch_sizes) == len(prompts)
+                assert max(server.servicer.batch_sizes) > 1
+                await client.close()
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_continuous_batching_limits(self) -> None:
+        """Streams beyond the batch size or the KV cache wait or pause, and all finish."""
+        async def run_streams(engine: FakeEngine, count: int) -> List[str]:
+            async with FakeTritonServer(engine) as server:
+                client = TritonClient(server.url)
+                texts = await asyncio.gather(
+                    *(read_stream(client, LICENSE, InferenceConfig()) for _ in range(count))
+                )
+                await client.close()
+            return texts
+
+        async def run_test():
+            answer = mock_response(LICENSE)
+            latency = LatencyModel(token_ms=2)
+
+            engine = FakeEngine(latency=latency)
+            assert await run_streams(engine, 12) == [answer] * 12
+            assert engine.peak_batch == engine.max_batch_size
+
+            small = FakeEngine(kv_cache_tokens=48, latency=latency)
+            assert await run_streams(small, 6) == [answer] * 6
+            # Admitted on their prompts, the sequences outgrow the cache and take turns
+            assert small.peak_kv_tokens <= 48 and small.preempted > 0
+
+        asyncio.get_event_loop().run_until_complete(run_test())
@@ -0,0 +1,173 @@
+"""
+Property-based tests for cached health and readiness.
+
+**Feature: tensorrt-llm-server, Property 21: Cached Readiness**
+**Validates: Requirements 1.3**
+
+Tests that readiness is derived from probe outcomes (failures make the
+instance unavailable, slow probes or slow generation degrade it), that a
+hanging probe is bounded by its timeout, that the background task refreshes
+the snapshot, and that ``/health`` and ``/ready`` never call the
+dependencies themselves.
+"""
+
+import asyncio
+import time
+from typing import List
+
+from fastapi.testclient import TestClient
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from api.health import DEGRADED, READY, UNAVAILABLE, HealthMonitor
+from api.main import app, get_health_monitor
+from observability.metrics import TIME_TO_FIRST_TOKEN
+
+# Probe behaviours: (ok, delay in seconds)
+probe_specs = st.lists(
+    st.tuples(st.booleans(), st.sampled_from([0.0, 0.03])), min_size=1, max_size=4
+)
+
+
+def make_probe(ok: bool, delay: float, calls: List[int]):
+    async def probe() -> bool:
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return ok
+    return probe
+
+
+class TestHealthMonitor:
+    """
+    Property tests for ``HealthMonitor``.
+
+    **Feature: tensorrt-llm-server, Property 21: Cached Readiness**
+    **Validates: Requirements 1.3**
+    """
+
+    @given(specs=probe_specs)
+    @settings(max_examples=30, deadline=None)
+    def test_status_follows_probe_outcomes(self, specs) -> None:
+        """Any failure is unavailable; otherwise any slow probe is degraded."""
+        async def run_test():
+            calls: List[int] = []
+            probes = {f"p{i}": make_probe(ok, delay, calls) for i, (ok, delay) in enumerate(specs)}
+            monitor = HealthMonitor(probes, timeout_s=1.0, slow_probe_ms=15, max_ttft_ms=1e9)
+            snapshot = await monitor.check()
+
+            if not all(ok for ok, _ in specs):
+                assert snapshot.status == UNAVAILABLE
+            elif any(delay > 0 for _, delay in specs):
+                assert snapshot.status == DEGRADED
+            else:
+                assert snapshot.status == READY
+            assert len(calls) == len(specs)
+            assert [snapshot.ok(name) for name in probes] == [ok for ok, _ in specs]
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_hanging_probe_times_out(self) -> None:
+        """A probe that never answers fails after the timeout without stalling the round."""
+        async def run_test():
+            async def hang() -> bool:
+                await asyncio.sleep(60)
+                return True
+
+            monitor = HealthMonitor({"triton": hang}, timeout_s=0.05)
+            start = time.perf_counter()
+            snapshot = await monitor.check()
+            assert time.perf_counter() - start < 1.0
+            assert snapshot.status == UNAVAILABLE
+            assert "timed out" in snapshot.checks["triton"].error
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_slow_generation_degrades(self) -> None:
+        """Recent time to first token above the limit degrades an otherwise ready instance."""
+        async def run_test():
+            calls: List[int] = []
+            monitor = HealthMonitor({"triton": make_probe(True, 0, calls)}, max_ttft_ms=500)
+            TIME_TO_FIRST_TOKEN.labels("stream").observe(0.9)
+            TIME_TO_FIRST_TOKEN.labels("stream").observe(0.7)
+            snapshot = await monitor.check()
+            assert snapshot.status == DEGRADED
+            assert abs(snapshot.recent_ttft_ms - 800) < 1e-6
+
+            # No generation since the last round: the old latency is not reused
+            assert (await monitor.check()).status == READY
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_background_refresh_and_staleness(self) -> None:
+        """The background task picks up changes; a stalled monitor reports degraded."""
+        async def run_test():
+            state = {"ok": True}
+
+            async def probe() -> bool:
+                return state["ok"]
+
+            monitor = HealthMonitor({"triton": probe}, interval_s=0.01)
+            await monitor.start()
+            assert monitor.snapshot().status == READY
+            state["ok"] = False
+            await asyncio.sleep(0.1)
+            assert monitor.snapshot().status == UNAVAILABLE
+            state["ok"] = True
+            await asyncio.sleep(0.1)
+            await monitor.close()
+            assert monitor.snapshot().status == READY
+
+            await asyncio.sleep(0.1)
+            assert monitor.snapshot().status == DEGRADED
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+
+class TestHealthEndpoints:
+    """
+    Tests for ``/health`` and ``/ready``.
+
+    **Feature: tensorrt-llm-server, Property 21: Cached Readiness**
+    **Validates: Requirements 1.3**
+    """
+
+    def teardown_method(self) -> None:
+        app.dependency_overrides.clear()
+
+    def test_endpoints_serve_cached_snapshot(self) -> None:
+        """Probe calls do not grow with health requests; /ready maps status to HTTP codes."""
+        calls: List[int] = []
+        state = {"ok": True}
+
+        async def triton() -> bool:
+            calls.append(1)
+            return state["ok"]
+
+        monitor = HealthMonitor({"triton": triton}, interval_s=3600)
+        app.dependency_overrides[get_health_monitor] = lambda: monitor
+        client = TestClient(app)
+        loop = asyncio.get_event_loop()
+
+        loop.run_until_complete(monitor.check())
+        for _ in range(20):
+            assert client.get("/health").json()["status"] == "healthy"
+        response = client.get("/ready")
+        assert response.status_code == 200 and response.json()["status"] == READY
+        assert len(calls) == 1
+
+        state["ok"] = False
+        loop.run_until_complete(monitor.check())
+        health = client.get("/health").json()
+        assert health["status"] == "unhealthy" and health["triton_ready"] is False
+        assert health["qdrant_ready"] is True
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["checks"]["triton"]["ok"] is False
+        assert len(calls) == 2
+
+    def test_ready_without_monitor(self) -> None:
+        """Before startup completes the instance is not ready."""
+        app.dependency_overrides[get_health_monitor] = lambda: None
+        client = TestClient(app)
+        assert client.get("/ready").status_code == 503
+        assert client.get("/health").json()["status"] == "starting"
@@ -0,0 +1,234 @@
+"""
+Property-based tests for BM25 and hybrid retrieval.
+
+**Feature: tensorrt-llm-server, Property 16: Hybrid Retrieval Scoring**
+**Validates: Requirements 4.2**
+
+Tests that Arabic orthographic variants analyze to the same terms, that the
+array-backed BM25 scores match a direct evaluation of the formula, that
+incremental builds equal one-shot builds, that fused scores stay in
+``[0, 1]``, and that exact service codes are retrieved even when the dense
+embedding cannot tell documents apart.
+"""
+
+import asyncio
+import math
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from rag.bm25 import BM25Index, light_stem, tokenize
+from rag.chunking import Document
+from rag.embeddings import BatchingEmbedder
+from rag.hybrid import fuse
+from rag.index import NumpyVectorIndex
+from rag.pipeline import RetrievalPipeline
+from rag.store import EmbeddingStore
+from scripts.build_rag_index import build_index
+from tests.test_semantic_cache_properties import KeywordEmbedder
+
+vocabulary = ["رخصة", "القيادة", "جواز", "السفر", "تجديد", "مخالفة", "moi-123", "٣٤٥", "تأشيرة"]
+documents = st.lists(
+    st.lists(st.sampled_from(vocabulary), min_size=0, max_size=8).map(" ".join),
+    min_size=1,
+    max_size=20,
+)
+
+
+def reference_bm25(texts: List[str], query: str, k1: float = 1.2, b: float = 0.75) -> np.ndarray:
+    """Direct BM25 evaluation, one document at a time."""
+    docs = [Counter(tokenize(t)) for t in texts]
+    lengths = [sum(d.values()) for d in docs]
+    avg = max(sum(lengths) / len(docs), 1e-9)
+    scores = np.zeros(len(docs))
+    for term, count in Counter(tokenize(query)).items():
+        df = sum(1 for d in docs if term in d)
+        if df == 0:
+            continue
+        idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+        for i, d in enumerate(docs):
+            tf = d.get(term, 0)
+            if tf:
+                norm = 1 - b + b * lengths[i] / avg
+                scores[i] += count * idf * tf * (k1 + 1) / (tf + k1 * norm)
+    return scores
+
+
+class TestArabicAnalysis:
+    """
+    Tests for BM25 text analysis.
+
+    **Feature: tensorrt-llm-server, Property 16: Hybrid Retrieval Scoring**
+    **Validates: Requirements 4.2**
+    """
+
+    def test_orthographic_variants_share_terms(self) -> None:
+        """Diacritics, hamza forms, taa marbuta and Arabic-Indic digits do not change terms."""
+        assert tokenize("رُخْصَة") == tokenize("رخصه") == tokenize("الرخصة")
+        assert tokenize("إصدار") == tokenize("اصدار")
+        assert tokenize("نموذج ٣٤٥") == tokenize("نموذج 345")
+
+    def test_codes_kept_whole_and_split(self) -> None:
+        """Service codes match both as a whole and by their parts."""
+        terms = tokenize("خدمة MOI-123")
+        assert "moi-123" in terms and "moi" in terms and "123" in terms
+
+    @given(word=st.text(alphabet="ابتثجحخدرزسشصطعفقلمنهوي", min_size=1, max_size=10))
+    @settings(max_examples=200)
+    def test_stem_never_empty(self, word: str) -> None:
+        """Stemming never strips a token below two letters unless it was shorter."""
+        stem = light_stem(word)
+        assert stem and word.find(stem) >= 0
+        assert len(stem) >= min(2, len(word))
+
+
+class TestBM25Index:
+    """
+    Property tests for ``BM25Index``.
+
+    **Feature: tensorrt-llm-server, Property 16: Hybrid Retrieval Scoring**
+    **Validates: Requirements 4.2**
+    """
+
+    @given(texts=documents, query=st.sampled_from(vocabulary))
+    @settings(max_examples=100)
+    def test_scores_match_formula(self, texts: List[str], query: str) -> None:
+        """Precomputed posting weights reproduce BM25 exactly."""
+        index = BM25Index.from_texts(texts)
+        np.testing.assert_allclose(index.score(query), reference_bm25(texts, query), rtol=1e-5)
+
+    @given(texts=documents, split=st.integers(0, 20), query=st.sampled_from(vocabulary))
+    @settings(max_examples=100)
+    def test_incremental_build_matches_one_shot(
+        self, texts: List[str], split: int, query: str
+    ) -> None:
+        """Adding documents in two builds gives the same scores as one build."""
+        incremental = BM25Index()
+        incremental.add(texts[:split])
+        incremental.build()
+        incremental.add(texts[split:])
+        one_shot = BM25Index.from_texts(texts)
+        np.testing.assert_allclose(incremental.score(query), one_shot.score(query), rtol=1e-5)
+
+    @given(texts=documents, query=st.sampled_from(vocabulary))
+    @settings(max_examples=25, deadline=None)
+    def test_save_load_round_trip(self, texts: List[str], query: str) -> None:
+        """A memory-mapped reload scores identically."""
+        index = BM25Index.from_texts(texts)
+        with tempfile.TemporaryDirectory() as tmp:
+            index.save(tmp)
+            np.testing.assert_allclose(BM25Index.load(tmp).score(query), index.score(query))
+
+
+class TestFusion:
+    """
+    Property tests for dense/sparse fusion.
+
+    **Feature: tensorrt-llm-server, Property 16: Hybrid Retrieval Scoring**
+    **Validates: Requirements 4.2**
+    """
+
+    @given(
+        method=st.sampled_from(["rrf", "weighted"]),
+        dense=st.lists(st.floats(-1, 1, allow_nan=False), max_size=10),
+        sparse=st.lists(st.floats(0.01, 50, allow_nan=False), max_size=10),
+        weight=st.floats(0, 1),
+    )
+    @settings(max_examples=200)
+    def test_scores_bounded_and_sorted(self, method, dense, sparse, weight) -> None:
+        """Fused scores lie in [0, 1], best first, with each id once."""
+        dense_scores = np.sort(np.array(dense, dtype=np.float32))[::-1]
+        sparse_scores = np.sort(np.array(sparse, dtype=np.float32))[::-1]
+        dense_ids = np.arange(len(dense))
+        sparse_ids = np.arange(len(sparse)) + 5
+        fused = fuse(
+            method, dense_ids, dense_scores, sparse_ids, sparse_scores, dense_weight=weight
+        )
+
+        scores = [score for _, score in fused]
+        assert all(-1e-6 <= s <= 1 + 1e-6 for s in scores)
+        assert scores == sorted(scores, reverse=True)
+        assert len({doc for doc, _ in fused}) == len(fused)
+
+    def test_rrf_top_in_both_scores_one(self) -> None:
+        """A chunk ranked first by both retrievers has relevance 1.0."""
+        fused = fuse("rrf", np.array([3, 1]), np.array([0.9, 0.5]), np.array([3]), np.array([7.0]))
+        assert fused[0] == (3, 1.0)
+
+
+class TestHybridPipeline:
+    """
+    Tests for hybrid ``RetrievalPipeline`` retrieval.
+
+    **Feature: tensorrt-llm-server, Property 16: Hybrid Retrieval Scoring**
+    **Validates: Requirements 4.2**
+    """
+
+    def test_exact_code_found_despite_identical_embeddings(self) -> None:
+        """Form numbers decide the ranking when dense scores tie."""
+        async def run_test():
+            embedder = BatchingEmbedder(KeywordEmbedder())
+            pipeline = RetrievalPipeline(
+                embedder, NumpyVectorIndex(embedder.dimension), sparse=BM25Index(), top_k=1
+            )
+            await pipeline.add_documents([
+                Document("form-101", "traffic", "نموذج رقم 101 لتجديد رخصة القيادة."),
+                Document("form-202", "traffic", "نموذج رقم 202 لتجديد رخصة القيادة."),
+            ])
+            results = await pipeline.retrieve("نموذج ٢٠٢ رخصة")
+            assert [r.chunk.document_id for r in results] == ["form-202"]
+            assert 0 < results[0].score <= 1
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_saved_pipeline_reloads_hybrid(self) -> None:
+        """The BM25 index is saved with the pipeline and picked up by ``load``."""
+        async def run_test():
+            embedder = BatchingEmbedder(KeywordEmbedder())
+            pipeline = RetrievalPipeline(embedder, NumpyVectorIndex(embedder.dimension))
+            await pipeline.add_documents([Document("d1", "traffic", "خدمة MOI-123 للمخالفات.")])
+            pipeline.rebuild_sparse()
+            with tempfile.TemporaryDirectory() as tmp:
+                pipeline.save(tmp)
+                loaded = RetrievalPipeline.load(tmp, embedder, fusion="weighted")
+                assert loaded.sparse is not None
+                results = await loaded.retrieve("moi-123")
+                assert results[0].chunk.document_id == "d1"
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_deleted_rows_not_found_lexically(self) -> None:
+        """Tombstoned store rows stay out of hybrid results before the BM25 rebuild."""
+        async def run_test():
+            embedder = BatchingEmbedder(KeywordEmbedder())
+            with tempfile.TemporaryDirectory() as tmp:
+                store = EmbeddingStore.build(Path(tmp), embedder.dimension)
+                pipeline = RetrievalPipeline(embedder, store, top_k=2)
+                await pipeline.add_documents([
+                    Document("form-101", "traffic", "نموذج رقم 101 لتجديد رخصة القيادة."),
+                    Document("form-202", "traffic", "نموذج رقم 202 لتجديد رخصة القيادة."),
+                ])
+                pipeline.rebuild_sparse()
+                pipeline.save(Path(tmp))
+                EmbeddingStore.delete_documents(Path(tmp), ["form-202"])
+
+                loaded = RetrievalPipeline.load(Path(tmp), embedder, top_k=2)
+                results = await loaded.retrieve("نموذج ٢٠٢")
+                assert [r.chunk.document_id for r in results] == ["form-101"]
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_append_without_bm25_refused_when_one_exists(self) -> None:
+        """Appending without rebuilding an existing BM25 index would desync it from the store."""
+        with tempfile.TemporaryDirectory() as tmp:
+            BM25Index.from_texts(["نموذج رقم 101"]).save(Path(tmp))
+            with pytest.raises(ValueError, match="BM25"):
+                asyncio.get_event_loop().run_until_complete(
+                    build_index([], Path(tmp), "unused", 500, 50, append=True, bm25=False)
+                )
@@ -0,0 +1,226 @@
+"""
+Property-based tests for Prometheus metrics.
+
+**Feature: tensorrt-llm-server, Property 20: Metrics Exposition**
+**Validates: Requirements 9.2**
+
+Tests that histograms render cumulative buckets consistent with the observed
+values, that label values are escaped, that the in-flight stream gauge
+returns to zero however a stream ends, that batching queue waits are
+recorded per request and that ``/metrics`` exposes the chat pipeline stages.
+"""
+
+import asyncio
+import math
+import re
+from typing import Dict, List, Tuple
+
+from fastapi.testclient import TestClient
+from hypothesis import example, given, settings
+from hypothesis import strategies as st
+
+from api.main import app, get_guardrails, get_triton_client
+from guardrails import Guardrails
+from models.batching import MicroBatcher
+from models.triton_client import MockTritonClient, TritonClient
+from observability.metrics import (
+    CONTENT_TYPE,
+    GENERATION,
+    QUEUE_WAIT,
+    TRITON_STREAMS,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+)
+
+SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse(text: str) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+    """Samples of a Prometheus text exposition by (name, labels)."""
+    samples = {}
+    for line in text.split("\n"):
+        if not line or line.startswith("#"):
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        name, labels, value = match.groups()
+        key = tuple(sorted(LABEL.findall(labels or "")))
+        samples[(name, key)] = math.inf if value == "+Inf" else float(value)
+    return samples
+
+
+bounds = st.lists(st.floats(0.001, 100, allow_nan=False), min_size=1, max_size=10, unique=True)
+values = st.lists(st.floats(0, 200, allow_nan=False), max_size=50)
+
+
+class TestMetricPrimitives:
+    """
+    Property tests for the hand-rolled metric types.
+
+    **Feature: tensorrt-llm-server, Property 20: Metrics Exposition**
+    **Validates: Requirements 9.2**
+    """
+
+    @given(buckets=bounds, observed=values)
+    @settings(max_examples=200)
+    def test_histogram_buckets_are_cumulative(
+        self, buckets: List[float], observed: List[float]
+    ) -> None:
+        """Each ``le`` bucket counts the values at or below its bound."""
+        registry = Registry()
+        histogram = registry.register(Histogram("h_seconds", "test", buckets=buckets))
+        for value in observed:
+            histogram.observe(value)
+
+        samples = parse(registry.render())
+        for bound in sorted(buckets):
+            le = repr(float(bound)) if not float(bound).is_integer() else str(int(bound))
+            expected = sum(1 for v in observed if v <= bound)
+            assert samples[("h_seconds_bucket", (("le", le),))] == expected
+        assert samples[("h_seconds_bucket", (("le", "+Inf"),))] == len(observed)
+        assert samples[("h_seconds_count", ())] == len(observed)
+        assert math.isclose(samples[("h_seconds_sum", ())], sum(observed), abs_tol=1e-6)
+
+    @given(value=st.text(max_size=20))
+    @example(value='\\n"\n\\')
+    @settings(max_examples=100)
+    def test_label_values_are_escaped(self, value: str) -> None:
+        """Any label value renders as one parseable sample line."""
+        registry = Registry()
+        counter = registry.register(Counter("c_total", "test", labels=("name",)))
+        counter.labels(value).inc(2)
+
+        samples = parse(registry.render())
+        assert len(samples) == 1
+        (name, labels), count = next(iter(samples.items()))
+        unescaped = re.sub(
+            r"\\(.)", lambda m: {"n": "\n"}.get(m.group(1), m.group(1)), labels[0][1]
+        )
+        assert name == "c_total" and unescaped == value and count == 2
+
+    def test_gauge_function_read_at_scrape(self) -> None:
+        """Callback gauges report the current value, not the value at registration."""
+        registry = Registry()
+        gauge = registry.register(Gauge("g_ratio", "test", labels=("cache",)))
+        state = {"ratio": 0.25}
+        gauge.labels("response").set_function(lambda: state["ratio"])
+        state["ratio"] = 0.75
+        assert parse(registry.render())[("g_ratio", (("cache", "response"),))] == 0.75
+
+
+class FakeStreamCall:
+    def __init__(self, n_tokens: int):
+        self.remaining = n_tokens
+
+    def __aiter__(self) -> "FakeStreamCall":
+        return self
+
+    async def __anext__(self):
+        if self.remaining == 0:
+            raise StopAsyncIteration
+        self.remaining -= 1
+        await asyncio.sleep(0)
+        return FakeResult(), None
+
+    def cancel(self) -> bool:
+        return True
+
+
+class FakeResult:
+    def as_numpy(self, name: str):
+        return [b"token "] if name == "text_output" else None
+
+
+class FakeGrpcClient:
+    def __init__(self, n_tokens: int):
+        self.n_tokens = n_tokens
+
+    def stream_infer(self, inputs_iterator):
+        return FakeStreamCall(self.n_tokens)
+
+
+class TestPipelineMetrics:
+    """
+    Tests for instrumentation of the chat pipeline.
+
+    **Feature: tensorrt-llm-server, Property 20: Metrics Exposition**
+    **Validates: Requirements 9.2**
+    """
+
+    @given(n_tokens=st.integers(1, 10), read=st.lists(st.integers(0, 10), min_size=1, max_size=5))
+    @settings(max_examples=50)
+    def test_stream_gauge_returns_to_zero(self, n_tokens: int, read: List[int]) -> None:
+        """Concurrent streams raise the gauge; finished or abandoned ones lower it."""
+        async def run_test():
+            client = TritonClient()
+            client._client = FakeGrpcClient(n_tokens)
+            client._prepare_inputs = lambda prompt, config: []
+            before = TRITON_STREAMS.labels().get()
+            generations = GENERATION.labels("stream").count
+
+            streams = [client.infer_stream("مرحبا") for _ in read]
+            for stream in streams:
+                await stream.__anext__()
+            assert TRITON_STREAMS.labels().get() == before + len(read)
+
+            for stream, n in zip(streams, read):
+                for _ in range(n):
+                    try:
+                        await stream.__anext__()
+                    except StopAsyncIteration:
+                        break
+                await stream.aclose()
+
+            assert TRITON_STREAMS.labels().get() == before
+            assert GENERATION.labels("stream").count == generations + len(read)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(n_requests=st.integers(1, 20), max_batch_size=st.integers(1, 8))
+    @settings(max_examples=50)
+    def test_queue_wait_recorded_per_request(self, n_requests: int, max_batch_size: int) -> None:
+        """Every batched request records exactly one queue wait."""
+        async def run_test():
+            async def dispatch(prompts, key):
+                return prompts
+
+            batcher = MicroBatcher(
+                dispatch, max_batch_size=max_batch_size, window_ms=1.0, name="test"
+            )
+            child = QUEUE_WAIT.labels("test")
+            before = child.count
+            await asyncio.gather(*(batcher.submit(str(i), None) for i in range(n_requests)))
+            assert child.count == before + n_requests
+            assert child.sum >= 0
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_metrics_endpoint_exposes_chat_stages(self) -> None:
+        """A chat request shows up in the guardrails and generation histograms."""
+        app.dependency_overrides[get_triton_client] = lambda: MockTritonClient()
+        app.dependency_overrides[get_guardrails] = lambda: Guardrails.create([])
+        try:
+            client = TestClient(app)
+            before = parse(client.get("/metrics").text)
+            body = {
+                "messages": [{"role": "user", "content": "كيف أجدد رخصة القيادة؟"}],
+                "user_id": "u1",
+            }
+            assert client.post("/v1/chat", json=body).status_code == 200
+
+            response = client.get("/metrics")
+            assert response.headers["content-type"] == CONTENT_TYPE
+            after = parse(response.text)
+            for name, labels in [
+                ("absher_guardrails_seconds_count", (("direction", "input"),)),
+                ("absher_guardrails_seconds_count", (("direction", "output"),)),
+                ("absher_generation_seconds_count", (("mode", "sync"),)),
+                ("absher_time_to_first_token_seconds_count", (("mode", "sync"),)),
+            ]:
+                assert after[(name, labels)] == before.get((name, labels), 0) + 1
+            assert ("absher_triton_streams_in_flight", ()) in after
+        finally:
+            app.dependency_overrides.clear()
@@ -0,0 +1,182 @@
+"""
+Property-based tests for KV-cache prefix reuse.
+
+**Feature: tensorrt-llm-server, Property 25: Stable Prompt Prefix**
+**Validates: Requirements 3.2, 9.2**
+
+Tests that the prefix tracker counts exactly the whole blocks a prompt shares
+with an earlier one and stays within the cache capacity, that placing the
+retrieved passages in the latest user turn keeps the previous prompt's
+system block and history as a prefix of the next one, that session trimming
+keeps the same first turn across turns, that the engine build enables block
+reuse, and that the Triton client reports reused prompt tokens.
+"""
+
+import asyncio
+import os
+from pathlib import Path
+from typing import List
+
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from api.models import Message
+from api.prompt import CONTEXT_IN_SYSTEM, CONTEXT_IN_TURN, build_prompt
+from api.sessions import InMemorySessionStore, PromptAssembler
+from models import TRITON_MODEL_REPOSITORY
+from models.prefix_cache import PrefixCacheTracker
+from models.triton_client import InferenceConfig
+from observability.metrics import KV_PREFIX_TOKENS, TIME_TO_FIRST_TOKEN_BY_PREFIX
+from scripts.convert_allam import AllamModelConverter, create_default_config
+from tests.test_usage_properties import FakeGrpcClient, make_client
+
+texts = st.text(alphabet=st.sampled_from(list("ابتثجحخدر ؟")), min_size=1, max_size=600).filter(
+    lambda s: s.strip()
+)
+words = st.text(alphabet=st.sampled_from(list("ابتثجحخدر")), min_size=1, max_size=30)
+
+
+def longest_common_prefix(a: str, b: str) -> int:
+    return len(os.path.commonprefix([a, b]))
+
+
+class TestPrefixCacheTracker:
+    """
+    Property tests for ``PrefixCacheTracker``.
+
+    **Feature: tensorrt-llm-server, Property 25: Stable Prompt Prefix**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    @given(first=texts, second=texts)
+    @settings(max_examples=100)
+    def test_reuse_is_the_shared_whole_blocks(self, first: str, second: str) -> None:
+        """A prompt reuses exactly the complete blocks it shares with the previous one."""
+        tracker = PrefixCacheTracker(tokens_per_block=4, kv_cache_tokens=4096)
+        assert tracker.observe(first) == 0.0
+        shared = min(longest_common_prefix(first, second), len(first), len(second))
+        expected_blocks = shared // tracker.block_chars
+        assert tracker.observe(second) == expected_blocks * tracker.block_chars / len(second)
+        assert 0.0 <= tracker.hit_ratio <= 1.0
+
+    @given(prompts=st.lists(texts, min_size=1, max_size=30), capacity=st.integers(1, 20))
+    @settings(max_examples=100)
+    def test_capacity_bound(self, prompts: List[str], capacity: int) -> None:
+        """No more blocks are tracked than the KV cache holds."""
+        tracker = PrefixCacheTracker(tokens_per_block=2, kv_cache_tokens=2 * capacity)
+        for prompt in prompts:
+            tracker.observe(prompt)
+            assert len(tracker) <= capacity
+
+    def test_leading_blocks_evicted_last(self) -> None:
+        """The shared start of prompts outlives their tails."""
+        tracker = PrefixCacheTracker(tokens_per_block=1, kv_cache_tokens=3)
+        block = tracker.block_chars
+        system = "س" * block
+        tracker.observe(system + "أ" * block + "ب" * block)
+        tracker.observe(system + "ت" * block + "ث" * block)
+        assert tracker.observe(system + "ج" * block) == 0.5
+
+
+class TestStablePrefixLayout:
+    """
+    Tests for the prompt layout and session windows.
+
+    **Feature: tensorrt-llm-server, Property 25: Stable Prompt Prefix**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    @given(
+        turns=st.lists(st.tuples(words, words), min_size=1, max_size=5),
+        question=words,
+        contexts=st.lists(words, min_size=2, max_size=2, unique=True),
+    )
+    @settings(max_examples=100)
+    def test_next_turn_extends_previous_prefix(
+        self, turns, question: str, contexts: List[str]
+    ) -> None:
+        """With passages in the latest turn, the next prompt extends the last up to its question."""
+        messages: List[Message] = []
+        for asked, answered in turns:
+            messages += [
+                Message(role="user", content=asked), Message(role="assistant", content=answered)
+            ]
+        previous_messages = messages[:-1]
+        following = messages + [Message(role="user", content=question)]
+
+        in_turn = CONTEXT_IN_TURN
+        before = build_prompt(previous_messages, context=[contexts[0]], context_placement=in_turn)
+        after = build_prompt(following, context=[contexts[1]], context_placement=in_turn)
+        stable = ""
+        if len(turns) > 1:
+            stable = build_prompt(previous_messages[:-1], context_placement=in_turn)
+        stable = stable[: stable.rfind("[INST]")] if stable else after[: after.index("<</SYS>>")]
+        assert after.startswith(stable) and before.startswith(stable)
+
+        # In the system block the passages cut the shared prefix short
+        in_system = build_prompt(
+            following, context=[contexts[1]], context_placement=CONTEXT_IN_SYSTEM
+        )
+        previous = build_prompt(previous_messages, context=[contexts[0]])
+        shared = longest_common_prefix(in_system, previous)
+        assert shared < in_system.index("<</SYS>>")
+
+    def test_trimmed_window_keeps_its_first_turn(self) -> None:
+        """Once trimmed, the window's first turn only moves when the budget is exceeded again."""
+        async def run_test():
+            assembler = PromptAssembler(
+                InMemorySessionStore(), max_input_tokens=400, context_placement=CONTEXT_IN_TURN
+            )
+            messages: List[Message] = []
+            starts = []
+            for i in range(30):
+                messages.append(Message(role="user", content=f"سؤال رقم {i} عن تجديد الجواز"))
+                session = await assembler.build("s1", messages, context=["مقطع من دليل الخدمة"])
+                assert session.prompt_tokens <= 400
+                starts.append(session.turns[0].key)
+                answer = f"الإجابة رقم {i} عن تجديد الجواز عبر منصة أبشر"
+                await assembler.record_answer(session, answer)
+                messages.append(Message(role="assistant", content=answer))
+
+            changes = sum(1 for a, b in zip(starts, starts[1:]) if a != b)
+            assert 0 < changes < len(starts) // 3
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+
+class TestEngineAndClient:
+    """
+    Tests for the engine build and the Triton client.
+
+    **Feature: tensorrt-llm-server, Property 25: Stable Prompt Prefix**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    def test_engine_and_model_enable_reuse(self, tmp_path: Path) -> None:
+        """The engine is built for block reuse and the model config turns it on."""
+        config = create_default_config(str(tmp_path), str(tmp_path / "out"))
+        converter = AllamModelConverter(config)
+        command = converter._build_engine_command(tmp_path / "ckpt", tmp_path / "engine")
+        assert "--use_paged_context_fmha enable" in command
+        assert "--tokens_per_block 64" in command
+
+        model_config = (TRITON_MODEL_REPOSITORY / "allam_tensorrt" / "config.pbtxt").read_text()
+        assert 'key: "enable_kv_cache_reuse"\n  value: { string_value: "true" }' in model_config
+
+    def test_client_reports_reused_prefix_tokens(self) -> None:
+        """A repeated system prefix is counted as reused prompt tokens with a hit TTFT."""
+        async def run_test():
+            client = make_client(FakeGrpcClient(generated=2))
+            client.prefix_tracker = PrefixCacheTracker(tokens_per_block=8, kv_cache_tokens=2560)
+            system = "أنت مساعد أبشر الذكي. " * 20
+            reused = KV_PREFIX_TOKENS.labels("reused").value
+            hits = TIME_TO_FIRST_TOKEN_BY_PREFIX.labels("hit").count
+
+            await client.infer(system + "سؤال أول", InferenceConfig(stream=False))
+            assert KV_PREFIX_TOKENS.labels("reused").value == reused
+            await client.infer(system + "سؤال ثان", InferenceConfig(stream=False))
+            assert KV_PREFIX_TOKENS.labels("reused").value > reused
+            assert TIME_TO_FIRST_TOKEN_BY_PREFIX.labels("hit").count == hits + 1
+            assert client.prefix_tracker.hit_ratio > 0.4
+
+        asyncio.get_event_loop().run_until_complete(run_test())
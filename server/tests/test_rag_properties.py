@@ -0,0 +1,216 @@
+"""
+Property-based tests for the RAG retrieval pipeline.
+
+**Feature: tensorrt-llm-server, Property 13: Retrieval Correctness**
+**Validates: Requirements 4.1, 4.2**
+
+Tests that chunking respects its size bound without losing text, that index
+search returns exactly the brute-force top-k, that a saved index reloads
+memory-mapped with identical results, and that chat responses carry the
+retrieved sources with their relevance scores.
+"""
+
+import asyncio
+import tempfile
+from typing import List
+
+import numpy as np
+from fastapi.testclient import TestClient
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from api.main import app, get_retriever, get_semantic_cache, get_triton_client
+from api.models import Message
+from api.prompt import build_prompt
+from models.triton_client import MockTritonClient
+from rag.chunking import Document, chunk_text
+from rag.embeddings import BatchingEmbedder
+from rag.index import NumpyVectorIndex
+from rag.pipeline import RetrievalPipeline
+from tests.test_semantic_cache_properties import KeywordEmbedder
+
+words = st.text(alphabet="ابتثجحخدرزسشصطعفقلمنهوي", min_size=1, max_size=12)
+sentences = st.lists(words, min_size=1, max_size=12).map(lambda ws: " ".join(ws) + ".")
+texts = st.lists(sentences, min_size=1, max_size=20).map(" ".join)
+
+
+def unit_vectors(n: int, d: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, d)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+SERVICE_DOCUMENTS = [
+    Document("traffic-001", "traffic", "يمكن تجديد رخصة القيادة عبر أبشر بعد سداد الرسوم."),
+    Document("passports-001", "passports", "يصدر جواز السفر إلكترونياً ويتم استلامه من البريد."),
+    Document("civil-001", "civil_affairs", "تجدد الهوية الوطنية قبل انتهائها بستة أشهر."),
+]
+
+
+async def make_pipeline(top_k: int = 2) -> RetrievalPipeline:
+    embedder = BatchingEmbedder(KeywordEmbedder())
+    pipeline = RetrievalPipeline(
+        embedder, NumpyVectorIndex(embedder.dimension), top_k=top_k, min_score=0.5
+    )
+    await pipeline.add_documents(SERVICE_DOCUMENTS)
+    return pipeline
+
+
+class TestChunking:
+    """
+    Property tests for document chunking.
+
+    **Feature: tensorrt-llm-server, Property 13: Retrieval Correctness**
+    **Validates: Requirements 4.1**
+    """
+
+    @given(text=texts, max_chars=st.integers(min_value=20, max_value=300))
+    @settings(max_examples=100)
+    def test_chunks_bounded_and_cover_text(self, text: str, max_chars: int) -> None:
+        """Every chunk fits the bound; without overlap, chunks reassemble the text."""
+        chunks = chunk_text(text, max_chars=max_chars, overlap_chars=max_chars // 4)
+        assert chunks
+        assert all(0 < len(chunk) <= max_chars for chunk in chunks)
+
+        disjoint = chunk_text(text, max_chars=max_chars, overlap_chars=0)
+        assert "".join("".join(disjoint).split()) == "".join(text.split())
+
+
+class TestVectorIndex:
+    """
+    Property tests for ``NumpyVectorIndex``.
+
+    **Feature: tensorrt-llm-server, Property 13: Retrieval Correctness**
+    **Validates: Requirements 4.2**
+    """
+
+    @given(
+        n=st.integers(min_value=0, max_value=200),
+        n_queries=st.integers(min_value=1, max_value=5),
+        k=st.integers(min_value=1, max_value=10),
+        seed=st.integers(min_value=0, max_value=2**16),
+    )
+    @settings(max_examples=100)
+    def test_search_matches_brute_force(self, n: int, n_queries: int, k: int, seed: int) -> None:
+        """Top-k scores equal the k largest inner products, best first."""
+        d = 16
+        index = NumpyVectorIndex(d)
+        index.add(unit_vectors(n, d, seed))
+        queries = unit_vectors(n_queries, d, seed + 1)
+
+        scores, ids = index.search(queries, k)
+
+        assert scores.shape == ids.shape == (n_queries, k)
+        expected = -np.sort(-(queries @ index.vectors.T), axis=1)[:, :k]
+        found = min(k, n)
+        np.testing.assert_allclose(scores[:, :found], expected, rtol=1e-5, atol=1e-6)
+        assert (ids[:, found:] == -1).all()
+        for row in range(n_queries):
+            assert len(set(ids[row, :found].tolist())) == found
+
+    @given(n=st.integers(min_value=1, max_value=100), seed=st.integers(0, 2**16))
+    @settings(max_examples=25)
+    def test_memory_mapped_reload_identical(self, n: int, seed: int) -> None:
+        """A saved index reloads memory-mapped and answers identically."""
+        d = 8
+        index = NumpyVectorIndex(d, unit_vectors(n, d, seed))
+        queries = unit_vectors(3, d, seed + 1)
+        with tempfile.TemporaryDirectory() as tmp:
+            index.save(tmp)
+            loaded = NumpyVectorIndex.load(tmp)
+            assert isinstance(loaded.vectors, np.memmap)
+            for original, reloaded in zip(index.search(queries, 5), loaded.search(queries, 5)):
+                np.testing.assert_array_equal(original, reloaded)
+
+
+class TestRetrievalPipeline:
+    """
+    Tests for ``RetrievalPipeline``.
+
+    **Feature: tensorrt-llm-server, Property 13: Retrieval Correctness**
+    **Validates: Requirements 4.1, 4.2**
+    """
+
+    def test_retrieves_matching_service(self) -> None:
+        """A question about one service retrieves that service's document first."""
+        async def run_test():
+            pipeline = await make_pipeline()
+            results = await pipeline.retrieve("كيف أجدد رخصة القيادة؟")
+            assert results[0].chunk.document_id == "traffic-001"
+            assert all(r.score >= pipeline.min_score for r in results)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_save_and_load_round_trip(self) -> None:
+        """A loaded pipeline returns the same chunks and scores."""
+        async def run_test():
+            pipeline = await make_pipeline()
+            with tempfile.TemporaryDirectory() as tmp:
+                pipeline.save(tmp)
+                loaded = RetrievalPipeline.load(tmp, pipeline.embedder, min_score=0.5)
+                query = "موعد تجديد الهوية"
+                assert await loaded.retrieve(query) == await pipeline.retrieve(query)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(n=st.integers(min_value=1, max_value=16))
+    @settings(max_examples=20)
+    def test_retrieve_many_embeds_once(self, n: int) -> None:
+        """Several questions are embedded in one model call."""
+        async def run_test():
+            pipeline = await make_pipeline()
+            model = pipeline.embedder.embedder
+            model.calls.clear()
+            results = await pipeline.retrieve_many([f"جواز {i}" for i in range(n)])
+            assert len(results) == n
+            assert model.calls == [n]
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_context_added_to_system_block(self) -> None:
+        """Retrieved passages appear inside the system section of the prompt."""
+        prompt = build_prompt([Message(role="user", content="سؤال")], context=["مقطع أول"])
+        system_block = prompt.split("<</SYS>>")[0]
+        assert "مقطع أول" in system_block
+
+
+class RecordingMock(MockTritonClient):
+    def __init__(self):
+        super().__init__()
+        self.prompts: List[str] = []
+
+    async def infer(self, prompt, config=None):
+        self.prompts.append(prompt)
+        return await super().infer(prompt, config)
+
+
+class TestRetrievalEndpoint:
+    """
+    Tests for retrieval integration with ``POST /v1/chat``.
+
+    **Feature: tensorrt-llm-server, Property 13: Retrieval Correctness**
+    **Validates: Requirements 4.1, 4.2**
+    """
+
+    def teardown_method(self) -> None:
+        app.dependency_overrides.clear()
+
+    def test_response_carries_sources(self) -> None:
+        """Chat responses list retrieved documents and put them in the prompt."""
+        model = RecordingMock()
+        pipeline = asyncio.get_event_loop().run_until_complete(make_pipeline())
+        app.dependency_overrides[get_triton_client] = lambda: model
+        app.dependency_overrides[get_semantic_cache] = lambda: None
+        app.dependency_overrides[get_retriever] = lambda: pipeline
+
+        response = TestClient(app).post(
+            "/v1/chat",
+            json={"messages": [{"role": "user", "content": "تجديد جواز السفر"}], "user_id": "u1"},
+        )
+
+        assert response.status_code == 200
+        sources = response.json()["sources"]
+        assert sources[0]["document_id"] == "passports-001"
+        assert sources[0]["service_category"] == "passports"
+        assert 0.5 <= sources[0]["relevance_score"] <= 1.0 + 1e-6
+        assert SERVICE_DOCUMENTS[1].text in model.prompts[0]
@@ -0,0 +1,212 @@
+"""
+Property-based tests for per-user rate limiting.
+
+**Feature: tensorrt-llm-server, Property 23: Per-User Rate Limits**
+**Validates: Requirements 3.2, 9.2**
+
+Tests that a user never gets more requests than the burst plus the refill,
+that a denied request is allowed once its ``Retry-After`` has passed, that
+generated tokens put the bucket into debt, that limiters sharing Redis share
+one budget with one script call per check, that a slow or failing Redis
+falls back to local buckets, and that the chat endpoints answer a limited
+user with an Arabic 429.
+"""
+
+import asyncio
+from typing import List, Tuple
+
+from fastapi.testclient import TestClient
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from api.main import app, get_guardrails, get_rate_limiter, get_triton_client
+from api.rate_limit import LocalTokenBuckets, RateLimiter, RateLimits
+from models.triton_client import MockTritonClient
+from observability.metrics import RATE_LIMIT_FALLBACKS
+
+limits_strategy = st.builds(
+    RateLimits,
+    requests_per_minute=st.floats(6, 600),
+    request_burst=st.integers(1, 10).map(float),
+    tokens_per_minute=st.floats(600, 60_000),
+    token_burst=st.integers(100, 5000).map(float),
+)
+
+# (seconds since the previous request, user)
+arrivals = st.lists(
+    st.tuples(st.floats(0, 2), st.sampled_from(["u1", "u2"])), min_size=1, max_size=60
+)
+
+
+class FakeRedis:
+    """Stands in for ``redis.asyncio``: runs the bucket rules behind ``register_script``."""
+
+    def __init__(self, limits: RateLimits, delay_s: float = 0.0, fail: bool = False):
+        self.buckets = LocalTokenBuckets(limits)
+        self.delay_s = delay_s
+        self.fail = fail
+        self.calls: List[Tuple[list, list]] = []
+        self.closed = False
+
+    def register_script(self, script: str):
+        assert "redis.call('TIME')" in script
+
+        async def run(keys: list, args: list) -> list:
+            self.calls.append((keys, args))
+            await asyncio.sleep(self.delay_s)
+            if self.fail:
+                raise ConnectionError("connection refused")
+            requests, tokens, enforce = args[4], args[5], args[6]
+            decision = self.buckets.apply(keys[0], requests, tokens, enforce == 1)
+            return [int(decision.allowed), int(decision.retry_after_s * 1000 + 0.999)]
+
+        return run
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+    close = aclose
+
+
+class TestTokenBuckets:
+    """
+    Property tests for ``LocalTokenBuckets``.
+
+    **Feature: tensorrt-llm-server, Property 23: Per-User Rate Limits**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    @given(limits=limits_strategy, events=arrivals)
+    @settings(max_examples=100, deadline=None)
+    def test_allowed_requests_bounded_by_burst_and_refill(
+        self, limits: RateLimits, events: List[Tuple[float, str]]
+    ) -> None:
+        """Each user gets at most ``burst + rate * elapsed`` requests."""
+        buckets = LocalTokenBuckets(limits)
+        now = 0.0
+        allowed = {"u1": 0, "u2": 0}
+        for gap, user in events:
+            now += gap
+            if buckets.apply(user, 1, 0, now=now).allowed:
+                allowed[user] += 1
+        for count in allowed.values():
+            assert count <= limits.request_burst + limits.request_rate * now + 1e-9
+
+    @given(limits=limits_strategy)
+    @settings(max_examples=100, deadline=None)
+    def test_retry_after_is_sufficient(self, limits: RateLimits) -> None:
+        """A denied request is allowed once its ``retry_after_s`` has elapsed."""
+        buckets = LocalTokenBuckets(limits)
+        for _ in range(int(limits.request_burst)):
+            assert buckets.apply("u1", 1, 0, now=0.0).allowed
+        denied = buckets.apply("u1", 1, 0, now=0.0)
+        assert not denied.allowed and denied.retry_after_s > 0
+        assert buckets.apply("u1", 1, 0, now=denied.retry_after_s * (1 + 1e-9)).allowed
+
+    @given(limits=limits_strategy, overshoot=st.integers(1, 10_000))
+    @settings(max_examples=100, deadline=None)
+    def test_token_debt_blocks_until_repaid(self, limits: RateLimits, overshoot: int) -> None:
+        """Tokens beyond the burst are debited anyway and hold off the next request."""
+        buckets = LocalTokenBuckets(limits)
+        assert buckets.apply("u1", 1, 0, now=0.0).allowed
+        debit = limits.token_burst + overshoot
+        assert buckets.apply("u1", 0, debit, enforce=False, now=0.0).allowed
+        assert buckets.levels("u1", now=0.0)[1] == -overshoot
+
+        denied = buckets.apply("u1", 1, 0, now=0.0)
+        assert not denied.allowed
+        request_wait = (2 - limits.request_burst) / limits.request_rate
+        expected = max(request_wait, (overshoot + 1) / limits.token_rate)
+        assert abs(denied.retry_after_s - expected) < 1e-6
+        assert buckets.apply("u1", 1, 0, now=denied.retry_after_s * (1 + 1e-9) + 1e-9).allowed
+
+    def test_lru_bound(self) -> None:
+        """Only the most recently seen users are tracked."""
+        buckets = LocalTokenBuckets(RateLimits(request_burst=1), max_users=3)
+        for i in range(10):
+            buckets.apply(f"u{i}", 1, 0, now=0.0)
+        assert len(buckets) == 3
+        assert not buckets.apply("u9", 1, 0, now=0.0).allowed
+        assert buckets.apply("u0", 1, 0, now=0.0).allowed
+
+
+class TestRateLimiter:
+    """
+    Tests for ``RateLimiter`` over Redis.
+
+    **Feature: tensorrt-llm-server, Property 23: Per-User Rate Limits**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    def teardown_method(self) -> None:
+        app.dependency_overrides.clear()
+
+    @given(burst=st.integers(1, 10), workers=st.integers(1, 4))
+    @settings(max_examples=30, deadline=None)
+    def test_workers_share_one_budget(self, burst: int, workers: int) -> None:
+        """Limiters on one Redis admit ``burst`` requests in total, one script call each."""
+        async def run_test():
+            limits = RateLimits(requests_per_minute=0.001, request_burst=burst)
+            redis = FakeRedis(limits)
+            limiters = [RateLimiter(limits, redis) for _ in range(workers)]
+            decisions = [await limiters[i % workers].check("u1") for i in range(burst * 3)]
+
+            assert sum(d.allowed for d in decisions) == burst
+            assert all(d.source == "redis" for d in decisions)
+            assert len(redis.calls) == burst * 3
+            keys = redis.calls[0][0]
+            assert keys == ["absher:rl:{u1}:req", "absher:rl:{u1}:tok"]
+            assert (await limiters[0].check("u2")).allowed
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_slow_or_failing_redis_falls_back(self) -> None:
+        """A slow Redis is abandoned after the timeout and skipped during the back-off."""
+        async def run_test():
+            limits = RateLimits(request_burst=2)
+            redis = FakeRedis(limits, delay_s=1.0)
+            limiter = RateLimiter(limits, redis, timeout_s=0.02, failure_backoff_s=60)
+            fallbacks = RATE_LIMIT_FALLBACKS.labels().value
+
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            first = await limiter.check("u1")
+            assert loop.time() - start < 0.5
+            assert first.allowed and first.source == "local"
+            assert len(redis.calls) == 1
+
+            assert (await limiter.check("u1")).allowed
+            third = await limiter.check("u1")
+            assert not third.allowed and third.source == "local"
+            assert len(redis.calls) == 1
+            assert RATE_LIMIT_FALLBACKS.labels().value == fallbacks + 1
+
+            failing = RateLimiter(limits, FakeRedis(limits, fail=True), failure_backoff_s=0)
+            decision = await failing.check("u1")
+            assert decision.allowed and decision.source == "local"
+            await limiter.close()
+            assert redis.closed
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_endpoints_limit_with_arabic_429(self) -> None:
+        """Past the burst both endpoints answer 429; streamed tokens are debited."""
+        limiter = RateLimiter(RateLimits(requests_per_minute=0.001, request_burst=2))
+        app.dependency_overrides[get_triton_client] = lambda: MockTritonClient()
+        app.dependency_overrides[get_guardrails] = lambda: None
+        app.dependency_overrides[get_rate_limiter] = lambda: limiter
+
+        http = TestClient(app)
+        body = {"messages": [{"role": "user", "content": "كيف أجدد جواز السفر؟"}], "user_id": "u1"}
+        assert http.post("/v1/chat/stream", json=body).status_code == 200
+        assert limiter.local.levels("u1")[1] < limiter.limits.token_burst
+        assert http.post("/v1/chat", json=body).status_code == 200
+        for path in ("/v1/chat", "/v1/chat/stream"):
+            response = http.post(path, json=body)
+            assert response.status_code == 429
+            assert response.json()["error"] == "rate_limited"
+            assert response.json()["message_ar"]
+            assert int(response.headers["Retry-After"]) >= 1
+
+        other = dict(body, user_id="u2")
+        assert http.post("/v1/chat", json=other).status_code == 200
@@ -0,0 +1,240 @@
+"""
+Property-based tests for the response cache and Arabic normalization.
+
+**Feature: tensorrt-llm-server, Property 11: Response Cache Consistency**
+**Validates: Requirements 3.2**
+
+Tests that spelling variants of a question share one cache entry, that only
+deterministic or low-temperature configs are served from cache, and that
+entries expire and are evicted as configured.
+"""
+
+import asyncio
+from typing import List
+
+from fastapi.testclient import TestClient
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from api.main import app, get_triton_client
+from models.arabic import normalize_arabic
+from models.response_cache import (
+    CachedTritonClient,
+    InMemoryCacheBackend,
+    cache_key,
+)
+from models.triton_client import InferenceConfig, InferenceResult, MockTritonClient
+
+arabic_chars = "أإآابتثجحخدذرزسشصضطظعغفقكلمنهويىة"
+diacritics = "ًٌٍَُِّْـ"
+arabic_text = st.text(alphabet=arabic_chars + " ", min_size=1, max_size=60).filter(
+    lambda x: x.strip()
+)
+
+
+class CountingClient(MockTritonClient):
+    """Mock client that counts how often the model is actually invoked."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.finish_reason = "stop"
+
+    async def infer(self, prompt, config=None) -> InferenceResult:
+        self.calls += 1
+        return await super().infer(prompt, config)
+
+    async def infer_stream(self, prompt, config=None, stats=None):
+        self.calls += 1
+        for token in self._generate_mock_response(prompt).split():
+            yield token + " "
+        if stats is not None:
+            stats.finish_reason = self.finish_reason
+
+
+deterministic = InferenceConfig(temperature=0.0, stream=False)
+
+
+class TestArabicNormalization:
+    """
+    Property tests for ``normalize_arabic``.
+
+    **Feature: tensorrt-llm-server, Property 11: Response Cache Consistency**
+    **Validates: Requirements 3.2**
+    """
+
+    @given(text=arabic_text)
+    @settings(max_examples=100)
+    def test_normalization_is_idempotent(self, text: str) -> None:
+        """Normalizing twice gives the same result as normalizing once."""
+        assert normalize_arabic(normalize_arabic(text)) == normalize_arabic(text)
+
+    @given(text=arabic_text, marks=st.lists(st.sampled_from(diacritics), max_size=10))
+    @settings(max_examples=100)
+    def test_diacritics_and_tatweel_ignored(self, text: str, marks: List[str]) -> None:
+        """Inserting tashkeel or tatweel after letters does not change the result."""
+        decorated = "".join(
+            ch + (marks[i % len(marks)] if marks and ch != " " else "")
+            for i, ch in enumerate(text)
+        )
+        assert normalize_arabic(decorated) == normalize_arabic(text)
+
+    @given(
+        words=st.lists(arabic_text, min_size=1, max_size=5),
+        spaces=st.sampled_from([" ", "  ", "\t", "\n "]),
+    )
+    @settings(max_examples=100)
+    def test_whitespace_collapsed(self, words: List[str], spaces: str) -> None:
+        """Any whitespace run normalizes to a single space."""
+        assert normalize_arabic(spaces.join(words)) == normalize_arabic(" ".join(words))
+
+    def test_letter_variants_unified(self) -> None:
+        """Alef, yaa and taa marbuta variants map to one form."""
+        assert normalize_arabic("إجازة") == normalize_arabic("اجازه")
+        assert normalize_arabic("آمنة") == normalize_arabic("امنه")
+        assert normalize_arabic("مستشفى") == normalize_arabic("مستشفي")
+        assert normalize_arabic("رُخْصَة") == normalize_arabic("رخصه")
+
+
+class TestResponseCache:
+    """
+    Property tests for ``CachedTritonClient``.
+
+    **Feature: tensorrt-llm-server, Property 11: Response Cache Consistency**
+    **Validates: Requirements 3.2**
+    """
+
+    @given(question=arabic_text, repeats=st.integers(min_value=2, max_value=5))
+    @settings(max_examples=100)
+    def test_repeated_question_hits_cache(self, question: str, repeats: int) -> None:
+        """For any question asked repeatedly, the model runs exactly once."""
+        async def run_test():
+            model = CountingClient()
+            client = CachedTritonClient(model, InMemoryCacheBackend())
+            results = [await client.infer(question, deterministic) for _ in range(repeats)]
+
+            assert model.calls == 1
+            assert len({r.text for r in results}) == 1
+            assert client.stats.hits == repeats - 1
+            assert client.stats.hit_rate == (repeats - 1) / repeats
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(
+        question=arabic_text, marks=st.lists(st.sampled_from(diacritics), min_size=1, max_size=5)
+    )
+    @settings(max_examples=100)
+    def test_spelling_variants_share_entry(self, question: str, marks: List[str]) -> None:
+        """A diacritized or re-spaced variant of a cached question is a hit."""
+        variant = "  " + "".join(ch + marks[i % len(marks)] for i, ch in enumerate(question))
+        assert cache_key(question, deterministic) == cache_key(variant, deterministic)
+
+    @given(
+        question=arabic_text,
+        temperature=st.floats(min_value=0.31, max_value=2.0, allow_nan=False),
+    )
+    @settings(max_examples=100)
+    def test_high_temperature_bypasses_cache(self, question: str, temperature: float) -> None:
+        """Sampled (high-temperature) configs always reach the model."""
+        async def run_test():
+            model = CountingClient()
+            client = CachedTritonClient(model, InMemoryCacheBackend())
+            config = InferenceConfig(temperature=temperature, top_k=50, stream=False)
+            await client.infer(question, config)
+            await client.infer(question, config)
+            assert model.calls == 2
+            assert client.stats.bypassed == 2
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(question=arabic_text, max_tokens=st.integers(min_value=1, max_value=511))
+    @settings(max_examples=100)
+    def test_sampling_parameters_part_of_key(self, question: str, max_tokens: int) -> None:
+        """The same question with different generation settings is a separate entry."""
+        other = InferenceConfig(temperature=0.0, max_tokens=max_tokens, stream=False)
+        assert cache_key(question, deterministic) != cache_key(question, other)
+
+    def test_ttl_expiry(self) -> None:
+        """Entries are not served after their TTL."""
+        async def run_test():
+            model = CountingClient()
+            client = CachedTritonClient(model, InMemoryCacheBackend(), ttl_s=0.01)
+            await client.infer("تجديد الجواز", deterministic)
+            await asyncio.sleep(0.02)
+            await client.infer("تجديد الجواز", deterministic)
+            assert model.calls == 2
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(max_entries=st.integers(min_value=1, max_value=10), extra=st.integers(1, 10))
+    @settings(max_examples=50)
+    def test_lru_eviction_bounds_size(self, max_entries: int, extra: int) -> None:
+        """The in-memory backend never exceeds its capacity and evicts the oldest."""
+        async def run_test():
+            backend = InMemoryCacheBackend(max_entries=max_entries)
+            for i in range(max_entries + extra):
+                await backend.set(f"k{i}", f"v{i}", ttl_s=60)
+            assert len(backend) == max_entries
+            assert await backend.get("k0") is None
+            assert await backend.get(f"k{max_entries + extra - 1}") is not None
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_stream_cached_only_when_complete(self) -> None:
+        """A stream abandoned part-way or cut at ``max_tokens`` is not cached; a stopped one is."""
+        async def run_test():
+            model = CountingClient()
+            client = CachedTritonClient(model, InMemoryCacheBackend())
+            config = InferenceConfig(temperature=0.0, stream=True)
+            question = "تجديد رخصة القيادة"
+
+            stream = client.infer_stream(question, config)
+            await stream.__anext__()
+            await stream.aclose()
+            assert client.stats.misses == 1
+
+            model.finish_reason = "length"
+            [t async for t in client.infer_stream(question, config)]
+            assert model.calls == 2 and client.stats.misses == 2
+
+            model.finish_reason = "stop"
+            full = "".join([t async for t in client.infer_stream(question, config)])
+            replay = "".join([t async for t in client.infer_stream(question, config)])
+            assert model.calls == 3
+            assert replay == full
+            # A cached stream answers non-streaming calls too
+            result = await client.infer(question, InferenceConfig(temperature=0.0, stream=False))
+            assert model.calls == 3 and result.text == full
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+
+class TestChatEndpoint:
+    """
+    Tests for ``POST /v1/chat``.
+
+    **Feature: tensorrt-llm-server, Property 1: API Request-Response Consistency**
+    **Validates: Requirements 3.1, 3.3**
+    """
+
+    def teardown_method(self) -> None:
+        app.dependency_overrides.clear()
+
+    def test_chat_served_from_cache(self) -> None:
+        """Repeated chat requests return the same answer from one generation."""
+        model = CountingClient()
+        cached = CachedTritonClient(model, InMemoryCacheBackend(), max_temperature=1.0)
+        app.dependency_overrides[get_triton_client] = lambda: cached
+
+        client = TestClient(app)
+        body = {
+            "messages": [{"role": "user", "content": "كيف أجدد رخصة القيادة؟"}],
+            "user_id": "u1",
+        }
+        first = client.post("/v1/chat", json=body)
+        second = client.post("/v1/chat", json=body)
+
+        assert first.status_code == 200 and second.status_code == 200
+        assert first.json()["response"] == second.json()["response"]
+        assert "رخصة" in first.json()["response"]
+        assert model.calls == 1
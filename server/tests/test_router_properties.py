@@ -0,0 +1,314 @@
+"""
+Property-based tests for multi-replica Triton routing.
+
+**Feature: tensorrt-llm-server, Property 29: Replica Routing**
+**Validates: Requirements 3.2, 9.2**
+
+Tests that the router spreads concurrent generations evenly and away from
+slow replicas, keeps a conversation on the replica holding its KV-cache
+prefix until that replica is too busy, ejects and readmits replicas from
+their probes, and moves a generation that hits a connection error before
+its first chunk to another replica without the caller noticing, including
+against real fake Triton servers.
+"""
+
+import asyncio
+from typing import List, Optional
+
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from models.prefix_cache import PrefixCacheTracker
+from models.router import AFFINITY, LEAST_LOAD, TritonRouter
+from models.triton_client import (
+    InferenceConfig,
+    InferenceResult,
+    TritonClient,
+    TritonClientError,
+    mock_response,
+)
+from models.usage import GenerationStats
+from observability.metrics import ROUTER_FAILOVERS
+from scripts.fake_triton_server import FakeEngine, FakeTritonServer
+from tests.test_channel_pool_properties import FakeInferenceServerException
+
+SYSTEM = "أنت مساعد أبشر للخدمات الحكومية. " * 20
+ANSWER = ["يمكنك ", "تجديد ", "الجواز ", "عبر ", "أبشر."]
+
+
+def grpc_error(status: str = "UNAVAILABLE") -> TritonClientError:
+    """A client error raised from a gRPC error, as ``TritonClient`` raises it."""
+    try:
+        raise FakeInferenceServerException(f"StatusCode.{status}")
+    except FakeInferenceServerException as e:
+        try:
+            raise TritonClientError(f"Inference failed: {e}")
+        except TritonClientError as error:
+            return error
+
+
+class FakeReplica:
+    """Fake replica client with a prefix tracker, a delay and injectable failures."""
+
+    def __init__(self, url: str, delay_s: float = 0.0):
+        self.url = url
+        self.delay_s = delay_s
+        self.prefix_tracker = PrefixCacheTracker()
+        self.ready = True
+        self.fail_with: Optional[BaseException] = None
+        self.fail_after_chunks: Optional[int] = None
+        self.release: Optional[asyncio.Event] = None
+        self.prompts: List[str] = []
+
+    async def is_server_ready(self) -> bool:
+        return self.ready
+
+    async def is_model_ready(self) -> bool:
+        return self.ready
+
+    async def _generate(self, prompt: str) -> None:
+        self.prompts.append(prompt)
+        self.prefix_tracker.observe(prompt)
+        await asyncio.sleep(self.delay_s)
+        if self.release is not None:
+            await self.release.wait()
+        if self.fail_with is not None and self.fail_after_chunks is None:
+            raise self.fail_with
+
+    async def infer(self, prompt, config=None) -> InferenceResult:
+        await self._generate(prompt)
+        return InferenceResult("".join(ANSWER), len(ANSWER), 1.0, "stop")
+
+    async def infer_stream(self, prompt, config=None, stats=None):
+        await self._generate(prompt)
+        for i, chunk in enumerate(ANSWER):
+            if self.fail_with is not None and i == self.fail_after_chunks:
+                raise self.fail_with
+            yield chunk
+        if stats is not None:
+            stats.prompt_tokens, stats.completion_tokens = 7, len(ANSWER)
+
+    async def close(self) -> None:
+        pass
+
+
+def conversation(session: int, turns: int) -> str:
+    """Prompt of a session's turn: shared system prompt, then the session's own history."""
+    history = "".join(
+        f"سؤال {session} رقم {turn} عن تجديد الوثائق والخدمات. " * 8 for turn in range(turns)
+    )
+    return SYSTEM + history + "كيف أجدد الجواز؟"
+
+
+async def settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestReplicaSelection:
+    """
+    Property tests for least-load and KV-affinity selection.
+
+    **Feature: tensorrt-llm-server, Property 29: Replica Routing**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    @given(replicas=st.integers(2, 5), requests=st.integers(1, 30))
+    @settings(max_examples=50)
+    def test_concurrent_requests_are_spread(self, replicas: int, requests: int) -> None:
+        """Without history, in-flight generations differ by at most one across replicas."""
+        async def run_test():
+            clients = [FakeReplica(f"triton-{i}:8001") for i in range(replicas)]
+            release = asyncio.Event()
+            for client in clients:
+                client.release = release
+            router = TritonRouter(clients)
+            tasks = [
+                asyncio.ensure_future(router.infer(f"سؤال {i}", InferenceConfig(stream=False)))
+                for i in range(requests)
+            ]
+            await settle()
+            in_flight = [backend.in_flight for backend in router.backends]
+            assert sum(in_flight) == requests
+            assert max(in_flight) - min(in_flight) <= 1
+            release.set()
+            await asyncio.gather(*tasks)
+            assert all(backend.in_flight == 0 for backend in router.backends)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(streaming=st.booleans())
+    @settings(max_examples=4, deadline=None)
+    def test_slow_replica_gets_less_traffic(self, streaming: bool) -> None:
+        """The EWMA of time to first token (or of generation time) favours the fast replica."""
+        async def run_test():
+            fast, slow = FakeReplica("fast:8001", 0.001), FakeReplica("slow:8001", 0.03)
+            router = TritonRouter([fast, slow])
+            for i in range(20):
+                if streaming:
+                    [chunk async for chunk in router.infer_stream(f"سؤال {i}")]
+                else:
+                    await router.infer(f"سؤال {i}")
+            assert len(fast.prompts) >= 17
+            averages = [backend.average(streaming) for backend in router.backends]
+            assert averages[0] < averages[1]
+            # Whole generations are not mistaken for first tokens, nor the reverse
+            assert all(backend.average(not streaming) is None for backend in router.backends)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(sessions=st.integers(2, 6))
+    @settings(max_examples=20, deadline=None)
+    def test_follow_up_turns_stay_on_replica(self, sessions: int) -> None:
+        """Every later turn of a session goes to the replica that served its first turn."""
+        async def run_test():
+            clients = [FakeReplica(f"triton-{i}:8001") for i in range(3)]
+            router = TritonRouter(clients)
+            home = {}
+            for session in range(sessions):
+                prompt = conversation(session, 1)
+                await router.infer(prompt)
+                home[session] = next(c for c in clients if c.prompts and c.prompts[-1] == prompt)
+            for turns in (2, 3):
+                for session in range(sessions):
+                    prompt = conversation(session, turns)
+                    assert router._select(prompt, [])[1] == AFFINITY
+                    await router.infer(prompt)
+                    assert home[session].prompts[-1] == prompt
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_busy_replica_gives_up_affinity(self) -> None:
+        """A session moves once its replica has more than the slack in flight over another."""
+        async def run_test():
+            clients = [FakeReplica("a:8001"), FakeReplica("b:8001")]
+            router = TritonRouter(clients, affinity_slack=2)
+            await router.infer(conversation(0, 1))
+            home = next(b for b in router.backends if b.client.prompts)
+            home.in_flight = 2
+            assert router._select(conversation(0, 2), []) == (home, AFFINITY)
+            home.in_flight = 3
+            backend, decision = router._select(conversation(0, 2), [])
+            assert backend is not home and decision == LEAST_LOAD
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+
+class TestReplicaHealth:
+    """
+    Tests for ejection, readmission and failover.
+
+    **Feature: tensorrt-llm-server, Property 29: Replica Routing**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    def test_probes_eject_and_readmit(self) -> None:
+        """Failing replicas get no traffic until they pass a probe; all down still routes."""
+        async def run_test():
+            a, b = FakeReplica("a:8001"), FakeReplica("b:8001")
+            router = TritonRouter([a, b])
+            b.ready = False
+            assert await router.is_server_ready() and await router.is_model_ready()
+            for i in range(6):
+                await router.infer(f"سؤال {i}")
+            assert len(a.prompts) == 6 and not b.prompts
+
+            a.ready = False
+            assert not await router.is_server_ready() and not await router.is_model_ready()
+            await router.infer("سؤال")
+            assert len(a.prompts) + len(b.prompts) == 7
+
+            b.ready = True
+            assert await router.is_server_ready()
+            assert [backend.healthy for backend in router.backends] == [False, True]
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_failover_is_invisible(self) -> None:
+        """A connection error before the first chunk moves the request; the caller sees none."""
+        async def run_test():
+            a, b = FakeReplica("a:8001"), FakeReplica("b:8001")
+            router = TritonRouter([a, b])
+            a.fail_with = grpc_error()
+            failovers = ROUTER_FAILOVERS.labels("a:8001").value
+
+            # Replica a looks fastest, so it is tried first
+            router.backends[0].ewma_latency_s, router.backends[1].ewma_latency_s = 0.001, 1.0
+            result = await router.infer("سؤال", InferenceConfig(stream=False))
+            assert result.text == "".join(ANSWER)
+
+            router.backends[0].healthy = True
+            router.backends[0].ewma_ttft_s, router.backends[1].ewma_ttft_s = 0.001, 1.0
+            stats = GenerationStats()
+            chunks = [c async for c in router.infer_stream("سؤال", InferenceConfig(), stats=stats)]
+            assert chunks == ANSWER and stats.completion_tokens == len(ANSWER)
+            assert stats.streamed and stats.ttft_ms is not None
+
+            assert ROUTER_FAILOVERS.labels("a:8001").value == failovers + 2
+            assert not router.backends[0].healthy
+            assert all(backend.in_flight == 0 for backend in router.backends)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_errors_that_cannot_fail_over(self) -> None:
+        """Errors after the first chunk, model errors and the last replica's error are raised."""
+        async def run_test():
+            a, b = FakeReplica("a:8001"), FakeReplica("b:8001")
+            router = TritonRouter([a, b])
+
+            a.fail_with = b.fail_with = grpc_error()
+            a.fail_after_chunks = b.fail_after_chunks = 2
+            received = []
+            with pytest.raises(TritonClientError):
+                async for chunk in router.infer_stream("سؤال"):
+                    received.append(chunk)
+            assert received == ANSWER[:2]
+            assert len(a.prompts) + len(b.prompts) == 1
+
+            a.fail_after_chunks = b.fail_after_chunks = None
+            with pytest.raises(TritonClientError):
+                await router.infer("سؤال")
+            assert len(a.prompts) + len(b.prompts) == 3
+
+            for backend in router.backends:
+                backend.healthy = True
+            # Model errors fail on any replica: no retry, no ejection
+            prompts = 3
+            for error in (
+                TritonClientError("Inference failed: invalid input"),
+                grpc_error("INTERNAL"),
+                grpc_error("UNKNOWN"),
+            ):
+                a.fail_with = b.fail_with = error
+                with pytest.raises(TritonClientError):
+                    await router.infer("سؤال")
+                with pytest.raises(TritonClientError):
+                    [chunk async for chunk in router.infer_stream("سؤال")]
+                prompts += 2
+                assert len(a.prompts) + len(b.prompts) == prompts
+                assert all(backend.healthy for backend in router.backends)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_fails_over_between_fake_triton_servers(self) -> None:
+        """With one of two Triton servers stopped, generations complete on the other."""
+        async def run_test():
+            async with FakeTritonServer(FakeEngine()) as up:
+                down = await FakeTritonServer(FakeEngine()).start()
+                router = TritonRouter([TritonClient(down.url), TritonClient(up.url)])
+                assert await router.is_server_ready()
+                assert all(backend.healthy for backend in router.backends)
+                await down.close()
+
+                prompt = "كيف أجدد الجواز؟"
+                results = await asyncio.gather(
+                    *(router.infer(prompt, InferenceConfig(stream=False)) for _ in range(4))
+                )
+                text = "".join([t async for t in router.infer_stream(prompt, InferenceConfig())])
+                assert [r.text for r in results] == [mock_response(prompt)] * 4
+                assert text == mock_response(prompt)
+                assert [backend.healthy for backend in router.backends] == [False, True]
+                await router.close()
+
+        asyncio.get_event_loop().run_until_complete(run_test())
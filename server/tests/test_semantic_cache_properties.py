@@ -0,0 +1,257 @@
+"""
+Property-based tests for the semantic answer cache.
+
+**Feature: tensorrt-llm-server, Property 12: Semantic Cache Matching**
+**Validates: Requirements 3.2, 4.1**
+
+Tests that questions close in embedding space share a cached answer and its
+RAG sources, that dissimilar questions and questions with client system
+messages never do, that the index respects its memory cap, and that
+concurrent embeddings are batched into one model call.
+"""
+
+import asyncio
+from typing import List, Sequence
+
+import numpy as np
+from fastapi.testclient import TestClient
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from api.main import app, get_semantic_cache, get_triton_client
+from api.models import Message, RAGSource
+from api.semantic_cache import SemanticCache, cacheable_question
+from models.triton_client import MockTritonClient
+from rag.embeddings import BatchingEmbedder
+
+
+class KeywordEmbedder:
+    """
+    Deterministic embedder: one dimension per known keyword.
+
+    Questions sharing the same keywords embed identically, which stands in
+    for paraphrases in a real multilingual model.
+    """
+
+    KEYWORDS = ["رخص", "جواز", "هوي", "مخالف", "تاشير", "سفر", "مرور", "اقام"]
+
+    def __init__(self):
+        self.calls: List[int] = []
+
+    @property
+    def dimension(self) -> int:
+        return len(self.KEYWORDS) + 1
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        self.calls.append(len(texts))
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for col, keyword in enumerate(self.KEYWORDS):
+                if keyword in text.replace("ة", "ه").replace("أ", "ا"):
+                    vectors[row, col] = 1.0
+            if not vectors[row].any():
+                vectors[row, -1] = 1.0
+        return vectors
+
+
+keywords = st.sampled_from(KeywordEmbedder.KEYWORDS)
+source_lists = st.lists(
+    st.builds(
+        RAGSource,
+        document_id=st.text(alphabet="abcdef0123456789", min_size=1, max_size=8),
+        service_category=st.sampled_from(["traffic", "passports", "civil_affairs"]),
+        relevance_score=st.floats(min_value=0.0, max_value=1.0, allow_nan=False),
+    ),
+    max_size=3,
+)
+
+
+def make_cache(max_bytes: int = 1024 * 1024) -> SemanticCache:
+    return SemanticCache(BatchingEmbedder(KeywordEmbedder()), threshold=0.9, max_bytes=max_bytes)
+
+
+class TestSemanticCache:
+    """
+    Property tests for ``SemanticCache``.
+
+    **Feature: tensorrt-llm-server, Property 12: Semantic Cache Matching**
+    **Validates: Requirements 3.2, 4.1**
+    """
+
+    @given(keyword=keywords, sources=source_lists)
+    @settings(max_examples=100)
+    def test_paraphrase_returns_cached_answer_and_sources(
+        self, keyword: str, sources: List[RAGSource]
+    ) -> None:
+        """Two phrasings with the same embedding share one answer and its sources."""
+        async def run_test():
+            cache = make_cache()
+            await cache.store(f"كيف {keyword} اجدد", "الجواب", sources)
+            hit = await cache.lookup(f"تجديد {keyword}")
+            assert hit is not None
+            assert hit.answer == "الجواب"
+            assert hit.sources == sources
+            assert hit.similarity >= cache.threshold
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(first=keywords, second=keywords)
+    @settings(max_examples=100)
+    def test_dissimilar_question_misses(self, first: str, second: str) -> None:
+        """Questions about different services never share an answer."""
+        async def run_test():
+            cache = make_cache()
+            await cache.store(first, "الجواب", [])
+            hit = await cache.lookup(second)
+            assert (hit is not None) == (first == second)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(max_bytes=st.integers(min_value=1, max_value=20_000), stores=st.integers(1, 30))
+    @settings(max_examples=100)
+    def test_index_capped_by_memory(self, max_bytes: int, stores: int) -> None:
+        """The number of entries never exceeds the memory-derived capacity."""
+        async def run_test():
+            cache = make_cache(max_bytes)
+            for i in range(stores):
+                await cache.store(f"سؤال {i}", f"جواب {i}", [])
+            assert 1 <= len(cache) <= cache.capacity
+            assert cache._vectors.nbytes <= max(max_bytes, cache._vectors.shape[1] * 4)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_least_recently_used_entry_replaced(self) -> None:
+        """When full, the entry not used for longest is evicted."""
+        async def run_test():
+            cache = make_cache()
+            cache.max_bytes = 1  # capacity of one entry
+            await cache.store("رخصة", "a", [])
+            await cache.store("جواز", "b", [])
+            assert len(cache) == 1
+            assert await cache.lookup("رخصة") is None
+            assert (await cache.lookup("جواز")).answer == "b"
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(n=st.integers(min_value=2, max_value=32))
+    @settings(max_examples=50)
+    def test_concurrent_embeddings_batched(self, n: int) -> None:
+        """Concurrent questions are embedded in a single model call."""
+        async def run_test():
+            model = KeywordEmbedder()
+            embedder = BatchingEmbedder(model, max_batch_size=64, window_ms=5.0)
+            vectors = await asyncio.gather(*(embedder.embed(f"سؤال {i}") for i in range(n)))
+            assert len(vectors) == n
+            assert model.calls == [n]
+            assert all(abs(np.linalg.norm(v) - 1.0) < 1e-5 for v in vectors)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_follow_up_questions_not_cacheable(self) -> None:
+        """Only first-turn questions are matched against the cache."""
+        first_turn = [Message(role="user", content="كيف أجدد رخصتي")]
+        follow_up = first_turn + [
+            Message(role="assistant", content="عبر أبشر"),
+            Message(role="user", content="وماذا عن الجواز؟"),
+        ]
+        assert cacheable_question(first_turn) == "كيف أجدد رخصتي"
+        assert cacheable_question(follow_up) is None
+
+    def test_system_instructions_not_cacheable(self) -> None:
+        """Questions sent with client system messages bypass the cache."""
+        system = Message(role="system", content="أجب باختصار")
+        assert cacheable_question([system, Message(role="user", content="كيف أجدد رخصتي")]) is None
+
+
+class CountingMock(MockTritonClient):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def infer(self, prompt, config=None):
+        self.calls += 1
+        return await super().infer(prompt, config)
+
+
+class FinishingMock(MockTritonClient):
+    """Mock client streaming ``answer`` and ending on ``finish_reason``."""
+
+    def __init__(self, answer: str, finish_reason: str):
+        super().__init__()
+        self.answer = answer
+        self.finish_reason = finish_reason
+
+    async def infer_stream(self, prompt, config=None, stats=None):
+        for word in self.answer.split():
+            yield word + " "
+        if stats is not None:
+            stats.finish_reason = self.finish_reason
+
+
+class TestSemanticCacheEndpoint:
+    """
+    Tests for semantic cache integration with ``POST /v1/chat``.
+
+    **Feature: tensorrt-llm-server, Property 12: Semantic Cache Matching**
+    **Validates: Requirements 3.2, 4.1**
+    """
+
+    def teardown_method(self) -> None:
+        app.dependency_overrides.clear()
+
+    def test_paraphrase_skips_model(self) -> None:
+        """A paraphrased first-turn question is answered without the model."""
+        model = CountingMock()
+        cache = make_cache()
+        app.dependency_overrides[get_triton_client] = lambda: model
+        app.dependency_overrides[get_semantic_cache] = lambda: cache
+
+        client = TestClient(app)
+        first = client.post(
+            "/v1/chat",
+            json={"messages": [{"role": "user", "content": "كيف أجدد رخصتي"}], "user_id": "u1"},
+        )
+        second = client.post(
+            "/v1/chat",
+            json={"messages": [{"role": "user", "content": "تجديد رخصة القيادة"}], "user_id": "u2"},
+        )
+
+        assert first.status_code == 200 and second.status_code == 200
+        assert second.json()["response"] == first.json()["response"]
+        assert model.calls == 1
+        assert cache.hits == 1
+
+    def test_system_instructions_do_not_share_answers(self) -> None:
+        """The same question under different system messages is generated each time."""
+        model = CountingMock()
+        cache = make_cache()
+        app.dependency_overrides[get_triton_client] = lambda: model
+        app.dependency_overrides[get_semantic_cache] = lambda: cache
+
+        client = TestClient(app)
+        for instructions in ("أجب باختصار", "أجب بالتفصيل مع الخطوات"):
+            messages = [
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": "كيف أجدد رخصتي"},
+            ]
+            response = client.post("/v1/chat", json={"messages": messages, "user_id": "u1"})
+            assert response.status_code == 200
+
+        assert model.calls == 2
+        assert cache.hits == 0 and len(cache) == 0
+
+    def test_stream_caches_only_complete_answers(self) -> None:
+        """Streamed answers cut at ``max_tokens`` or empty are not cached; stopped ones are."""
+        body = {"messages": [{"role": "user", "content": "كيف أجدد رخصتي"}], "user_id": "u1"}
+        for answer, finish_reason, cached in (
+            ("يمكنك تجديد الرخصة", "length", False),
+            ("", "stop", False),
+            ("يمكنك تجديد الرخصة عبر أبشر", "stop", True),
+        ):
+            cache, model = make_cache(), FinishingMock(answer, finish_reason)
+            app.dependency_overrides[get_triton_client] = lambda: model
+            app.dependency_overrides[get_semantic_cache] = lambda: cache
+            with TestClient(app).stream("POST", "/v1/chat/stream", json=body) as response:
+                events = "".join(response.iter_text())
+            assert "event: done" in events
+            assert len(cache) == int(cached)
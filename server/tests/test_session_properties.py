@@ -0,0 +1,253 @@
+"""
+Property-based tests for conversation sessions.
+
+**Feature: tensorrt-llm-server, Property 24: Incremental Prompt Assembly**
+**Validates: Requirements 3.2**
+
+Tests that an assembled prompt equals ``build_prompt`` when the history
+fits, that a follow-up turn renders only the new message once the answer is
+recorded, that an edited history is re-rendered from the edit, that long
+histories and then passages are trimmed to the token budget while a
+question that still does not fit is rejected, and that the chat
+endpoint reuses the session between requests and stores none for requests
+without a ``session_id``.
+"""
+
+import asyncio
+from typing import List
+
+import pytest
+from fastapi.testclient import TestClient
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from api.main import app, get_guardrails, get_prompt_assembler, get_triton_client
+from api.models import Message
+from api.prompt import build_prompt, render_turn, system_block
+from api.sessions import InMemorySessionStore, PromptAssembler, PromptTooLongError
+from models.triton_client import MockTritonClient
+from models.usage import TokenCounter
+
+arabic_text = st.text(
+    alphabet=st.sampled_from(list("ابتثجحخدذرزسشصضطظعغفقكلمنهوي ؟.")), min_size=1, max_size=40
+).filter(lambda s: s.strip())
+
+conversations = st.lists(
+    st.tuples(st.sampled_from(["user", "assistant"]), arabic_text), min_size=1, max_size=12
+).map(lambda turns: [Message(role=role, content=text) for role, text in turns])
+
+
+class CountingCounter(TokenCounter):
+    """Records every text it has to count."""
+
+    def __init__(self):
+        super().__init__()
+        self.counted: List[str] = []
+
+    def count(self, text: str) -> int:
+        self.counted.append(text)
+        return super().count(text)
+
+
+class TestPromptAssembler:
+    """
+    Property tests for ``PromptAssembler``.
+
+    **Feature: tensorrt-llm-server, Property 24: Incremental Prompt Assembly**
+    **Validates: Requirements 3.2**
+    """
+
+    @given(messages=conversations, context=st.lists(arabic_text, max_size=3))
+    @settings(max_examples=100, deadline=None)
+    def test_matches_build_prompt_within_budget(
+        self, messages: List[Message], context: List[str]
+    ) -> None:
+        """Without trimming the assembled prompt is exactly ``build_prompt``."""
+        async def run_test():
+            assembler = PromptAssembler(InMemorySessionStore(), max_input_tokens=100_000)
+            session = await assembler.build("s1", messages, context)
+            assert session.prompt == build_prompt(messages, context=context)
+            assert session.dropped_turns == 0
+
+            # Stored turns reproduce the same prompt without rendering again
+            await assembler.store.set("s1", session.turns, 60)
+            again = await assembler.build("s1", messages, context)
+            assert again.prompt == session.prompt and again.rendered_turns == 0
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(
+        questions=st.lists(arabic_text, min_size=2, max_size=8),
+        answers=st.lists(arabic_text, min_size=8, max_size=8),
+    )
+    @settings(max_examples=50, deadline=None)
+    def test_follow_up_renders_only_the_delta(
+        self, questions: List[str], answers: List[str]
+    ) -> None:
+        """With the answer recorded, each turn counts just the new question and the system block."""
+        async def run_test():
+            counter = CountingCounter()
+            assembler = PromptAssembler(
+                InMemorySessionStore(), counter=counter, max_input_tokens=100_000
+            )
+            messages: List[Message] = []
+            for question, answer in zip(questions, answers):
+                messages.append(Message(role="user", content=question))
+                counter.counted.clear()
+                session = await assembler.build("s1", messages)
+                assert session.rendered_turns == 1
+                assert len(counter.counted) == 2  # system block + new question
+                assert session.prompt == build_prompt(messages)
+                await assembler.record_answer(session, answer, tokens=7)
+                messages.append(Message(role="assistant", content=answer))
+
+            # The prompt's count is known to the shared counter
+            assert counter.count(session.prompt) == session.prompt_tokens
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_edited_history_rerenders_from_the_edit(self) -> None:
+        """Changing an earlier message invalidates that turn and every later one."""
+        async def run_test():
+            assembler = PromptAssembler(InMemorySessionStore())
+            messages = [
+                Message(role="user", content="كيف أجدد الجواز؟"),
+                Message(role="assistant", content="عبر أبشر."),
+                Message(role="user", content="وكم الرسوم؟"),
+            ]
+            session = await assembler.build("s1", messages)
+            await assembler.record_answer(session, "ثلاثمئة ريال.")
+            edited = [messages[0], Message(role="assistant", content="من أبشر."), messages[2]]
+            session = await assembler.build("s1", edited)
+            assert session.rendered_turns == 2
+            assert session.prompt == build_prompt(edited)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(
+        messages=conversations,
+        context=st.lists(arabic_text, max_size=4),
+        budget=st.integers(40, 400),
+    )
+    @settings(max_examples=100, deadline=None)
+    def test_window_fits_budget(
+        self, messages: List[Message], context: List[str], budget: int
+    ) -> None:
+        """The prompt fits the budget: old turns go first, then the last passages, else it fails."""
+        async def run_test():
+            assembler = PromptAssembler(InMemorySessionStore(), max_input_tokens=budget)
+            try:
+                session = await assembler.build("s1", messages, context)
+            except PromptTooLongError:
+                counter = TokenCounter()
+                needed = counter.count(system_block(messages)) + counter.count(
+                    render_turn(messages[-1])
+                )
+                assert needed > budget
+                return
+            kept = messages[session.dropped_turns:]
+            kept_context = context[:len(context) - session.dropped_passages]
+
+            assert session.prompt_tokens <= budget
+            assert kept and session.prompt == build_prompt(kept, context=kept_context)
+            assert len(session.turns) == len(kept)
+            if len(kept) > 1:
+                assert kept[0].role == "user" or session.dropped_turns == 0
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_passages_give_way_to_the_question(self) -> None:
+        """The least relevant passages are dropped first; a question alone too long fails."""
+        async def run_test():
+            counter = TokenCounter()
+            question = [Message(role="user", content="كيف أجدد رخصة القيادة؟")]
+            base = counter.count(system_block(question)) + counter.count(render_turn(question[0]))
+            passages = ["مقطع " * 30, "فقرة " * 30, "نص " * 30]
+            assembler = PromptAssembler(InMemorySessionStore(), max_input_tokens=base + 60)
+            session = await assembler.build("s1", question, passages)
+            assert 0 < session.dropped_passages < len(passages)
+            assert session.prompt_tokens <= base + 60
+            kept = passages[:len(passages) - session.dropped_passages]
+            assert session.prompt == build_prompt(question, context=kept)
+
+            long_question = [Message(role="user", content="سؤال " * 200)]
+            with pytest.raises(PromptTooLongError):
+                await assembler.build("s1", long_question, passages)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_store_lru_and_expiry(self) -> None:
+        """The in-memory store keeps the most recent sessions until their TTL."""
+        async def run_test():
+            store = InMemorySessionStore(max_sessions=2)
+            for name in ("a", "b", "c"):
+                await store.set(name, [], 60)
+            assert len(store) == 2 and await store.get("a") is None
+            await store.set("d", [], 0)
+            assert await store.get("d") is None
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+
+class TestSessionEndpoint:
+    """
+    Tests for sessions in the chat endpoint.
+
+    **Feature: tensorrt-llm-server, Property 24: Incremental Prompt Assembly**
+    **Validates: Requirements 3.2**
+    """
+
+    def teardown_method(self) -> None:
+        app.dependency_overrides.clear()
+
+    def test_chat_reuses_session_turns(self) -> None:
+        """The second turn of a session renders only the new question."""
+        counter = CountingCounter()
+        assembler = PromptAssembler(InMemorySessionStore(), counter=counter)
+        app.dependency_overrides[get_triton_client] = lambda: MockTritonClient()
+        app.dependency_overrides[get_guardrails] = lambda: None
+        app.dependency_overrides[get_prompt_assembler] = lambda: assembler
+        http = TestClient(app)
+
+        messages = [{"role": "user", "content": "كيف أجدد رخصة القيادة؟"}]
+        body = {"messages": messages, "user_id": "u1", "session_id": "s1"}
+        first = http.post("/v1/chat", json=body).json()
+        messages += [
+            {"role": "assistant", "content": first["response"]},
+            {"role": "user", "content": "وكم الرسوم؟"},
+        ]
+        counter.counted.clear()
+        body = {"messages": messages, "user_id": "u1", "session_id": first["session_id"]}
+        assert http.post("/v1/chat", json=body).status_code == 200
+        rendered = [text for text in counter.counted if not text.startswith("<<SYS>>")]
+        assert rendered == ["[INST] وكم الرسوم؟ [/INST]"]
+
+    def test_chat_without_session_id_stores_nothing(self) -> None:
+        """A request without ``session_id`` cannot be continued, so no session is stored."""
+        store = InMemorySessionStore()
+        app.dependency_overrides[get_triton_client] = lambda: MockTritonClient()
+        app.dependency_overrides[get_guardrails] = lambda: None
+        app.dependency_overrides[get_prompt_assembler] = lambda: PromptAssembler(store)
+        http = TestClient(app)
+
+        body = {
+            "messages": [{"role": "user", "content": "كيف أجدد رخصة القيادة؟"}],
+            "user_id": "u1",
+        }
+        for _ in range(3):
+            assert http.post("/v1/chat", json=body).status_code == 200
+        assert len(store) == 0
+
+    def test_chat_rejects_question_over_the_budget(self) -> None:
+        """A question that alone exceeds the engine's input gets a 400, not a Triton error."""
+        app.dependency_overrides[get_triton_client] = lambda: MockTritonClient()
+        app.dependency_overrides[get_guardrails] = lambda: None
+        app.dependency_overrides[get_prompt_assembler] = lambda: PromptAssembler(
+            InMemorySessionStore(), max_input_tokens=100
+        )
+        http = TestClient(app)
+
+        body = {"messages": [{"role": "user", "content": "سؤال " * 200}], "user_id": "u1"}
+        response = http.post("/v1/chat", json=body)
+        assert response.status_code == 400
+        assert response.json()["error"] == "prompt_too_long"
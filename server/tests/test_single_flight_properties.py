@@ -0,0 +1,211 @@
+"""
+Property-based tests for single-flight generation.
+
+**Feature: tensorrt-llm-server, Property 26: Single-Flight Generation**
+**Validates: Requirements 3.2, 9.2**
+
+Tests that concurrent identical deterministic requests share one generation
+and all receive its full text, that streams joining late are replayed the
+chunks already sent, that sampled configs are never shared, that a
+subscriber going away only cancels the generation when it was the last one,
+and that a failure reaches every caller.
+"""
+
+import asyncio
+from typing import List
+
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from models.single_flight import SingleFlightTritonClient
+from models.triton_client import InferenceConfig, InferenceResult, TritonClientError
+from models.usage import GenerationStats
+from observability.metrics import SINGLE_FLIGHT
+
+deterministic = InferenceConfig(temperature=0.0)
+sampled = InferenceConfig(temperature=0.9)
+chunks_strategy = st.lists(
+    st.sampled_from(["تجديد ", "الجواز ", "عبر ", "أبشر", "."]), min_size=1, max_size=12
+)
+
+
+class GatedClient:
+    """Fake client whose generations advance only when the test releases them."""
+
+    def __init__(self, chunks: List[str], fail: bool = False):
+        self.chunks = chunks
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+        self.step = asyncio.Semaphore(0)
+
+    async def infer(self, prompt, config=None) -> InferenceResult:
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise TritonClientError("Inference failed: boom")
+        return InferenceResult("".join(self.chunks), len(self.chunks), 1.0, "stop")
+
+    async def infer_stream(self, prompt, config=None, stats=None):
+        self.calls += 1
+        try:
+            for chunk in self.chunks:
+                await self.step.acquire()
+                yield chunk
+            if self.fail:
+                raise TritonClientError("Streaming inference failed: boom")
+            if stats is not None:
+                stats.prompt_tokens, stats.completion_tokens = 5, len(self.chunks)
+        except (asyncio.CancelledError, GeneratorExit):
+            self.cancelled += 1
+            raise
+
+    async def close(self) -> None:
+        pass
+
+
+async def collect(client, prompt: str, config: InferenceConfig, stats=None) -> str:
+    return "".join([token async for token in client.infer_stream(prompt, config, stats=stats)])
+
+
+async def settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestSingleFlight:
+    """
+    Property tests for ``SingleFlightTritonClient``.
+
+    **Feature: tensorrt-llm-server, Property 26: Single-Flight Generation**
+    **Validates: Requirements 3.2, 9.2**
+    """
+
+    @given(chunks=chunks_strategy, callers=st.integers(2, 20))
+    @settings(max_examples=50)
+    def test_identical_calls_share_one_generation(self, chunks: List[str], callers: int) -> None:
+        """Concurrent identical calls, in spelling variants, get one generation's result."""
+        async def run_test():
+            inner = GatedClient(chunks)
+            client = SingleFlightTritonClient(inner)
+            followers = SINGLE_FLIGHT.labels("follower").value
+            prompts = ["كيف أجدد الجواز؟", "كيف اجدد الجواز؟", "كيف أجدّد الجواز؟"]
+            config = InferenceConfig(temperature=0.0, stream=False)
+            tasks = [
+                asyncio.ensure_future(client.infer(prompts[i % len(prompts)], config))
+                for i in range(callers)
+            ]
+            await settle()
+            assert client.in_flight == 1
+            inner.release.set()
+            results = await asyncio.gather(*tasks)
+
+            assert inner.calls == 1
+            assert all(r.text == "".join(chunks) for r in results)
+            assert len({id(r) for r in results}) == callers
+            assert SINGLE_FLIGHT.labels("follower").value == followers + callers - 1
+            assert client.in_flight == 0
+
+            # Once finished, the next call generates again
+            await client.infer(prompts[0], config)
+            assert inner.calls == 2
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(chunks=chunks_strategy, joins=st.lists(st.integers(0, 12), min_size=1, max_size=8))
+    @settings(max_examples=50)
+    def test_streams_fan_out_with_replay(self, chunks: List[str], joins: List[int]) -> None:
+        """Streams that join after any number of chunks still receive the whole text."""
+        async def run_test():
+            inner = GatedClient(chunks)
+            client = SingleFlightTritonClient(inner)
+            tasks = []
+            stats = [GenerationStats() for _ in joins]
+            # Every stream joins before the last chunk; one joining after the
+            # end would start a generation of its own
+            for released in range(len(chunks)):
+                for i, join in enumerate(joins):
+                    if min(join, len(chunks) - 1) == released:
+                        tasks.append(asyncio.ensure_future(
+                            collect(client, "سؤال", deterministic, stats[i])
+                        ))
+                await settle()
+                inner.step.release()
+            texts = await asyncio.gather(*tasks)
+
+            assert inner.calls == 1
+            assert texts == ["".join(chunks)] * len(joins)
+            assert all(s.completion_tokens == len(chunks) and s.streamed for s in stats)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_sampled_configs_are_not_shared(self) -> None:
+        """Requests that sample at a high temperature each generate."""
+        async def run_test():
+            inner = GatedClient(["نص"])
+            client = SingleFlightTritonClient(inner)
+            calls = [asyncio.ensure_future(client.infer("سؤال", sampled)) for _ in range(3)]
+            streams = [asyncio.ensure_future(collect(client, "سؤال", sampled)) for _ in range(3)]
+            await settle()
+            assert inner.calls == 6 and client.in_flight == 0
+            inner.release.set()
+            for _ in range(3):
+                inner.step.release()
+            await asyncio.gather(*calls, *streams)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_last_subscriber_leaving_cancels_generation(self) -> None:
+        """A departing subscriber detaches; the last one to leave stops the generation."""
+        async def run_test():
+            inner = GatedClient(["أ", "ب", "ت"])
+            client = SingleFlightTritonClient(inner)
+            first = asyncio.ensure_future(collect(client, "سؤال", deterministic))
+            second = asyncio.ensure_future(collect(client, "سؤال", deterministic))
+            await settle()
+            first.cancel()
+            await settle()
+            assert inner.cancelled == 0
+            for _ in range(3):
+                inner.step.release()
+            assert await second == "أبت"
+
+            third = asyncio.ensure_future(collect(client, "سؤال", deterministic))
+            await settle()
+            third.cancel()
+            await settle()
+            assert inner.cancelled == 1 and client.in_flight == 0
+
+            config = InferenceConfig(temperature=0.0, stream=False)
+            call = asyncio.ensure_future(client.infer("سؤال", config))
+            await settle()
+            call.cancel()
+            await settle()
+            assert inner.cancelled == 2 and client.in_flight == 0
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    def test_failure_reaches_every_caller(self) -> None:
+        """A failed shared generation raises for each caller attached to it."""
+        async def run_test():
+            inner = GatedClient(["أ"], fail=True)
+            client = SingleFlightTritonClient(inner)
+            config = InferenceConfig(temperature=0.0, stream=False)
+            calls = [asyncio.ensure_future(client.infer("سؤال", config)) for _ in range(3)]
+            streams = [
+                asyncio.ensure_future(collect(client, "سؤال", deterministic)) for _ in range(3)
+            ]
+            await settle()
+            inner.release.set()
+            inner.step.release()
+            results = await asyncio.gather(*calls, *streams, return_exceptions=True)
+            assert inner.calls == 2
+            assert all(isinstance(r, TritonClientError) for r in results)
+            assert client.in_flight == 0
+
+        asyncio.get_event_loop().run_until_complete(run_test())
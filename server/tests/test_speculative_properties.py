@@ -0,0 +1,157 @@
+"""
+Property-based tests for draft-target speculative decoding support.
+
+**Feature: tensorrt-llm-server, Property 30: Speculative Decoding Configuration**
+**Validates: Requirements 2.1, 2.2, 3.2**
+
+Tests that a draft model builds a second engine and a target engine that
+accepts draft tokens, that drafts with another vocabulary are rejected,
+that the Triton repository wires the BLS model to both engines, and that
+the client sends the number of draft tokens and counts speculative steps by
+their text.
+"""
+
+import asyncio
+import json
+import re
+from pathlib import Path
+
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from models import ALLAM_MODEL_NAME, TRITON_MODEL_REPOSITORY
+from models.triton_client import InferenceConfig, _parameter_inputs
+from models.usage import GenerationStats, estimate_tokens
+from scripts.convert_allam import AllamModelConverter, create_default_config
+from tests.test_conversion_properties import FakeRunner
+from tests.test_usage_properties import FakeGrpcClient, make_client
+
+ALLAM_VOCAB = 64000
+PHI3_VOCAB = 32064
+
+
+def model_dir(path: Path, vocab_size: int) -> Path:
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "config.json").write_text(json.dumps({"vocab_size": vocab_size}))
+    return path
+
+
+def model_config(name: str) -> str:
+    return (TRITON_MODEL_REPOSITORY / name / "config.pbtxt").read_text()
+
+
+def parameter(config: str, key: str) -> str:
+    match = re.search(rf'key:\s*"{key}"\s*value:\s*\{{\s*string_value:\s*"([^"]*)"', config)
+    assert match is not None, key
+    return match.group(1)
+
+
+class TestSpeculativeConversion:
+    """
+    Property tests for the draft and target engine builds.
+
+    **Feature: tensorrt-llm-server, Property 30: Speculative Decoding Configuration**
+    **Validates: Requirements 2.1, 2.2**
+    """
+
+    @given(max_draft_len=st.integers(1, 16))
+    @settings(max_examples=20, deadline=None)
+    def test_target_accepts_draft_tokens(self, tmp_path_factory, max_draft_len: int) -> None:
+        """Only the target engine takes external draft tokens; the draft has its own dirs."""
+        root = tmp_path_factory.mktemp("speculative")
+        allam = model_dir(root / "allam", ALLAM_VOCAB)
+        config = create_default_config(str(allam), str(root / "out"))
+        config.draft_model_dir = model_dir(root / "draft", ALLAM_VOCAB)
+        config.max_draft_len = max_draft_len
+        config.validate()
+        converter = AllamModelConverter(config, runner=FakeRunner())
+
+        target = converter._build_engine_command(root / "ckpt", root / "engine")
+        draft = converter._build_engine_command(
+            root / "draft_ckpt", root / "draft_engine", draft=True
+        )
+        assert "--speculative_decoding_mode draft_tokens_external" in target
+        assert f"--max_draft_len {max_draft_len}" in target
+        assert "--speculative_decoding_mode" not in draft and "--paged_kv_cache enable" in draft
+
+        converter.convert()
+        assert (root / "out" / "engine").is_dir()
+        assert (root / "out" / "draft" / "checkpoint").is_dir()
+        assert (root / "out" / "draft" / "engine").is_dir()
+
+    def test_without_draft_engine_is_unchanged(self, tmp_path: Path) -> None:
+        """Allam alone is built without speculative options."""
+        config = create_default_config(str(tmp_path), str(tmp_path / "out"))
+        assert not config.speculative
+        converter = AllamModelConverter(config)
+        command = converter._build_engine_command(tmp_path / "ckpt", tmp_path / "engine")
+        assert "--speculative_decoding_mode" not in command and "--max_draft_len" not in command
+
+    def test_rejects_incompatible_drafts(self, tmp_path: Path) -> None:
+        """A draft with another vocabulary (Phi-3), a bad draft length or beam search fails."""
+        allam = model_dir(tmp_path / "allam", ALLAM_VOCAB)
+        config = create_default_config(str(allam), str(tmp_path / "out"))
+        config.draft_model_dir = model_dir(tmp_path / "phi3", PHI3_VOCAB)
+        with pytest.raises(ValueError, match="vocabulary"):
+            config.validate()
+
+        config.draft_model_dir = model_dir(tmp_path / "draft", ALLAM_VOCAB)
+        config.validate()
+        for field, value in (("max_draft_len", 0), ("max_draft_len", 17), ("max_beam_width", 2)):
+            original = getattr(config, field)
+            setattr(config, field, value)
+            with pytest.raises(ValueError):
+                config.validate()
+            setattr(config, field, original)
+
+        config.draft_model_dir = tmp_path / "missing"
+        with pytest.raises(ValueError, match="Draft model directory"):
+            config.validate()
+
+
+class TestSpeculativeServing:
+    """
+    Tests for the Triton repository and the client.
+
+    **Feature: tensorrt-llm-server, Property 30: Speculative Decoding Configuration**
+    **Validates: Requirements 3.2**
+    """
+
+    def test_repository_wires_draft_and_target(self) -> None:
+        """The BLS model names both engines; the target takes draft tokens."""
+        bls = model_config("tensorrt_llm_bls")
+        assert parameter(bls, "tensorrt_llm_model_name") == ALLAM_MODEL_NAME
+        draft_name = parameter(bls, "tensorrt_llm_draft_model_name")
+        assert f'name: "{draft_name}"' in model_config(draft_name)
+        assert 'name: "num_draft_tokens"' in bls
+        assert 'name: "draft_input_ids"' in model_config(ALLAM_MODEL_NAME)
+        assert parameter(model_config(draft_name), "enable_kv_cache_reuse") == "true"
+
+    @given(num_draft_tokens=st.integers(0, 16))
+    @settings(max_examples=20)
+    def test_client_sends_draft_tokens(self, num_draft_tokens: int) -> None:
+        """``num_draft_tokens`` is sent only when set, so the ensemble never sees it."""
+        inputs = _parameter_inputs(InferenceConfig(num_draft_tokens=num_draft_tokens), 2)
+        names = [tensor.name() for tensor in inputs]
+        assert ("num_draft_tokens" in names) == (num_draft_tokens > 0)
+        if num_draft_tokens:
+            tensor = inputs[names.index("num_draft_tokens")]
+            assert tensor.shape() == [2, 1] and tensor.datatype() == "INT32"
+
+    def test_speculative_steps_are_counted_by_text(self) -> None:
+        """Without ``sequence_length`` a step carrying several tokens is not counted as one."""
+        async def run_test():
+            steps = [
+                ("يمكنك تجديد ", None, None), ("جواز السفر ", None, None), ("عبر أبشر.", None, None)
+            ]
+            text = "".join(step[0] for step in steps)
+            for num_draft_tokens, expected in ((0, len(steps)), (4, estimate_tokens(text))):
+                client = make_client(FakeGrpcClient(steps=list(steps)))
+                stats = GenerationStats()
+                config = InferenceConfig(num_draft_tokens=num_draft_tokens)
+                chunks = [chunk async for chunk in client.infer_stream("سؤال", config, stats)]
+                assert "".join(chunks) == text
+                assert stats.completion_tokens == expected and not stats.exact
+
+        asyncio.get_event_loop().run_until_complete(run_test())
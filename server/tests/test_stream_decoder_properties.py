@@ -0,0 +1,161 @@
+"""
+Property-based tests for incremental stream decoding.
+
+**Feature: tensorrt-llm-server, Property 18: Incremental Detokenization**
+**Validates: Requirements 3.2**
+
+Tests that any byte-level split of a UTF-8 answer decodes to the same text,
+that released pieces never split a grapheme cluster, that stop sequences
+are honoured across chunk boundaries, that only a minimal tail is held back
+and that ``TritonClient.infer_stream`` cancels generation at a stop string.
+"""
+
+import asyncio
+from typing import List
+
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from models.stream_decoder import StreamDecoder, _is_extender, _may_be_extended, truncate_at_stop
+from models.triton_client import InferenceConfig, TritonClient
+
+STOP = ("</s>", "[INST]")
+
+# Arabic letters, harakat and shadda, ZWJ, Latin, digits and stop-string pieces
+alphabet = st.sampled_from(
+    list("رخصةالقيادأبشر .1<>/s[INST]é")
+    + ["\u064e", "\u064f", "\u0650", "\u0651", "\u064b", "\u200d", "\u0301"]
+)
+texts = st.lists(alphabet, max_size=60).map("".join)
+
+
+def split_bytes(data: bytes, cuts: List[int]) -> List[bytes]:
+    points = sorted({min(c, len(data)) for c in cuts})
+    return [data[i:j] for i, j in zip([0] + points, points + [len(data)])]
+
+
+def decode(chunks, stop=()) -> List[str]:
+    decoder = StreamDecoder(stop)
+    pieces = [decoder.feed(chunk) for chunk in chunks]
+    pieces.append(decoder.finish())
+    return pieces
+
+
+class TestStreamDecoder:
+    """
+    Property tests for ``StreamDecoder``.
+
+    **Feature: tensorrt-llm-server, Property 18: Incremental Detokenization**
+    **Validates: Requirements 3.2**
+    """
+
+    @given(text=texts, cuts=st.lists(st.integers(0, 300), max_size=30))
+    @settings(max_examples=300)
+    def test_any_byte_split_round_trips(self, text: str, cuts: List[int]) -> None:
+        """Multibyte characters split across chunks decode exactly once."""
+        pieces = decode(split_bytes(text.encode("utf-8"), cuts))
+        assert "".join(pieces) == text
+
+    @given(text=texts, cuts=st.lists(st.integers(0, 300), max_size=30))
+    @settings(max_examples=300)
+    def test_pieces_end_on_cluster_boundaries(self, text: str, cuts: List[int]) -> None:
+        """No piece ending in a letter is followed by a mark or ZWJ of the same cluster."""
+        pieces = decode(split_bytes(text.encode("utf-8"), cuts))
+        position = 0
+        for piece in pieces[:-1]:
+            position += len(piece)
+            if piece and position < len(text) and _may_be_extended(text[position - 1]):
+                assert not _is_extender(text[position])
+                assert text[position - 1] != "\u200d"
+
+    @given(text=texts, cuts=st.lists(st.integers(0, 300), max_size=30))
+    @settings(max_examples=300)
+    def test_stop_sequences_across_chunks(self, text: str, cuts: List[int]) -> None:
+        """Output ends right before the first stop string, wherever the chunks split it."""
+        decoder = StreamDecoder(STOP)
+        output = "".join(decoder.feed(c) for c in split_bytes(text.encode("utf-8"), cuts))
+        output += decoder.finish()
+        expected, matched = truncate_at_stop(text, STOP)
+        assert output == expected
+        assert decoder.stop_sequence == matched
+
+    def test_minimal_holdback(self) -> None:
+        """Only a trailing letter or a partial stop string waits for the next chunk."""
+        decoder = StreamDecoder(STOP)
+        assert decoder.feed("مرحباً بك ".encode("utf-8")) == "مرحباً بك "
+        assert decoder.feed("في أبشر") == "في أبش"
+        assert decoder.feed("َ.") == "رَ."
+        assert decoder.feed(" انتهى</") == " انتهى"
+        assert decoder.feed("s> المزيد") == ""
+        assert decoder.stopped and decoder.finish() == ""
+
+    def test_split_multibyte_character(self) -> None:
+        """The two bytes of an Arabic letter arriving separately yield one character."""
+        data = "ش".encode("utf-8")
+        decoder = StreamDecoder()
+        assert decoder.feed(data[:1]) == ""
+        assert decoder.feed(data[1:]) == ""
+        assert decoder.finish() == "ش"
+
+
+class FakeStreamCall:
+    """Stream response iterator yielding fixed byte chunks."""
+
+    def __init__(self, chunks: List[bytes]):
+        self.chunks = list(chunks)
+        self.cancelled = False
+
+    def __aiter__(self) -> "FakeStreamCall":
+        return self
+
+    async def __anext__(self):
+        if not self.chunks or self.cancelled:
+            raise StopAsyncIteration
+        return FakeResult(self.chunks.pop(0)), None
+
+    def cancel(self) -> bool:
+        self.cancelled = True
+        return True
+
+
+class FakeResult:
+    def __init__(self, chunk: bytes):
+        self.chunk = chunk
+
+    def as_numpy(self, name: str):
+        return [self.chunk] if name == "text_output" else None
+
+
+class FakeGrpcClient:
+    def __init__(self, chunks: List[bytes]):
+        self.call = FakeStreamCall(chunks)
+
+    def stream_infer(self, inputs_iterator):
+        return self.call
+
+
+class TestTritonStreamDecoding:
+    """
+    Tests for decoding inside ``TritonClient.infer_stream``.
+
+    **Feature: tensorrt-llm-server, Property 18: Incremental Detokenization**
+    **Validates: Requirements 3.2**
+    """
+
+    @given(cuts=st.lists(st.integers(0, 120), max_size=20))
+    @settings(max_examples=50)
+    def test_stop_cancels_generation(self, cuts: List[int]) -> None:
+        """Generation is cancelled at the stop string and nothing after it is sent."""
+        answer = "يمكنك تجديد الرخصة عبر أبشر.</s>[INST] سؤال آخر"
+
+        async def run_test():
+            client = TritonClient()
+            client._client = FakeGrpcClient(split_bytes(answer.encode("utf-8"), cuts) + [b"more"])
+            client._prepare_inputs = lambda prompt, config: []
+
+            tokens = [t async for t in client.infer_stream("مرحبا", InferenceConfig(stop=STOP))]
+
+            assert "".join(tokens) == "يمكنك تجديد الرخصة عبر أبشر."
+            assert client._client.call.cancelled
+
+        asyncio.get_event_loop().run_until_complete(run_test())
@@ -11,20 +11,19 @@ response is complete.
 
 import asyncio
 import string
+import sys
 from typing import List
-from hypothesis import given, strategies as st, settings
 
-import sys
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
 sys.path.insert(0, str(__file__).rsplit("/", 2)[0])
 
 from models.triton_client import (
-    MockTritonClient,
     InferenceConfig,
-    InferenceResult,
     create_triton_client,
 )
 
-
 # Strategies for generating test data
 arabic_chars = "أبتثجحخدذرزسشصضطظعغفقكلمنهوي"
 valid_prompts = st.text(
@@ -54,7 +53,7 @@ def valid_inference_configs(draw: st.DrawFn) -> InferenceConfig:
 class TestStreamingTokenDelivery:
     """
     Property tests for streaming token delivery.
-    
+
     **Feature: tensorrt-llm-server, Property 7: Streaming Token Delivery**
     **Validates: Requirements 3.2, 9.2**
     """
@@ -65,43 +64,43 @@ class TestStreamingTokenDelivery:
         """
         **Feature: tensorrt-llm-server, Property 7: Streaming Token Delivery**
         **Validates: Requirements 3.2, 9.2**
-        
+
         For any valid prompt, streaming inference delivers tokens progressively,
         meaning the client receives partial content before the full response.
         """
         async def run_test():
             client = create_triton_client(use_mock=True)
-            
+
             tokens_received: List[str] = []
             timestamps: List[float] = []
-            
+
             import time
             start_time = time.perf_counter()
-            
+
             async for token in client.infer_stream(prompt):
                 tokens_received.append(token)
                 timestamps.append(time.perf_counter() - start_time)
-            
+
             # Property: Must receive at least one token
             assert len(tokens_received) >= 1, "Should receive at least one token"
-            
+
             # Property: Tokens should arrive progressively (not all at once)
             if len(timestamps) > 1:
                 # Check that there's some time gap between tokens
                 time_gaps = [
-                    timestamps[i] - timestamps[i-1] 
+                    timestamps[i] - timestamps[i-1]
                     for i in range(1, len(timestamps))
                 ]
                 # At least some gaps should be non-zero (progressive delivery)
                 assert any(gap > 0 for gap in time_gaps), \
                     "Tokens should be delivered progressively, not all at once"
-            
+
             # Property: Concatenated tokens form a non-empty response
             full_response = "".join(tokens_received)
             assert full_response.strip(), "Full response should be non-empty"
-            
+
             await client.close()
-        
+
         asyncio.get_event_loop().run_until_complete(run_test())
 
     @given(prompt=valid_prompts, config=valid_inference_configs())
@@ -112,26 +111,26 @@ class TestStreamingTokenDelivery:
         """
         **Feature: tensorrt-llm-server, Property 7: Streaming Token Delivery**
         **Validates: Requirements 3.2, 9.2**
-        
+
         For any valid prompt and inference config, streaming delivers tokens.
         """
         async def run_test():
             client = create_triton_client(use_mock=True)
-            
+
             tokens_received: List[str] = []
-            
+
             async for token in client.infer_stream(prompt, config):
                 tokens_received.append(token)
-            
+
             # Property: Must receive tokens
             assert len(tokens_received) >= 1, "Should receive at least one token"
-            
+
             # Property: Each token is a string
             for token in tokens_received:
                 assert isinstance(token, str), "Each token should be a string"
-            
+
             await client.close()
-        
+
         asyncio.get_event_loop().run_until_complete(run_test())
 
     @given(prompt=valid_prompts)
@@ -140,20 +139,20 @@ class TestStreamingTokenDelivery:
         """
         **Feature: tensorrt-llm-server, Property 7: Streaming Token Delivery**
         **Validates: Requirements 3.2, 9.2**
-        
+
         For any streaming request, client receives partial content before
         the full response is complete.
         """
         async def run_test():
             client = create_triton_client(use_mock=True)
-            
+
             partial_contents: List[str] = []
             accumulated = ""
-            
+
             async for token in client.infer_stream(prompt):
                 accumulated += token
                 partial_contents.append(accumulated)
-            
+
             # Property: Should have multiple partial states
             # (unless response is a single token)
             if len(partial_contents) > 1:
@@ -161,20 +160,20 @@ class TestStreamingTokenDelivery:
                 for i in range(len(partial_contents) - 1):
                     assert partial_contents[i+1].startswith(partial_contents[i]), \
                         "Each partial content should be a prefix of the next"
-                
+
                 # First partial should be shorter than final
                 assert len(partial_contents[0]) < len(partial_contents[-1]), \
                     "First partial should be shorter than final response"
-            
+
             await client.close()
-        
+
         asyncio.get_event_loop().run_until_complete(run_test())
 
 
 class TestStreamingVsSynchronousConsistency:
     """
     Property tests comparing streaming vs synchronous inference.
-    
+
     **Feature: tensorrt-llm-server, Property 7: Streaming Token Delivery**
     **Validates: Requirements 3.2, 9.2**
     """
@@ -185,42 +184,42 @@ class TestStreamingVsSynchronousConsistency:
         """
         **Feature: tensorrt-llm-server, Property 7: Streaming Token Delivery**
         **Validates: Requirements 3.2, 9.2**
-        
+
         For any prompt, streaming and synchronous inference produce
         equivalent final content.
         """
         async def run_test():
             client = create_triton_client(use_mock=True)
-            
+
             # Get synchronous result
             sync_result = await client.infer(prompt)
             sync_text = sync_result.text
-            
+
             # Get streaming result
             streaming_tokens: List[str] = []
             async for token in client.infer_stream(prompt):
                 streaming_tokens.append(token)
             streaming_text = "".join(streaming_tokens).strip()
-            
+
             # Property: Both should produce non-empty results
             assert sync_text.strip(), "Sync result should be non-empty"
             assert streaming_text, "Streaming result should be non-empty"
-            
+
             # Property: Results should be equivalent
             # (allowing for whitespace differences)
             assert sync_text.strip() == streaming_text.strip(), \
                 f"Sync and streaming should produce same content: " \
                 f"'{sync_text}' vs '{streaming_text}'"
-            
+
             await client.close()
-        
+
         asyncio.get_event_loop().run_until_complete(run_test())
 
 
 class TestInferenceResultProperties:
     """
     Property tests for InferenceResult structure.
-    
+
     **Feature: tensorrt-llm-server, Property 7: Streaming Token Delivery**
     **Validates: Requirements 3.2, 9.2**
     """
@@ -231,28 +230,28 @@ class TestInferenceResultProperties:
         """
         **Feature: tensorrt-llm-server, Property 7: Streaming Token Delivery**
         **Validates: Requirements 3.2, 9.2**
-        
+
         For any prompt, inference result has valid structure with
         non-negative latency and token count.
         """
         async def run_test():
             client = create_triton_client(use_mock=True)
-            
+
             result = await client.infer(prompt)
-            
+
             # Property: Result has non-empty text
             assert result.text.strip(), "Result text should be non-empty"
-            
+
             # Property: Latency is non-negative
             assert result.latency_ms >= 0, "Latency should be non-negative"
-            
+
             # Property: Token count is positive
             assert result.tokens_generated >= 0, "Token count should be non-negative"
-            
+
             # Property: Finish reason is valid
             assert result.finish_reason in ("stop", "length", "error"), \
                 f"Invalid finish reason: {result.finish_reason}"
-            
+
             await client.close()
-        
+
         asyncio.get_event_loop().run_until_complete(run_test())
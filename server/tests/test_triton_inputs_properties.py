@@ -0,0 +1,108 @@
+"""
+Property-based tests for Triton input tensor preparation.
+
+**Feature: tensorrt-llm-server, Property 9: Inference Input Encoding**
+**Validates: Requirements 3.2**
+
+Tests that prepared input tensors faithfully encode the prompt and sampling
+parameters, and that parameter tensors are shared per distinct config.
+"""
+
+import dataclasses
+import string
+
+import numpy as np
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from models.triton_client import InferenceConfig, TritonClient, _parameter_inputs
+
+arabic_chars = "أبتثجحخدذرزسشصضطظعغفقكلمنهوي"
+valid_prompts = st.text(
+    alphabet=string.ascii_letters + string.digits + " " + arabic_chars,
+    min_size=1,
+    max_size=200,
+)
+
+
+@st.composite
+def inference_configs(draw: st.DrawFn) -> InferenceConfig:
+    """Generate valid InferenceConfig objects."""
+    return InferenceConfig(
+        max_tokens=draw(st.integers(min_value=1, max_value=512)),
+        temperature=draw(st.floats(min_value=0.0, max_value=2.0, allow_nan=False)),
+        top_p=draw(st.floats(min_value=0.1, max_value=1.0, allow_nan=False)),
+        top_k=draw(st.integers(min_value=1, max_value=100)),
+        stream=draw(st.booleans()),
+    )
+
+
+def decode_inputs(inputs: list) -> dict:
+    """Decode InferInput objects back into a name -> value mapping."""
+    decoded = {}
+    for tensor in inputs:
+        assert tensor.shape() == [1, 1]
+        raw = tensor._get_content()
+        if tensor.datatype() == "BYTES":
+            # Triton BYTES serialization: 4-byte little-endian length prefix
+            decoded[tensor.name()] = raw[4:].decode("utf-8")
+        else:
+            dtype = {"INT32": np.int32, "FP32": np.float32, "BOOL": bool}[tensor.datatype()]
+            decoded[tensor.name()] = np.frombuffer(raw, dtype=dtype)[0].item()
+    return decoded
+
+
+class TestPreparedInputs:
+    """
+    Property tests for ``TritonClient._prepare_inputs``.
+
+    **Feature: tensorrt-llm-server, Property 9: Inference Input Encoding**
+    **Validates: Requirements 3.2**
+    """
+
+    @given(prompt=valid_prompts, config=inference_configs())
+    @settings(max_examples=100)
+    def test_inputs_encode_prompt_and_config(self, prompt: str, config: InferenceConfig) -> None:
+        """For any prompt and config, the encoded tensors round-trip exactly."""
+        decoded = decode_inputs(TritonClient()._prepare_inputs(prompt, config))
+
+        assert decoded["text_input"] == prompt
+        assert decoded["max_tokens"] == config.max_tokens
+        assert decoded["temperature"] == np.float32(config.temperature).item()
+        assert decoded["top_p"] == np.float32(config.top_p).item()
+        assert decoded["top_k"] == config.top_k
+        assert decoded["stream"] == config.stream
+
+    @given(prompts=st.lists(valid_prompts, min_size=2, max_size=5), config=inference_configs())
+    @settings(max_examples=100)
+    def test_parameter_tensors_shared_per_config(
+        self, prompts: list, config: InferenceConfig
+    ) -> None:
+        """Requests with equal configs reuse the same parameter tensors."""
+        client = TritonClient()
+        prepared = [
+            client._prepare_inputs(prompt, dataclasses.replace(config)) for prompt in prompts
+        ]
+
+        for inputs in prepared[1:]:
+            assert all(a is b for a, b in zip(inputs[1:], prepared[0][1:]))
+            assert inputs[0] is not prepared[0][0]
+
+    @given(config=inference_configs(), max_tokens=st.integers(min_value=1, max_value=512))
+    @settings(max_examples=100)
+    def test_distinct_configs_not_shared(self, config: InferenceConfig, max_tokens: int) -> None:
+        """Configs that differ in any field never share parameter tensors."""
+        other = dataclasses.replace(config, max_tokens=max_tokens)
+        if other == config:
+            assert _parameter_inputs(other) is _parameter_inputs(config)
+        else:
+            assert _parameter_inputs(other) is not _parameter_inputs(config)
+
+    def test_config_is_immutable(self) -> None:
+        """InferenceConfig is frozen so it can key the parameter cache."""
+        config = InferenceConfig(stream=False)
+        try:
+            config.stream = True
+            assert False, "InferenceConfig should be immutable"
+        except dataclasses.FrozenInstanceError:
+            pass
@@ -0,0 +1,287 @@
+"""
+Property-based tests for token usage accounting.
+
+**Feature: tensorrt-llm-server, Property 19: Usage Accounting**
+**Validates: Requirements 3.2**
+
+Tests that prompt and completion token counts come from the ensemble's
+``input_lengths`` and ``sequence_length`` outputs for direct, micro-batched
+and streamed inference, that the local estimate is used and flagged as
+inexact when those outputs are missing, that the timing fields are
+consistent, and that both chat endpoints report usage.
+"""
+
+import asyncio
+import json
+from typing import List, Optional, Tuple
+
+import numpy as np
+from fastapi.testclient import TestClient
+from hypothesis import given, settings
+from hypothesis import strategies as st
+from tritonclient.utils import deserialize_bytes_tensor
+
+from api.main import app, get_guardrails, get_triton_client
+from models.triton_client import InferenceConfig, MockTritonClient, TritonClient
+from models.usage import GenerationStats, TokenCounter, estimate_tokens
+
+Row = Tuple[str, Optional[int], Optional[int]]
+
+arabic_words = st.sampled_from(
+    ["تجديد", "رخصة", "القيادة", "جواز", "السفر", "أبشر", "مرحباً", "2024", "،", ".", "؟", "abc"]
+)
+texts = st.lists(arabic_words, min_size=1, max_size=20).map(" ".join)
+
+
+class FakeEnsembleResult:
+    """Ensemble response with ``text_output`` and optional token count outputs."""
+
+    def __init__(self, rows: List[Row]):
+        self.rows = rows
+
+    def as_numpy(self, name: str) -> Optional[np.ndarray]:
+        if name == "text_output":
+            return np.array([[text.encode("utf-8")] for text, _, _ in self.rows], dtype=object)
+        column = 1 if name == "input_lengths" else 2
+        values = [row[column] for row in self.rows]
+        if any(v is None for v in values):
+            return None
+        return np.array([[v] for v in values], dtype=np.int32)
+
+
+class FakeGrpcClient:
+    """Answers each prompt with ``generated`` tokens after ``len(prompt)`` prompt tokens."""
+
+    def __init__(self, generated: int = 3, report: bool = True, steps: Optional[List[Row]] = None):
+        self.generated = generated
+        self.report = report
+        self.steps = steps or []
+
+    async def infer(self, model_name: str, inputs: list) -> FakeEnsembleResult:
+        prompts = [p.decode("utf-8") for p in deserialize_bytes_tensor(inputs[0]._get_content())]
+        rows = []
+        for prompt in prompts:
+            if self.report:
+                rows.append((f"echo:{prompt}", len(prompt), len(prompt) + self.generated))
+            else:
+                rows.append((f"echo:{prompt}", None, None))
+        return FakeEnsembleResult(rows)
+
+    def stream_infer(self, inputs_iterator):
+        return FakeStreamCall(self.steps)
+
+
+class FakeStreamCall:
+    def __init__(self, steps: List[Row]):
+        self.steps = list(steps)
+
+    def __aiter__(self) -> "FakeStreamCall":
+        return self
+
+    async def __anext__(self):
+        if not self.steps:
+            raise StopAsyncIteration
+        await asyncio.sleep(0)
+        return FakeEnsembleResult([self.steps.pop(0)]), None
+
+    def cancel(self) -> bool:
+        return True
+
+
+def make_client(
+    grpc_client: FakeGrpcClient, batch_window_ms: Optional[float] = None
+) -> TritonClient:
+    client = TritonClient(batch_window_ms=batch_window_ms, token_counter=TokenCounter())
+    client._client = grpc_client
+    return client
+
+
+class TestModelReportedUsage:
+    """
+    Property tests for usage taken from the ensemble outputs.
+
+    **Feature: tensorrt-llm-server, Property 19: Usage Accounting**
+    **Validates: Requirements 3.2**
+    """
+
+    @given(prompt=texts, generated=st.integers(0, 20), max_tokens=st.integers(1, 20))
+    @settings(max_examples=100)
+    def test_infer_counts_from_sequence_length(
+        self, prompt: str, generated: int, max_tokens: int
+    ) -> None:
+        """Completion tokens are ``sequence_length - input_lengths``, independent of the text."""
+        async def run_test():
+            client = make_client(FakeGrpcClient(generated))
+            config = InferenceConfig(stream=False, max_tokens=max_tokens)
+            result = await client.infer(prompt, config)
+
+            assert result.exact_usage
+            assert result.prompt_tokens == len(prompt)
+            assert result.tokens_generated == generated
+            assert result.finish_reason == ("length" if generated >= max_tokens else "stop")
+            assert result.ttft_ms == result.latency_ms
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(prompts=st.lists(texts, min_size=1, max_size=12), generated=st.integers(0, 20))
+    @settings(max_examples=50)
+    def test_batched_rows_keep_their_counts(self, prompts: List[str], generated: int) -> None:
+        """Each caller of a micro-batch gets the token counts of its own row."""
+        async def run_test():
+            client = make_client(FakeGrpcClient(generated), batch_window_ms=5.0)
+            config = InferenceConfig(stream=False)
+
+            results = await asyncio.gather(*(client.infer(p, config) for p in prompts))
+
+            assert [r.prompt_tokens for r in results] == [len(p) for p in prompts]
+            assert all(r.tokens_generated == generated and r.exact_usage for r in results)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(
+        input_length=st.integers(1, 2048),
+        steps=st.lists(st.tuples(arabic_words, st.integers(1, 4)), min_size=1, max_size=20),
+    )
+    @settings(max_examples=100)
+    def test_stream_sums_step_lengths(
+        self, input_length: int, steps: List[Tuple[str, int]]
+    ) -> None:
+        """Streamed completion tokens are the sum of the per-response lengths."""
+        async def run_test():
+            rows = [(word + " ", input_length, n) for word, n in steps]
+            client = make_client(FakeGrpcClient(steps=rows))
+            stats = GenerationStats()
+
+            tokens = [t async for t in client.infer_stream("سؤال", InferenceConfig(), stats=stats)]
+
+            assert "".join(tokens) == "".join(word + " " for word, _ in steps)
+            assert stats.exact and stats.streamed
+            assert stats.prompt_tokens == input_length
+            assert stats.completion_tokens == sum(n for _, n in steps)
+            assert 0 <= stats.ttft_ms <= stats.latency_ms
+            if stats.completion_tokens >= 2:
+                spread = stats.ttft_ms + stats.inter_token_ms * (stats.completion_tokens - 1)
+                assert abs(spread - stats.latency_ms) < 1e-6
+            generated = stats.tokens_per_second * stats.latency_ms / 1000
+            assert abs(generated - stats.completion_tokens) < 1e-6
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(generated=st.integers(1, 8), max_tokens=st.integers(1, 8))
+    @settings(max_examples=50)
+    def test_stream_finish_reason(self, generated: int, max_tokens: int) -> None:
+        """A stream ends on ``length`` at ``max_tokens``, on ``stop`` before; cut short, on none."""
+        async def run_test():
+            rows = [("كلمة ", 4, 1)] * generated
+            config = InferenceConfig(max_tokens=max_tokens)
+
+            stats = GenerationStats()
+            _ = [t async for t in make_client(FakeGrpcClient(steps=rows)).infer_stream(
+                "سؤال", config, stats=stats
+            )]
+            assert stats.finish_reason == ("length" if generated >= max_tokens else "stop")
+
+            stats = GenerationStats()
+            stop = InferenceConfig(max_tokens=max_tokens, stop=("كلمة",))
+            _ = [t async for t in make_client(FakeGrpcClient(steps=rows)).infer_stream(
+                "سؤال", stop, stats=stats
+            )]
+            assert stats.finish_reason == "stop"
+
+            stats = GenerationStats()
+            client = make_client(FakeGrpcClient(steps=rows))
+            stream = client.infer_stream("سؤال", config, stats=stats)
+            await stream.__anext__()
+            await stream.aclose()
+            assert stats.finish_reason is None
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+
+class TestEstimatedUsage:
+    """
+    Property tests for the fallback when the model reports no counts.
+
+    **Feature: tensorrt-llm-server, Property 19: Usage Accounting**
+    **Validates: Requirements 3.2**
+    """
+
+    @given(prompt=texts)
+    @settings(max_examples=100)
+    def test_missing_outputs_are_estimated(self, prompt: str) -> None:
+        """Without ``input_lengths``/``sequence_length`` counts are estimated and flagged."""
+        async def run_test():
+            client = make_client(FakeGrpcClient(report=False))
+            result = await client.infer(prompt, InferenceConfig(stream=False))
+
+            assert not result.exact_usage
+            assert result.prompt_tokens == estimate_tokens(prompt)
+            assert result.tokens_generated == estimate_tokens(f"echo:{prompt}")
+            assert result.finish_reason == "stop"
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(steps=st.lists(arabic_words, min_size=1, max_size=20))
+    @settings(max_examples=50)
+    def test_stream_without_lengths_counts_steps(self, steps: List[str]) -> None:
+        """Each streamed response counts as one token when lengths are missing."""
+        async def run_test():
+            client = make_client(FakeGrpcClient(steps=[(w + " ", None, None) for w in steps]))
+            stats = GenerationStats()
+            _ = [t async for t in client.infer_stream("سؤال", InferenceConfig(), stats=stats)]
+
+            assert not stats.exact
+            assert stats.prompt_tokens == estimate_tokens("سؤال")
+            assert stats.completion_tokens == len(steps)
+
+        asyncio.get_event_loop().run_until_complete(run_test())
+
+    @given(a=texts, b=texts)
+    @settings(max_examples=100)
+    def test_estimate_is_additive_over_words(self, a: str, b: str) -> None:
+        """The estimate never merges words and grows with long words."""
+        assert estimate_tokens(f"{a} {b}") == estimate_tokens(a) + estimate_tokens(b)
+        assert estimate_tokens(a) >= len(a.split())
+
+
+class TestChatUsage:
+    """
+    Tests for usage reporting on the chat endpoints.
+
+    **Feature: tensorrt-llm-server, Property 19: Usage Accounting**
+    **Validates: Requirements 3.2**
+    """
+
+    def setup_method(self) -> None:
+        self.triton = MockTritonClient()
+        app.dependency_overrides[get_triton_client] = lambda: self.triton
+        app.dependency_overrides[get_guardrails] = lambda: None
+
+    def teardown_method(self) -> None:
+        app.dependency_overrides.clear()
+
+    def test_chat_and_stream_report_usage(self) -> None:
+        """Both endpoints return token counts and timing for a generated answer."""
+        client = TestClient(app)
+        body = {
+            "messages": [{"role": "user", "content": "كيف أجدد رخصة القيادة؟"}],
+            "user_id": "u1",
+        }
+
+        usage = client.post("/v1/chat", json=body).json()["usage"]
+        assert usage["prompt_tokens"] > 0 and usage["completion_tokens"] > 0
+        assert usage["total_tokens"] == usage["prompt_tokens"] + usage["completion_tokens"]
+        assert usage["exact"] is False
+
+        events = []
+        with client.stream("POST", "/v1/chat/stream", json=body) as stream_response:
+            for line in stream_response.iter_lines():
+                if line.startswith("data:"):
+                    events.append(json.loads(line.split(":", 1)[1]))
+        done = events[-1]
+        streamed = "".join(e.get("token", "") for e in events)
+
+        assert done["usage"]["completion_tokens"] == estimate_tokens(streamed)
+        assert done["usage"]["prompt_tokens"] == usage["prompt_tokens"]
+        assert done["usage"]["ttft_ms"] <= done["latency_ms"]
+        assert done["usage"]["inter_token_ms"] is not None